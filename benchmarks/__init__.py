@@ -0,0 +1,8 @@
+"""Performance benchmarks for the fixedpoint package.
+
+Run with:
+
+    python -m benchmarks
+
+The benchmarks use only the standard library and need no network access.
+"""
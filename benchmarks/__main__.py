@@ -0,0 +1,83 @@
+"""Run the benchmarks and compare them with a stored baseline.
+
+Usage:
+
+    python -m benchmarks [--output RESULTS] [--baseline BASELINE] [--threshold FRACTION]
+                         [--min-delta SECONDS] [--update-baseline] [--filter PATTERN]
+                         [--widths 8,16,...] [--retries N]
+
+Times are compared after normalizing by a calibration loop timed in the same
+run, and cases which appear slower are timed again in a fresh interpreter before
+being reported. The exit status is 1 if any case is still slower than the
+baseline by more than both the threshold and the minimum delta, and 0 otherwise.
+"""
+
+import argparse
+import os
+import sys
+
+from benchmarks.suite import (run, retime, compare, load, save, WIDTHS, DEFAULT_REPEAT, DEFAULT_MIN_TIME,
+                              DEFAULT_THRESHOLD, DEFAULT_MIN_DELTA, DEFAULT_RETRIES)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Benchmark the fixedpoint package.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="The JSON file of baseline results (default: %(default)s).")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="The tolerated fractional slowdown relative to the baseline (default: %(default)s).")
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                        help="The tolerated absolute slowdown in seconds per call (default: %(default)s).")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Replace the baseline with these results instead of comparing with it.")
+    parser.add_argument('--filter', dest='pattern', help="Only run cases whose names contain this string.")
+    parser.add_argument('--widths', type=lambda s: tuple(int(w) for w in s.split(',')), default=WIDTHS,
+                        help="Comma-separated QFormat widths in bits (default: {}).".format(
+                            ','.join(str(w) for w in WIDTHS)))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="The number of timed repeats of each case (default: %(default)s).")
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME,
+                        help="The minimum duration of each repeat in seconds (default: %(default)s).")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help="The number of times apparent regressions are timed again (default: %(default)s).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    def progress(name, seconds):
+        print("{:<40} {:>12.3f} us".format(name, seconds * 1e6))
+
+    results = run(args.widths, args.pattern, args.repeat, args.min_time, progress)
+    if args.output:
+        save(results, args.output)
+    if args.update_baseline:
+        save(results, args.baseline)
+        print("Baseline written to {}".format(args.baseline))
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline at {}; run with --update-baseline to create one".format(args.baseline))
+        return 0
+
+    baseline = load(args.baseline)
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+    for _ in range(args.retries):
+        if not regressions:
+            break
+        retime(results, [r.name for r in regressions], args.widths, args.repeat, args.min_time)
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+    for regression in regressions:
+        print("REGRESSION {:<40} {:>10.3f} us -> {:>10.3f} us ({:.0%} slower)".format(
+            regression.name, regression.baseline * 1e6, regression.current * 1e6, regression.ratio - 1))
+    if regressions:
+        return 1
+    print("No regressions beyond {:.0%} of baseline".format(args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
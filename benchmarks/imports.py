@@ -0,0 +1,68 @@
+"""Measure the cost of importing fixedpoint, and check that it loads no array modules.
+
+Usage:
+
+    python -m benchmarks.imports [--repeat N]
+
+Each measurement is made in a fresh interpreter. The exit status is 1 if importing
+fixedpoint loads NumPy or any of the array modules, which would make scalar-only
+users pay for features they do not use.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+FORBIDDEN_MODULES = ('numpy', 'fixedpoint.array', 'fixedpoint.quantization')
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure(statement, repeat=5):
+    """The fastest time to execute statement in a fresh interpreter, and the modules then loaded.
+
+    Returns:
+        A (seconds, modules) pair.
+    """
+    best = None
+    modules = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', 'import json' + _PROBE.format(statement=statement)],
+                                check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        result = json.loads(output)
+        if best is None or result['seconds'] < best:
+            best = result['seconds']
+        modules = result['modules']
+    return best, modules
+
+
+def forbidden_modules(modules):
+    """The modules, of those loaded, which scalar-only users should not pay for."""
+    return [m for m in modules if any(m == f or m.startswith(f + '.') for f in FORBIDDEN_MODULES)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.imports',
+                                     description="Measure the cost of importing fixedpoint.")
+    parser.add_argument('--repeat', type=int, default=5, help="The number of fresh interpreters (default: 5).")
+    args = parser.parse_args(argv)
+
+    seconds, modules = measure('import fixedpoint', args.repeat)
+    print("import fixedpoint: {:.3f} ms, {} modules loaded".format(seconds * 1e3, len(modules)))
+    loaded = forbidden_modules(modules)
+    if loaded:
+        print("FAIL: importing fixedpoint loaded {}".format(', '.join(loaded)))
+        return 1
+    print("No array modules or their dependencies were loaded")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""The benchmark cases, a runner, and comparison of results with a baseline.
+
+Each case is timed over a matrix of QFormat widths. A case is a callable of no
+arguments, timed with timeit; the reported figure is the fastest of several
+repeats, in seconds per call, which is the least noisy estimate of its cost.
+
+A fixed pure-Python calibration loop is timed at intervals between the cases, so
+results from machines or interpreters of different speeds can be compared by
+normalizing each time to the median calibration time of its own run.
+"""
+
+import json
+import multiprocessing
+import operator
+import pickle
+import platform
+import statistics
+import sys
+import timeit
+from collections import namedtuple
+from fractions import Fraction
+
+from fixedpoint import FixedPoint, QFormat, __version__
+
+WIDTHS = (8, 16, 32, 64, 128, 256)
+
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.05
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA = 2e-7
+DEFAULT_RETRIES = 3
+CALIBRATION_INTERVAL = 16
+
+Regression = namedtuple('Regression', ['name', 'baseline', 'current', 'ratio'])
+
+BINARY_OPERATORS = (
+    ('add', operator.add),
+    ('sub', operator.sub),
+    ('mul', operator.mul),
+    ('truediv', operator.truediv),
+    ('floordiv', operator.floordiv),
+    ('mod', operator.mod),
+    ('pow', lambda a, b: a ** 2),
+)
+
+UNARY_OPERATORS = (
+    ('neg', operator.neg),
+    ('pos', operator.pos),
+    ('abs', operator.abs),
+)
+
+COMPARISONS = (
+    ('eq', operator.eq),
+    ('lt', operator.lt),
+    ('le', operator.le),
+)
+
+
+def qformat_for_width(width):
+    """A QFormat of the given total width, split evenly between integer and fraction bits."""
+    return QFormat(width - width // 2, width // 2)
+
+
+def operands(qformat):
+    """Two typical non-zero values in a QFormat, using most of its range and precision."""
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    a = FixedPoint.from_raw((2**(num_bits - 1) - 1) // 3, qformat)
+    b = FixedPoint.from_raw(-(2**(num_bits - 2) + 7) // 5, qformat)
+    return a, b
+
+
+def cases(widths=WIDTHS):
+    """Generate (name, callable) pairs for every benchmark case.
+
+    Args:
+        widths: The total widths, in bits, of the QFormats to benchmark.
+    """
+    for width in widths:
+        qformat = qformat_for_width(width)
+        a, b = operands(qformat)
+        integer = a.numerator // a.denominator or 1
+        real = float(a)
+        fraction = Fraction(a)
+        pickled = pickle.dumps(a)
+        suffix = '[{}]'.format(qformat)
+
+        yield 'new_from_int' + suffix, lambda: FixedPoint(integer, qformat)
+        yield 'new_from_float' + suffix, lambda: FixedPoint(real, qformat)
+        yield 'new_from_fraction' + suffix, lambda: FixedPoint(fraction, qformat)
+        yield 'new_from_fixed_point' + suffix, lambda: FixedPoint(b, qformat)
+        yield 'new_from_raw' + suffix, lambda: FixedPoint.from_raw(a._numerator, qformat)
+
+        for name, op in BINARY_OPERATORS:
+            yield name + suffix, (lambda op: lambda: op(a, b))(op)
+        for name, op in UNARY_OPERATORS:
+            yield name + suffix, (lambda op: lambda: op(b))(op)
+        for name, op in COMPARISONS:
+            yield name + suffix, (lambda op: lambda: op(a, b))(op)
+
+        yield 'str' + suffix, lambda: str(b)
+        yield 'round' + suffix, lambda: round(b)
+        yield 'round_ndigits' + suffix, lambda: round(b, 2)
+        yield 'pickle_dumps' + suffix, lambda: pickle.dumps(a)
+        yield 'pickle_loads' + suffix, lambda: pickle.loads(pickled)
+
+
+def calibration():
+    """A fixed workload of pure-Python rational arithmetic and comparisons, like that of the cases."""
+    a = Fraction(355, 113)
+    b = Fraction(-22, 7)
+    for _ in range(10):
+        c = (a + b) * a - b
+        if c < b:
+            break
+    return c
+
+
+def time_case(func, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME):
+    """The fastest time per call of func, in seconds.
+
+    Args:
+        func: A callable of no arguments.
+
+        repeat: The number of timed repeats.
+
+        min_time: The minimum duration of each repeat, in seconds, which determines
+            the number of calls per repeat.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    return min([elapsed] + timer.repeat(repeat - 1, number)) / number
+
+
+def run(widths=WIDTHS, pattern=None, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME, progress=None):
+    """Run the benchmarks.
+
+    Args:
+        widths: The total widths, in bits, of the QFormats to benchmark.
+
+        pattern: If given, only cases with names containing this string are run.
+
+        repeat: The number of timed repeats of each case.
+
+        min_time: The minimum duration of each repeat, in seconds.
+
+        progress: An optional callable taking the name and time of each case as it
+            completes.
+
+    Returns:
+        A dictionary of results, suitable for saving as JSON, with the seconds per
+        call of each case under the 'results' key and the median seconds per call
+        of the calibration loop under the 'calibration' key.
+    """
+    results = {}
+    calibrations = []
+    for name, func in cases(widths):
+        if pattern is not None and pattern not in name:
+            continue
+        if len(results) % CALIBRATION_INTERVAL == 0:
+            calibrations.append(time_case(calibration, repeat, min_time))
+        results[name] = time_case(func, repeat, min_time)
+        if progress is not None:
+            progress(name, results[name])
+    calibrations.append(time_case(calibration, repeat, min_time))
+    return {
+        'fixedpoint': __version__,
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'calibration': statistics.median(calibrations),
+        'results': results,
+    }
+
+
+def _time_named(names, widths, repeat, min_time):
+    """Time the calibration loop and the named cases.
+
+    Returns:
+        The seconds per call of the calibration loop, and a dictionary of the seconds
+        per call of each case by name.
+    """
+    times = {name: time_case(func, repeat, min_time) for name, func in cases(widths) if name in names}
+    return time_case(calibration, repeat, min_time), times
+
+
+def retime(results, names, widths=WIDTHS, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME):
+    """Time some cases again in a fresh interpreter, keeping the faster of the old and new time of each.
+
+    The speed of a case can differ by tens of percent from one interpreter process to
+    the next, while staying steady within a process, so apparent regressions are
+    timed again in a new process. The new times are scaled by the ratio of the
+    calibration times of the two processes before they are compared with the old.
+
+    Args:
+        results: Results, as returned by run(), which are updated in place.
+
+        names: The names of the cases to time again.
+
+        widths: The total widths, in bits, of the QFormats of the cases.
+
+        repeat: The number of timed repeats of each case.
+
+        min_time: The minimum duration of each repeat, in seconds.
+    """
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        calibration_seconds, times = pool.apply(_time_named, (set(names), widths, repeat, min_time))
+    scale = results['calibration'] / calibration_seconds if results.get('calibration') else 1
+    for name, seconds in times.items():
+        results['results'][name] = min(results['results'][name], seconds * scale)
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA):
+    """Find the cases which are slower than their baseline by more than a threshold.
+
+    If both sets of results have a calibration time, the baseline times are first
+    scaled by the ratio of the calibration times, so that a uniformly slower or
+    faster machine reports no regressions. Cases missing from either set of
+    results are ignored.
+
+    Args:
+        current: Results, as returned by run().
+
+        baseline: Results, as returned by run().
+
+        threshold: The tolerated fractional slowdown. For example, 0.25 tolerates
+            cases taking up to 25% longer than their baseline.
+
+        min_delta: The tolerated absolute slowdown, in seconds per call, after
+            scaling. Cases so fast that timer noise exceeds the threshold are only
+            reported if they slow down by more than this.
+
+    Returns:
+        A list of Regressions, slowest relative to baseline first. The baseline
+        time of each is scaled to the speed of the current run.
+    """
+    scale = 1
+    if current.get('calibration') and baseline.get('calibration'):
+        scale = current['calibration'] / baseline['calibration']
+    regressions = []
+    for name, seconds in current['results'].items():
+        baseline_seconds = baseline['results'].get(name)
+        if baseline_seconds:
+            expected = baseline_seconds * scale
+            ratio = seconds / expected
+            if ratio > 1 + threshold and seconds - expected > min_delta:
+                regressions.append(Regression(name, expected, seconds, ratio))
+    return sorted(regressions, key=lambda r: r.ratio, reverse=True)
+
+
+def load(path):
+    """Load results from a JSON file."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(results, path):
+    """Save results to a JSON file."""
+    with open(path, mode='wt', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -5,3 +5,4 @@ __version__ = '1.0.0'
 
 from .fixedpoint import FixedPoint
 from .qformat import QFormat
+from .complexfixedpoint import ComplexFixedPoint
@@ -0,0 +1,517 @@
+"""An array of fixed-point numbers sharing one QFormat.
+
+This module requires NumPy.
+"""
+
+from fractions import Fraction
+from math import ceil, floor
+from numbers import Integral, Rational
+
+import numpy as np
+
+from fixedpoint.complexfixedpoint import (ComplexFixedPoint, multiply_numerators, check_multiply_method,
+                                         MULTIPLY_STANDARD, _exact_real)
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.qformat import sum_qformat, product_qformat, negated_qformat
+from fixedpoint.quantization import (quantize, constrain, shift_round, ROUND_HALF_EVEN, OVERFLOW_ERROR,
+                                     MAX_ARRAY_BITS)
+
+
+class FixedPointArray:
+    """An immutable, n-dimensional array of fixed-point numbers with a common QFormat.
+
+    The values are held as an array of raw integer numerators, in the narrowest
+    native integer dtype for the QFormat, or as Python integers in an array
+    of dtype object if the QFormat is wider than 64 bits.
+    """
+
+    @classmethod
+    def from_values(cls, values, qformat, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_ERROR):
+        """Quantize an array-like of real numbers into a FixedPointArray.
+
+        Args:
+            values: An array-like of real numbers, or of FixedPoint instances. FixedPoint
+                and Fraction elements are rounded exactly.
+
+            qformat: The QFormat of the result.
+
+            rounding: One of the quantization.ROUNDING_MODES.
+
+            overflow: One of the quantization.OVERFLOW_MODES.
+
+        Returns:
+            A FixedPointArray.
+
+        Raises:
+            OverflowError: If overflow is OVERFLOW_ERROR and a value is out of range.
+        """
+        array = np.asarray(values, dtype=object if _contains_fixed_point(values) else None)
+        if array.dtype == object:
+            # Exact conversion of FixedPoint or other rational values, element by element
+            numerators = shift_round(np.frompyfunc(_sticky_numerator(qformat), 1, 1)(array), -2, rounding)
+            return cls(constrain(numerators, qformat, overflow)[0], qformat)
+        return cls(quantize(array, qformat, rounding, overflow).numerators, qformat)
+
+    def __init__(self, numerators, qformat):
+        """Initialize a FixedPointArray from raw integer numerators.
+
+        Args:
+            numerators: An array-like of integer numerators which, when divided by
+                qformat.denominator, give the values of the elements.
+
+            qformat: The QFormat of the elements.
+
+        Raises:
+            TypeError: If numerators are not integers.
+            OverflowError: If any numerator exceeds the precision of qformat.
+        """
+        numerators = np.asarray(numerators)
+        if numerators.dtype != object and numerators.dtype.kind not in 'iu':
+            raise TypeError("{} numerators must be integers, not {}"
+                            .format(self.__class__.__name__, numerators.dtype))
+        numerators, _ = constrain(numerators, qformat, OVERFLOW_ERROR)
+        numerators.flags.writeable = False
+        self._numerators = numerators
+        self._qformat = qformat
+
+    @classmethod
+    def _from_numerators(cls, numerators, qformat):
+        """Wrap an array of numerators already in the storage dtype for qformat, without copying it.
+
+        Raises:
+            OverflowError: If any numerator exceeds the precision of qformat.
+        """
+        lower = qformat._min_numerator()
+        upper = qformat._max_numerator()
+        if numerators.size and (numerators.min() < lower or numerators.max() > upper):
+            raise OverflowError("Numerators are out of range {} <= numerator <= {} for {!r}"
+                                .format(lower, upper, qformat))
+        obj = super().__new__(cls)
+        obj._numerators = numerators.view()
+        obj._numerators.flags.writeable = False
+        obj._qformat = qformat
+        return obj
+
+    @property
+    def numerators(self):
+        """The read-only array of raw integer numerators."""
+        return self._numerators
+
+    @property
+    def qformat(self):
+        """The QFormat of every element."""
+        return self._qformat
+
+    @property
+    def shape(self):
+        """The shape of the array."""
+        return self._numerators.shape
+
+    @property
+    def ndim(self):
+        """The number of dimensions of the array."""
+        return self._numerators.ndim
+
+    @property
+    def dtype(self):
+        """The dtype of the numerators."""
+        return self._numerators.dtype
+
+    def __len__(self):
+        return len(self._numerators)
+
+    def __getitem__(self, index):
+        item = self._numerators[index]
+        if isinstance(item, np.ndarray):
+            return self.__class__(item, self._qformat)
+        return FixedPoint.from_raw(int(item), self._qformat)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, FixedPointArray):
+            return NotImplemented
+        return (self._qformat == other._qformat and self.shape == other.shape and
+                bool(np.all(self._numerators == other._numerators)))
+
+    __hash__ = None
+
+    def to_float(self):
+        """The values as an array of float64, which may lose precision."""
+        return np.ldexp(self._numerators.astype(np.float64), -self._qformat.fraction_bits)
+
+    def tolist(self):
+        """The values as a nested list of FixedPoint instances."""
+        def convert(item):
+            if isinstance(item, list):
+                return [convert(i) for i in item]
+            return FixedPoint.from_raw(item, self._qformat)
+        return convert(self._numerators.tolist())
+
+    def __repr__(self):
+        return "{}({!r}, {!r})".format(self.__class__.__name__, self._numerators.tolist(), self._qformat)
+
+    def sort(self, axis=-1):
+        """A sorted copy of the array, ordered by comparing raw numerators.
+
+        Args:
+            axis: The axis along which to sort, or None to sort the flattened array.
+        """
+        return self.__class__(np.sort(self._numerators, axis=axis, kind='stable'), self._qformat)
+
+    def argsort(self, axis=-1):
+        """The indices which would sort the array, as for numpy.argsort with a stable sort.
+
+        Args:
+            axis: The axis along which to sort, or None to sort the flattened array.
+        """
+        return np.argsort(self._numerators, axis=axis, kind='stable')
+
+    def searchsorted(self, values, side='left'):
+        """The indices at which values would be inserted to keep a sorted array in order.
+
+        Values need not be representable in the QFormat of the array: each is compared
+        exactly with the elements, as for numpy.searchsorted on the exact values.
+
+        Args:
+            values: A real number, a sequence of them, or a FixedPointArray.
+
+            side: 'left' for the first suitable index, or 'right' for the last.
+
+        Returns:
+            An integer index if values is a single number, otherwise an array of
+            indices with the shape of values.
+
+        Raises:
+            ValueError: If the array is not one-dimensional or side is not supported.
+        """
+        if self.ndim != 1:
+            raise ValueError("Only one-dimensional arrays can be searched, not shape {}".format(self.shape))
+        if side not in ('left', 'right'):
+            raise ValueError("Side {!r} is not 'left' or 'right'".format(side))
+        keys = self._search_keys(values, side)
+        lower = self._qformat._min_numerator()
+        upper = self._qformat._max_numerator()
+        # Keys are brought within the range of the elements, so that the array is searched without conversion
+        clipped = np.asarray(np.clip(keys, lower, upper)).astype(self.dtype)
+        indices = np.searchsorted(self._numerators, clipped, side=side)
+        indices = np.where(keys > upper, len(self), np.where(keys < lower, 0, indices))
+        return int(indices) if np.ndim(indices) == 0 else indices
+
+    def _search_keys(self, values, side):
+        """Integers which bound values exactly, when compared with the numerators of the array.
+
+        An element is less than a value if and only if its numerator is less than the
+        ceiling of the value scaled to the QFormat of the array, and no greater than a
+        value if and only if its numerator is no greater than the floor, so those are
+        the keys for the left and right sides respectively.
+        """
+        fraction_bits = self._qformat.fraction_bits
+        if not isinstance(values, FixedPointArray):
+            def key(value):
+                scaled = Fraction(value) * (1 << fraction_bits)
+                return ceil(scaled) if side == 'left' else floor(scaled)
+            return np.asarray(np.frompyfunc(key, 1, 1)(np.asarray(values, dtype=object)), dtype=object)
+        shift = fraction_bits - values.qformat.fraction_bits
+        num_bits = values.qformat.integer_bits + values.qformat.fraction_bits + max(shift, 0)
+        numerators = values.numerators.astype(np.int64 if num_bits < MAX_ARRAY_BITS else object)
+        if shift >= 0:
+            return numerators << shift
+        if side == 'left':
+            return -((-numerators) >> -shift)
+        return numerators >> -shift
+
+    def unique(self, return_counts=False):
+        """The sorted distinct values of the flattened array.
+
+        Args:
+            return_counts: If True, also return the number of times each value occurs.
+
+        Returns:
+            A one-dimensional FixedPointArray, or a 2-tuple of it and an array of counts.
+        """
+        if return_counts:
+            numerators, counts = np.unique(self._numerators, return_counts=True)
+            return self.__class__(numerators, self._qformat), counts
+        return self.__class__(np.unique(self._numerators), self._qformat)
+
+    def min(self, axis=None):
+        """The least value, as a FixedPoint, or the least values along an axis as a FixedPointArray.
+
+        Raises:
+            ValueError: If the array, or the axis, is empty.
+        """
+        return self._reduce(np.min, axis)
+
+    def max(self, axis=None):
+        """The greatest value, as a FixedPoint, or the greatest values along an axis as a FixedPointArray.
+
+        Raises:
+            ValueError: If the array, or the axis, is empty.
+        """
+        return self._reduce(np.max, axis)
+
+    def _reduce(self, func, axis):
+        result = func(self._numerators, axis=axis)
+        if isinstance(result, np.ndarray):
+            return self.__class__(result, self._qformat)
+        return FixedPoint.from_raw(int(result), self._qformat)
+
+
+def _sticky_numerator(qformat):
+    """Make a function converting a real number exactly to a numerator with two more fraction bits than qformat.
+
+    The extra bits are the bit below the least significant bit of qformat and a
+    sticky bit, set if the value lies strictly between two numerators with one
+    more fraction bit. Rounding the result by two bits therefore rounds the value
+    exactly, in any rounding mode.
+    """
+    scale = Fraction(2) ** (qformat.fraction_bits + 1)
+
+    def numerator(value):
+        scaled = Fraction(value) * scale
+        floor, remainder = divmod(scaled.numerator, scaled.denominator)
+        return 2 * floor + (remainder != 0)
+    return numerator
+
+
+def _working(numerators, num_bits):
+    """Numerators in a dtype in which arithmetic with results of num_bits bits is exact."""
+    return numerators.astype(np.int64 if num_bits <= MAX_ARRAY_BITS else object)
+
+
+class ComplexFixedPointArray:
+    """An immutable, n-dimensional array of complex fixed-point numbers with a common QFormat.
+
+    The real and imaginary parts are held as two FixedPointArrays of the same shape.
+    Arithmetic is exact, element by element, with the same result QFormats as for
+    ComplexFixedPoint, and operands are broadcast as by NumPy.
+    """
+
+    @classmethod
+    def from_values(cls, values, qformat, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_ERROR):
+        """Quantize an array-like of complex numbers into a ComplexFixedPointArray.
+
+        Args:
+            values: An array-like of complex or real numbers, or of ComplexFixedPoint
+                or FixedPoint instances, which are converted exactly.
+
+            qformat: The QFormat of both parts of the result.
+
+            rounding: One of the quantization.ROUNDING_MODES.
+
+            overflow: One of the quantization.OVERFLOW_MODES.
+
+        Raises:
+            OverflowError: If overflow is OVERFLOW_ERROR and a part is out of range.
+        """
+        array = np.asarray(values, dtype=object if _contains_fixed_point(values) else None)
+        if array.dtype == object:
+            real = np.frompyfunc(lambda value: value.real, 1, 1)(array)
+            imag = np.frompyfunc(lambda value: value.imag, 1, 1)(array)
+        else:
+            real, imag = np.real(array), np.imag(array)
+        return cls(FixedPointArray.from_values(real, qformat, rounding, overflow).numerators,
+                   FixedPointArray.from_values(imag, qformat, rounding, overflow).numerators, qformat)
+
+    def __init__(self, real_numerators, imag_numerators, qformat):
+        """Initialize a ComplexFixedPointArray from raw integer numerators.
+
+        Args:
+            real_numerators: An array-like of the integer numerators of the real parts.
+
+            imag_numerators: An array-like of the integer numerators of the imaginary
+                parts, of the same shape.
+
+            qformat: The QFormat of both parts.
+
+        Raises:
+            TypeError: If numerators are not integers.
+            ValueError: If the shapes of the parts differ, or qformat is unsigned.
+            OverflowError: If any numerator exceeds the precision of qformat.
+        """
+        if not qformat.signed:
+            raise ValueError("The parts of complex numbers cannot have unsigned {!r}".format(qformat))
+        real = FixedPointArray(real_numerators, qformat)
+        imag = FixedPointArray(imag_numerators, qformat)
+        if real.shape != imag.shape:
+            raise ValueError("Real and imaginary parts have different shapes {} and {}"
+                             .format(real.shape, imag.shape))
+        self._real = real
+        self._imag = imag
+        self._qformat = qformat
+
+    @property
+    def real(self):
+        """The real parts, as a FixedPointArray."""
+        return self._real
+
+    @property
+    def imag(self):
+        """The imaginary parts, as a FixedPointArray."""
+        return self._imag
+
+    @property
+    def qformat(self):
+        """The QFormat of both parts of every element."""
+        return self._qformat
+
+    @property
+    def shape(self):
+        """The shape of the array."""
+        return self._real.shape
+
+    @property
+    def ndim(self):
+        """The number of dimensions of the array."""
+        return self._real.ndim
+
+    def __len__(self):
+        return len(self._real)
+
+    def __getitem__(self, index):
+        real = self._real.numerators[index]
+        imag = self._imag.numerators[index]
+        if isinstance(real, np.ndarray):
+            return self.__class__(real, imag, self._qformat)
+        return ComplexFixedPoint.from_raw(int(real), int(imag), self._qformat)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, ComplexFixedPointArray):
+            return NotImplemented
+        return self._qformat == other._qformat and self._real == other._real and self._imag == other._imag
+
+    __hash__ = None
+
+    def to_complex(self):
+        """The values as an array of complex128, which may lose precision."""
+        return self._real.to_float() + 1j * self._imag.to_float()
+
+    def tolist(self):
+        """The values as a nested list of ComplexFixedPoint instances."""
+        def convert(real, imag):
+            if isinstance(real, list):
+                return [convert(r, i) for r, i in zip(real, imag)]
+            return ComplexFixedPoint.from_raw(real, imag, self._qformat)
+        return convert(self._real.numerators.tolist(), self._imag.numerators.tolist())
+
+    def __repr__(self):
+        return "{}({!r}, {!r}, {!r})".format(self.__class__.__name__, self._real.numerators.tolist(),
+                                             self._imag.numerators.tolist(), self._qformat)
+
+    def _operand(self, other):
+        """Convert an operand to a ComplexFixedPointArray, or return None if it is not exact."""
+        if isinstance(other, ComplexFixedPointArray):
+            return other
+        if isinstance(other, FixedPointArray):
+            # A real operand in an unsigned QFormat gains a sign bit, as both parts must be signed
+            return ComplexFixedPointArray(other.numerators, np.zeros_like(other.numerators), other.qformat.to_signed())
+        if isinstance(other, Rational):
+            other = ComplexFixedPoint(_exact_real(other))
+        if isinstance(other, ComplexFixedPoint):
+            return ComplexFixedPointArray(np.array(other._real_numerator, dtype=object),
+                                          np.array(other._imag_numerator, dtype=object), other.qformat)
+        return None
+
+    def _numerators_in(self, num_bits, shift=0):
+        return (_working(self._real.numerators, num_bits) << shift,
+                _working(self._imag.numerators, num_bits) << shift)
+
+    def _add(self, other):
+        qformat = sum_qformat(self._qformat, other._qformat)
+        num_bits = qformat.integer_bits + qformat.fraction_bits
+        a_real, a_imag = self._numerators_in(num_bits, qformat.fraction_bits - self._qformat.fraction_bits)
+        b_real, b_imag = other._numerators_in(num_bits, qformat.fraction_bits - other._qformat.fraction_bits)
+        return ComplexFixedPointArray(a_real + b_real, a_imag + b_imag, qformat)
+
+    def __add__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else self._add(operand)
+
+    def __radd__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else operand._add(self)
+
+    def __sub__(self, other):
+        # As for FixedPoint, an integer is negated before conversion
+        if isinstance(other, Integral):
+            return self._add(self._operand(-other))
+        operand = self._operand(other)
+        return NotImplemented if operand is None else self._add(-operand)
+
+    def __rsub__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else operand._add(-self)
+
+    def multiply(self, other, method=MULTIPLY_STANDARD):
+        """The exact element-wise product with another array or number.
+
+        Args:
+            other: A ComplexFixedPointArray, FixedPointArray, ComplexFixedPoint,
+                FixedPoint or integer.
+
+            method: One of the complexfixedpoint.MULTIPLY_METHODS. The result does
+                not depend on it.
+
+        Returns:
+            A ComplexFixedPointArray in QFormat(ia + ib + 1, fa + fb).
+
+        Raises:
+            TypeError: If other is not an exact number or array.
+            ValueError: If method is not supported.
+        """
+        check_multiply_method(method)
+        operand = self._operand(other)
+        if operand is None:
+            raise TypeError("Cannot multiply {} exactly by {!r}".format(self.__class__.__name__, other))
+        qformat = product_qformat(self._qformat, operand._qformat)
+        # Intermediate results may wrap in int64, but the exact result fits, so it is correct
+        num_bits = qformat.integer_bits + qformat.fraction_bits
+        a_real, a_imag = self._numerators_in(num_bits)
+        b_real, b_imag = operand._numerators_in(num_bits)
+        real, imag = multiply_numerators(a_real, a_imag, b_real, b_imag, method)
+        return ComplexFixedPointArray(real, imag, qformat)
+
+    def __mul__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else self.multiply(operand)
+
+    def __rmul__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else operand.multiply(self)
+
+    def __neg__(self):
+        qformat = negated_qformat(self._qformat)
+        real, imag = self._numerators_in(qformat.integer_bits + qformat.fraction_bits)
+        return ComplexFixedPointArray(-real, -imag, qformat)
+
+    def __pos__(self):
+        return self
+
+    def conjugate(self):
+        """The complex conjugates, in QFormat(integer_bits + 1, fraction_bits)."""
+        qformat = negated_qformat(self._qformat)
+        real, imag = self._numerators_in(qformat.integer_bits + qformat.fraction_bits)
+        return ComplexFixedPointArray(real, -imag, qformat)
+
+    def magnitude_squared(self):
+        """The exact squared magnitudes, as a FixedPointArray in QFormat(2 * integer_bits + 1, 2 * fraction_bits)."""
+        # The sum of two squares is no greater than twice the greatest square, which a product format holds
+        qformat = product_qformat(self._qformat, self._qformat)
+        real, imag = self._numerators_in(qformat.integer_bits + qformat.fraction_bits)
+        return FixedPointArray(real * real + imag * imag, qformat)
+
+
+def _contains_fixed_point(values):
+    if isinstance(values, np.ndarray):
+        return values.dtype == object
+    if isinstance(values, (list, tuple)):
+        return any(_contains_fixed_point(v) if isinstance(v, (list, tuple))
+                   else isinstance(v, (FixedPoint, ComplexFixedPoint)) for v in values)
+    return isinstance(values, (FixedPoint, ComplexFixedPoint))
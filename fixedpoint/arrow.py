@@ -0,0 +1,188 @@
+"""An Apache Arrow extension type for arrays of fixed-point numbers.
+
+FixedPointType stores the raw numerators of an array as Arrow int8, int16, int32 or
+int64, the narrowest which holds its QFormat, and records the QFormat in the
+extension metadata of the field, as a string such as 'Q1.15'. Files and streams
+written with it can therefore be read exactly by any Arrow implementation, and
+readers which do not know the extension type still see the integer numerators and
+the QFormat.
+
+Conversion in both directions shares the numerator buffer rather than copying it,
+so a FixedPointArray can be read directly from a memory-mapped IPC file:
+
+    >>> table = pa.table({'x': to_arrow(values)})
+    >>> with pa.OSFile('values.arrow', 'wb') as sink:
+    ...     with pa.ipc.new_file(sink, table.schema) as writer:
+    ...         writer.write_table(table)
+    >>> with pa.memory_map('values.arrow') as source:
+    ...     values = from_arrow(pa.ipc.open_file(source).read_all()['x'])
+
+Importing this module registers FixedPointType with pyarrow. If pandas is installed,
+columns of pandas_extension.FixedPointDtype convert to and from FixedPointType too.
+
+This module requires NumPy and pyarrow.
+"""
+
+import numpy as np
+import pyarrow as pa
+
+from fixedpoint.array import FixedPointArray
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.qformat import QFormat
+from fixedpoint.quantization import numerator_dtype
+
+EXTENSION_NAME = 'fixedpoint.fixedpoint'
+
+
+class FixedPointScalar(pa.ExtensionScalar):
+    """An element of an Arrow array of FixedPointType."""
+
+    def as_py(self, **kwargs):
+        """The element as a FixedPoint, or None if it is null."""
+        value = self.value
+        return None if value is None else FixedPoint.from_raw(value.as_py(), self.type.qformat)
+
+
+class FixedPointType(pa.ExtensionType):
+    """The Arrow extension type of fixed-point numbers with a common QFormat."""
+
+    def __init__(self, qformat):
+        """Initialize a FixedPointType.
+
+        Args:
+            qformat: The QFormat of every element.
+
+        Raises:
+            ValueError: If the numerators of qformat do not fit in 64 bits.
+        """
+        self._qformat = qformat
+        super().__init__(pa.from_numpy_dtype(numerator_dtype(qformat)), EXTENSION_NAME)
+
+    @property
+    def qformat(self):
+        """The QFormat of every element."""
+        return self._qformat
+
+    def __arrow_ext_serialize__(self):
+        return str(self._qformat).encode('ascii')
+
+    @classmethod
+    def __arrow_ext_deserialize__(cls, storage_type, serialized):
+        qformat = QFormat.from_str(serialized.decode('ascii'))
+        if storage_type != pa.from_numpy_dtype(numerator_dtype(qformat)):
+            raise TypeError("Storage type {} does not match {!r}".format(storage_type, qformat))
+        return cls(qformat)
+
+    def __arrow_ext_scalar_class__(self):
+        return FixedPointScalar
+
+    def to_pandas_dtype(self):
+        from fixedpoint.pandas_extension import FixedPointDtype
+        return FixedPointDtype(self._qformat)
+
+    def __eq__(self, other):
+        # Arrow also compares extension types with this, for example when concatenating arrays
+        if isinstance(other, FixedPointType):
+            return self._qformat == other._qformat
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash((EXTENSION_NAME, self._qformat))
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self._qformat)
+
+
+def _register():
+    try:
+        pa.register_extension_type(FixedPointType(QFormat(1, 0)))
+    except pa.ArrowKeyError:
+        # Already registered, for example if this module has been reloaded
+        pass
+
+
+_register()
+
+
+def _to_arrow(numerators, mask, qformat):
+    """An Arrow array of FixedPointType sharing a buffer of numerators, with nulls where mask is true."""
+    arrow_type = FixedPointType(qformat)
+    numerators = np.ascontiguousarray(numerators)
+    if numerators.dtype != numerator_dtype(qformat):
+        raise TypeError("Numerators of dtype {} are not stored as {!r} requires".format(numerators.dtype, qformat))
+    validity, null_count = None, 0
+    if mask is not None and mask.any():
+        validity = pa.py_buffer(np.packbits(~mask, bitorder='little'))
+        null_count = int(mask.sum())
+    storage = pa.Array.from_buffers(arrow_type.storage_type, len(numerators), [validity, pa.py_buffer(numerators)],
+                                    null_count)
+    return pa.ExtensionArray.from_storage(arrow_type, storage)
+
+
+def _from_arrow(array):
+    """The numerators, missing mask and QFormat of an Arrow array of FixedPointType.
+
+    The numerators share the buffer of the array, and are undefined where elements are null.
+    """
+    if isinstance(array, pa.ChunkedArray):
+        # combine_chunks() also makes an empty array of the right type when there are no chunks
+        array = array.chunk(0) if array.num_chunks == 1 else array.combine_chunks()
+    if not isinstance(array.type, FixedPointType):
+        raise TypeError("Arrow array of type {} is not of {}".format(array.type, FixedPointType.__name__))
+    qformat = array.type.qformat
+    storage = array.storage
+    dtype = np.dtype(numerator_dtype(qformat))
+    buffer = storage.buffers()[1]
+    if buffer is None:
+        numerators = np.empty(0, dtype=dtype)
+    else:
+        numerators = np.frombuffer(buffer, dtype=dtype, count=storage.offset + len(storage))[storage.offset:]
+    mask = storage.is_null().to_numpy(zero_copy_only=False) if storage.null_count else None
+    return numerators, mask, qformat
+
+
+def to_arrow(values):
+    """Convert a one-dimensional FixedPointArray to an Arrow array without copying the numerators.
+
+    Args:
+        values: A one-dimensional FixedPointArray. Its numerators are copied only if
+            they are not contiguous.
+
+    Returns:
+        A pyarrow.ExtensionArray of FixedPointType.
+
+    Raises:
+        ValueError: If values is not one-dimensional, or its QFormat is wider than
+            64 bits.
+    """
+    if values.ndim != 1:
+        raise ValueError("Only one-dimensional arrays can be converted to Arrow, not {}-dimensional"
+                         .format(values.ndim))
+    return _to_arrow(values.numerators, None, values.qformat)
+
+
+def from_arrow(array):
+    """Convert an Arrow array of FixedPointType to a FixedPointArray without copying the numerators.
+
+    Args:
+        array: A pyarrow.ExtensionArray of FixedPointType, or a pyarrow.ChunkedArray
+            of them. The chunks of a ChunkedArray are copied into one array unless
+            there is only one.
+
+    Returns:
+        A FixedPointArray whose numerators share the buffer of array.
+
+    Raises:
+        TypeError: If array is not of FixedPointType.
+        ValueError: If array contains nulls, which a FixedPointArray cannot hold.
+        OverflowError: If a numerator is out of range for the QFormat.
+    """
+    numerators, mask, qformat = _from_arrow(array)
+    if mask is not None:
+        raise ValueError("An Arrow array with {} nulls cannot be converted to a {}"
+                         .format(int(mask.sum()), FixedPointArray.__name__))
+    return FixedPointArray._from_numerators(numerators, qformat)
@@ -0,0 +1,448 @@
+"""Out-of-core processing of fixed-point datasets in blocks of bounded size.
+
+Datasets too large for memory are kept in files, either as raw numerators in a
+NumeratorFile or bit-packed in a packed.PackedFixedPointArray, and processed a block
+at a time. The length of the blocks is chosen so that the numerators in memory at
+once stay within a memory ceiling. While one block is being processed, the next can
+be read from the file by a background thread. NumPy and the operating system
+release the GIL while reading and copying, so reading overlaps with processing.
+
+map_blocks() applies a function of numerators, such as dsp.FIRFilter.process, to
+each block in order, so a filter which keeps its state between calls gives the same
+results as if the whole dataset were processed at once:
+
+    >>> fir = FIRFilter(taps, QFormat(1, 15), QFormat(8, 30), QFormat(1, 15))
+    >>> samples = NumeratorFile('samples.bin', QFormat(1, 15))
+    >>> write_numerators('filtered.bin', map_blocks(fir.process, fir.output_qformat, samples))
+
+reduce_blocks() folds the blocks into an accumulator, which histogram(), peak() and
+error_statistics() use to summarize a dataset, or compare it with golden data,
+exactly.
+
+This module requires NumPy.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from math import ceil, floor, sqrt
+
+import numpy as np
+
+from fixedpoint.array import FixedPointArray
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.linalg import NATIVE_ACCUMULATOR_BITS
+from fixedpoint.parallel import _sum_chunk, _sum_block_length
+from fixedpoint.qformat import sum_qformat
+from fixedpoint.quantization import numerator_dtype
+
+DEFAULT_MAX_MEMORY = 1 << 28
+
+# Histograms of QFormats up to this width count every possible numerator, rather than searching the edges
+DIRECT_HISTOGRAM_BITS = 16
+
+ErrorStatistics = namedtuple('ErrorStatistics', ['count', 'mismatches', 'max_error', 'mean_error', 'rms_error'])
+
+
+class NumeratorFile:
+    """A one-dimensional array of fixed-point numbers stored in a file as raw numerators.
+
+    Each numerator is stored as a two's complement integer in the narrowest of 1, 2, 4
+    or 8 bytes which holds the QFormat, as written by write_numerators(). The file is
+    memory-mapped, and numerators are read, and checked against the range of the
+    QFormat, only when they are indexed.
+    """
+
+    def __init__(self, file, qformat, length=None, offset=0, byteorder='<'):
+        """Open a file of numerators, by memory-mapping it.
+
+        Args:
+            file: The path of the file, or a file object open for reading.
+
+            qformat: The QFormat of every element.
+
+            length: The number of elements, or None for as many as the file holds
+                after offset.
+
+            offset: The position in the file of the first numerator.
+
+            byteorder: '<' for little-endian or '>' for big-endian numerators.
+
+        Raises:
+            ValueError: If the numerators of qformat do not fit in 64 bits, byteorder
+                is not '<' or '>', or the file is too short to hold length elements.
+        """
+        if byteorder not in ('<', '>'):
+            raise ValueError("Byte order {!r} is not '<' or '>'".format(byteorder))
+        dtype = np.dtype(numerator_dtype(qformat)).newbyteorder(byteorder)
+        shape = None if length is None else (length,)
+        self._numerators = np.memmap(file, dtype=dtype, mode='r', offset=offset, shape=shape)
+        self._qformat = qformat
+
+    @property
+    def numerators(self):
+        """The read-only numpy.memmap of numerators, unchecked and in the byte order of the file."""
+        return self._numerators
+
+    @property
+    def qformat(self):
+        """The QFormat of every element."""
+        return self._qformat
+
+    def __len__(self):
+        return len(self._numerators)
+
+    def __getitem__(self, index):
+        """Read an element as a FixedPoint, or any other index as a FixedPointArray.
+
+        Raises:
+            OverflowError: If a numerator read is out of range for the QFormat.
+        """
+        item = self._numerators[index]
+        if isinstance(item, np.ndarray):
+            numerators = item.astype(item.dtype.newbyteorder('='))
+            return FixedPointArray._from_numerators(numerators, self._qformat)
+        return FixedPoint.from_raw(int(item), self._qformat)
+
+    def __iter__(self):
+        for _, (numerators,) in iter_blocks(self, read_ahead=False):
+            for numerator in numerators:
+                yield FixedPoint.from_raw(int(numerator), self._qformat)
+
+    def __repr__(self):
+        return "{}({!r}, {!r}, {!r})".format(self.__class__.__name__, self._numerators.filename, self._qformat,
+                                             len(self))
+
+
+def write_numerators(file, blocks, byteorder='<'):
+    """Write blocks of fixed-point numbers to a file as raw numerators, which NumeratorFile can read.
+
+    Args:
+        file: The path of the file, or a file object open for writing.
+
+        blocks: An iterable of one-dimensional FixedPointArrays with a common QFormat,
+            such as the results of map_blocks().
+
+        byteorder: '<' for little-endian or '>' for big-endian.
+
+    Returns:
+        The number of numerators written.
+
+    Raises:
+        ValueError: If byteorder is not '<' or '>', the blocks have different
+            QFormats, or their QFormat does not fit in 64 bits.
+    """
+    if byteorder not in ('<', '>'):
+        raise ValueError("Byte order {!r} is not '<' or '>'".format(byteorder))
+    if not hasattr(file, 'write'):
+        with open(file, 'wb') as f:
+            return write_numerators(f, blocks, byteorder)
+    count = 0
+    qformat = None
+    for block in blocks:
+        if qformat is None:
+            qformat = block.qformat
+            dtype = np.dtype(numerator_dtype(qformat)).newbyteorder(byteorder)
+        elif block.qformat != qformat:
+            raise ValueError("Cannot write a block of {!r} to a file of {!r}".format(block.qformat, qformat))
+        file.write(block.numerators.astype(dtype).tobytes())
+        count += block.numerators.size
+    return count
+
+
+def block_length(qformats, max_memory=DEFAULT_MAX_MEMORY, read_ahead=True):
+    """The number of elements in each block read from sources with the given QFormats.
+
+    Args:
+        qformats: The QFormat of each source read together.
+
+        max_memory: The greatest number of bytes of numerators read from the sources
+            to be in memory at once. Memory used by the function applied to each block
+            is not counted.
+
+        read_ahead: True if the next block of each source is read while the current
+            one is processed, so that two blocks of each source are in memory at once.
+
+    Returns:
+        A positive integer.
+
+    Raises:
+        ValueError: If a QFormat does not fit in 64 bits, or max_memory is too small
+            to hold one element of each source.
+    """
+    buffers = 2 if read_ahead else 1
+    element_bytes = buffers * sum(np.dtype(numerator_dtype(qformat)).itemsize for qformat in qformats)
+    length = max_memory // element_bytes
+    if length < 1:
+        raise ValueError("A memory ceiling of {} bytes cannot hold one element, which needs {} bytes"
+                         .format(max_memory, element_bytes))
+    return length
+
+
+def _read(source, start, stop):
+    """The numerators of elements start to stop of a source, in an array of their own."""
+    numerators = source[start:stop].numerators
+    if isinstance(source, FixedPointArray):
+        # Slices are views, perhaps of a memory-mapped array, so copy them to read the data here
+        numerators = numerators.copy()
+    return numerators
+
+
+def iter_blocks(*sources, max_memory=DEFAULT_MAX_MEMORY, read_ahead=True):
+    """Read corresponding blocks of numerators from one or more sources.
+
+    Args:
+        *sources: One or more one-dimensional sources of the same length, each of
+            which is a NumeratorFile, a packed.PackedFixedPointArray or a
+            FixedPointArray.
+
+        max_memory: As for block_length().
+
+        read_ahead: If true, read the next blocks in a background thread while the
+            current ones are processed.
+
+    Yields:
+        A 2-tuple of the index of the first element of the blocks, and a tuple of the
+        arrays of numerators of each source, in the native byte order. The arrays are
+        not shared with the sources, nor with earlier blocks.
+
+    Raises:
+        TypeError: If no source is given.
+        ValueError: If the sources differ in length or are not one-dimensional, or as
+            for block_length().
+        OverflowError: If a numerator read from a file is out of range for its QFormat.
+    """
+    if not sources:
+        raise TypeError("At least one source must be supplied.")
+    for source in sources:
+        if getattr(source, 'ndim', 1) != 1:
+            raise ValueError("Only one-dimensional sources can be read in blocks, not shape {}"
+                             .format(source.shape))
+    length = len(sources[0])
+    if any(len(source) != length for source in sources):
+        raise ValueError("Cannot read sources of lengths {} together".format([len(source) for source in sources]))
+    step = block_length([source.qformat for source in sources], max_memory, read_ahead)
+
+    def read(start):
+        return tuple(_read(source, start, start + step) for source in sources)
+
+    starts = range(0, length, step)
+    if not read_ahead or len(starts) < 2:
+        for start in starts:
+            yield start, read(start)
+        return
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(read, 0)
+        for start in starts:
+            blocks = pending.result()
+            if start + step < length:
+                pending = pool.submit(read, start + step)
+            yield start, blocks
+
+
+def map_blocks(func, output_qformat, *sources, max_memory=DEFAULT_MAX_MEMORY, read_ahead=True):
+    """Apply a function of numerators to corresponding blocks of one or more sources.
+
+    Args:
+        func: A callable taking an array of numerators from each source and returning
+            an array of numerators in output_qformat, such as dsp.FIRFilter.process.
+            Blocks are passed to it one at a time, in order, so it may keep state
+            between them.
+
+        output_qformat: The QFormat of the numerators returned by func.
+
+        *sources: As for iter_blocks().
+
+        max_memory: As for block_length().
+
+        read_ahead: As for iter_blocks().
+
+    Yields:
+        A FixedPointArray of the results for each block, in order.
+
+    Raises:
+        OverflowError: If func returns a numerator out of range for output_qformat.
+        As for iter_blocks().
+    """
+    for _, blocks in iter_blocks(*sources, max_memory=max_memory, read_ahead=read_ahead):
+        yield FixedPointArray(func(*blocks), output_qformat)
+
+
+def reduce_blocks(func, initial, *sources, max_memory=DEFAULT_MAX_MEMORY, read_ahead=True):
+    """Fold corresponding blocks of one or more sources into an accumulated value.
+
+    Args:
+        func: A callable taking the accumulated value, the index of the first element
+            of the blocks, and an array of numerators from each source, and returning
+            the new accumulated value.
+
+        initial: The accumulated value before the first block.
+
+        *sources: As for iter_blocks().
+
+        max_memory: As for block_length().
+
+        read_ahead: As for iter_blocks().
+
+    Returns:
+        The accumulated value after the last block.
+
+    Raises:
+        As for iter_blocks().
+    """
+    accumulated = initial
+    for start, blocks in iter_blocks(*sources, max_memory=max_memory, read_ahead=read_ahead):
+        accumulated = func(accumulated, start, *blocks)
+    return accumulated
+
+
+def histogram(source, edges, max_memory=DEFAULT_MAX_MEMORY, read_ahead=True):
+    """Count the elements of a source which fall between consecutive edges, exactly.
+
+    As for numpy.histogram, every bin but the last includes its lower edge and excludes
+    its upper edge, and the last bin includes both. The edges are compared exactly with
+    the fixed-point values, without converting them to floats.
+
+    Args:
+        source: As for iter_blocks().
+
+        edges: An increasing sequence of at least two real numbers, such as floats,
+            Fractions or FixedPoints.
+
+        max_memory: As for block_length().
+
+        read_ahead: As for iter_blocks().
+
+    Returns:
+        An array of len(edges) - 1 counts, of dtype int64.
+
+    Raises:
+        ValueError: If there are fewer than two edges, or they are not increasing.
+        As for iter_blocks().
+    """
+    edges = [Fraction(edge) for edge in edges]
+    if len(edges) < 2:
+        raise ValueError("A histogram needs at least two edges, not {}".format(len(edges)))
+    if any(lower >= upper for lower, upper in zip(edges, edges[1:])):
+        raise ValueError("Histogram edges must be increasing")
+    qformat = source.qformat
+    lower, upper = qformat._min_numerator(), qformat._max_numerator()
+
+    # An element is at least edge e if its numerator is at least ceil(e * denominator), and is beyond
+    # the last edge if its numerator is at least floor(e * denominator) + 1
+    thresholds = [ceil(edge * qformat.denominator) for edge in edges[:-1]]
+    thresholds.append(floor(edges[-1] * qformat.denominator) + 1)
+    thresholds = [min(max(threshold, lower), upper + 1) for threshold in thresholds]
+
+    if qformat.integer_bits + qformat.fraction_bits <= DIRECT_HISTOGRAM_BITS:
+        # Count the elements with each numerator, then the number at least each threshold directly
+        def count_numerators(counts, start, numerators):
+            return counts + np.bincount(numerators.astype(np.int64) - lower, minlength=len(counts))
+
+        counts = reduce_blocks(count_numerators, np.zeros(upper - lower + 1, dtype=np.int64), source,
+                               max_memory=max_memory, read_ahead=read_ahead)
+        at_least = np.concatenate((np.cumsum(counts[::-1])[::-1], [0]))
+        reached = at_least[np.array(thresholds, dtype=np.int64) - lower]
+    else:
+        # Thresholds beyond the greatest numerator are reached by no element, so are not searched
+        searched = np.array([t for t in thresholds if t <= upper], dtype=numerator_dtype(qformat))
+
+        def count_reached(counts, start, numerators):
+            # For each number k, the count of elements which reach exactly k of the searched thresholds
+            return counts + np.bincount(np.searchsorted(searched, numerators, side='right'),
+                                        minlength=len(searched) + 1)
+
+        counts = reduce_blocks(count_reached, np.zeros(len(searched) + 1, dtype=np.int64), source,
+                               max_memory=max_memory, read_ahead=read_ahead)
+        reached = np.concatenate((np.cumsum(counts[::-1])[::-1][1:],
+                                  np.zeros(len(thresholds) - len(searched), dtype=np.int64)))
+    return reached[:-1] - reached[1:]
+
+
+def peak(source, max_memory=DEFAULT_MAX_MEMORY, read_ahead=True):
+    """Find the element of a source with the greatest magnitude.
+
+    Args:
+        source: As for iter_blocks().
+
+        max_memory: As for block_length().
+
+        read_ahead: As for iter_blocks().
+
+    Returns:
+        A 2-tuple of the index of the first element with the greatest magnitude and
+        that element as a FixedPoint, or None if source is empty.
+
+    Raises:
+        As for iter_blocks().
+    """
+    def find(best, start, numerators):
+        if not len(numerators):
+            return best
+        for index in (int(np.argmax(numerators)), int(np.argmin(numerators))):
+            numerator = int(numerators[index])
+            # The greatest magnitude wins, then the earliest index
+            candidate = (abs(numerator), -(start + index), numerator)
+            if best is None or candidate > best:
+                best = candidate
+        return best
+
+    best = reduce_blocks(find, None, source, max_memory=max_memory, read_ahead=read_ahead)
+    if best is None:
+        return None
+    return -best[1], FixedPoint.from_raw(best[2], source.qformat)
+
+
+def error_statistics(source, golden, max_memory=DEFAULT_MAX_MEMORY, read_ahead=True):
+    """Compare the elements of a source with those of golden reference data, exactly.
+
+    The error of each element is its value minus the corresponding golden value. The
+    errors, and the sums of them and of their squares, are computed exactly; only the
+    mean and root mean square are rounded, when they are converted to floats.
+
+    Args:
+        source: As for iter_blocks().
+
+        golden: A source of the same length as source, in any QFormat.
+
+        max_memory: As for block_length().
+
+        read_ahead: As for iter_blocks().
+
+    Returns:
+        An ErrorStatistics of the number of elements compared, the number which differ
+        from their golden values, the greatest magnitude of an error as a FixedPoint
+        with the fraction bits of the finer QFormat, and the mean and root mean square
+        error as floats, which are nan if there are no elements.
+
+    Raises:
+        As for iter_blocks().
+    """
+    a, b = source.qformat, golden.qformat
+    fraction_bits = max(a.fraction_bits, b.fraction_bits)
+    a_shift, b_shift = fraction_bits - a.fraction_bits, fraction_bits - b.fraction_bits
+    error_qformat = sum_qformat(a, b).to_signed()
+    native = error_qformat.integer_bits + error_qformat.fraction_bits <= NATIVE_ACCUMULATOR_BITS
+    error_dtype = np.int64 if native else object
+    # The longest runs of errors, and of their squares, whose sums cannot overflow a native accumulator
+    sum_length = _sum_block_length(error_qformat) if native else 0
+    squared_sum_length = (2**NATIVE_ACCUMULATOR_BITS - 1) // error_qformat._max_magnitude()**2 if native else 0
+
+    def compare(totals, start, a_numerators, b_numerators):
+        count, mismatches, max_error, error_sum, squared_sum = totals
+        if not len(a_numerators):
+            return totals
+        errors = (a_numerators.astype(error_dtype) << a_shift) - (b_numerators.astype(error_dtype) << b_shift)
+        magnitudes = np.abs(errors)
+        squares = magnitudes * magnitudes if squared_sum_length else magnitudes.astype(object) ** 2
+        return (count + len(errors), mismatches + int(np.count_nonzero(errors)), max(max_error, int(magnitudes.max())),
+                error_sum + _sum_chunk(errors, sum_length), squared_sum + _sum_chunk(squares, squared_sum_length))
+
+    count, mismatches, max_error, error_sum, squared_sum = reduce_blocks(
+        compare, (0, 0, 0, 0, 0), source, golden, max_memory=max_memory, read_ahead=read_ahead)
+    if not count:
+        return ErrorStatistics(0, 0, FixedPoint(0, error_qformat), float('nan'), float('nan'))
+    denominator = 2**fraction_bits
+    return ErrorStatistics(count, mismatches, FixedPoint.from_raw(max_error, error_qformat),
+                           float(Fraction(error_sum, count * denominator)),
+                           sqrt(Fraction(squared_sum, count * denominator**2)))
@@ -0,0 +1,351 @@
+"""An exact, fixed-point, complex number type.
+
+The real and imaginary parts of a ComplexFixedPoint share one signed QFormat, and
+arithmetic follows the same rules as FixedPoint, so the results are exact wherever
+the corresponding FixedPoint results are:
+
+    a + b has QFormat(max(ia, ib) + 1, max(fa, fb)).
+    a * b has QFormat(ia + ib + 1, fa + fb), which is just wide enough for both
+        parts of the exact product (ac - bd) + (ad + bc)j.
+    -a and a.conjugate() have QFormat(ia + 1, fa).
+    a.magnitude_squared() is a FixedPoint in QFormat(2 * ia + 1, 2 * fa).
+
+Real operands may be FixedPoints, integers or other rationals with a power-of-two
+denominator, such as Fraction(1, 4), and give exact results. Other rationals raise
+TypeError, and other complex numbers give a float complex result.
+
+Division, like FixedPoint division, rounds to the nearest value with ties to even.
+Unsigned QFormats are not supported, since negation and conjugation need a sign bit.
+"""
+
+from fractions import Fraction
+from numbers import Complex, Real, Rational, Integral
+
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.qformat import QFormat, sum_qformat, product_qformat, negated_qformat
+
+
+def _check_signed(qformat):
+    if not qformat.signed:
+        raise ValueError("The parts of a complex number cannot have unsigned {!r}".format(qformat))
+    return qformat
+
+
+def _exact_real(value):
+    """Convert a rational number to a FixedPoint exactly.
+
+    Raises:
+        TypeError: If value does not have a power-of-two denominator.
+    """
+    try:
+        return FixedPoint(value)
+    except ValueError:
+        raise TypeError("{!r} cannot be represented exactly in fixed point".format(value)) from None
+
+
+MULTIPLY_STANDARD = 'standard'
+MULTIPLY_GAUSS = 'gauss'
+
+MULTIPLY_METHODS = (MULTIPLY_STANDARD, MULTIPLY_GAUSS)
+
+
+def check_multiply_method(method):
+    """Raise ValueError if method is not one of the MULTIPLY_METHODS."""
+    if method not in MULTIPLY_METHODS:
+        raise ValueError("Multiplication method {!r} is not one of {}".format(method, ', '.join(MULTIPLY_METHODS)))
+
+
+def multiply_numerators(a_real, a_imag, b_real, b_imag, method=MULTIPLY_STANDARD):
+    """The exact product of two complex numbers given by integer parts.
+
+    This works equally for Python integers and for arrays of them.
+
+    Args:
+        a_real, a_imag: The real and imaginary parts of the first factor.
+
+        b_real, b_imag: The real and imaginary parts of the second factor.
+
+        method: MULTIPLY_STANDARD, which uses four multiplications, or MULTIPLY_GAUSS,
+            which uses three multiplications and five additions. The results are
+            identical; the latter is faster when multiplication is expensive, as it is
+            for very wide numerators.
+
+    Returns:
+        A 2-tuple of the real and imaginary parts of the product.
+    """
+    if method == MULTIPLY_GAUSS:
+        k1 = b_real * (a_real + a_imag)
+        k2 = a_real * (b_imag - b_real)
+        k3 = a_imag * (b_real + b_imag)
+        return k1 - k3, k1 + k2
+    return a_real * b_real - a_imag * b_imag, a_real * b_imag + a_imag * b_real
+
+
+class ComplexFixedPoint(Complex):
+    """A complex, fixed-point, binary, immutable number type."""
+
+    @classmethod
+    def _from_numerators(cls, real_numerator, imag_numerator, qformat):
+        obj = super().__new__(cls)
+        obj._real_numerator = qformat.check_numerator(real_numerator)
+        obj._imag_numerator = qformat.check_numerator(imag_numerator)
+        obj._qformat = qformat
+        return obj
+
+    def __new__(cls, real, imag=0, qformat=None):
+        """Obtain a ComplexFixedPoint instance.
+
+        Args:
+            real: The real part, as a real number, or a complex number if imag is zero.
+
+            imag: The imaginary part, as a real number.
+
+            qformat: An optional QFormat of both parts. If not supplied, the narrowest
+                QFormat which represents both parts exactly is used.
+
+        Raises:
+            TypeError: If a part is not a real number.
+            ValueError: If a part cannot be represented in finite precision when a
+                qformat was not supplied.
+            ValueError: If qformat is unsigned.
+            OverflowError: If a part is out of range for qformat.
+        """
+        if isinstance(real, Complex) and not isinstance(real, Real):
+            if imag != 0:
+                raise TypeError("The real part {!r} of {} is complex".format(real, cls.__name__))
+            real, imag = real.real, real.imag
+        if qformat is None:
+            real, imag = FixedPoint(real), FixedPoint(imag)
+            qformat = QFormat.from_qformats(real.qformat, imag.qformat).to_signed()
+        _check_signed(qformat)
+        real, imag = FixedPoint(real, qformat), FixedPoint(imag, qformat)
+        return cls._from_numerators(real._numerator, imag._numerator, qformat)
+
+    @classmethod
+    def from_raw(cls, real_numerator, imag_numerator, qformat):
+        """Create a ComplexFixedPoint directly from the raw integer numerators of its parts.
+
+        Args:
+            real_numerator: The numerator of the real part in qformat.
+
+            imag_numerator: The numerator of the imaginary part in qformat.
+
+            qformat: The QFormat of both parts.
+
+        Raises:
+            TypeError: If a numerator is not an integer.
+            ValueError: If qformat is unsigned.
+            OverflowError: If a numerator exceeds the precision of qformat.
+        """
+        _check_signed(qformat)
+        for numerator in (real_numerator, imag_numerator):
+            if not isinstance(numerator, Integral):
+                raise TypeError("{} numerator {!r} is not an integer".format(cls.__name__, numerator))
+        return cls._from_numerators(int(real_numerator), int(imag_numerator), qformat)
+
+    @property
+    def qformat(self):
+        """The QFormat of both parts."""
+        return self._qformat
+
+    @property
+    def real(self):
+        """The real part, as a FixedPoint."""
+        return FixedPoint._from_numerator(self._real_numerator, self._qformat)
+
+    @property
+    def imag(self):
+        """The imaginary part, as a FixedPoint."""
+        return FixedPoint._from_numerator(self._imag_numerator, self._qformat)
+
+    def __repr__(self):
+        return "{}({!s}, {!s}, {!r})".format(self.__class__.__name__, self.real, self.imag, self._qformat)
+
+    def __str__(self):
+        imag = str(self.imag)
+        return "({}{}{}j)".format(self.real, '' if imag.startswith('-') else '+', imag)
+
+    def __reduce__(self):
+        return (self.__class__.from_raw, (self._real_numerator, self._imag_numerator, self._qformat))
+
+    def __complex__(self):
+        return complex(float(self.real), float(self.imag))
+
+    def __bool__(self):
+        return self._real_numerator != 0 or self._imag_numerator != 0
+
+    def __eq__(self, other):
+        if isinstance(other, ComplexFixedPoint):
+            return Fraction(self.real) == Fraction(other.real) and Fraction(self.imag) == Fraction(other.imag)
+        if isinstance(other, Complex):
+            return self.real == other.real and self.imag == other.imag
+        return NotImplemented
+
+    __hash__ = None
+
+    def _operand(self, other):
+        """Convert an operand to a ComplexFixedPoint, or return None for types which are not exact.
+
+        Raises:
+            TypeError: If other is a rational number without a power-of-two denominator,
+                which has no exact result.
+        """
+        if isinstance(other, ComplexFixedPoint):
+            return other
+        if isinstance(other, Rational):
+            real = _exact_real(other)
+            # A real operand in an unsigned QFormat gains a sign bit, as both parts must be signed
+            qformat = real.qformat.to_signed()
+            return ComplexFixedPoint._from_numerators(real._numerator, 0, qformat)
+        return None
+
+    def _add(self, other):
+        qformat = sum_qformat(self._qformat, other._qformat)
+        a_real, a_imag = self._numerators_in(qformat)
+        b_real, b_imag = other._numerators_in(qformat)
+        return ComplexFixedPoint._from_numerators(a_real + b_real, a_imag + b_imag, qformat)
+
+    def _numerators_in(self, qformat):
+        """The numerators of both parts in a QFormat with at least as many fraction bits."""
+        shift = qformat.fraction_bits - self._qformat.fraction_bits
+        return self._real_numerator << shift, self._imag_numerator << shift
+
+    def __add__(self, other):
+        operand = self._operand(other)
+        if operand is not None:
+            return self._add(operand)
+        if isinstance(other, Complex):
+            return complex(self) + other
+        return NotImplemented
+
+    def __radd__(self, other):
+        operand = self._operand(other)
+        if operand is not None:
+            return operand._add(self)
+        if isinstance(other, Complex):
+            return other + complex(self)
+        return NotImplemented
+
+    def __sub__(self, other):
+        # As for FixedPoint, an integer is negated before conversion
+        if isinstance(other, int):
+            return self + -other
+        operand = self._operand(other)
+        if operand is not None:
+            return self._add(-operand)
+        if isinstance(other, Complex):
+            return complex(self) - other
+        return NotImplemented
+
+    def __rsub__(self, other):
+        operand = self._operand(other)
+        if operand is not None:
+            return operand._add(-self)
+        if isinstance(other, Complex):
+            return other - complex(self)
+        return NotImplemented
+
+    def multiply(self, other, method=MULTIPLY_STANDARD):
+        """The exact product with another ComplexFixedPoint, or a FixedPoint, integer or other dyadic rational.
+
+        Args:
+            other: The other factor.
+
+            method: One of the MULTIPLY_METHODS, as for multiply_numerators(). The
+                result does not depend on it.
+
+        Returns:
+            A ComplexFixedPoint in QFormat(ia + ib + 1, fa + fb).
+
+        Raises:
+            TypeError: If other is not an exact number.
+            ValueError: If method is not supported.
+        """
+        check_multiply_method(method)
+        operand = self._operand(other)
+        if operand is None:
+            raise TypeError("Cannot multiply {} exactly by {!r}".format(self.__class__.__name__, other))
+        qformat = product_qformat(self._qformat, operand._qformat)
+        real, imag = multiply_numerators(self._real_numerator, self._imag_numerator,
+                                         operand._real_numerator, operand._imag_numerator, method)
+        return ComplexFixedPoint._from_numerators(real, imag, qformat)
+
+    def __mul__(self, other):
+        operand = self._operand(other)
+        if operand is not None:
+            return self.multiply(operand)
+        if isinstance(other, Complex):
+            return complex(self) * other
+        return NotImplemented
+
+    def __rmul__(self, other):
+        operand = self._operand(other)
+        if operand is not None:
+            return operand.multiply(self)
+        if isinstance(other, Complex):
+            return other * complex(self)
+        return NotImplemented
+
+    def _divide(self, divisor):
+        # a / b = a * conj(b) / |b|**2, with each part rounded as by FixedPoint division
+        denominator = divisor.magnitude_squared()
+        if not denominator:
+            raise ZeroDivisionError("{} division by zero".format(self.__class__.__name__))
+        numerator = self.multiply(divisor.conjugate())
+        real, imag = numerator.real / denominator, numerator.imag / denominator
+        return ComplexFixedPoint._from_numerators(real._numerator, imag._numerator, real.qformat)
+
+    def __truediv__(self, other):
+        operand = self._operand(other)
+        if operand is not None:
+            return self._divide(operand)
+        if isinstance(other, Complex):
+            return complex(self) / other
+        return NotImplemented
+
+    def __rtruediv__(self, other):
+        operand = self._operand(other)
+        if operand is not None:
+            return operand._divide(self)
+        if isinstance(other, Complex):
+            return other / complex(self)
+        return NotImplemented
+
+    def __pow__(self, exponent):
+        if isinstance(exponent, Integral):
+            if exponent == 0:
+                return ComplexFixedPoint._from_numerators(1, 0, QFormat(2, 0))
+            result, base, n = None, self, abs(int(exponent))
+            while n:
+                if n & 1:
+                    result = base if result is None else result.multiply(base)
+                n >>= 1
+                if n:
+                    base = base.multiply(base)
+            return 1 / result if exponent < 0 else result
+        return complex(self) ** exponent
+
+    def __rpow__(self, base):
+        return base ** complex(self)
+
+    def __neg__(self):
+        qformat = negated_qformat(self._qformat)
+        return ComplexFixedPoint._from_numerators(-self._real_numerator, -self._imag_numerator, qformat)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        """The magnitude, as a float. Use magnitude_squared() for an exact result."""
+        return abs(complex(self))
+
+    def conjugate(self):
+        """The complex conjugate, in QFormat(integer_bits + 1, fraction_bits)."""
+        qformat = negated_qformat(self._qformat)
+        return ComplexFixedPoint._from_numerators(self._real_numerator, -self._imag_numerator, qformat)
+
+    def magnitude_squared(self):
+        """The exact squared magnitude, as a FixedPoint in QFormat(2 * integer_bits + 1, 2 * fraction_bits)."""
+        # The sum of two squares is no greater than twice the greatest square, which a product format holds
+        qformat = product_qformat(self._qformat, self._qformat)
+        return FixedPoint._from_numerator(self._real_numerator ** 2 + self._imag_numerator ** 2, qformat)
@@ -0,0 +1,445 @@
+"""Bit-true fixed-point signal processing kernels.
+
+The kernels operate on arrays of raw integer numerators rather than on FixedPoint
+instances. Results are bit-exact with the equivalent scalar FixedPoint computation
+described in the documentation of each kernel.
+
+This module requires NumPy.
+"""
+
+import numpy as np
+
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.linalg import max_product_magnitude
+from fixedpoint.qformat import QFormat
+from fixedpoint.quantization import (shift_round, constrain, numerator_dtype,
+                                     shift_round_integer, constrain_integer,
+                                     check_rounding, check_overflow,
+                                     ROUND_HALF_EVEN, OVERFLOW_ERROR)
+
+NATIVE_ACCUMULATOR_BITS = 63
+
+DIRECT_FORM_1 = 'df1'
+DIRECT_FORM_2 = 'df2'
+DIRECT_FORM_2_TRANSPOSED = 'df2t'
+
+FORMS = (DIRECT_FORM_1, DIRECT_FORM_2, DIRECT_FORM_2_TRANSPOSED)
+
+BLOCK_ELEMENTS = 1 << 20
+
+
+def _numerators_in_common_qformat(values):
+    """Convert a sequence of reals to numerators in a QFormat which represents all of them exactly.
+
+    Args:
+        values: A non-empty sequence of FixedPoint instances, or of other real numbers
+            which can be represented exactly by FixedPoint.
+
+    Returns:
+        A 2-tuple of a list of integer numerators and their common QFormat.
+    """
+    fixed_points = [FixedPoint(value) for value in values]
+    qformat = QFormat.from_qformats(*(f.qformat for f in fixed_points))
+    return [FixedPoint(f, qformat)._numerator for f in fixed_points], qformat
+
+
+def _check_samples(samples, qformat):
+    """Check that a block of sample numerators is in range for qformat.
+
+    Raises:
+        OverflowError: If any numerator exceeds the precision of qformat.
+    """
+    lower = qformat._min_numerator()
+    upper = qformat._max_numerator()
+    if samples.size and (samples.min() < lower or samples.max() > upper):
+        raise OverflowError("Samples are out of range {} <= numerator <= {} for {!r}"
+                            .format(lower, upper, qformat))
+
+
+class FIRFilter:
+    """A streaming, bit-true, fixed-point finite impulse response filter.
+
+    Each output sample is bit-exact with this scalar FixedPoint reference:
+
+        acc = FixedPoint(0, accumulator_qformat)
+        for tap, sample in zip(taps, reversed(window)):
+            acc = FixedPoint(acc + FixedPoint(tap * sample, accumulator_qformat), accumulator_qformat)
+        y = FixedPoint(acc, output_qformat)
+
+    That is, each full-precision product is rounded into the accumulator format (which
+    is exact when the accumulator has at least as many fraction bits as the product),
+    the products are summed, and the sum is rounded into the output format.
+
+    The accumulator range is checked once each output's sum is complete, as with a
+    two's complement hardware accumulator, so a partial sum which would make the
+    reference raise OverflowError does not affect the result if the final sum is in
+    range.
+
+    The filter keeps its delay line between calls to process(), so a signal may be
+    filtered in blocks of any size with the same result as filtering it in one call.
+    """
+
+    def __init__(self, taps, input_qformat, accumulator_qformat, output_qformat,
+                 rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_ERROR):
+        """Initialize a FIR filter.
+
+        Args:
+            taps: A non-empty sequence of filter coefficients, as FixedPoint instances
+                or other exactly representable reals. The zeroth tap multiplies the
+                most recent sample.
+
+            input_qformat: The QFormat of the input sample numerators.
+
+            accumulator_qformat: The QFormat of the accumulator.
+
+            output_qformat: The QFormat of the output sample numerators. Must fit in
+                64 bits.
+
+            rounding: One of the quantization.ROUNDING_MODES, used when rounding
+                products into the accumulator and the accumulator into the output.
+
+            overflow: One of the quantization.OVERFLOW_MODES, applied to the
+                accumulator and to the output.
+
+        Raises:
+            ValueError: If taps is empty or a mode is not supported.
+        """
+        if len(taps) < 1:
+            raise ValueError("{} requires at least one tap".format(self.__class__.__name__))
+        check_rounding(rounding)
+        check_overflow(overflow)
+        numerator_dtype(output_qformat)
+        tap_numerators, self._taps_qformat = _numerators_in_common_qformat(taps)
+        self._input_qformat = input_qformat
+        self._accumulator_qformat = accumulator_qformat
+        self._output_qformat = output_qformat
+        self._rounding = rounding
+        self._overflow = overflow
+
+        product_fraction_bits = self._taps_qformat.fraction_bits + input_qformat.fraction_bits
+        self._product_shift = accumulator_qformat.fraction_bits - product_fraction_bits
+        self._output_shift = output_qformat.fraction_bits - accumulator_qformat.fraction_bits
+
+        # Use native integers only if no product, shifted product or sum can overflow them
+        product_bound = max_product_magnitude(self._taps_qformat, input_qformat) << max(self._product_shift, 0)
+        sum_bound = max(product_bound, accumulator_qformat._max_magnitude()) * len(taps)
+        self._dtype = np.int64 if sum_bound < 2**NATIVE_ACCUMULATOR_BITS else object
+        output_bound = accumulator_qformat._max_magnitude() << max(self._output_shift, 0)
+        self._output_dtype = np.int64 if output_bound < 2**NATIVE_ACCUMULATOR_BITS else object
+
+        # Reversed so that a window of samples, oldest first, multiplies elementwise
+        self._reversed_taps = np.array(tap_numerators[::-1], dtype=self._dtype)
+        self.reset()
+
+    @property
+    def taps_qformat(self):
+        """The QFormat in which all taps are exactly represented."""
+        return self._taps_qformat
+
+    @property
+    def input_qformat(self):
+        """The QFormat of the input sample numerators."""
+        return self._input_qformat
+
+    @property
+    def accumulator_qformat(self):
+        """The QFormat of the accumulator."""
+        return self._accumulator_qformat
+
+    @property
+    def output_qformat(self):
+        """The QFormat of the output sample numerators."""
+        return self._output_qformat
+
+    @property
+    def state(self):
+        """The numerators of the most recent len(taps) - 1 input samples, oldest first."""
+        return self._delay_line.copy()
+
+    def reset(self):
+        """Clear the delay line, as if all previous input samples were zero."""
+        self._delay_line = np.zeros(len(self._reversed_taps) - 1, dtype=self._dtype)
+
+    def process(self, samples):
+        """Filter a block of input samples.
+
+        Args:
+            samples: A one-dimensional array of integer numerators in input_qformat.
+
+        Returns:
+            An array of the same length containing the output numerators in output_qformat,
+            in the narrowest signed dtype for that format.
+
+        Raises:
+            OverflowError: If a sample is out of range for input_qformat, or overflow is
+                OVERFLOW_ERROR and the accumulator or an output sample overflows. The
+                delay line is not updated in this case.
+        """
+        samples = np.asarray(samples)
+        if samples.ndim != 1:
+            raise ValueError("{} can only process one-dimensional blocks".format(self.__class__.__name__))
+        _check_samples(samples, self._input_qformat)
+        extended = np.concatenate((self._delay_line, samples.astype(self._dtype)))
+        num_taps = len(self._reversed_taps)
+        block_length = max(BLOCK_ELEMENTS // num_taps, 1)
+        accumulators = np.empty(len(samples), dtype=self._dtype)
+        for start in range(0, len(samples), block_length):
+            stop = min(start + block_length, len(samples))
+            windows = np.lib.stride_tricks.sliding_window_view(extended[start:stop + num_taps - 1], num_taps)
+            products = windows * self._reversed_taps
+            if self._product_shift < 0:
+                products = shift_round(products, self._product_shift, self._rounding)
+                accumulators[start:stop] = products.sum(axis=1)
+            else:
+                accumulators[start:stop] = shift_round(products.sum(axis=1), self._product_shift)
+
+        accumulators, _ = constrain(accumulators, self._accumulator_qformat, self._overflow)
+        outputs = shift_round(accumulators.astype(self._output_dtype), self._output_shift, self._rounding)
+        outputs, _ = constrain(outputs, self._output_qformat, self._overflow)
+
+        if num_taps > 1:
+            self._delay_line = extended[len(extended) - (num_taps - 1):].copy()
+        return outputs
+
+
+def _requantizer(shift, qformat, rounding, overflow):
+    """Make a function which rounds an integer by shift bits and constrains it to qformat."""
+    lower = qformat._min_numerator()
+    upper = qformat._max_numerator()
+
+    def requantize(numerator):
+        result = shift_round_integer(numerator, shift, rounding)
+        if lower <= result <= upper:
+            return result
+        return constrain_integer(result, qformat, overflow)
+
+    return requantize
+
+
+class _Section:
+    """The integer coefficients and quantization points of one second-order section."""
+
+    def __init__(self, coefficients, input_qformat, state_qformat, rounding, overflow):
+        if len(coefficients) == 6:
+            if coefficients[3] != 1:
+                raise ValueError("Second-order section {!r} must be normalized so that a0 == 1"
+                                 .format(coefficients))
+            coefficients = coefficients[:3] + coefficients[4:]
+        if len(coefficients) != 5:
+            raise ValueError("Second-order section {!r} must have coefficients (b0, b1, b2, a1, a2) "
+                             "or (b0, b1, b2, 1, a1, a2)".format(coefficients))
+        numerators, self.coefficient_qformat = _numerators_in_common_qformat(list(coefficients))
+        self.b0, self.b1, self.b2, self.a1, self.a2 = numerators
+        self.input_qformat = input_qformat
+        self.state_qformat = state_qformat
+
+        # All products and sums are formed exactly with this many fraction bits
+        coefficient_bits = self.coefficient_qformat.fraction_bits
+        self.fraction_bits = coefficient_bits + max(input_qformat.fraction_bits, state_qformat.fraction_bits)
+        self.input_shift = self.fraction_bits - coefficient_bits - input_qformat.fraction_bits
+        self.state_shift = self.fraction_bits - coefficient_bits - state_qformat.fraction_bits
+        self.align_input_shift = self.fraction_bits - input_qformat.fraction_bits
+        self.align_state_shift = self.fraction_bits - state_qformat.fraction_bits
+        self.requantize = _requantizer(state_qformat.fraction_bits - self.fraction_bits,
+                                       state_qformat, rounding, overflow)
+
+
+class BiquadCascade:
+    """A streaming, bit-true cascade of fixed-point second-order IIR sections.
+
+    Each section has coefficients (b0, b1, b2, a1, a2), implementing the transfer
+    function (b0 + b1/z + b2/z**2) / (1 + a1/z + a2/z**2), and its own state QFormat.
+    The input to each section is the output of the previous section, in that
+    section's state QFormat, and the input of the first section is in input_qformat.
+
+    Within a section all products and sums are formed exactly, and results are
+    rounded into the section's state QFormat only at the quantization points of the
+    chosen structure. In scalar FixedPoint terms, with q(v) = FixedPoint(v, state_qformat):
+
+        DIRECT_FORM_1:
+            y = q(b0*x + b1*x1 + b2*x2 - a1*y1 - a2*y2)
+            x2, x1, y2, y1 = x1, x, y1, y
+
+        DIRECT_FORM_2:
+            w = q(x - a1*w1 - a2*w2)
+            y = q(b0*w + b1*w1 + b2*w2)
+            w2, w1 = w1, w
+
+        DIRECT_FORM_2_TRANSPOSED:
+            y = q(b0*x + s1)
+            s1, s2 = q(b1*x - a1*y + s2), q(b2*x - a2*y)
+
+    The output of the last section is rounded into output_qformat. Results are
+    bit-exact with the equivalent FixedPoint loop, which raises OverflowError where
+    overflow is OVERFLOW_ERROR. The recursion runs on Python integers, one section at
+    a time over the whole block, without creating FixedPoint or QFormat objects.
+    """
+
+    def __init__(self, sections, input_qformat, state_qformats, output_qformat,
+                 form=DIRECT_FORM_2_TRANSPOSED, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_ERROR):
+        """Initialize a cascade of second-order sections.
+
+        Args:
+            sections: A non-empty sequence of sections, each a sequence of coefficients
+                (b0, b1, b2, a1, a2), or (b0, b1, b2, a0, a1, a2) with a0 == 1 as produced
+                by scipy.signal. Coefficients are FixedPoint instances or other exactly
+                representable reals.
+
+            input_qformat: The QFormat of the input sample numerators.
+
+            state_qformats: The QFormat of the state and output of each section, either
+                a single QFormat for all sections or a sequence with one per section.
+
+            output_qformat: The QFormat of the output sample numerators. Must fit in
+                64 bits.
+
+            form: One of FORMS.
+
+            rounding: One of the quantization.ROUNDING_MODES.
+
+            overflow: One of the quantization.OVERFLOW_MODES, applied at every
+                quantization point.
+
+        Raises:
+            ValueError: If there are no sections, the number of state QFormats does not
+                match the number of sections, or a section or mode is invalid.
+        """
+        if len(sections) < 1:
+            raise ValueError("{} requires at least one section".format(self.__class__.__name__))
+        if isinstance(state_qformats, QFormat):
+            state_qformats = [state_qformats] * len(sections)
+        if len(state_qformats) != len(sections):
+            raise ValueError("{} state QFormats were supplied for {} sections"
+                             .format(len(state_qformats), len(sections)))
+        if form not in FORMS:
+            raise ValueError("Form {!r} is not one of {}".format(form, ', '.join(FORMS)))
+        check_rounding(rounding)
+        check_overflow(overflow)
+        numerator_dtype(output_qformat)
+
+        self._sections = []
+        section_input_qformat = input_qformat
+        for coefficients, state_qformat in zip(sections, state_qformats):
+            self._sections.append(_Section(tuple(coefficients), section_input_qformat, state_qformat,
+                                           rounding, overflow))
+            section_input_qformat = state_qformat
+        self._input_qformat = input_qformat
+        self._output_qformat = output_qformat
+        self._form = form
+        self._rounding = rounding
+        self._overflow = overflow
+        self.reset()
+
+    @property
+    def input_qformat(self):
+        """The QFormat of the input sample numerators."""
+        return self._input_qformat
+
+    @property
+    def state_qformats(self):
+        """The QFormat of the state and output of each section."""
+        return [section.state_qformat for section in self._sections]
+
+    @property
+    def output_qformat(self):
+        """The QFormat of the output sample numerators."""
+        return self._output_qformat
+
+    @property
+    def form(self):
+        """The filter structure, one of FORMS."""
+        return self._form
+
+    @property
+    def state(self):
+        """The state numerators of each section, as a list of tuples.
+
+        For DIRECT_FORM_1 each tuple is (x1, x2, y1, y2), for DIRECT_FORM_2 it is
+        (w1, w2) and for DIRECT_FORM_2_TRANSPOSED it is (s1, s2).
+        """
+        return list(self._state)
+
+    def reset(self):
+        """Clear the state of every section, as if all previous input samples were zero."""
+        length = 4 if self._form == DIRECT_FORM_1 else 2
+        self._state = [(0,) * length for _ in self._sections]
+
+    def process(self, samples):
+        """Filter a block of input samples.
+
+        Args:
+            samples: A one-dimensional array of integer numerators in input_qformat.
+
+        Returns:
+            An array of the same length containing the output numerators in output_qformat,
+            in the narrowest signed dtype for that format.
+
+        Raises:
+            OverflowError: If a sample is out of range for input_qformat, or overflow is
+                OVERFLOW_ERROR and any quantization point overflows. The state is not
+                updated in this case.
+        """
+        samples = np.asarray(samples)
+        if samples.ndim != 1:
+            raise ValueError("{} can only process one-dimensional blocks".format(self.__class__.__name__))
+        _check_samples(samples, self._input_qformat)
+        kernel = {DIRECT_FORM_1: _direct_form_1,
+                  DIRECT_FORM_2: _direct_form_2,
+                  DIRECT_FORM_2_TRANSPOSED: _direct_form_2_transposed}[self._form]
+        signal = [int(x) for x in samples]
+        new_state = []
+        for section, state in zip(self._sections, self._state):
+            signal, section_state = kernel(section, signal, state)
+            new_state.append(section_state)
+        last_qformat = self._sections[-1].state_qformat
+        output_shift = self._output_qformat.fraction_bits - last_qformat.fraction_bits
+        outputs = shift_round(np.array(signal, dtype=object), output_shift, self._rounding)
+        outputs, _ = constrain(outputs, self._output_qformat, self._overflow)
+        self._state = new_state
+        return outputs
+
+
+def _direct_form_1(section, signal, state):
+    b0, b1, b2, a1, a2 = section.b0, section.b1, section.b2, section.a1, section.a2
+    input_shift, state_shift = section.input_shift, section.state_shift
+    requantize = section.requantize
+    x1, x2, y1, y2 = state
+    output = []
+    append = output.append
+    for x in signal:
+        acc = ((b0 * x + b1 * x1 + b2 * x2) << input_shift) - ((a1 * y1 + a2 * y2) << state_shift)
+        y = requantize(acc)
+        append(y)
+        x2, x1, y2, y1 = x1, x, y1, y
+    return output, (x1, x2, y1, y2)
+
+
+def _direct_form_2(section, signal, state):
+    b0, b1, b2, a1, a2 = section.b0, section.b1, section.b2, section.a1, section.a2
+    align_input_shift, state_shift = section.align_input_shift, section.state_shift
+    requantize = section.requantize
+    w1, w2 = state
+    output = []
+    append = output.append
+    for x in signal:
+        w = requantize((x << align_input_shift) - ((a1 * w1 + a2 * w2) << state_shift))
+        y = requantize((b0 * w + b1 * w1 + b2 * w2) << state_shift)
+        append(y)
+        w2, w1 = w1, w
+    return output, (w1, w2)
+
+
+def _direct_form_2_transposed(section, signal, state):
+    b0, b1, b2, a1, a2 = section.b0, section.b1, section.b2, section.a1, section.a2
+    input_shift, state_shift = section.input_shift, section.state_shift
+    align_state_shift = section.align_state_shift
+    requantize = section.requantize
+    s1, s2 = state
+    output = []
+    append = output.append
+    for x in signal:
+        y = requantize(((b0 * x) << input_shift) + (s1 << align_state_shift))
+        s1 = requantize(((b1 * x) << input_shift) - ((a1 * y) << state_shift) + (s2 << align_state_shift))
+        s2 = requantize(((b2 * x) << input_shift) - ((a2 * y) << state_shift))
+        append(y)
+    return output, (s1, s2)
@@ -0,0 +1,257 @@
+"""Bit-true fixed-point fast Fourier transforms.
+
+The transforms operate on arrays of raw integer numerators holding the real and
+imaginary parts of complex samples, all in one QFormat, and produce results in
+the same QFormat. Every butterfly output is formed exactly from its inputs and the
+quantized twiddle factors, then rounded once, so results are bit-exact with a
+scalar FixedPoint model of the same butterflies.
+
+This module requires NumPy.
+"""
+
+from collections import namedtuple
+from math import cos, sin, pi
+
+import numpy as np
+
+from fixedpoint.qformat import QFormat
+from fixedpoint.quantization import (quantize, shift_round, constrain, numerator_dtype,
+                                     check_rounding, check_overflow,
+                                     ROUND_HALF_EVEN, OVERFLOW_ERROR, OVERFLOW_SATURATE)
+
+SCALE_NONE = 'none'
+SCALE_UNCONDITIONAL = 'unconditional'
+SCALE_BLOCK_FLOATING_POINT = 'block_floating_point'
+
+SCALINGS = (SCALE_NONE, SCALE_UNCONDITIONAL, SCALE_BLOCK_FLOATING_POINT)
+
+RADICES = (2, 4)
+
+DEFAULT_TWIDDLE_QFORMAT = QFormat(2, 14)
+
+NATIVE_BITS = 63
+
+Transformed = namedtuple('Transformed', ['real', 'imag', 'exponent'])
+
+
+def twiddles(n, twiddle_qformat=DEFAULT_TWIDDLE_QFORMAT, inverse=False):
+    """The quantized twiddle factors exp(-2j*pi*k/n) for k in range(n).
+
+    Args:
+        n: The transform length.
+
+        twiddle_qformat: The QFormat of the twiddle factors. Values which cannot be
+            represented, such as 1.0 in a format with a single integer bit, saturate.
+
+        inverse: If True, the factors exp(+2j*pi*k/n) for the inverse transform.
+
+    Returns:
+        A 2-tuple of arrays of the real and imaginary twiddle numerators.
+    """
+    sign = 1.0 if inverse else -1.0
+    angles = [2 * pi * k / n for k in range(n)]
+    real = quantize([cos(a) for a in angles], twiddle_qformat, overflow=OVERFLOW_SATURATE).numerators
+    imag = quantize([sign * sin(a) for a in angles], twiddle_qformat, overflow=OVERFLOW_SATURATE).numerators
+    return real, imag
+
+
+def fft(real, imag, qformat, twiddle_qformat=DEFAULT_TWIDDLE_QFORMAT, scaling=SCALE_UNCONDITIONAL,
+        rounding=ROUND_HALF_EVEN, radix=2, overflow=OVERFLOW_ERROR):
+    """The forward discrete Fourier transform of fixed-point complex samples.
+
+    Each stage of butterflies is computed exactly from the stage inputs and the
+    twiddle factors, then shifted right by the stage's scaling and rounded once
+    into qformat:
+
+        SCALE_NONE never shifts, so the output grows by up to log2(n) bits, which
+        must be accommodated by qformat.
+
+        SCALE_UNCONDITIONAL shifts every radix-2 stage by one bit and every radix-4
+        stage by two bits, so the result is the DFT divided by n.
+
+        SCALE_BLOCK_FLOATING_POINT shifts each stage by the fewest bits needed for
+        all of its outputs to fit in qformat.
+
+    Args:
+        real: A one-dimensional array of numerators of the real parts, in qformat.
+
+        imag: A one-dimensional array of numerators of the imaginary parts, in
+            qformat, or None if the samples are real.
+
+        qformat: The QFormat of the samples and of the result. Must fit in 64 bits.
+
+        twiddle_qformat: The QFormat of the twiddle factors.
+
+        scaling: One of SCALINGS.
+
+        rounding: One of the quantization.ROUNDING_MODES.
+
+        radix: 2, or 4 if the length is a power of four.
+
+        overflow: One of the quantization.OVERFLOW_MODES, applied to the outputs of
+            each stage.
+
+    Returns:
+        A Transformed named tuple (real, imag, exponent) where real and imag are
+        arrays of numerators in qformat and the transform is given by their values
+        multiplied by 2**exponent.
+
+    Raises:
+        ValueError: If the length is not a power of the radix, or an argument is
+            not supported.
+        OverflowError: If overflow is OVERFLOW_ERROR and a stage overflows.
+    """
+    return _transform(real, imag, qformat, twiddle_qformat, scaling, rounding, radix, overflow, inverse=False)
+
+
+def ifft(real, imag, qformat, twiddle_qformat=DEFAULT_TWIDDLE_QFORMAT, scaling=SCALE_UNCONDITIONAL,
+         rounding=ROUND_HALF_EVEN, radix=2, overflow=OVERFLOW_ERROR):
+    """The inverse discrete Fourier transform of fixed-point complex samples.
+
+    The arguments and result are as for fft(), using conjugated twiddle factors. With
+    SCALE_UNCONDITIONAL the result is the conventionally normalized inverse, with
+    an exponent of zero.
+    """
+    transformed = _transform(real, imag, qformat, twiddle_qformat, scaling, rounding, radix, overflow,
+                             inverse=True)
+    n = len(transformed.real)
+    return transformed._replace(exponent=transformed.exponent - (n.bit_length() - 1))
+
+
+def _check_length(n, radix):
+    if radix not in RADICES:
+        raise ValueError("Radix {!r} is not one of {}".format(radix, ', '.join(map(str, RADICES))))
+    bits_per_digit = radix.bit_length() - 1
+    if n < 1 or n & (n - 1) or (n.bit_length() - 1) % bits_per_digit:
+        raise ValueError("Transform length {} is not a power of {}".format(n, radix))
+    return (n.bit_length() - 1) // bits_per_digit
+
+
+def digit_reversed_indices(n, radix):
+    """The permutation of range(n) which reverses the base-radix digits of each index."""
+    num_digits = _check_length(n, radix)
+    indices = np.arange(n)
+    reversed_indices = np.zeros(n, dtype=np.int64)
+    for _ in range(num_digits):
+        reversed_indices = reversed_indices * radix + indices % radix
+        indices //= radix
+    return reversed_indices
+
+
+def _transform(real, imag, qformat, twiddle_qformat, scaling, rounding, radix, overflow, inverse):
+    if scaling not in SCALINGS:
+        raise ValueError("Scaling {!r} is not one of {}".format(scaling, ', '.join(SCALINGS)))
+    check_rounding(rounding)
+    check_overflow(overflow)
+    dtype = numerator_dtype(qformat)
+
+    real = np.asarray(real)
+    imag = np.zeros_like(real) if imag is None else np.asarray(imag)
+    if real.ndim != 1 or real.shape != imag.shape:
+        raise ValueError("Real and imaginary parts must be one-dimensional arrays of equal length")
+    n = len(real)
+    num_stages = _check_length(n, radix)
+
+    # Sums of radix products of data and twiddle numerators, with headroom for the growth of a stage
+    num_bits = qformat.integer_bits + qformat.fraction_bits + twiddle_qformat.integer_bits + \
+        twiddle_qformat.fraction_bits + radix.bit_length()
+    work_dtype = np.int64 if num_bits <= NATIVE_BITS else object
+
+    order = digit_reversed_indices(n, radix)
+    x_real = real[order].astype(work_dtype)
+    x_imag = imag[order].astype(work_dtype)
+    w_real, w_imag = (w.astype(work_dtype) for w in twiddles(n, twiddle_qformat, inverse))
+    stage = _radix_2_stage if radix == 2 else _radix_4_stage
+    bits_per_stage = radix.bit_length() - 1
+
+    exponent = 0
+    span = 1
+    for _ in range(num_stages):
+        y_real, y_imag = stage(x_real, x_imag, w_real, w_imag, span, twiddle_qformat.fraction_bits, inverse)
+        if scaling == SCALE_NONE:
+            shift = 0
+        elif scaling == SCALE_UNCONDITIONAL:
+            shift = bits_per_stage
+        else:
+            shift = _block_floating_point_shift(y_real, y_imag, qformat, twiddle_qformat.fraction_bits, rounding)
+        total_shift = twiddle_qformat.fraction_bits + shift
+        x_real, _ = constrain(shift_round(y_real, -total_shift, rounding), qformat, overflow)
+        x_imag, _ = constrain(shift_round(y_imag, -total_shift, rounding), qformat, overflow)
+        x_real, x_imag = x_real.astype(work_dtype), x_imag.astype(work_dtype)
+        exponent += shift
+        span *= radix
+
+    return Transformed(x_real.astype(dtype), x_imag.astype(dtype), exponent)
+
+
+def _block_floating_point_shift(y_real, y_imag, qformat, twiddle_fraction_bits, rounding):
+    """The fewest bits by which exact stage outputs must be shifted to fit in qformat after rounding."""
+    lower = qformat._min_numerator()
+    upper = qformat._max_numerator()
+    shift = 0
+    while True:
+        total_shift = twiddle_fraction_bits + shift
+        fits = True
+        for y in (y_real, y_imag):
+            if len(y) == 0:
+                continue
+            extremes = shift_round(np.array([y.min(), y.max()], dtype=y.dtype), -total_shift, rounding)
+            if extremes[0] < lower or extremes[1] > upper:
+                fits = False
+                break
+        if fits:
+            return shift
+        shift += 1
+
+
+def _complex_multiply(a_real, a_imag, b_real, b_imag):
+    return a_real * b_real - a_imag * b_imag, a_real * b_imag + a_imag * b_real
+
+
+def _radix_2_stage(x_real, x_imag, w_real, w_imag, span, twiddle_fraction_bits, inverse):
+    """Exact radix-2 butterflies combining transforms of length span, scaled by 2**twiddle_fraction_bits."""
+    n = len(x_real)
+    length = 2 * span
+    stride = n // length
+    k = np.arange(span) * stride
+    shape = (n // length, 2, span)
+    a_real, b_real = np.moveaxis(x_real.reshape(shape), 1, 0)
+    a_imag, b_imag = np.moveaxis(x_imag.reshape(shape), 1, 0)
+    t_real, t_imag = _complex_multiply(b_real, b_imag, w_real[k], w_imag[k])
+    a_real = a_real << twiddle_fraction_bits
+    a_imag = a_imag << twiddle_fraction_bits
+    y_real = np.stack((a_real + t_real, a_real - t_real), axis=1).reshape(n)
+    y_imag = np.stack((a_imag + t_imag, a_imag - t_imag), axis=1).reshape(n)
+    return y_real, y_imag
+
+
+def _radix_4_stage(x_real, x_imag, w_real, w_imag, span, twiddle_fraction_bits, inverse):
+    """Exact radix-4 butterflies combining transforms of length span, scaled by 2**twiddle_fraction_bits."""
+    n = len(x_real)
+    length = 4 * span
+    stride = n // length
+    k = np.arange(span) * stride
+    shape = (n // length, 4, span)
+    s_real = np.moveaxis(x_real.reshape(shape), 1, 0)
+    s_imag = np.moveaxis(x_imag.reshape(shape), 1, 0)
+    t0_real = s_real[0] << twiddle_fraction_bits
+    t0_imag = s_imag[0] << twiddle_fraction_bits
+    t1_real, t1_imag = _complex_multiply(s_real[1], s_imag[1], w_real[k], w_imag[k])
+    t2_real, t2_imag = _complex_multiply(s_real[2], s_imag[2], w_real[2 * k], w_imag[2 * k])
+    t3_real, t3_imag = _complex_multiply(s_real[3], s_imag[3], w_real[3 * k], w_imag[3 * k])
+
+    # Multiplication by -j (or +j for the inverse transform) of (t1 - t3)
+    sum02_real, sum02_imag = t0_real + t2_real, t0_imag + t2_imag
+    diff02_real, diff02_imag = t0_real - t2_real, t0_imag - t2_imag
+    sum13_real, sum13_imag = t1_real + t3_real, t1_imag + t3_imag
+    diff13_real, diff13_imag = t1_real - t3_real, t1_imag - t3_imag
+    if inverse:
+        rot_real, rot_imag = -diff13_imag, diff13_real
+    else:
+        rot_real, rot_imag = diff13_imag, -diff13_real
+
+    y_real = np.stack((sum02_real + sum13_real, diff02_real + rot_real,
+                       sum02_real - sum13_real, diff02_real - rot_real), axis=1).reshape(n)
+    y_imag = np.stack((sum02_imag + sum13_imag, diff02_imag + rot_imag,
+                       sum02_imag - sum13_imag, diff02_imag - rot_imag), axis=1).reshape(n)
+    return y_real, y_imag
@@ -1,12 +1,46 @@
 import operator
 
-from fractions import Fraction, gcd
+from collections import OrderedDict, namedtuple
+from decimal import Decimal, Context, MAX_PREC, MAX_EMAX, MIN_EMIN
+from fractions import Fraction
 from functools import lru_cache
 from numbers import Real, Integral, Rational, Complex
-from math import trunc, frexp, log10, log2, isnan, isinf, floor
+from math import trunc, frexp, log10, log2, isnan, isinf, floor, gcd
 from itertools import count
 
-from fixedpoint.qformat import QFormat
+from fixedpoint.qformat import QFormat, sum_qformat, product_qformat, quotient_qformat, negated_qformat, power_qformat
+
+# FixedPoint is immutable, so common values can be shared rather than re-created.
+# Integers in this range are cached in their natural QFormat, and zero and one in
+# the most recently used FLYWEIGHT_QFORMATS QFormats.
+FLYWEIGHT_MIN_INTEGER = -256
+FLYWEIGHT_MAX_INTEGER = 256
+FLYWEIGHT_QFORMATS = 128
+
+FlyweightInfo = namedtuple('FlyweightInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# A decimal context in which the exact decimal value of any FixedPoint can be formed without rounding
+_EXACT_DECIMAL_CONTEXT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+_flyweight_integers = {}
+_flyweight_constants = OrderedDict()
+_flyweight_hits = 0
+_flyweight_misses = 0
+
+
+def flyweight_info():
+    """Statistics of the cache of shared FixedPoint instances, like functools.lru_cache.cache_info()."""
+    maxsize = FLYWEIGHT_MAX_INTEGER - FLYWEIGHT_MIN_INTEGER + 1 + 2 * FLYWEIGHT_QFORMATS
+    return FlyweightInfo(_flyweight_hits, _flyweight_misses, maxsize,
+                         len(_flyweight_integers) + len(_flyweight_constants))
+
+
+def flyweight_clear():
+    """Empty the cache of shared FixedPoint instances and reset its statistics."""
+    global _flyweight_hits, _flyweight_misses
+    _flyweight_integers.clear()
+    _flyweight_constants.clear()
+    _flyweight_hits = _flyweight_misses = 0
 
 
 def lowest_set_bit(x):
@@ -40,6 +74,116 @@ def signed_left_shift(x, shift):
     return x
 
 
+def scale_ratio(numerator, denominator, fraction_bits):
+    """Scale the ratio numerator/denominator by 2**fraction_bits and round to an integer.
+
+    Only integer arithmetic is used. Results exactly halfway between two integers are
+    rounded to the even integer, consistent with round() on Fractions.
+
+    Args:
+        numerator: The integer numerator of the ratio.
+        denominator: The positive integer denominator of the ratio.
+        fraction_bits: The signed number of binary places by which to scale.
+
+    Returns:
+        The integer nearest to numerator * 2**fraction_bits / denominator.
+    """
+    if fraction_bits >= 0:
+        numerator <<= fraction_bits
+    else:
+        denominator <<= -fraction_bits
+    if denominator == 1:
+        return numerator
+    quotient, remainder = divmod(numerator, denominator)
+    twice_remainder = 2 * remainder
+    if twice_remainder > denominator or (twice_remainder == denominator and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+def decimal_to_numerator(value, qformat):
+    """Convert a decimal.Decimal to the nearest numerator in a QFormat.
+
+    The conversion is exact if the value is representable in qformat, and otherwise
+    rounds to nearest with ties to even, like FixedPoint(value, qformat).
+
+    Args:
+        value: A finite decimal.Decimal.
+
+        qformat: The QFormat of the numerator.
+
+    Returns:
+        The integer numerator.
+
+    Raises:
+        ValueError: If value is NaN or infinite.
+        OverflowError: If the rounded value is out of range for qformat.
+    """
+    if not value.is_finite():
+        raise ValueError("{} cannot be represented by FixedPoint".format(value))
+    # as_integer_ratio() is exact and considerably faster than accumulating the digits of as_tuple()
+    numerator, denominator = value.as_integer_ratio()
+    return qformat.check_numerator(scale_ratio(numerator, denominator, qformat.fraction_bits))
+
+
+def decimals_to_numerators(values, qformat):
+    """Convert an iterable of decimal.Decimals to numerators in a QFormat, as by decimal_to_numerator()."""
+    return [decimal_to_numerator(value, qformat) for value in values]
+
+
+@lru_cache(maxsize=256)
+def _power_of_five(exponent):
+    return 5**exponent
+
+
+def numerator_to_decimal(numerator, qformat):
+    """The exact value of a numerator in a QFormat as a decimal.Decimal.
+
+    Every binary fraction has a finite decimal expansion, so the result is exact,
+    whatever the current decimal context, with no more decimal places than needed.
+
+    Args:
+        numerator: The integer numerator.
+
+        qformat: The QFormat of the numerator.
+
+    Returns:
+        A decimal.Decimal.
+    """
+    fraction_bits = qformat.fraction_bits
+    if numerator == 0:
+        return Decimal(0)
+    # Discard trailing zero bits, so that n / 2**places == n * 5**places / 10**places is in lowest terms
+    zero_bits = min((numerator & -numerator).bit_length() - 1, fraction_bits)
+    places = fraction_bits - zero_bits
+    scaled = Decimal((numerator >> zero_bits) * _power_of_five(places))
+    return scaled.scaleb(-places, _EXACT_DECIMAL_CONTEXT) if places else scaled
+
+
+def numerators_to_decimals(numerators, qformat):
+    """Convert an iterable of numerators in a QFormat to decimal.Decimals, as by numerator_to_decimal()."""
+    return [numerator_to_decimal(int(numerator), qformat) for numerator in numerators]
+
+
+def sorted_fixed_points(values, reverse=False):
+    """Sort FixedPoints, which may have different QFormats, by comparing integer sort keys.
+
+    Each value is converted once to an integer key at the greatest fraction width of
+    the values, rather than to a Fraction at every comparison.
+
+    Args:
+        values: An iterable of FixedPoints.
+
+        reverse: If True, sort in descending order.
+
+    Returns:
+        A new list of the values in order. The sort is stable.
+    """
+    values = list(values)
+    fraction_bits = max((value._qformat.fraction_bits for value in values), default=0)
+    return sorted(values, key=lambda value: value.sort_key(fraction_bits), reverse=reverse)
+
+
 def prime_factors(n):
     """The prime factors of n.
 
@@ -127,7 +271,7 @@ def _make_operators(mono, poly):
         if isinstance(other, FixedPoint):
             return mono(self, other)
         elif isinstance(other, int):
-            return mono(self, FixedPoint(other))
+            return mono(self, FixedPoint._from_integer(other))
         elif isinstance(other, Fraction):
             return poly(Fraction(self), other)
         elif isinstance(other, float):
@@ -142,6 +286,8 @@ def _make_operators(mono, poly):
     def rop(self, other):
         if isinstance(other, FixedPoint):
             return mono(other, self)
+        if isinstance(other, int):
+            return mono(FixedPoint._from_integer(other), self)
         if isinstance(other, Integral):
             return mono(FixedPoint(other), self)
         elif isinstance(other, Rational):
@@ -161,8 +307,7 @@ def _make_operators(mono, poly):
 def _add(a, b):
     assert isinstance(a, FixedPoint)
     assert isinstance(b, FixedPoint)
-    promoted_qformat = QFormat.from_qformats(a.qformat, b.qformat)
-    result_qformat = QFormat(promoted_qformat.integer_bits + 1, promoted_qformat.fraction_bits)
+    result_qformat = sum_qformat(a.qformat, b.qformat)
     lhs_op = FixedPoint(a, result_qformat)
     rhs_op = FixedPoint(b, result_qformat)
     result_numerator = lhs_op._numerator + rhs_op._numerator
@@ -172,8 +317,7 @@ def _add(a, b):
 def _mul(a, b):
     assert isinstance(a, FixedPoint)
     assert isinstance(b, FixedPoint)
-    result_qformat = QFormat(a.qformat.integer_bits + b.qformat.integer_bits + 1,
-                             a.qformat.fraction_bits + b.qformat.fraction_bits)
+    result_qformat = product_qformat(a.qformat, b.qformat)
     lhs_op = FixedPoint(a, result_qformat)
     rhs_op = FixedPoint(b, result_qformat)
     result_numerator = (lhs_op._numerator * rhs_op._numerator) // result_qformat.denominator
@@ -183,8 +327,7 @@ def _mul(a, b):
 def _truediv(dividend, divisor):
     assert isinstance(dividend, FixedPoint)
     assert isinstance(divisor, FixedPoint)
-    result_qformat = QFormat(dividend.qformat.integer_bits + divisor.qformat.fraction_bits + 1,
-                             divisor.qformat.integer_bits + dividend.qformat.fraction_bits)
+    result_qformat = quotient_qformat(dividend.qformat, divisor.qformat)
 
     working_qformat = QFormat.from_qformats(dividend.qformat, divisor.qformat, result_qformat)
 
@@ -202,8 +345,7 @@ def _pow(base, exponent):
     assert isinstance(base, FixedPoint)
     if exponent.is_integer():
         integer_exponent = abs(floor(exponent))
-        result_qformat = QFormat(max(base.qformat.integer_bits - 1, 0) * integer_exponent + 1,
-                                 base.qformat.fraction_bits * integer_exponent)
+        result_qformat = power_qformat(base.qformat, integer_exponent)
         result_numerator = base._numerator ** integer_exponent
         positive_result = FixedPoint._from_numerator(result_numerator, result_qformat)
         if exponent >= 0:
@@ -272,13 +414,25 @@ class FixedPoint(Rational):
             A FixedPoint representation with sufficient precision to represent i.
         """
         assert isinstance(i, int)
+        global _flyweight_hits, _flyweight_misses
+        shared = cls is FixedPoint and FLYWEIGHT_MIN_INTEGER <= i <= FLYWEIGHT_MAX_INTEGER
+        if shared:
+            try:
+                result = _flyweight_integers[i]
+                _flyweight_hits += 1
+                return result
+            except KeyError:
+                _flyweight_misses += 1
         num_bits = i.bit_length() + 1  # Additional bit for sign information
         qformat = QFormat(num_bits, 0)
-        return cls._from_numerator(i, qformat)
+        result = cls._from_numerator(int(i), qformat)
+        if shared:
+            _flyweight_integers[i] = result
+        return result
 
     @classmethod
     def _from_rational_exact(cls, r):
-        """Create a FixedPoint using a QFormat with sufficient precision to represent the integer.
+        """Create a FixedPoint using a QFormat with sufficient precision to represent the rational.
 
         Args:
             r: A rational number to be represented exactly.
@@ -291,24 +445,31 @@ class FixedPoint(Rational):
         """
         assert isinstance(r, Rational)
         integer_part = trunc(r)
-        fraction_part = abs(r - integer_part)
-        binary_numerator, binary_denominator = fraction_with_base(fraction_part, base=2)
+        fraction = Fraction(r.numerator, r.denominator)
+        binary_numerator, binary_denominator = fraction_with_base(fraction, base=2)
         qformat = QFormat(integer_part.bit_length() + 1,
                           int(log2(binary_denominator)))
         return cls._from_numerator(binary_numerator, qformat)
 
     @classmethod
-    def _from_value_approximately(cls, value, qformat):
-        """Create a possibly approximate representation of value with specified precision.
+    def _from_decimal_exact(cls, d):
+        """Create a FixedPoint using a QFormat with sufficient precision to represent the decimal.
 
         Args:
-            value: The value to be represented in fixed point.
+            d: A decimal.Decimal to be represented exactly.
 
-            qformat: The precision of the result.
+        Raises:
+            OverflowError: If d is NaN or infinite.
+            ValueError: If d has no finite binary representation.
         """
-        assert qformat is not None
-        numerator = round(value * qformat.denominator)
-        return cls._from_numerator(numerator, qformat)
+        if not d.is_finite():
+            raise OverflowError("{} cannot be represented by {}".format(d, cls.__name__))
+        numerator, denominator = d.as_integer_ratio()
+        if denominator & (denominator - 1):
+            raise ValueError("Cannot represent {} exactly in {}".format(d, cls.__name__))
+        fraction_bits = denominator.bit_length() - 1
+        integer_bits = (abs(numerator) >> fraction_bits).bit_length() + 1
+        return cls._from_numerator(numerator, QFormat(integer_bits, fraction_bits))
 
     @classmethod
     def _from_number_with_arbitrary_precision(cls, value):
@@ -320,6 +481,8 @@ class FixedPoint(Rational):
         Raises:
             TypeError: If value cannot be represented with finite precision.
         """
+        if isinstance(value, Decimal):
+            return cls._from_decimal_exact(value)
         if not isinstance(value, Real):
             raise TypeError("{} cannot represent non-real value {} of type {}"
                             .format(cls.__name__, value, type(value).__name__))
@@ -334,6 +497,62 @@ class FixedPoint(Rational):
             return cls._from_float(value)
         raise TypeError("{} cannot represent value {}".format(cls.__name__, value))
 
+    @classmethod
+    def _from_value_with_specific_precision(cls, value, qformat):
+        """Quantize a number directly into a specific precision.
+
+        The numerator in the target QFormat is computed with integer arithmetic only, so
+        no intermediate FixedPoint or Fraction is created. Values which fall exactly
+        halfway between two representable numbers are rounded to the even numerator.
+
+        Args:
+            value: The Real number to be represented.
+
+            qformat: The precision of the result.
+
+        Raises:
+            TypeError: If value is not a real number.
+            ValueError: If value is NaN or infinite.
+            OverflowError: If value cannot be represented without overflow.
+        """
+        if isinstance(value, FixedPoint):
+            return cls._from_fixed_point_with_specific_precision(value, qformat)
+        if isinstance(value, int):
+            if cls is FixedPoint and (value == 0 or value == 1):
+                return cls._from_constant(value, qformat)
+            return cls._from_numerator(scale_ratio(value, 1, qformat.fraction_bits), qformat)
+        if isinstance(value, Rational):
+            numerator = scale_ratio(value.numerator, value.denominator, qformat.fraction_bits)
+            return cls._from_numerator(numerator, qformat)
+        if isinstance(value, Real):
+            f = float(value)
+            if isnan(f) or isinf(f):
+                raise ValueError("{} cannot be represented by {}".format(f, cls.__name__))
+            n, d = f.as_integer_ratio()
+            return cls._from_numerator(scale_ratio(n, d, qformat.fraction_bits), qformat)
+        if isinstance(value, Decimal):
+            return cls._from_numerator(decimal_to_numerator(value, qformat), qformat)
+        raise TypeError("{} cannot represent non-real value {} of type {}"
+                        .format(cls.__name__, value, type(value).__name__))
+
+    @classmethod
+    def _from_constant(cls, value, qformat):
+        """A shared instance of zero or one in qformat, from the cache of recently used QFormats."""
+        global _flyweight_hits, _flyweight_misses
+        key = (value, qformat)
+        try:
+            result = _flyweight_constants[key]
+            _flyweight_hits += 1
+            _flyweight_constants.move_to_end(key)
+            return result
+        except KeyError:
+            _flyweight_misses += 1
+        result = cls._from_numerator(value << qformat.fraction_bits, qformat)
+        _flyweight_constants[key] = result
+        if len(_flyweight_constants) > 2 * FLYWEIGHT_QFORMATS:
+            _flyweight_constants.popitem(last=False)
+        return result
+
     @classmethod
     def _from_fixed_point_with_specific_precision(cls, value, qformat):
         """Represent an existing FixedPoint number with different precision.
@@ -346,7 +565,7 @@ class FixedPoint(Rational):
         Raises:
             OverflowError: If value cannot be represented without overflow.
         """
-        if qformat == value.qformat:
+        if qformat == value.qformat and type(value) == cls:
             return value
         numerator = qformat.rescale_numerator(value._numerator, value.qformat)
         return cls._from_numerator(numerator, qformat)
@@ -388,15 +607,42 @@ class FixedPoint(Rational):
             TypeError: If value cannot be represented as a FixedPoint value.
         """
 
+        if qformat is not None:
+            return cls._from_value_with_specific_precision(value, qformat)
         try:
-            fixed_point = cls._from_number_with_arbitrary_precision(value)
-        except ValueError:
-            if qformat is None:
-                raise
-            fixed_point = cls._from_value_approximately(value, qformat)
+            return cls._from_number_with_arbitrary_precision(value)
         except OverflowError as e:
             raise ValueError(str(e))
-        return fixed_point if (qformat is None) else cls._from_fixed_point_with_specific_precision(fixed_point, qformat)
+
+    @classmethod
+    def from_raw(cls, numerator, qformat):
+        """Create a FixedPoint directly from its raw integer numerator.
+
+        No conversion or rounding is performed, so this is the cheapest way to
+        construct a FixedPoint from, say, a value read from a hardware register.
+
+        Example:
+
+            # 0b0101_1000 in Q4.4 is 5.5
+            >>> FixedPoint.from_raw(0x58, QFormat(4, 4))
+            FixedPoint(5.5, QFormat(4, 4))
+
+        Args:
+            numerator: The integer numerator which, when divided by qformat.denominator,
+                gives the value of the result.
+
+            qformat: The precision of the result.
+
+        Returns:
+            A new FixedPoint instance.
+
+        Raises:
+            TypeError: If numerator is not an integer.
+            OverflowError: If numerator exceeds the precision of qformat.
+        """
+        if not isinstance(numerator, Integral):
+            raise TypeError("{} numerator {!r} is not an integer".format(cls.__name__, numerator))
+        return cls._from_numerator(int(numerator), qformat)
 
     @property
     def qformat(self):
@@ -410,6 +656,9 @@ class FixedPoint(Rational):
     def __repr__(self):
         return "{}({!s}, {!r})".format(self.__class__.__name__, self, self.qformat)
 
+    def __reduce__(self):
+        return (self.__class__.from_raw, (self._numerator, self._qformat))
+
     def __str__(self):
         # All fractions with a finite binary representation (i.e. FixedPoint instances) also have a finite decimal
         # representation since all binary fractions have the form of k/2**a and all decimals have the form
@@ -423,6 +672,9 @@ class FixedPoint(Rational):
             integer_part = self._numerator >> self._qformat.fraction_bits
 
         integer_digits = str(integer_part)
+        if self._numerator < 0 and integer_part == 0:
+            # The sign of a value between -1 and 0 is not carried by its integer part
+            integer_digits = '-0'
 
         fractional_part = abs(self._numerator) & (2**self._qformat.fraction_bits - 1)
         if fractional_part == 0:
@@ -433,6 +685,32 @@ class FixedPoint(Rational):
         decimal_digits = str(decimal_numerator).zfill(int(log10(decimal_denominator)))
         return "{}.{}".format(integer_digits, decimal_digits)
 
+    def sort_key(self, fraction_bits):
+        """An integer which orders FixedPoints as their values do.
+
+        Keys computed with the same fraction_bits compare as the values do, whatever
+        the QFormats of the values, so they are cheaper to sort than the values
+        themselves.
+
+        Args:
+            fraction_bits: The common fraction width, which must be at least that of
+                every value to be compared.
+
+        Returns:
+            The value multiplied by 2**fraction_bits, as an integer.
+
+        Raises:
+            ValueError: If fraction_bits is less than the fraction bits of this value.
+        """
+        shift = fraction_bits - self._qformat.fraction_bits
+        if shift < 0:
+            raise ValueError("Sort keys with {} fraction bits cannot order {!r}".format(fraction_bits, self))
+        return self._numerator << shift
+
+    def to_decimal(self):
+        """The exact value as a decimal.Decimal, whatever the current decimal context."""
+        return numerator_to_decimal(self._numerator, self._qformat)
+
     @property
     def numerator(self):
         """The numerator of an irreducible rational representation of the number.
@@ -473,8 +751,9 @@ class FixedPoint(Rational):
 
     def __neg__(self):
         # This can overflow for the most negative value of the current QFormat - the positive value can't be
-        # represented - so the result must have one additional bit of precision.
-        result_qformat = QFormat(self._qformat.integer_bits + 1, self._qformat.fraction_bits)
+        # represented - so the result must have one additional bit of precision, which is the sign bit if the current
+        # QFormat is unsigned.
+        result_qformat = negated_qformat(self._qformat)
         return FixedPoint._from_numerator(-self._numerator, result_qformat)
 
     def __pos__(self):
@@ -0,0 +1,235 @@
+"""Opt-in counting of the internal work done by FixedPoint operations.
+
+Instrumentation counts these events:
+
+    allocations: FixedPoint instances created.
+    rescales: numerators converted between QFormats with QFormat.rescale_numerator.
+    qformats_interned: distinct QFormats created, rather than reused.
+    overflows: OverflowErrors raised by range checks.
+    overflows_swallowed: those of the overflows which were handled within the
+        fixedpoint package rather than propagating to the caller.
+
+Each event is attributed to the outermost FixedPoint operation in progress, such as
+'__add__' or '__new__', and optionally to the line of code outside the package which
+called it.
+
+While instrumentation is disabled, which is the default, the classes are not
+modified in any way, so there is no cost at all. Enabling it replaces the counted
+methods of FixedPoint and QFormat with counting wrappers, and disabling it restores
+the originals.
+
+Example:
+
+    >>> with instrumented():
+    ...     FixedPoint(1.5) * FixedPoint(3)
+    >>> snapshot()['by_operator']['__mul__']['allocations']
+    3
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.qformat import QFormat
+
+EVENTS = ('allocations', 'rescales', 'qformats_interned', 'overflows', 'overflows_swallowed')
+
+OPERATORS = ('__new__', 'from_raw',
+             '__add__', '__radd__', '__sub__', '__rsub__', '__mul__', '__rmul__',
+             '__truediv__', '__rtruediv__', '__floordiv__', '__rfloordiv__', '__mod__', '__rmod__',
+             '__pow__', '__rpow__', '__neg__', '__pos__', '__abs__',
+             '__trunc__', '__floor__', '__ceil__', '__round__',
+             '__eq__', '__lt__', '__le__', '__gt__', '__ge__',
+             '__str__', '__repr__', '__float__', '__bool__')
+
+OTHER = '<other>'
+
+_PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+_lock = threading.Lock()
+_local = threading.local()
+_originals = {}
+_call_sites = False
+_totals = Counter()
+_by_operator = {}
+_by_call_site = {}
+
+
+def _record(event, count=1):
+    stack = getattr(_local, 'stack', None)
+    operator, site = stack[0] if stack else (OTHER, None)
+    with _lock:
+        _totals[event] += count
+        _by_operator.setdefault(operator, Counter())[event] += count
+        if site is not None:
+            _by_call_site.setdefault(site, Counter())[event] += count
+
+
+def _caller():
+    """The 'filename:lineno' of the innermost frame outside the fixedpoint package and the numbers module."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not (filename.startswith(_PACKAGE_DIRECTORY) or frame.f_globals.get('__name__') == 'numbers'):
+            return "{}:{}".format(filename, frame.f_lineno)
+        frame = frame.f_back
+    return None
+
+
+def _operation(name, func):
+    """Wrap a public FixedPoint method so that events within it are attributed to it."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            return func(*args, **kwargs)
+        stack.append((name, _caller() if _call_sites else None))
+        _local.overflows = 0
+        try:
+            return func(*args, **kwargs)
+        except OverflowError:
+            _local.overflows -= 1
+            raise
+        finally:
+            if _local.overflows > 0:
+                _record('overflows_swallowed', _local.overflows)
+            stack.pop()
+    return wrapper
+
+
+def _allocation(func):
+    @wraps(func)
+    def wrapper(cls, numerator, qformat):
+        result = func(cls, numerator, qformat)
+        _record('allocations')
+        return result
+    return wrapper
+
+
+def _rescale(func):
+    @wraps(func)
+    def wrapper(self, src_numerator, src_qformat):
+        _record('rescales')
+        return func(self, src_numerator, src_qformat)
+    return wrapper
+
+
+def _check(func):
+    @wraps(func)
+    def wrapper(self, numerator):
+        try:
+            return func(self, numerator)
+        except OverflowError:
+            _record('overflows')
+            if getattr(_local, 'stack', None):
+                _local.overflows += 1
+            raise
+    return wrapper
+
+
+def _intern(func):
+    @wraps(func)
+    def wrapper(cls, integer_bits, fraction_bits, signed=True):
+        if (integer_bits, fraction_bits, signed) not in cls._instances:
+            _record('qformats_interned')
+        return func(cls, integer_bits, fraction_bits, signed)
+    return wrapper
+
+
+def _replace(cls, name, make_wrapper):
+    original = cls.__dict__.get(name)
+    _originals[(cls, name)] = original
+    attribute = original if original is not None else getattr(cls, name)
+    if isinstance(attribute, (classmethod, staticmethod)):
+        setattr(cls, name, type(attribute)(make_wrapper(attribute.__func__)))
+    else:
+        setattr(cls, name, make_wrapper(attribute))
+
+
+def is_enabled():
+    """Whether instrumentation is enabled."""
+    return bool(_originals)
+
+
+def enable(call_sites=False):
+    """Start counting events.
+
+    Args:
+        call_sites: If True, also attribute events to the line of code which called
+            each operation. This makes each operation considerably slower.
+    """
+    global _call_sites
+    _call_sites = call_sites
+    if is_enabled():
+        return
+    for name in OPERATORS:
+        _replace(FixedPoint, name, lambda func, name=name: _operation(name, func))
+    _replace(FixedPoint, '_from_numerator', _allocation)
+    _replace(QFormat, 'rescale_numerator', _rescale)
+    _replace(QFormat, 'check_numerator', _check)
+    _replace(QFormat, '__new__', _intern)
+
+
+def disable():
+    """Stop counting events, restoring the original methods. The counts are retained."""
+    for (cls, name), original in _originals.items():
+        if original is None:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, original)
+    _originals.clear()
+
+
+def reset():
+    """Set all counts to zero."""
+    with _lock:
+        _totals.clear()
+        _by_operator.clear()
+        _by_call_site.clear()
+
+
+def snapshot():
+    """The counts so far.
+
+    Returns:
+        A dictionary with the total count of each of the EVENTS, and under the keys
+        'by_operator' and 'by_call_site', dictionaries mapping operator names and
+        'filename:lineno' call sites respectively to dictionaries of counts.
+    """
+    with _lock:
+        result = {event: _totals[event] for event in EVENTS}
+        result['by_operator'] = {operator: dict(counts) for operator, counts in _by_operator.items()}
+        result['by_call_site'] = {site: dict(counts) for site, counts in _by_call_site.items()}
+    return result
+
+
+@contextmanager
+def instrumented(call_sites=False, reset_counts=True):
+    """A context manager within which instrumentation is enabled.
+
+    The previous state is restored on exit, and the counts remain available from
+    snapshot().
+
+    Args:
+        call_sites: As for enable().
+
+        reset_counts: If True, set all counts to zero on entry.
+    """
+    global _call_sites
+    was_enabled, previous_call_sites = is_enabled(), _call_sites
+    if reset_counts:
+        reset()
+    enable(call_sites)
+    try:
+        yield
+    finally:
+        if was_enabled:
+            _call_sites = previous_call_sites
+        else:
+            disable()
@@ -0,0 +1,420 @@
+"""Compile fixed-point expressions into integer-only kernels.
+
+Each FixedPoint operation derives the QFormat of its result from those of its
+operands, rescales the operands and checks the range of the result. When the same
+expression is evaluated many times with operands in the same QFormats, all of that
+work gives the same answer every time. trace() does it once: it calls a function
+with placeholder operands, records each operation with its resolved QFormat, and
+generates a function which computes the same numerators using integer shifts,
+additions, multiplications and divisions alone.
+
+Kernels are bit-exact with the traced function applied to FixedPoint values, and
+raise the same exceptions where FixedPoint would raise OverflowError or
+ZeroDivisionError.
+"""
+
+from numbers import Integral
+
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.qformat import QFormat, sum_qformat, product_qformat, quotient_qformat, negated_qformat, power_qformat
+
+NATIVE_ARRAY_BITS = 63
+
+
+def _shift_round_half_even(source, shift):
+    """An expression rounding the numerator in source right by shift bits, to even on ties."""
+    if shift <= 0:
+        return "({} << {})".format(source, -shift) if shift else source
+    return "(({src} + {bias} + (({src} >> {shift}) & 1)) >> {shift})".format(
+        src=source, bias=(1 << (shift - 1)) - 1, shift=shift)
+
+
+def _divide_scalar(dividend, divisor):
+    """The quotient of two integers, rounded to nearest with ties to even, as Fraction rounds."""
+    quotient, remainder = divmod(dividend, divisor)
+    twice = 2 * remainder
+    if divisor < 0:
+        twice, divisor = -twice, -divisor
+    if twice > divisor or (twice == divisor and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+def _check_scalar(numerator, lower, upper, qformat):
+    if not lower <= numerator <= upper:
+        raise OverflowError("Numerator {} is out of range {} <= numerator <= {} for {!r}"
+                            .format(numerator, lower, upper, qformat))
+    return numerator
+
+
+def _divide_array(dividend, divisor):
+    import numpy as np
+    if np.any(divisor == 0):
+        raise ZeroDivisionError("Fixed-point division by zero")
+    quotient = dividend // divisor
+    remainder = dividend - quotient * divisor
+    negative = divisor < 0
+    twice = np.where(negative, -2 * remainder, 2 * remainder)
+    magnitude = np.where(negative, -divisor, divisor)
+    return quotient + ((twice > magnitude) | ((twice == magnitude) & (quotient & 1 == 1)))
+
+
+def _check_array(numerators, lower, upper, qformat):
+    import numpy as np
+    out_of_range = (numerators < lower) | (numerators > upper)
+    if np.any(out_of_range):
+        raise OverflowError("Numerator {} is out of range {} <= numerator <= {} for {!r}"
+                            .format(numerators[out_of_range].flat[0], lower, upper, qformat))
+    return numerators
+
+
+class Traced:
+    """A placeholder for a FixedPoint value during tracing.
+
+    Traced values support the arithmetic operators of FixedPoint with other traced
+    values, FixedPoint constants and integer constants. Their values are unknown while
+    tracing, so they cannot be compared or converted to other types.
+    """
+
+    def __init__(self, trace, name, qformat, bits=None):
+        self._trace = trace
+        self._name = name
+        self._qformat = qformat
+        # The width of the widest intermediate numerator needed to compute this value
+        self._bits = bits if bits is not None else qformat.integer_bits + qformat.fraction_bits
+
+    @property
+    def qformat(self):
+        """The QFormat this value would have if computed with FixedPoint."""
+        return self._qformat
+
+    def __repr__(self):
+        return "{}({!r}, {!r})".format(self.__class__.__name__, self._name, self._qformat)
+
+    def __bool__(self):
+        raise TypeError("The value of a {} is not known while tracing".format(self.__class__.__name__))
+
+    def _coerce(self, other):
+        if isinstance(other, Traced):
+            if other._trace is not self._trace:
+                raise ValueError("{!r} belongs to a different trace".format(other))
+            return other
+        if isinstance(other, (FixedPoint, Integral)):
+            return self._trace.constant(FixedPoint(int(other) if isinstance(other, Integral) else other))
+        return None
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self._trace.add(self, other)
+
+    def __radd__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self._trace.add(other, self)
+
+    def __sub__(self, other):
+        # As Rational.__sub__, self + -other, in which an integer is negated before conversion
+        if isinstance(other, Integral):
+            return self._trace.add(self, self._coerce(-other))
+        other = self._coerce(other)
+        return NotImplemented if other is None else self._trace.add(self, -other)
+
+    def __rsub__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self._trace.add(-self, other)
+
+    def __mul__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self._trace.mul(self, other)
+
+    def __rmul__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self._trace.mul(other, self)
+
+    def __truediv__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self._trace.truediv(self, other)
+
+    def __rtruediv__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self._trace.truediv(other, self)
+
+    def __pow__(self, exponent):
+        if not isinstance(exponent, Integral) or exponent == 0:
+            raise TypeError("Only non-zero integer exponents can be traced, not {!r}".format(exponent))
+        return self._trace.pow(self, int(exponent))
+
+    def __neg__(self):
+        return self._trace.neg(self)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self._trace.abs(self)
+
+
+class _Trace:
+    """The operations recorded while tracing a function."""
+
+    def __init__(self):
+        self.lines = []
+        self.plan = []
+        self._count = 0
+
+    def _emit(self, operation, expression, qformat, bits):
+        name = 't{}'.format(self._count)
+        self._count += 1
+        self.lines.append("{} = {}".format(name, expression))
+        self.plan.append((name, operation, qformat))
+        return Traced(self, name, qformat, bits)
+
+    def _check(self, expression, qformat):
+        return "_check({}, {}, {}, {!r})".format(expression, qformat._min_numerator(),
+                                                 qformat._max_numerator(), qformat)
+
+    def argument(self, index, qformat):
+        name = 'x{}'.format(index)
+        self.plan.append((name, 'input', qformat))
+        return Traced(self, name, qformat)
+
+    def constant(self, value):
+        qformat = value.qformat
+        return self._emit('constant', repr(value._numerator), qformat, qformat.integer_bits + qformat.fraction_bits)
+
+    def add(self, a, b):
+        # As _add: align to the common fraction bits, with one more integer bit
+        fraction_bits = max(a.qformat.fraction_bits, b.qformat.fraction_bits)
+        qformat = sum_qformat(a.qformat, b.qformat)
+        expression = "{} + {}".format(_shift_round_half_even(a._name, a.qformat.fraction_bits - fraction_bits),
+                                      _shift_round_half_even(b._name, b.qformat.fraction_bits - fraction_bits))
+        return self._emit('add', expression, qformat, max(a._bits, b._bits, qformat.integer_bits + fraction_bits))
+
+    def mul(self, a, b):
+        # As _mul: the exact product of the numerators
+        qformat = product_qformat(a.qformat, b.qformat)
+        return self._emit('mul', "{} * {}".format(a._name, b._name), qformat,
+                          max(a._bits, b._bits, qformat.integer_bits + qformat.fraction_bits))
+
+    def truediv(self, dividend, divisor):
+        # As _truediv: a rounded quotient in a working format, rounded again into the result format
+        d, v = dividend.qformat, divisor.qformat
+        qformat = quotient_qformat(d, v)
+        working_fraction_bits = max(d.fraction_bits, v.fraction_bits, qformat.fraction_bits)
+        shift = working_fraction_bits - d.fraction_bits + v.fraction_bits
+        quotient = "_divide({} << {}, {})".format(dividend._name, shift, divisor._name)
+        expression = _shift_round_half_even(quotient, working_fraction_bits - qformat.fraction_bits)
+        bits = max(dividend._bits, divisor._bits, d.integer_bits + d.fraction_bits + shift + 1)
+        return self._emit('truediv', expression, qformat, bits)
+
+    def neg(self, a):
+        qformat = negated_qformat(a.qformat)
+        return self._emit('neg', "-{}".format(a._name), qformat,
+                          max(a._bits, qformat.integer_bits + qformat.fraction_bits))
+
+    def abs(self, a):
+        # The magnitude of the most negative value is out of range, as for FixedPoint
+        return self._emit('abs', self._check("abs({})".format(a._name), a.qformat), a.qformat, a._bits + 1)
+
+    def pow(self, base, exponent):
+        # As _pow: the numerator raised to the magnitude of the exponent, then the reciprocal if negative
+        magnitude = abs(exponent)
+        qformat = power_qformat(base.qformat, magnitude)
+        expression = self._check("{} ** {}".format(base._name, magnitude), qformat)
+        power = self._emit('pow', expression, qformat, max(base._bits, (base.qformat.integer_bits +
+                                                                         base.qformat.fraction_bits) * magnitude))
+        if exponent > 0:
+            return power
+        return self.truediv(self.constant(FixedPoint(1)), power)
+
+    def rescale(self, a, qformat):
+        # As FixedPoint(a, qformat): round to nearest, ties to even, then check the range
+        shift = a.qformat.fraction_bits - qformat.fraction_bits
+        expression = _shift_round_half_even(a._name, shift)
+        # Signed values can be negative, so they might overflow any unsigned format
+        source = a.qformat.to_signed() if qformat.signed else a.qformat
+        cannot_overflow = source.signed == qformat.signed and (
+            qformat.integer_bits > source.integer_bits or (qformat.integer_bits == source.integer_bits and shift <= 0))
+        if not cannot_overflow:
+            expression = self._check(expression, qformat)
+        bits = max(a._bits + 1, qformat.integer_bits + qformat.fraction_bits,
+                   a.qformat.integer_bits + a.qformat.fraction_bits - min(shift, 0))
+        return self._emit('rescale', expression, qformat, bits)
+
+
+def rescale(value, qformat):
+    """Convert a value to a QFormat, rounding to nearest with ties to even.
+
+    This is equivalent to FixedPoint(value, qformat), and unlike that can also be applied
+    to Traced values within a function being traced.
+
+    Args:
+        value: A FixedPoint, real number or Traced value.
+
+        qformat: The QFormat of the result.
+
+    Returns:
+        A FixedPoint, or a Traced value if value is Traced.
+
+    Raises:
+        OverflowError: If the value cannot be represented in qformat.
+    """
+    if isinstance(value, Traced):
+        return value._trace.rescale(value, qformat)
+    return FixedPoint(value, qformat)
+
+
+class Kernel:
+    """An integer-only function compiled from a traced fixed-point function.
+
+    A kernel may be applied to FixedPoint values, to integer numerators, or to NumPy
+    arrays of integer numerators.
+    """
+
+    def __init__(self, input_qformats, outputs, trace, single):
+        self._input_qformats = tuple(input_qformats)
+        self._output_qformats = tuple(output.qformat for output in outputs)
+        self._plan = tuple(trace.plan)
+        self._single = single
+        self._bits = max(output._bits for output in outputs)
+
+        parameters = ', '.join('x{}'.format(i) for i in range(len(input_qformats)))
+        results = ', '.join(output._name for output in outputs)
+        body = trace.lines + ["return {}".format(results if single else "({},)".format(results))]
+        self._source = "def kernel({}):\n{}\n".format(parameters, ''.join("    {}\n".format(line) for line in body))
+        code = compile(self._source, '<fixedpoint kernel>', 'exec')
+
+        namespace = {'_divide': _divide_scalar, '_check': _check_scalar, 'QFormat': QFormat}
+        exec(code, namespace)
+        self._scalar_kernel = namespace['kernel']
+        self._code = code
+        self._array_kernel = None
+
+    @property
+    def input_qformats(self):
+        """The QFormats of the arguments."""
+        return self._input_qformats
+
+    @property
+    def output_qformats(self):
+        """The QFormats of the results, as a tuple."""
+        return self._output_qformats
+
+    @property
+    def plan(self):
+        """A tuple of (name, operation, qformat) triples, one per traced value, in order."""
+        return self._plan
+
+    @property
+    def source(self):
+        """The Python source of the generated integer function."""
+        return self._source
+
+    def evaluate(self, *numerators):
+        """Apply the kernel to integer numerators.
+
+        Args:
+            *numerators: One integer numerator per argument, in the corresponding input QFormat.
+
+        Returns:
+            The integer numerator of the result, or a tuple of numerators if the traced
+            function returned a tuple.
+
+        Raises:
+            OverflowError: If an operation overflows as it would with FixedPoint.
+            ZeroDivisionError: If a divisor is zero.
+        """
+        return self._scalar_kernel(*numerators)
+
+    def evaluate_array(self, *numerators):
+        """Apply the kernel element-wise to NumPy arrays of integer numerators.
+
+        The arithmetic is performed in int64 if the plan proves that no intermediate
+        value can exceed it, and otherwise in Python integers. This method requires
+        NumPy.
+
+        Args:
+            *numerators: One array-like of integer numerators per argument, in the
+                corresponding input QFormat. The arrays are broadcast together.
+
+        Returns:
+            An array of result numerators, or a tuple of arrays if the traced function
+            returned a tuple.
+
+        Raises:
+            OverflowError: If any element overflows as it would with FixedPoint.
+            ZeroDivisionError: If any divisor is zero.
+        """
+        import numpy as np
+        if self._array_kernel is None:
+            namespace = {'_divide': _divide_array, '_check': _check_array, 'QFormat': QFormat}
+            exec(self._code, namespace)
+            self._array_kernel = namespace['kernel']
+        dtype = np.int64 if self._bits <= NATIVE_ARRAY_BITS else object
+        return self._array_kernel(*(np.asarray(n).astype(dtype) for n in numerators))
+
+    def __call__(self, *args):
+        """Apply the kernel to FixedPoint values.
+
+        Args:
+            *args: One real number per argument. Values which are not FixedPoints in the
+                corresponding input QFormat are first converted to it.
+
+        Returns:
+            A FixedPoint, or a tuple of FixedPoints if the traced function returned a tuple.
+
+        Raises:
+            TypeError: If the number of arguments differs from the number of input QFormats.
+        """
+        if len(args) != len(self._input_qformats):
+            raise TypeError("Kernel takes {} arguments but {} were given".format(len(self._input_qformats), len(args)))
+        numerators = [(arg if isinstance(arg, FixedPoint) and arg.qformat == qformat
+                       else FixedPoint(arg, qformat))._numerator
+                      for arg, qformat in zip(args, self._input_qformats)]
+        results = self._scalar_kernel(*numerators)
+        if self._single:
+            return FixedPoint._from_numerator(results, self._output_qformats[0])
+        return tuple(FixedPoint._from_numerator(n, q) for n, q in zip(results, self._output_qformats))
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, ', '.join(repr(q) for q in self._input_qformats))
+
+
+def trace(func, *input_qformats):
+    """Trace a fixed-point function and compile it into an integer-only Kernel.
+
+    func is called once, with one Traced placeholder per input QFormat. It may use the
+    arithmetic operators (+, -, *, /, unary -, abs and ** with a non-zero integer
+    exponent) between its arguments, FixedPoint constants and integer constants, and
+    rescale() to convert a value to another QFormat. It must return a Traced value or a
+    tuple of them, and its control flow must not depend on the values of its arguments.
+
+    Example:
+
+        >>> mac = trace(lambda acc, x, y: rescale(acc + x * y, QFormat(8, 24)),
+        ...             QFormat(8, 24), QFormat(1, 15), QFormat(1, 15))
+        >>> mac(FixedPoint(0.5), FixedPoint(0.25), FixedPoint(0.5))
+        FixedPoint(0.625, QFormat(8, 24))
+        >>> mac.evaluate(2**23, 2**13, 2**14)
+        10485760
+
+    Args:
+        func: The function to trace.
+
+        *input_qformats: The QFormat of each argument of func.
+
+    Returns:
+        A Kernel.
+
+    Raises:
+        TypeError: If func performs an operation which cannot be traced.
+    """
+    recorder = _Trace()
+    arguments = [recorder.argument(index, qformat) for index, qformat in enumerate(input_qformats)]
+    result = func(*arguments)
+    single = not isinstance(result, tuple)
+    outputs = [result] if single else list(result)
+    for output in outputs:
+        if not isinstance(output, Traced) or output._trace is not recorder:
+            raise TypeError("Traced function must return values computed from its arguments, not {!r}"
+                            .format(output))
+    return Kernel(input_qformats, outputs, recorder, single)
@@ -0,0 +1,166 @@
+"""Bit-true fixed-point linear algebra.
+
+This module requires NumPy.
+"""
+
+import numpy as np
+
+from fixedpoint.array import FixedPointArray
+from fixedpoint.qformat import QFormat
+from fixedpoint.quantization import (shift_round, constrain, check_rounding, check_overflow,
+                                     ROUND_HALF_EVEN, OVERFLOW_ERROR, MAX_ARRAY_BITS)
+
+NATIVE_ACCUMULATOR_BITS = 63
+
+BLOCK_ELEMENTS = 1 << 20
+
+
+def max_product_magnitude(a_qformat, b_qformat):
+    """The largest magnitude of the product of numerators in two QFormats.
+
+    For signed QFormats this is the product of the two most negative numerators.
+    """
+    return a_qformat._max_magnitude() * b_qformat._max_magnitude()
+
+
+def minimal_accumulator_qformat(a_qformat, b_qformat, inner_dimension):
+    """The narrowest QFormat which can accumulate inner_dimension products exactly.
+
+    Args:
+        a_qformat: The QFormat of the left-hand operands.
+        b_qformat: The QFormat of the right-hand operands.
+        inner_dimension: The number of products which are summed.
+
+    Returns:
+        A QFormat with the fraction bits of the full-precision product and enough integer
+        bits that no sum of inner_dimension products can overflow it.
+    """
+    bound = max_product_magnitude(a_qformat, b_qformat) * max(inner_dimension, 1)
+    # A positive bound needs one more bit than the same negative value
+    num_bits = bound.bit_length() + 1
+    fraction_bits = a_qformat.fraction_bits + b_qformat.fraction_bits
+    return QFormat(num_bits - fraction_bits, fraction_bits)
+
+
+def accumulator_cannot_overflow(a_qformat, b_qformat, inner_dimension, accumulator_qformat):
+    """Whether an accumulator is proven, from the formats alone, never to overflow.
+
+    Args:
+        a_qformat: The QFormat of the left-hand operands.
+        b_qformat: The QFormat of the right-hand operands.
+        inner_dimension: The number of products which are summed.
+        accumulator_qformat: The QFormat of the accumulator.
+
+    Returns:
+        True if every sum of inner_dimension exact products of numerators in a_qformat and
+        b_qformat, aligned to the fraction bits of accumulator_qformat, is within its range.
+    """
+    shift = accumulator_qformat.fraction_bits - a_qformat.fraction_bits - b_qformat.fraction_bits
+    product_bound = max_product_magnitude(a_qformat, b_qformat)
+    # Products are rounded individually, so each is bounded by its shifted bound rounded up
+    product_bound = (product_bound << shift) if shift >= 0 else -(-product_bound >> -shift)
+    bound = product_bound * max(inner_dimension, 1)
+    return (accumulator_qformat._min_numerator() <= -bound and
+            bound <= accumulator_qformat._max_numerator())
+
+
+def _inner_block_length(a_qformat, b_qformat, product_shift):
+    """The largest number of products whose exact sum is proven to fit in a native accumulator."""
+    product_bound = max_product_magnitude(a_qformat, b_qformat) << max(product_shift, 0)
+    return (2**NATIVE_ACCUMULATOR_BITS - 1) // product_bound
+
+
+def matmul(a, b, accumulator_qformat, out_qformat, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_ERROR):
+    """The matrix product of two FixedPointArrays.
+
+    Each element of the result is computed as for a dot product in scalar FixedPoint:
+
+        acc = FixedPoint(0, accumulator_qformat)
+        for x, y in zip(row, column):
+            acc = FixedPoint(acc + FixedPoint(x * y, accumulator_qformat), accumulator_qformat)
+        result = FixedPoint(acc, out_qformat)
+
+    That is, each exact product is rounded into the accumulator format (which is exact
+    if the accumulator has at least as many fraction bits as the product), the products
+    are summed, and the sum is rounded into the output format. The accumulator range is
+    checked once each sum is complete, as with a two's complement hardware accumulator.
+
+    Products are summed in native 64-bit integers in blocks of the inner dimension
+    which are proven from the operand QFormats not to overflow them. When the whole
+    inner dimension fits in one block, which is the common case, a single native
+    matrix multiplication is used. Otherwise the block sums are combined in Python
+    integers, and if even a single product could overflow a native integer, all of
+    the arithmetic uses Python integers.
+
+    Like numpy.matmul, operands with more than two dimensions are treated as stacks of
+    matrices, so many small matrix products can be computed in one call.
+
+    Args:
+        a: A FixedPointArray with shape (..., m, k).
+
+        b: A FixedPointArray with shape (..., k, n).
+
+        accumulator_qformat: The QFormat of the accumulator.
+
+        out_qformat: The QFormat of the result.
+
+        rounding: One of the quantization.ROUNDING_MODES.
+
+        overflow: One of the quantization.OVERFLOW_MODES, applied to the accumulator
+            and to the result.
+
+    Returns:
+        A FixedPointArray with shape (..., m, n) in out_qformat.
+
+    Raises:
+        ValueError: If the operand shapes are not compatible.
+        OverflowError: If overflow is OVERFLOW_ERROR and the accumulator or result overflows.
+    """
+    check_rounding(rounding)
+    check_overflow(overflow)
+    if a.ndim < 2 or b.ndim < 2 or a.shape[-1] != b.shape[-2]:
+        raise ValueError("Cannot multiply matrices with shapes {} and {}".format(a.shape, b.shape))
+
+    inner_dimension = a.shape[-1]
+    product_fraction_bits = a.qformat.fraction_bits + b.qformat.fraction_bits
+    product_shift = accumulator_qformat.fraction_bits - product_fraction_bits
+
+    sums = _blocked_matmul(a.numerators, b.numerators, a.qformat, b.qformat, product_shift, rounding)
+    if not accumulator_cannot_overflow(a.qformat, b.qformat, inner_dimension, accumulator_qformat):
+        sums, _ = constrain(sums, accumulator_qformat, overflow)
+
+    output_shift = out_qformat.fraction_bits - accumulator_qformat.fraction_bits
+    output_bits = accumulator_qformat.integer_bits + accumulator_qformat.fraction_bits + max(output_shift, 0)
+    sums = sums.astype(np.int64 if output_bits <= MAX_ARRAY_BITS else object)
+    outputs, _ = constrain(shift_round(sums, output_shift, rounding), out_qformat, overflow)
+    return FixedPointArray(outputs, out_qformat)
+
+
+def _blocked_matmul(a, b, a_qformat, b_qformat, product_shift, rounding):
+    """Exact sums of products, each aligned or rounded to the accumulator fraction bits."""
+    inner_dimension = a.shape[-1]
+    block_length = _inner_block_length(a_qformat, b_qformat, product_shift)
+    native = block_length >= 1
+    step = min(block_length, inner_dimension) if native else inner_dimension
+    if product_shift < 0:
+        # Each product is rounded individually, so the products are materialized
+        batch_shape = np.broadcast_shapes(a.shape[:-2], b.shape[:-2])
+        num_outputs = int(np.prod(batch_shape, dtype=np.int64)) * a.shape[-2] * b.shape[-1]
+        step = min(step, BLOCK_ELEMENTS // max(num_outputs, 1))
+    step = max(step, 1)
+    widen = native and block_length < inner_dimension
+    dtype = np.int64 if native else object
+
+    total = None
+    for start in range(0, max(inner_dimension, 1), step):
+        a_block = a[..., :, start:start + step].astype(dtype)
+        b_block = b[..., start:start + step, :].astype(dtype)
+        if product_shift < 0:
+            products = a_block[..., :, :, np.newaxis] * b_block[..., np.newaxis, :, :]
+            partial = shift_round(products, product_shift, rounding).sum(axis=-2)
+        else:
+            partial = np.matmul(a_block, b_block)
+        if widen:
+            partial = partial.astype(object)
+        total = partial if total is None else total + partial
+    return shift_round(total, max(product_shift, 0))
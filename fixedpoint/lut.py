@@ -0,0 +1,220 @@
+"""Fixed-point function approximation with lookup tables.
+
+A table samples a function at evenly spaced breakpoints across the whole range of
+an input QFormat. Evaluation uses the high-order bits of the input numerator as
+the table index and, for linear interpolation, the low-order bits as the
+interpolation weight, so only integer arithmetic is used.
+
+Tables are built once and reused: build() keeps the most recently used tables in
+a bounded cache keyed by its arguments.
+
+This module requires NumPy.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from fixedpoint.array import FixedPointArray
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.quantization import (quantize, shift_round, shift_round_integer, check_rounding,
+                                     ROUND_HALF_EVEN, OVERFLOW_SATURATE)
+
+INTERPOLATION_NONE = 'none'
+INTERPOLATION_LINEAR = 'linear'
+
+INTERPOLATIONS = (INTERPOLATION_NONE, INTERPOLATION_LINEAR)
+
+NATIVE_ACCUMULATOR_BITS = 63
+
+CACHE_SIZE = 64
+
+
+def _sample(func, x):
+    """The value of func at x, or NaN or infinity where func raises an exception instead."""
+    try:
+        return func(x)
+    except (ValueError, ZeroDivisionError):
+        return float('nan')
+    except OverflowError:
+        return float('inf')
+
+
+class LookupTable:
+    """A table approximating a function from one QFormat to another.
+
+    The input range of input_qformat is divided into entries segments of equal width.
+    With INTERPOLATION_NONE each input maps to the function value at the start of its
+    segment. With INTERPOLATION_LINEAR the result is interpolated between the values at
+    the start and end of the segment, and rounded. Function values which are out of
+    range for output_qformat saturate, and NaNs become zero. Where func raises
+    ValueError or ZeroDivisionError, as math.log and 1 / x do outside their domains,
+    its value is taken to be NaN, and where it raises OverflowError, as math.exp does
+    for large arguments, its value is taken to be infinite.
+    """
+
+    def __init__(self, func, input_qformat, output_qformat, entries, interpolation=INTERPOLATION_LINEAR,
+                 rounding=ROUND_HALF_EVEN):
+        """Build a lookup table by sampling func.
+
+        Args:
+            func: A function of one float argument returning a float.
+
+            input_qformat: The QFormat of the inputs. Must fit in 64 bits.
+
+            output_qformat: The QFormat of the outputs. Must fit in 64 bits.
+
+            entries: The number of segments, a power of two no greater than the number
+                of distinct values of input_qformat.
+
+            interpolation: One of INTERPOLATIONS.
+
+            rounding: One of the quantization.ROUNDING_MODES, used when quantizing
+                function values and interpolating.
+
+        Raises:
+            ValueError: If entries or interpolation are not supported.
+        """
+        input_bits = input_qformat.integer_bits + input_qformat.fraction_bits
+        if entries < 1 or entries & (entries - 1) or entries > 2**input_bits:
+            raise ValueError("Number of entries {} is not a power of two no greater than 2**{}"
+                             .format(entries, input_bits))
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError("Interpolation {!r} is not one of {}".format(interpolation, ', '.join(INTERPOLATIONS)))
+        check_rounding(rounding)
+
+        self._func = func
+        self._input_qformat = input_qformat
+        self._output_qformat = output_qformat
+        self._interpolation = interpolation
+        self._rounding = rounding
+        self._offset = -input_qformat._min_numerator()
+        self._segment_bits = input_bits - (entries.bit_length() - 1)
+
+        # One more breakpoint than segments, so the last segment can be interpolated
+        num_breakpoints = entries + (1 if interpolation == INTERPOLATION_LINEAR else 0)
+        breakpoints = [(i << self._segment_bits) - self._offset for i in range(num_breakpoints)]
+        with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+            values = [_sample(func, n / input_qformat.denominator) for n in breakpoints]
+        table = quantize(values, output_qformat, rounding, OVERFLOW_SATURATE).numerators
+        self._table = table.astype(np.int64)
+        self._table_list = table.tolist()
+        self._slopes = np.diff(self._table.astype(object)) if interpolation == INTERPOLATION_LINEAR else None
+        self._interpolation_dtype = np.int64
+        if self._slopes is not None:
+            # Interpolate in native integers when no scaled start plus slope times weight can overflow them
+            bound = (max(abs(t) for t in self._table_list) + max(abs(s) for s in self._slopes)) << self._segment_bits
+            if bound >= 2**NATIVE_ACCUMULATOR_BITS:
+                self._interpolation_dtype = object
+            self._slopes = self._slopes.astype(self._interpolation_dtype)
+
+    @property
+    def input_qformat(self):
+        """The QFormat of the inputs."""
+        return self._input_qformat
+
+    @property
+    def output_qformat(self):
+        """The QFormat of the outputs."""
+        return self._output_qformat
+
+    @property
+    def entries(self):
+        """The number of segments."""
+        return len(self._table_list) - (1 if self._interpolation == INTERPOLATION_LINEAR else 0)
+
+    @property
+    def interpolation(self):
+        """The interpolation method, one of INTERPOLATIONS."""
+        return self._interpolation
+
+    @property
+    def table(self):
+        """The output numerators at each breakpoint."""
+        return self._table.copy()
+
+    def lookup_numerator(self, numerator):
+        """Evaluate the table for a single input numerator, using Python integers only.
+
+        Args:
+            numerator: An integer numerator in input_qformat.
+
+        Returns:
+            An integer numerator in output_qformat.
+        """
+        unsigned = numerator + self._offset
+        index = unsigned >> self._segment_bits
+        start = self._table_list[index]
+        if self._interpolation == INTERPOLATION_NONE or self._segment_bits == 0:
+            return start
+        weight = unsigned - (index << self._segment_bits)
+        step = self._table_list[index + 1] - start
+        return shift_round_integer((start << self._segment_bits) + step * weight, -self._segment_bits, self._rounding)
+
+    def lookup_numerators(self, numerators):
+        """Evaluate the table for an array of input numerators.
+
+        Args:
+            numerators: An array of integer numerators in input_qformat.
+
+        Returns:
+            An array of the same shape of integer numerators in output_qformat.
+        """
+        # Offset in uint64, which holds every 64-bit input exactly, wrapping signed numerators past zero
+        signed_dtype = np.int64 if self._input_qformat.signed else np.uint64
+        unsigned = np.asarray(numerators).astype(signed_dtype).astype(np.uint64) + np.uint64(self._offset)
+        index = unsigned >> self._segment_bits
+        start = self._table[index]
+        if self._interpolation == INTERPOLATION_NONE or self._segment_bits == 0:
+            return start
+        dtype = self._interpolation_dtype
+        weight = (unsigned - (index << self._segment_bits)).astype(dtype)
+        interpolated = (start.astype(dtype) << self._segment_bits) + self._slopes[index] * weight
+        return shift_round(interpolated, -self._segment_bits, self._rounding)
+
+    def __call__(self, x):
+        """Evaluate the table.
+
+        Args:
+            x: A FixedPoint, FixedPointArray or real number. Values in other QFormats are
+                first converted to input_qformat.
+
+        Returns:
+            A FixedPoint, or for a FixedPointArray argument a FixedPointArray, in
+            output_qformat.
+        """
+        if isinstance(x, FixedPointArray):
+            if x.qformat != self._input_qformat:
+                x = FixedPointArray.from_values(x.tolist(), self._input_qformat)
+            outputs = self.lookup_numerators(x.numerators)
+            return FixedPointArray(outputs, self._output_qformat)
+        x = FixedPoint(x, self._input_qformat)
+        return FixedPoint.from_raw(self.lookup_numerator(x._numerator), self._output_qformat)
+
+    def __repr__(self):
+        return "{}({}, {!r}, {!r}, {!r}, interpolation={!r})".format(
+            self.__class__.__name__, getattr(self._func, '__name__', repr(self._func)),
+            self._input_qformat, self._output_qformat, self.entries, self._interpolation)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def build(func, input_qformat, output_qformat, entries, interpolation=INTERPOLATION_LINEAR,
+          rounding=ROUND_HALF_EVEN):
+    """Obtain a LookupTable, reusing a previously built table for the same arguments.
+
+    The most recently used CACHE_SIZE tables are retained. Use build.cache_info() to
+    inspect and build.cache_clear() to empty the cache.
+
+    Example:
+
+        >>> tanh_table = build(math.tanh, QFormat(4, 12), QFormat(1, 15), 256)
+        >>> tanh_table(FixedPoint(0.5))
+        FixedPoint(0.462127685546875, QFormat(1, 15))
+
+    Args:
+        See LookupTable. func must be hashable, which all functions are.
+
+    Returns:
+        A LookupTable.
+    """
+    return LookupTable(func, input_qformat, output_qformat, entries, interpolation, rounding)
@@ -0,0 +1,236 @@
+"""Bit-true quantized neural network kernels with per-channel weight QFormats.
+
+The kernels emulate integer inference hardware: inputs and weights are held as
+integer numerators, products are accumulated exactly, and a fused epilogue adds
+the bias, rounds each channel into the output QFormat, applies the activation and
+saturates, all on whole arrays.
+
+This module requires NumPy.
+"""
+
+from fractions import Fraction
+
+import numpy as np
+
+from fixedpoint.array import FixedPointArray
+from fixedpoint.qformat import QFormat
+from fixedpoint.quantization import (shift_round, constrain, check_rounding, check_overflow,
+                                     ROUND_HALF_EVEN, OVERFLOW_SATURATE, OVERFLOW_ERROR)
+
+NATIVE_ACCUMULATOR_BITS = 63
+
+ACTIVATION_NONE = None
+ACTIVATION_RELU = 'relu'
+
+ACTIVATIONS = (ACTIVATION_NONE, ACTIVATION_RELU)
+
+
+def _channel_qformats(weight_qformats, num_channels):
+    """A list of one weight QFormat per output channel."""
+    if isinstance(weight_qformats, QFormat):
+        return [weight_qformats] * num_channels
+    weight_qformats = list(weight_qformats)
+    if len(weight_qformats) != num_channels:
+        raise ValueError("{} weight QFormats were supplied for {} output channels"
+                         .format(len(weight_qformats), num_channels))
+    return weight_qformats
+
+
+def _check_weights(weights, weight_qformats):
+    """Check that each channel of weight numerators is within the range of its QFormat."""
+    weights = np.asarray(weights)
+    for channel, qformat in enumerate(weight_qformats):
+        constrain(weights[channel], qformat, OVERFLOW_ERROR)
+    return weights
+
+
+def _accumulator_dtype(x_qformat, weight_qformats, bias, out_qformat, num_products):
+    """int64 if no accumulator can overflow it, as proven from the formats, otherwise object."""
+    x_bound = x_qformat._max_magnitude()
+    bound = 0
+    for qformat in weight_qformats:
+        fraction_bits = x_qformat.fraction_bits + qformat.fraction_bits
+        channel_bound = x_bound * qformat._max_magnitude() * num_products
+        if bias is not None:
+            bias_shift = fraction_bits - bias.qformat.fraction_bits
+            bias_bound = bias.qformat._max_magnitude()
+            channel_bound += (bias_bound << bias_shift) if bias_shift >= 0 else bias_bound
+        bound = max(bound, channel_bound << max(out_qformat.fraction_bits - fraction_bits, 0))
+    return np.int64 if bound < 2**NATIVE_ACCUMULATOR_BITS else object
+
+
+def _check_bias(bias, num_channels):
+    if bias is not None and bias.shape != (num_channels,):
+        raise ValueError("Bias with shape {} does not match {} output channels".format(bias.shape, num_channels))
+
+
+def _epilogue(accumulators, channel_axis, x_qformat, weight_qformats, bias, out_qformat,
+              activation, clamp, rounding, overflow):
+    """Add bias, requantize each channel into out_qformat, apply the activation and saturate."""
+    accumulator_fraction_bits = [x_qformat.fraction_bits + q.fraction_bits for q in weight_qformats]
+    shape = [1] * accumulators.ndim
+    shape[channel_axis] = -1
+
+    if bias is not None:
+        bias_numerators = bias.numerators.astype(accumulators.dtype)
+        aligned = np.empty(len(weight_qformats), dtype=accumulators.dtype)
+        for fraction_bits in set(accumulator_fraction_bits):
+            channels = [c for c, f in enumerate(accumulator_fraction_bits) if f == fraction_bits]
+            aligned[channels] = shift_round(bias_numerators[channels], fraction_bits - bias.qformat.fraction_bits,
+                                            rounding)
+        accumulators = accumulators + aligned.reshape(shape)
+
+    # Channels with the same accumulator format share one vectorized shift
+    outputs = np.empty_like(accumulators)
+    for fraction_bits in set(accumulator_fraction_bits):
+        channels = [c for c, f in enumerate(accumulator_fraction_bits) if f == fraction_bits]
+        selected = np.take(accumulators, channels, axis=channel_axis)
+        shifted = shift_round(selected, out_qformat.fraction_bits - fraction_bits, rounding)
+        index = [slice(None)] * accumulators.ndim
+        index[channel_axis] = channels
+        outputs[tuple(index)] = shifted
+
+    if activation == ACTIVATION_RELU:
+        outputs = np.maximum(outputs, 0)
+    if clamp is not None:
+        low, high = _clamp_numerators(clamp, out_qformat)
+        if low is not None or high is not None:
+            outputs = np.clip(outputs, low, high)
+    outputs, _ = constrain(outputs, out_qformat, overflow)
+    return FixedPointArray(outputs, out_qformat)
+
+
+def _clamp_numerators(clamp, qformat):
+    """The numerators of a pair of clamp limits, rounded to nearest with ties to even and saturated to qformat.
+
+    A limit beyond the range of qformat on its own side is None instead, so that
+    values beyond it are left to the overflow mode, as they would be with no clamp.
+    """
+    lower = qformat._min_numerator()
+    upper = qformat._max_numerator()
+    low, high = (round(Fraction(limit) * Fraction(2) ** qformat.fraction_bits) for limit in clamp)
+    return (None if low < lower else min(low, upper)), (None if high > upper else max(high, lower))
+
+
+def _check_modes(activation, rounding, overflow):
+    if activation not in ACTIVATIONS:
+        raise ValueError("Activation {!r} is not one of {}".format(activation, ACTIVATIONS))
+    check_rounding(rounding)
+    check_overflow(overflow)
+
+
+def dense(x, weights, weight_qformats, out_qformat, bias=None, activation=ACTIVATION_NONE, clamp=None,
+          rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_SATURATE):
+    """A fully connected layer.
+
+    For each output channel c, the exact sum of products of the inputs and the weights
+    of channel c is formed in the accumulator format of that channel, which has the
+    fraction bits of x.qformat plus those of weight_qformats[c]. The bias is then added,
+    rounded into the accumulator format if it has more fraction bits, and the sum is
+    rounded into out_qformat. Finally the activation and clamp are applied and the
+    result is brought within the range of out_qformat according to overflow.
+
+    Args:
+        x: A FixedPointArray of inputs with shape (batch, in_features).
+
+        weights: An array of integer weight numerators with shape (out_features,
+            in_features).
+
+        weight_qformats: The QFormat of the weights, either a single QFormat or a
+            sequence with one per output channel.
+
+        out_qformat: The QFormat of the result. Must fit in 64 bits.
+
+        bias: An optional FixedPointArray of shape (out_features,).
+
+        activation: One of ACTIVATIONS.
+
+        clamp: An optional (min, max) pair of reals limiting the output range.
+
+        rounding: One of the quantization.ROUNDING_MODES.
+
+        overflow: One of the quantization.OVERFLOW_MODES.
+
+    Returns:
+        A FixedPointArray with shape (batch, out_features) in out_qformat.
+
+    Raises:
+        ValueError: If shapes or formats are inconsistent, or a mode is not supported.
+        OverflowError: If overflow is OVERFLOW_ERROR and an output is out of range.
+    """
+    _check_modes(activation, rounding, overflow)
+    weight_qformats = _channel_qformats(weight_qformats, len(weights))
+    weights = _check_weights(weights, weight_qformats)
+    if x.ndim != 2 or weights.ndim != 2 or x.shape[1] != weights.shape[1]:
+        raise ValueError("Cannot apply weights with shape {} to inputs with shape {}"
+                         .format(weights.shape, x.shape))
+    _check_bias(bias, len(weights))
+    dtype = _accumulator_dtype(x.qformat, weight_qformats, bias, out_qformat, x.shape[1])
+    accumulators = np.matmul(x.numerators.astype(dtype), weights.astype(dtype).T)
+    return _epilogue(accumulators, 1, x.qformat, weight_qformats, bias, out_qformat,
+                     activation, clamp, rounding, overflow)
+
+
+def conv2d(x, weights, weight_qformats, out_qformat, bias=None, stride=1, padding=0,
+           activation=ACTIVATION_NONE, clamp=None, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_SATURATE):
+    """A two-dimensional convolution layer.
+
+    The arithmetic of each output element is as for dense(), over the receptive field
+    of that element. Input padding is filled with zeros.
+
+    Args:
+        x: A FixedPointArray of inputs with shape (batch, in_channels, height, width).
+
+        weights: An array of integer weight numerators with shape (out_channels,
+            in_channels, kernel_height, kernel_width).
+
+        weight_qformats: The QFormat of the weights, either a single QFormat or a
+            sequence with one per output channel.
+
+        out_qformat: The QFormat of the result. Must fit in 64 bits.
+
+        bias: An optional FixedPointArray of shape (out_channels,).
+
+        stride: The step between receptive fields, as an integer or a (vertical,
+            horizontal) pair.
+
+        padding: The number of zeros added to each edge, as an integer or a
+            (vertical, horizontal) pair.
+
+        activation: One of ACTIVATIONS.
+
+        clamp: An optional (min, max) pair of reals limiting the output range.
+
+        rounding: One of the quantization.ROUNDING_MODES.
+
+        overflow: One of the quantization.OVERFLOW_MODES.
+
+    Returns:
+        A FixedPointArray with shape (batch, out_channels, out_height, out_width) in
+        out_qformat.
+
+    Raises:
+        ValueError: If shapes or formats are inconsistent, or a mode is not supported.
+        OverflowError: If overflow is OVERFLOW_ERROR and an output is out of range.
+    """
+    _check_modes(activation, rounding, overflow)
+    weight_qformats = _channel_qformats(weight_qformats, len(weights))
+    weights = _check_weights(weights, weight_qformats)
+    if x.ndim != 4 or weights.ndim != 4 or x.shape[1] != weights.shape[1]:
+        raise ValueError("Cannot apply weights with shape {} to inputs with shape {}"
+                         .format(weights.shape, x.shape))
+    stride_y, stride_x = (stride, stride) if isinstance(stride, int) else stride
+    pad_y, pad_x = (padding, padding) if isinstance(padding, int) else padding
+    kernel_height, kernel_width = weights.shape[2:]
+
+    _check_bias(bias, len(weights))
+    dtype = _accumulator_dtype(x.qformat, weight_qformats, bias, out_qformat,
+                               weights.shape[1] * kernel_height * kernel_width)
+    padded = np.pad(x.numerators.astype(dtype), ((0, 0), (0, 0), (pad_y, pad_y), (pad_x, pad_x)))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (kernel_height, kernel_width), axis=(2, 3))
+    windows = windows[:, :, ::stride_y, ::stride_x]
+    # (batch, in, out_h, out_w, kh, kw) x (out, in, kh, kw) -> (batch, out_h, out_w, out)
+    accumulators = np.tensordot(windows, weights.astype(dtype), axes=([1, 4, 5], [1, 2, 3]))
+    accumulators = np.moveaxis(accumulators, 3, 1)
+    return _epilogue(accumulators, 1, x.qformat, weight_qformats, bias, out_qformat,
+                     activation, clamp, rounding, overflow)
@@ -0,0 +1,359 @@
+"""Bit-packed storage of fixed-point numerators at exactly the width of their QFormat.
+
+The numerators of a QFormat of m + n bits are stored at m + n bits per element,
+rather than padded to the next native integer, so that Q2.10 and Q4.8 numerators
+take 12 bits rather than 16 and Q8.16 numerators 24 bits rather than 32. Element i
+occupies bits i * (m + n) to (i + 1) * (m + n) - 1 of the buffer, counting from the
+least significant bit of its first byte, in two's complement if the QFormat is
+signed. The final byte is padded with zero bits.
+
+    >>> packed = PackedFixedPointArray.from_array(FixedPointArray(numerators, QFormat(2, 10)))
+    >>> packed.nbytes == len(packed) * 12 // 8
+    True
+    >>> packed[1000:2000]
+    FixedPointArray([...], QFormat(2, 10))
+
+Packing and unpacking are vectorized and work through the elements in blocks, so
+that temporary arrays stay small however long the array is. Any buffer of bytes
+can hold a PackedFixedPointArray, including a numpy.memmap of a file, which is read
+without copying it, so only the elements which are indexed are ever unpacked.
+
+This module requires NumPy.
+"""
+
+from numbers import Integral
+
+import numpy as np
+
+from fixedpoint.array import FixedPointArray
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.quantization import numerator_dtype
+
+DEFAULT_BLOCK_LENGTH = 1 << 16
+
+
+def _width(qformat):
+    """The number of bits per element, checking that qformat fits in a native integer."""
+    numerator_dtype(qformat)
+    return qformat.integer_bits + qformat.fraction_bits
+
+
+def packed_nbytes(qformat, length):
+    """The number of bytes in which length numerators of a QFormat are packed.
+
+    Args:
+        qformat: The QFormat of the numerators.
+
+        length: The number of numerators.
+
+    Returns:
+        The number of bytes, with the final byte padded if the number of bits is not
+        a multiple of eight.
+
+    Raises:
+        ValueError: If the numerators of qformat do not fit in 64 bits.
+    """
+    return -(-length * _width(qformat) // 8)
+
+
+def _block_length(block_length):
+    """A block length which is a positive multiple of eight, so that every block starts at a byte boundary."""
+    return max(-(-block_length // 8) * 8, 8)
+
+
+def pack(numerators, qformat, block_length=DEFAULT_BLOCK_LENGTH):
+    """Pack numerators into a buffer at exactly the width of their QFormat.
+
+    Args:
+        numerators: An array-like of integer numerators, which is flattened.
+
+        qformat: The QFormat of the numerators.
+
+        block_length: The number of elements packed at a time, rounded up to a
+            multiple of eight.
+
+    Returns:
+        A one-dimensional array of dtype uint8 of packed_nbytes(qformat, len(numerators))
+        bytes.
+
+    Raises:
+        ValueError: If the numerators of qformat do not fit in 64 bits.
+        OverflowError: If any numerator is out of range for qformat.
+    """
+    width = _width(qformat)
+    numerators = np.asarray(numerators).ravel()
+    lower = qformat._min_numerator()
+    upper = qformat._max_numerator()
+    if numerators.size and (numerators.min() < lower or numerators.max() > upper):
+        raise OverflowError("Numerators are out of range {} <= numerator <= {} for {!r}"
+                            .format(lower, upper, qformat))
+    if numerators.dtype == object:
+        numerators = numerators.astype(np.int64 if qformat.signed else np.uint64)
+    packed = np.empty(packed_nbytes(qformat, len(numerators)), dtype=np.uint8)
+    block_length = _block_length(block_length)
+    for start in range(0, len(numerators), block_length):
+        # Conversion to uint64 keeps the two's complement bits of negative numerators
+        words = numerators[start:start + block_length].astype('<u8')
+        bits = np.unpackbits(words.view(np.uint8).reshape(-1, 8), axis=1, count=width, bitorder='little')
+        block = np.packbits(bits, bitorder='little')
+        offset = start * width // 8
+        packed[offset:offset + len(block)] = block
+    return packed
+
+
+def _words(buffer, offsets):
+    """The little-endian 64-bit words starting at byte offsets into a buffer, reading zero bytes past its end."""
+    length = len(buffer)
+    inside = offsets <= length - 8
+    all_inside = bool(inside.all())
+    if length >= 8:
+        # A view of a word starting at every byte, which numpy reads without copying the buffer
+        all_words = np.ndarray((length - 7,), dtype='<u8', buffer=buffer, strides=(1,))
+        if all_inside:
+            return all_words[offsets]
+    words = np.zeros(len(offsets), dtype=np.uint64)
+    if length >= 8:
+        words[inside] = all_words[offsets[inside]]
+    if not all_inside:
+        # Words overlapping the end of the buffer are read from a zero-padded copy of its last bytes
+        tail_start = max(length - 8, 0)
+        tail = np.zeros(16, dtype=np.uint8)
+        tail[:length - tail_start] = buffer[tail_start:]
+        tail_words = np.ndarray((9,), dtype='<u8', buffer=tail, strides=(1,))
+        words[~inside] = tail_words[offsets[~inside] - tail_start]
+    return words
+
+
+def _unpack_elements(buffer, qformat, indices):
+    """The numerators of the elements at an array of indices, which must be in range."""
+    width = _width(qformat)
+    bits = indices.astype(np.int64).ravel() * width
+    offsets = bits >> 3
+    shifts = (bits & 7).astype(np.uint64)
+    values = _words(buffer, offsets) >> shifts
+    if width > 64 - 7:
+        # The element may extend into the byte after its word
+        following = offsets + 8
+        next_bytes = np.where(following < len(buffer), buffer[np.minimum(following, len(buffer) - 1)], 0)
+        values |= np.where(shifts > 0, next_bytes.astype(np.uint64) << (np.uint64(64) - shifts), np.uint64(0))
+    # Shifting the element to the top of the word and back clears the bits above it, and extends its sign if signed
+    unused_bits = 64 - width
+    values = values << unused_bits
+    if qformat.signed:
+        values = values.view(np.int64)
+    return (values >> unused_bits).astype(numerator_dtype(qformat)).reshape(indices.shape)
+
+
+def unpack(buffer, qformat, length, start=0, block_length=DEFAULT_BLOCK_LENGTH):
+    """Unpack numerators packed at exactly the width of their QFormat.
+
+    Args:
+        buffer: A one-dimensional array of dtype uint8, or any object supporting the
+            buffer protocol, holding packed numerators.
+
+        qformat: The QFormat of the numerators.
+
+        length: The number of numerators to unpack.
+
+        start: The index of the first element to unpack.
+
+        block_length: The number of elements unpacked at a time.
+
+    Returns:
+        An array of length numerators in numerator_dtype(qformat).
+
+    Raises:
+        ValueError: If the numerators of qformat do not fit in 64 bits, or buffer is
+            too short to hold the elements.
+    """
+    if not isinstance(buffer, np.ndarray):
+        buffer = np.frombuffer(buffer, dtype=np.uint8)
+    buffer = np.ascontiguousarray(buffer)
+    if len(buffer) < packed_nbytes(qformat, start + length):
+        raise ValueError("A buffer of {} bytes cannot hold {} elements of {!r}"
+                         .format(len(buffer), start + length, qformat))
+    numerators = np.empty(length, dtype=numerator_dtype(qformat))
+    block_length = _block_length(block_length)
+    for offset in range(0, length, block_length):
+        count = min(block_length, length - offset)
+        indices = np.arange(start + offset, start + offset + count)
+        numerators[offset:offset + count] = _unpack_elements(buffer, qformat, indices)
+    return numerators
+
+
+class PackedFixedPointArray:
+    """An immutable, one-dimensional array of fixed-point numbers packed at exactly the width of their QFormat.
+
+    Indexing with an integer gives a FixedPoint, and indexing with a slice or an
+    array of indices gives a FixedPointArray, unpacking only the elements indexed.
+    """
+
+    def __init__(self, buffer, qformat, length):
+        """Initialize a PackedFixedPointArray over a buffer of packed numerators, without copying it.
+
+        Args:
+            buffer: A one-dimensional array of dtype uint8, such as a numpy.memmap,
+                or any object supporting the buffer protocol, such as bytes, holding
+                numerators packed as by pack().
+
+            qformat: The QFormat of every element.
+
+            length: The number of elements.
+
+        Raises:
+            ValueError: If the numerators of qformat do not fit in 64 bits, or buffer is
+                too short to hold length elements.
+        """
+        if not isinstance(buffer, np.ndarray):
+            buffer = np.frombuffer(buffer, dtype=np.uint8)
+        if buffer.dtype != np.uint8 or buffer.ndim != 1 or not buffer.flags.c_contiguous:
+            raise ValueError("Packed numerators must be a contiguous one-dimensional array of uint8, not {} of shape {}"
+                             .format(buffer.dtype, buffer.shape))
+        nbytes = packed_nbytes(qformat, length)
+        if len(buffer) < nbytes:
+            raise ValueError("A buffer of {} bytes cannot hold {} elements of {!r}"
+                             .format(len(buffer), length, qformat))
+        buffer = buffer[:nbytes].view()
+        buffer.flags.writeable = False
+        self._buffer = buffer
+        self._qformat = qformat
+        self._length = length
+
+    @classmethod
+    def from_array(cls, values, block_length=DEFAULT_BLOCK_LENGTH):
+        """Pack a FixedPointArray.
+
+        Args:
+            values: A FixedPointArray, which is flattened.
+
+            block_length: The number of elements packed at a time.
+
+        Raises:
+            ValueError: If the QFormat of values is wider than 64 bits.
+        """
+        return cls(pack(values.numerators, values.qformat, block_length), values.qformat, values.numerators.size)
+
+    @classmethod
+    def fromfile(cls, file, qformat, length, offset=0):
+        """Open packed numerators in a file as a PackedFixedPointArray, by memory-mapping it.
+
+        Args:
+            file: The path of the file, or a file object open for reading.
+
+            qformat: The QFormat of every element.
+
+            length: The number of elements.
+
+            offset: The position in the file of the first byte of packed numerators.
+
+        Raises:
+            ValueError: If the file is too short to hold length elements.
+        """
+        buffer = np.memmap(file, dtype=np.uint8, mode='r', offset=offset, shape=(packed_nbytes(qformat, length),))
+        return cls(buffer, qformat, length)
+
+    def tofile(self, file):
+        """Write the packed numerators to a file.
+
+        Args:
+            file: The path of the file, or a file object open for writing.
+        """
+        self._buffer.tofile(file)
+
+    @property
+    def buffer(self):
+        """The read-only array of packed bytes."""
+        return self._buffer
+
+    @property
+    def qformat(self):
+        """The QFormat of every element."""
+        return self._qformat
+
+    @property
+    def nbytes(self):
+        """The number of bytes of packed numerators."""
+        return self._buffer.nbytes
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, Integral):
+            return FixedPoint.from_raw(self._numerator(index), self._qformat)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step == 1:
+                numerators = unpack(self._buffer, self._qformat, max(stop - start, 0), start)
+                return FixedPointArray._from_numerators(numerators, self._qformat)
+            index = np.arange(start, stop, step)
+        indices = np.asarray(index)
+        if indices.dtype == bool:
+            if indices.shape != (self._length,):
+                raise IndexError("Boolean index of shape {} does not match length {}"
+                                 .format(indices.shape, self._length))
+            indices = np.flatnonzero(indices)
+        if indices.dtype.kind not in 'iu':
+            raise IndexError("Only integers, slices and integer or boolean arrays are valid indices")
+        if indices.size and (indices.min() < -self._length or indices.max() >= self._length):
+            raise IndexError("Index out of range for length {}".format(self._length))
+        indices = np.where(indices < 0, indices + self._length, indices)
+        return FixedPointArray._from_numerators(_unpack_elements(self._buffer, self._qformat, indices), self._qformat)
+
+    def _numerator(self, index):
+        if not -self._length <= index < self._length:
+            raise IndexError("Index {} out of range for length {}".format(index, self._length))
+        index = index % self._length
+        width = _width(self._qformat)
+        first_bit = index * width
+        first_byte = first_bit // 8
+        word = int.from_bytes(self._buffer[first_byte:-(-(first_bit + width) // 8)].tobytes(), 'little')
+        numerator = (word >> (first_bit % 8)) & ((1 << width) - 1)
+        if self._qformat.signed and numerator >> (width - 1):
+            numerator -= 1 << width
+        return numerator
+
+    def __iter__(self):
+        for block in self.blocks():
+            yield from block
+
+    def blocks(self, block_length=DEFAULT_BLOCK_LENGTH):
+        """Unpack the elements in order, a block at a time.
+
+        Args:
+            block_length: The number of elements in each block but the last.
+
+        Yields:
+            A FixedPointArray of each block of consecutive elements.
+        """
+        block_length = _block_length(block_length)
+        for start in range(0, self._length, block_length):
+            yield self[start:start + block_length]
+
+    def to_array(self, block_length=DEFAULT_BLOCK_LENGTH):
+        """Unpack every element into a FixedPointArray.
+
+        Args:
+            block_length: The number of elements unpacked at a time.
+        """
+        return FixedPointArray._from_numerators(unpack(self._buffer, self._qformat, self._length,
+                                                       block_length=block_length), self._qformat)
+
+    def __eq__(self, other):
+        if not isinstance(other, PackedFixedPointArray):
+            return NotImplemented
+        if self._qformat != other._qformat or self._length != other._length:
+            return False
+        if not self.nbytes:
+            return True
+        # The padding bits of the final byte, which a buffer from elsewhere may not have cleared, are ignored
+        used_bits = (self._length * _width(self._qformat)) % 8 or 8
+        mask = (1 << used_bits) - 1
+        return (bool(np.array_equal(self._buffer[:-1], other._buffer[:-1])) and
+                int(self._buffer[-1]) & mask == int(other._buffer[-1]) & mask)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}(<{} bytes>, {!r}, {!r})".format(self.__class__.__name__, self.nbytes, self._qformat,
+                                                    self._length)
@@ -0,0 +1,604 @@
+"""A pandas extension dtype and array for columns of fixed-point numbers.
+
+A FixedPointExtensionArray holds the raw integer numerators of a column in one
+contiguous NumPy array, in the narrowest native integer dtype for its QFormat, or as
+Python integers in an array of dtype object if the QFormat is wider than 64 bits,
+together with a boolean mask of missing values. Arithmetic, comparisons, reductions
+and group-by aggregations operate on whole arrays of numerators, and the results
+have the same QFormats as the corresponding FixedPoint operations:
+
+    >>> s = pd.Series([1.5, -0.25, None], dtype='fixedpoint[Q4.4]')
+    >>> (s * s).dtype
+    fixedpoint[Q9.8]
+    >>> s.sum()
+    FixedPoint(1.25, QFormat(5, 4))
+
+Importing this module registers FixedPointDtype with pandas, so that the dtype can
+be given by name. This module requires NumPy and pandas.
+"""
+
+import operator
+import re
+from functools import reduce
+from fractions import Fraction
+from numbers import Integral
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray, ExtensionDtype, register_extension_dtype, take
+from pandas.api.indexers import check_array_indexer
+from pandas.api.types import is_integer, is_list_like, pandas_dtype
+from pandas.core import roperator
+from pandas.core.arraylike import OpsMixin
+
+from fixedpoint.array import _working
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.parallel import minimal_sum_qformat, _sum_chunk, _sum_block_length
+from fixedpoint.qformat import QFormat, sum_qformat, product_qformat, quotient_qformat, negated_qformat
+from fixedpoint.quantization import (quantize, shift_round, constrain, numerator_dtype, ROUND_HALF_EVEN,
+                                     OVERFLOW_ERROR, MAX_ARRAY_BITS)
+
+
+@register_extension_dtype
+class FixedPointDtype(ExtensionDtype):
+    """The pandas dtype of columns of fixed-point numbers with a common QFormat.
+
+    The name of the dtype is 'fixedpoint[Qm.n]', by which it can also be given to
+    pandas, for example as pd.Series(values, dtype='fixedpoint[Q1.15]').
+    """
+
+    type = FixedPoint
+    na_value = pd.NA
+    _metadata = ('qformat',)
+    _is_numeric = True
+
+    _NAME_PATTERN = re.compile(r'^fixedpoint\[(U?Q\d+\.\d+)\]$')
+
+    def __init__(self, qformat):
+        """Initialize a FixedPointDtype.
+
+        Args:
+            qformat: The QFormat of every element.
+        """
+        self._qformat = qformat
+
+    @property
+    def qformat(self):
+        """The QFormat of every element."""
+        return self._qformat
+
+    @property
+    def name(self):
+        return 'fixedpoint[{}]'.format(self._qformat)
+
+    def __repr__(self):
+        return self.name
+
+    @classmethod
+    def construct_array_type(cls):
+        return FixedPointExtensionArray
+
+    @classmethod
+    def construct_from_string(cls, string):
+        """Create a FixedPointDtype from its name, such as 'fixedpoint[Q1.15]' or 'fixedpoint[UQ0.16]'.
+
+        Raises:
+            TypeError: If string is not the name of a FixedPointDtype.
+        """
+        if not isinstance(string, str):
+            raise TypeError("'construct_from_string' expects a string, got {}".format(type(string)))
+        match = cls._NAME_PATTERN.match(string)
+        if match is None:
+            raise TypeError("Cannot construct a '{}' from '{}'".format(cls.__name__, string))
+        return cls(QFormat.from_str(match.group(1)))
+
+    def __from_arrow__(self, array):
+        """Convert an Arrow array or chunked array of arrow.FixedPointType to a FixedPointExtensionArray."""
+        from fixedpoint.arrow import _from_arrow
+        numerators, mask, qformat = _from_arrow(array)
+        if qformat != self._qformat:
+            raise TypeError("Arrow array of {!r} cannot be converted to {}".format(qformat, self))
+        # pandas arrays are mutable, so the numerators are copied from the Arrow buffer
+        mask = np.zeros(len(numerators), dtype=bool) if mask is None else mask
+        return FixedPointExtensionArray._simple_new(np.array(numerators), mask, qformat)
+
+    def _get_common_dtype(self, dtypes):
+        # Columns with different QFormats are promoted as for FixedPoint arithmetic
+        if all(isinstance(dtype, FixedPointDtype) for dtype in dtypes):
+            return FixedPointDtype(QFormat.from_qformats(*(dtype.qformat for dtype in dtypes)))
+        return None
+
+
+def _num_bits(qformat):
+    # The bits of a signed working integer which holds every numerator, so one more than the width if unsigned
+    return qformat.integer_bits + qformat.fraction_bits + (0 if qformat.signed else 1)
+
+
+def _storage_dtype(qformat):
+    """The dtype in which the numerators of a QFormat are stored."""
+    return numerator_dtype(qformat) if qformat.integer_bits + qformat.fraction_bits <= MAX_ARRAY_BITS else object
+
+
+def _is_missing(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+class _Operand:
+    """The numerators, missing mask and QFormat of an array operand, or of a scalar as zero-dimensional arrays."""
+
+    def __init__(self, numerators, mask, qformat):
+        self.numerators = numerators
+        self.mask = mask
+        self.qformat = qformat
+
+    @classmethod
+    def scalar(cls, value):
+        qformat = value.qformat
+        return cls(np.asarray(value._numerator, dtype=_storage_dtype(qformat)), np.asarray(False), qformat)
+
+    def aligned(self, num_bits, fraction_bits):
+        """The numerators scaled to fraction_bits, in a dtype which holds num_bits exactly."""
+        return _working(self.numerators, num_bits) << (fraction_bits - self.qformat.fraction_bits)
+
+    def __neg__(self):
+        qformat = negated_qformat(self.qformat)
+        return _Operand(-_working(self.numerators, _num_bits(qformat)), self.mask, qformat)
+
+
+def _add(a, b):
+    qformat = sum_qformat(a.qformat, b.qformat)
+    num_bits = _num_bits(qformat)
+    numerators = a.aligned(num_bits, qformat.fraction_bits) + b.aligned(num_bits, qformat.fraction_bits)
+    return FixedPointExtensionArray._simple_new(numerators, a.mask | b.mask, qformat)
+
+
+def _mul(a, b):
+    qformat = product_qformat(a.qformat, b.qformat)
+    num_bits = _num_bits(qformat)
+    numerators = _working(a.numerators, num_bits) * _working(b.numerators, num_bits)
+    return FixedPointExtensionArray._simple_new(numerators, a.mask | b.mask, qformat)
+
+
+def _quotient_half_even(dividends, divisors):
+    """Integer quotients rounded to the nearest, with ties to even."""
+    negative = divisors < 0
+    dividends = np.where(negative, -dividends, dividends)
+    divisors = np.where(negative, -divisors, divisors)
+    quotients = dividends // divisors
+    twice_remainders = 2 * (dividends - quotients * divisors)
+    round_up = (twice_remainders > divisors) | ((twice_remainders == divisors) & (quotients % 2 == 1))
+    return quotients + round_up.astype(quotients.dtype)
+
+
+def _truediv(dividend, divisor):
+    # As for FixedPoint, the quotient is rounded to a working QFormat, then to the result QFormat
+    result_qformat = quotient_qformat(dividend.qformat, divisor.qformat)
+    working_qformat = QFormat.from_qformats(dividend.qformat, divisor.qformat, result_qformat)
+    fraction_bits = working_qformat.fraction_bits
+    num_bits = max(_num_bits(dividend.qformat) + 2 * fraction_bits - dividend.qformat.fraction_bits,
+                   _num_bits(divisor.qformat) + fraction_bits - divisor.qformat.fraction_bits) + 1
+    dividends = dividend.aligned(num_bits, 2 * fraction_bits)
+    divisors = divisor.aligned(num_bits, fraction_bits)
+    if np.any((divisors == 0) & ~divisor.mask):
+        raise ZeroDivisionError("{} division by zero".format(FixedPointExtensionArray.__name__))
+    divisors = np.where(divisor.mask, 1, divisors).astype(divisors.dtype)
+    working = _quotient_half_even(dividends, divisors)
+    numerators = shift_round(working, result_qformat.fraction_bits - fraction_bits, ROUND_HALF_EVEN)
+    return FixedPointExtensionArray._simple_new(numerators, dividend.mask | divisor.mask, result_qformat)
+
+
+def _sub(a, b):
+    return _add(a, -b)
+
+
+# The exact operators, as functions of two _Operands, and whether the operands are exchanged
+_ARITHMETIC_OPERATORS = {
+    operator.add: (_add, False),
+    roperator.radd: (_add, True),
+    operator.sub: (_sub, False),
+    roperator.rsub: (_sub, True),
+    operator.mul: (_mul, False),
+    roperator.rmul: (_mul, True),
+    operator.truediv: (_truediv, False),
+    roperator.rtruediv: (_truediv, True),
+}
+
+
+class FixedPointExtensionArray(OpsMixin, ExtensionArray):
+    """A pandas extension array of fixed-point numbers with a common QFormat, which may be missing.
+
+    Additions, subtractions, multiplications and divisions by FixedPoints, integers or
+    other FixedPointExtensionArrays are exact, or rounded as for FixedPoint, and are
+    computed on whole arrays of numerators. Operations with floats give floats. Other
+    operations are applied element by element to FixedPoint instances.
+    """
+
+    __array_priority__ = 1000
+
+    @classmethod
+    def _simple_new(cls, numerators, mask, qformat):
+        """Create an array from numerators which are known to be in range, without checking them."""
+        obj = super().__new__(cls)
+        mask = np.asarray(mask, dtype=bool)
+        numerators = np.asarray(numerators)
+        if mask.any():
+            numerators = np.where(mask, 0, numerators)
+        obj._numerators = numerators.astype(_storage_dtype(qformat), copy=False)
+        obj._mask = mask
+        obj._dtype = FixedPointDtype(qformat)
+        return obj
+
+    def __init__(self, numerators, qformat, mask=None):
+        """Initialize a FixedPointExtensionArray from raw integer numerators.
+
+        Args:
+            numerators: A one-dimensional array-like of integer numerators which, when
+                divided by qformat.denominator, give the values of the elements.
+
+            qformat: The QFormat of the elements.
+
+            mask: An optional array-like of booleans, of the same length as numerators,
+                which are true for missing elements.
+
+        Raises:
+            TypeError: If numerators are not integers.
+            ValueError: If numerators are not one-dimensional, or mask has a different shape.
+            OverflowError: If any numerator exceeds the precision of qformat.
+        """
+        numerators = np.asarray(numerators)
+        if numerators.dtype != object and numerators.dtype.kind not in 'iu':
+            raise TypeError("{} numerators must be integers, not {}"
+                            .format(self.__class__.__name__, numerators.dtype))
+        if numerators.ndim != 1:
+            raise ValueError("{} numerators must be one-dimensional".format(self.__class__.__name__))
+        mask = np.zeros(numerators.shape, dtype=bool) if mask is None else np.array(mask, dtype=bool)
+        if mask.shape != numerators.shape:
+            raise ValueError("The mask has shape {} but the numerators have shape {}"
+                             .format(mask.shape, numerators.shape))
+        if mask.any():
+            numerators = np.where(mask, 0, numerators)
+        self._numerators, _ = constrain(numerators, qformat, OVERFLOW_ERROR)
+        self._mask = mask
+        self._dtype = FixedPointDtype(qformat)
+
+    @classmethod
+    def from_values(cls, values, qformat, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_ERROR):
+        """Quantize a sequence of real numbers, which may be missing, into a FixedPointExtensionArray.
+
+        Args:
+            values: A one-dimensional array-like of real numbers or FixedPoint instances.
+                None, pd.NA and NaN are missing.
+
+            qformat: The QFormat of the result.
+
+            rounding: One of the quantization.ROUNDING_MODES, used for arrays of floats.
+                Other values are rounded as by FixedPoint.
+
+            overflow: One of the quantization.OVERFLOW_MODES, used for arrays of floats.
+                Other values which are out of range raise OverflowError.
+
+        Returns:
+            A FixedPointExtensionArray.
+
+        Raises:
+            OverflowError: If a value is out of range for qformat.
+        """
+        if isinstance(values, FixedPointExtensionArray):
+            return values.astype(FixedPointDtype(qformat))
+        if isinstance(values, (pd.Series, pd.Index)):
+            values = values.array
+        array = np.asarray(values) if isinstance(values, np.ndarray) else None
+        if array is not None and array.dtype.kind == 'f' and _num_bits(qformat) <= MAX_ARRAY_BITS:
+            mask = np.isnan(array)
+            numerators = quantize(np.where(mask, 0.0, array), qformat, rounding, overflow).numerators
+            return cls._simple_new(numerators, mask, qformat)
+        if array is not None and array.dtype.kind in 'iu':
+            shift = qformat.fraction_bits
+            numerators, _ = constrain(_working(array, _num_bits(qformat) + shift) << shift, qformat, overflow)
+            return cls._simple_new(numerators, np.zeros(len(array), dtype=bool), qformat)
+        values = list(values)
+        mask = np.array([_is_missing(value) for value in values], dtype=bool)
+        numerators = np.array([0 if missing else FixedPoint(value, qformat)._numerator
+                               for value, missing in zip(values, mask)], dtype=object)
+        return cls._simple_new(numerators, mask, qformat)
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        if dtype is not None:
+            dtype = pandas_dtype(dtype)
+            if not isinstance(dtype, FixedPointDtype):
+                raise TypeError("Cannot create a {} with dtype {}".format(cls.__name__, dtype))
+        if isinstance(scalars, FixedPointExtensionArray):
+            if dtype is None or dtype == scalars.dtype:
+                return scalars.copy() if copy else scalars
+            return scalars.astype(dtype)
+        if dtype is None:
+            return cls.from_values(scalars, _infer_qformat(scalars))
+        return cls.from_values(scalars, dtype.qformat)
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        mask = np.array([value is None for value in values], dtype=bool)
+        return cls._simple_new(np.where(mask, 0, values), mask, original.qformat)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def qformat(self):
+        """The QFormat of every element."""
+        return self._dtype.qformat
+
+    @property
+    def numerators(self):
+        """The array of raw integer numerators, which are zero where elements are missing."""
+        return self._numerators
+
+    @property
+    def nbytes(self):
+        return self._numerators.nbytes + self._mask.nbytes
+
+    def __len__(self):
+        return len(self._numerators)
+
+    def __getitem__(self, item):
+        if is_integer(item):
+            if self._mask[item]:
+                return pd.NA
+            return FixedPoint._from_numerator(int(self._numerators[item]), self.qformat)
+        item = check_array_indexer(self, item)
+        return self._simple_new(self._numerators[item], self._mask[item], self.qformat)
+
+    def __setitem__(self, key, value):
+        if is_list_like(key):
+            key = check_array_indexer(self, key)
+        if is_list_like(value):
+            value = self._from_sequence(value, dtype=self._dtype)
+            numerators, mask = value._numerators, value._mask
+        elif _is_missing(value):
+            numerators, mask = 0, True
+        else:
+            numerators, mask = FixedPoint(value, self.qformat)._numerator, False
+        self._numerators[key] = numerators
+        self._mask[key] = mask
+
+    def __iter__(self):
+        qformat = self.qformat
+        for numerator, missing in zip(self._numerators.tolist(), self._mask.tolist()):
+            yield pd.NA if missing else FixedPoint._from_numerator(numerator, qformat)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None and np.dtype(dtype).kind == 'f':
+            return self.to_float().astype(dtype, copy=False)
+        result = np.empty(len(self), dtype=object)
+        result[:] = list(self)
+        return result if dtype is None else result.astype(dtype)
+
+    def to_float(self):
+        """The values as an array of float64, which may lose precision, with NaN for missing values."""
+        values = np.ldexp(self._numerators.astype(np.float64), -self.qformat.fraction_bits)
+        values[self._mask] = np.nan
+        return values
+
+    def isna(self):
+        return self._mask.copy()
+
+    def copy(self):
+        return self._simple_new(self._numerators.copy(), self._mask.copy(), self.qformat)
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        indices = np.asarray(indices, dtype=np.intp)
+        numerators = take(self._numerators, indices, allow_fill=allow_fill, fill_value=0)
+        mask = take(self._mask, indices, allow_fill=allow_fill, fill_value=True)
+        if allow_fill and not _is_missing(fill_value):
+            fill = indices == -1
+            numerators[fill] = FixedPoint(fill_value, self.qformat)._numerator
+            mask[fill] = False
+        return self._simple_new(numerators, mask, self.qformat)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        to_concat = list(to_concat)
+        qformat = QFormat.from_qformats(*(array.qformat for array in to_concat))
+        to_concat = [array.astype(FixedPointDtype(qformat), copy=False) for array in to_concat]
+        return cls._simple_new(np.concatenate([array._numerators for array in to_concat]),
+                               np.concatenate([array._mask for array in to_concat]), qformat)
+
+    def astype(self, dtype, copy=True):
+        dtype = pandas_dtype(dtype)
+        if isinstance(dtype, FixedPointDtype):
+            if dtype == self._dtype:
+                return self.copy() if copy else self
+            return self._rescale(dtype.qformat)
+        if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+            return self.to_float().astype(dtype, copy=False)
+        return super().astype(dtype, copy=copy)
+
+    def _rescale(self, qformat):
+        """The values converted to another QFormat, rounding as for FixedPoint."""
+        shift = qformat.fraction_bits - self.qformat.fraction_bits
+        numerators = _working(self._numerators, _num_bits(self.qformat) + max(shift, 0))
+        numerators, _ = constrain(shift_round(numerators, shift, ROUND_HALF_EVEN), qformat, OVERFLOW_ERROR)
+        return self._simple_new(numerators, self._mask.copy(), qformat)
+
+    def __arrow_array__(self, type=None):
+        """Convert to an Arrow array of arrow.FixedPointType, sharing the buffer of numerators."""
+        from fixedpoint.arrow import _to_arrow
+        return _to_arrow(self._numerators, self._mask, self.qformat)
+
+    def _values_for_argsort(self):
+        return self._numerators
+
+    def _values_for_factorize(self):
+        values = self._numerators.astype(object)
+        values[self._mask] = None
+        return values, None
+
+    def factorize(self, use_na_sentinel=True):
+        valid = ~self._mask
+        codes = np.full(len(self), -1, dtype=np.intp)
+        valid_codes, uniques = pd.factorize(self._numerators[valid])
+        codes[valid] = valid_codes
+        mask = np.zeros(len(uniques), dtype=bool)
+        if not use_na_sentinel and not valid.all():
+            codes[~valid] = len(uniques)
+            uniques = np.append(uniques, 0)
+            mask = np.append(mask, True)
+        return codes, self._simple_new(uniques, mask, self.qformat)
+
+    def unique(self):
+        return self.factorize(use_na_sentinel=False)[1]
+
+    def value_counts(self, dropna=True):
+        """The number of occurrences of each distinct value, counted on the numerators.
+
+        Args:
+            dropna: If False, also count the missing values.
+
+        Returns:
+            A Series of counts indexed by the distinct values, in order of first appearance.
+        """
+        codes, uniques = self.factorize(use_na_sentinel=dropna)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques)).astype(np.int64)
+        return pd.Series(counts, index=pd.Index(uniques), name='count')
+
+    def _formatter(self, boxed=False):
+        return str
+
+    def _operand(self, other):
+        """Convert an operand to an _Operand, or return None for types which are not exact."""
+        if isinstance(other, FixedPointExtensionArray):
+            if len(other) != len(self):
+                raise ValueError("Lengths must match: {} != {}".format(len(self), len(other)))
+            return _Operand(other._numerators, other._mask, other.qformat)
+        if isinstance(other, FixedPoint):
+            return _Operand.scalar(other)
+        if isinstance(other, Integral):
+            return _Operand.scalar(FixedPoint._from_integer(int(other)))
+        if other is pd.NA:
+            return _Operand(np.asarray(0, dtype=np.int8), np.asarray(True), QFormat(1, 0))
+        if isinstance(other, (list, tuple, np.ndarray)):
+            array = np.asarray(other)
+            if array.dtype.kind in 'iu' or (array.dtype == object and len(array) and
+                                            all(isinstance(v, (FixedPoint, Integral)) for v in array)):
+                return self._operand(self._from_sequence(array))
+        return None
+
+    def _arith_method(self, other, op):
+        operand = self._operand(other)
+        if operand is not None and op in _ARITHMETIC_OPERATORS:
+            func, reflected = _ARITHMETIC_OPERATORS[op]
+            this = _Operand(self._numerators, self._mask, self.qformat)
+            # As for FixedPoint, an integer subtrahend is negated before conversion
+            if op is operator.sub and isinstance(other, Integral):
+                return _add(this, _Operand.scalar(FixedPoint._from_integer(-int(other))))
+            return func(operand, this) if reflected else func(this, operand)
+        if isinstance(other, FixedPointExtensionArray):
+            other = np.asarray(other)
+        if isinstance(other, float) or (isinstance(other, np.ndarray) and other.dtype.kind == 'f'):
+            return op(self.to_float(), other)
+        return op(np.asarray(self), other)
+
+    def _cmp_method(self, other, op):
+        if isinstance(other, float) and np.isfinite(other) or isinstance(other, Fraction):
+            try:
+                other = FixedPoint(other)
+            except ValueError:
+                pass
+        operand = self._operand(other)
+        if operand is None:
+            if isinstance(other, FixedPointExtensionArray):
+                other = np.asarray(other)
+            values = np.asarray(op(self.to_float(), other), dtype=bool)
+            return pd.arrays.BooleanArray(values, self._mask.copy())
+        fraction_bits = max(self.qformat.fraction_bits, operand.qformat.fraction_bits)
+        num_bits = max(_num_bits(self.qformat) - self.qformat.fraction_bits,
+                       _num_bits(operand.qformat) - operand.qformat.fraction_bits) + fraction_bits
+        this = _Operand(self._numerators, self._mask, self.qformat)
+        values = op(this.aligned(num_bits, fraction_bits), operand.aligned(num_bits, fraction_bits))
+        mask = np.broadcast_to(self._mask | operand.mask, values.shape)
+        return pd.arrays.BooleanArray(np.asarray(values, dtype=bool), mask.copy())
+
+    def __neg__(self):
+        negated = -_Operand(self._numerators, self._mask, self.qformat)
+        return self._simple_new(negated.numerators, self._mask.copy(), negated.qformat)
+
+    def __pos__(self):
+        return self.copy()
+
+    def __abs__(self):
+        # As for FixedPoint, the QFormat is unchanged, so the most negative value overflows
+        numerators, _ = constrain(np.abs(_working(self._numerators, _num_bits(self.qformat) + 1)), self.qformat,
+                                  OVERFLOW_ERROR)
+        return self._simple_new(numerators, self._mask.copy(), self.qformat)
+
+    def _reduce(self, name, *, skipna=True, keepdims=False, **kwargs):
+        if name not in ('sum', 'prod', 'min', 'max', 'mean'):
+            raise TypeError("'{}' with dtype {} does not support operation '{}'"
+                            .format(self.__class__.__name__, self._dtype, name))
+        if not skipna and self._mask.any():
+            result = pd.NA
+        else:
+            numerators = self._numerators[~self._mask]
+            if name in ('sum', 'prod'):
+                if len(numerators) < kwargs.get('min_count', 0):
+                    result = pd.NA
+                elif name == 'sum':
+                    result = self._sum(numerators)
+                else:
+                    result = reduce(operator.mul, self[~self._mask], FixedPoint._from_integer(1))
+            elif not len(numerators):
+                result = pd.NA
+            elif name == 'mean':
+                result = self._sum(numerators) / len(numerators)
+            else:
+                result = FixedPoint._from_numerator(int(getattr(numerators, name)()), self.qformat)
+        if keepdims:
+            dtype = self._dtype if result is pd.NA else FixedPointDtype(result.qformat)
+            return self._from_sequence([result], dtype=dtype)
+        return result
+
+    def _sum(self, numerators):
+        """The exact sum of numerators, in the QFormat given by parallel.minimal_sum_qformat()."""
+        qformat = minimal_sum_qformat(self.qformat, len(numerators))
+        return FixedPoint._from_numerator(_sum_chunk(numerators, _sum_block_length(self.qformat)), qformat)
+
+    def _groupby_op(self, *, how, has_dropped_na, min_count, ngroups, ids, **kwargs):
+        if how not in ('sum', 'min', 'max', 'mean'):
+            # pandas falls back to aggregating each group of FixedPoint instances
+            raise NotImplementedError("{} does not support the group-by operation '{}'"
+                                      .format(self.__class__.__name__, how))
+        ids = np.asarray(ids)
+        grouped = ids >= 0
+        valid = grouped & ~self._mask
+        group_ids = ids[valid]
+        counts = np.bincount(group_ids, minlength=ngroups)
+        if how in ('sum', 'mean'):
+            qformat = minimal_sum_qformat(self.qformat, int(counts.max()) if ngroups else 0)
+            results = np.zeros(ngroups, dtype=np.int64 if _num_bits(qformat) <= MAX_ARRAY_BITS else object)
+            np.add.at(results, group_ids, _working(self._numerators[valid], _num_bits(qformat)))
+            mask = counts < (min_count if how == 'sum' else 1)
+        else:
+            qformat = self.qformat
+            func = np.minimum if how == 'min' else np.maximum
+            initial = qformat._max_numerator() if how == 'min' else qformat._min_numerator()
+            results = np.full(ngroups, initial, dtype=self._numerators.dtype)
+            func.at(results, group_ids, self._numerators[valid])
+            mask = counts < max(min_count, 1)
+        if not kwargs.get('skipna', True):
+            mask |= np.bincount(ids[grouped & self._mask], minlength=ngroups) > 0
+        result = self._simple_new(results, mask, qformat)
+        if how == 'mean':
+            counts_qformat = FixedPoint._from_integer(max(int(counts.max()) if ngroups else 0, 1)).qformat
+            counts = _Operand(np.maximum(counts, 1).astype(_storage_dtype(counts_qformat)), mask, counts_qformat)
+            result = _truediv(_Operand(result._numerators, mask, qformat), counts)
+        return result
+
+
+def _infer_qformat(values):
+    """The narrowest QFormat which represents every value which is not missing exactly."""
+    qformats = [FixedPoint(value).qformat for value in values if not _is_missing(value)]
+    if not qformats:
+        raise ValueError("Cannot infer a QFormat without any values")
+    return QFormat.from_qformats(*qformats)
@@ -0,0 +1,136 @@
+"""Deterministic parallel reductions of FixedPointArrays.
+
+Fixed-point addition without rounding is exact and associative, so a sum can be
+split across workers and still give the same result as a sequential sum. The
+numerators are divided into chunks of a fixed size, which does not depend on the
+number of workers. Each chunk is summed exactly, in native 64-bit integers in blocks
+proven from the QFormat not to overflow them, or else in Python integers. The chunk
+sums are then combined pairwise in a fixed tree order. The result is therefore
+bit-identical however many workers run.
+
+NumPy releases the GIL while summing native integers, so the default thread pool
+uses several cores. An executor, such as a ProcessPoolExecutor, can also be given.
+
+This module requires NumPy.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.linalg import minimal_accumulator_qformat, _inner_block_length, NATIVE_ACCUMULATOR_BITS
+from fixedpoint.qformat import minimal_sum_qformat
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def _sum_block_length(qformat):
+    """The largest number of numerators whose sum is proven to fit in a native accumulator."""
+    return (2**NATIVE_ACCUMULATOR_BITS - 1) // qformat._max_magnitude()
+
+
+def _sum_chunk(numerators, block_length):
+    """The exact sum of a one-dimensional array of numerators."""
+    if block_length < 1 or numerators.dtype == object:
+        return int(numerators.astype(object).sum())
+    return sum(int(numerators[start:start + block_length].sum(dtype=np.int64))
+               for start in range(0, len(numerators), block_length))
+
+
+def _dot_chunk(a, b, block_length):
+    """The exact inner product of two one-dimensional arrays of numerators."""
+    if block_length < 1 or a.dtype == object or b.dtype == object:
+        return int(np.dot(a.astype(object), b.astype(object)))
+    return sum(int(np.dot(a[start:start + block_length].astype(np.int64),
+                          b[start:start + block_length].astype(np.int64)))
+               for start in range(0, len(a), block_length))
+
+
+def _tree_combine(partials):
+    """Add partial sums pairwise, in an order which depends only on their number."""
+    partials = list(partials)
+    if not partials:
+        return 0
+    while len(partials) > 1:
+        combined = [partials[i] + partials[i + 1] for i in range(0, len(partials) - 1, 2)]
+        if len(partials) % 2:
+            combined.append(partials[-1])
+        partials = combined
+    return partials[0]
+
+
+def _map_chunks(func, arrays, block_length, chunk_size, workers, executor):
+    """Apply func to corresponding chunks of arrays, returning the results in chunk order."""
+    if chunk_size < 1:
+        raise ValueError("Chunk size {} is not positive".format(chunk_size))
+    length = len(arrays[0])
+    chunks = [[array[start:start + chunk_size] for array in arrays] for start in range(0, length, chunk_size)]
+    if executor is not None:
+        futures = [executor.submit(func, *chunk, block_length) for chunk in chunks]
+        return [future.result() for future in futures]
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers <= 1:
+        return [func(*chunk, block_length) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda chunk: func(*chunk, block_length), chunks))
+
+
+def reduce_sum(values, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+    """The exact sum of the elements of a FixedPointArray, computed in parallel.
+
+    Args:
+        values: A FixedPointArray of any shape.
+
+        workers: The number of threads. Defaults to the number of CPUs.
+
+        chunk_size: The number of elements summed by each task. The result does not
+            depend on it.
+
+        executor: An optional concurrent.futures.Executor on which to run the tasks,
+            in which case workers is ignored.
+
+    Returns:
+        A FixedPoint in the QFormat given by minimal_sum_qformat().
+
+    Raises:
+        ValueError: If chunk_size is not positive.
+    """
+    numerators = values.numerators.reshape(-1)
+    partials = _map_chunks(_sum_chunk, [numerators], _sum_block_length(values.qformat), chunk_size, workers,
+                           executor)
+    qformat = minimal_sum_qformat(values.qformat, len(numerators))
+    return FixedPoint._from_numerator(_tree_combine(partials), qformat)
+
+
+def reduce_dot(a, b, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+    """The exact inner product of two FixedPointArrays, computed in parallel.
+
+    Args:
+        a: A FixedPointArray of any shape.
+
+        b: A FixedPointArray of the same shape as a.
+
+        workers: The number of threads. Defaults to the number of CPUs.
+
+        chunk_size: The number of products summed by each task. The result does not
+            depend on it.
+
+        executor: An optional concurrent.futures.Executor on which to run the tasks,
+            in which case workers is ignored.
+
+    Returns:
+        A FixedPoint in the QFormat given by linalg.minimal_accumulator_qformat().
+
+    Raises:
+        ValueError: If the shapes of a and b differ, or chunk_size is not positive.
+    """
+    if a.shape != b.shape:
+        raise ValueError("Cannot form the inner product of arrays with shapes {} and {}".format(a.shape, b.shape))
+    a_numerators = a.numerators.reshape(-1)
+    b_numerators = b.numerators.reshape(-1)
+    partials = _map_chunks(_dot_chunk, [a_numerators, b_numerators], _inner_block_length(a.qformat, b.qformat, 0),
+                           chunk_size, workers, executor)
+    qformat = minimal_accumulator_qformat(a.qformat, b.qformat, len(a_numerators))
+    return FixedPoint._from_numerator(_tree_combine(partials), qformat)
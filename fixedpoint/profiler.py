@@ -0,0 +1,277 @@
+"""Profile the dynamic range and precision of values to choose minimal QFormats.
+
+Values are observed at probes, each identified by a name or, by default, by the
+line of code at which probe() is called. For each probe a Profiler records the
+range of values and the fraction bits needed to represent them exactly. It can
+also compare each value with the corresponding value from a floating-point shadow
+computation, to measure the error accumulated by fixed-point arithmetic up to
+that point. From these it recommends the narrowest QFormat for each probe which
+covers the observed range and keeps rounding error within a budget.
+
+Example:
+
+    >>> def mac(acc, x, y):
+    ...     return probe(acc + probe(x * y, 'product'), 'sum')
+    >>> profiler = Profiler()
+    >>> x, y = FixedPoint(0.3, QFormat(1, 15)), FixedPoint(-0.7, QFormat(1, 15))
+    >>> result = profiler.run(mac, FixedPoint(0.5), x, y, shadow=[0.5, 0.3, -0.7])
+    >>> profiler.recommend(error_budget=2**-12)
+    {'product': QFormat(1, 12), 'sum': QFormat(1, 12)}
+"""
+
+import sys
+from collections import namedtuple, defaultdict
+from fractions import Fraction
+from math import ceil, log2, sqrt
+from numbers import Real
+
+from fixedpoint.fixedpoint import FixedPoint
+from fixedpoint.qformat import QFormat
+
+Profile = namedtuple('Profile', ['name', 'count', 'minimum', 'maximum', 'integer_bits', 'fraction_bits',
+                                 'max_abs_error', 'rms_error'])
+
+_active = []
+
+
+def probe(value, name=None):
+    """Observe a value in the active Profiler, if there is one.
+
+    Args:
+        value: A real number, usually a FixedPoint.
+
+        name: The name of the probe. Defaults to the 'filename:lineno' of the caller.
+
+    Returns:
+        value, unchanged.
+    """
+    if _active:
+        if name is None:
+            frame = sys._getframe(1)
+            name = "{}:{}".format(frame.f_code.co_filename, frame.f_lineno)
+        _active[-1]._observe(name, value)
+    return value
+
+
+def fraction_bits_of(value):
+    """The number of fraction bits needed to represent a real value exactly.
+
+    Returns:
+        A non-negative integer, or None if the value has no finite binary representation.
+    """
+    if isinstance(value, FixedPoint):
+        denominator = value.denominator
+    else:
+        denominator = Fraction(value).denominator
+    if denominator & (denominator - 1):
+        return None
+    return denominator.bit_length() - 1
+
+
+def integer_bits_for_range(minimum, maximum, fraction_bits):
+    """The fewest integer bits of a QFormat which can hold a range of values.
+
+    Args:
+        minimum: The least value, as a real number.
+
+        maximum: The greatest value, as a real number.
+
+        fraction_bits: The number of fraction bits of the QFormat. Values are rounded
+            to this precision before their range is checked.
+
+    Returns:
+        An integer number of integer bits, including the sign bit, of at least one.
+    """
+    scale = 2**fraction_bits
+    lower = round(Fraction(minimum) * scale)
+    upper = round(Fraction(maximum) * scale)
+    num_bits = max(upper.bit_length() + 1 if upper > 0 else 1,
+                   (-lower - 1).bit_length() + 1 if lower < 0 else 1)
+    return max(num_bits - fraction_bits, 1)
+
+
+def fraction_bits_for_error(error_budget):
+    """The fewest fraction bits for which round-to-nearest error is within a budget."""
+    if error_budget <= 0:
+        raise ValueError("Error budget {} is not positive".format(error_budget))
+    # Rounding to nearest has error at most half of the least significant bit
+    return max(ceil(-log2(error_budget)) - 1, 0)
+
+
+class _Site:
+
+    def __init__(self):
+        self.count = 0
+        self.minimum = None
+        self.maximum = None
+        self.fraction_bits = 0
+        self.errors = 0
+        self.max_abs_error = None
+        self.sum_squared_error = 0.0
+
+    def record(self, value, shadow):
+        exact = Fraction(value)
+        self.count += 1
+        self.minimum = exact if self.minimum is None else min(self.minimum, exact)
+        self.maximum = exact if self.maximum is None else max(self.maximum, exact)
+        bits = fraction_bits_of(value)
+        self.fraction_bits = None if bits is None or self.fraction_bits is None else max(self.fraction_bits, bits)
+        if shadow is not None:
+            error = abs(float(exact - Fraction(shadow)))
+            self.errors += 1
+            self.max_abs_error = error if self.max_abs_error is None else max(self.max_abs_error, error)
+            self.sum_squared_error += error * error
+
+
+class Profiler:
+    """Records the range, precision and error of values observed at probes.
+
+    A Profiler observes probes while it is active, either within a with statement or
+    during run().
+    """
+
+    def __init__(self):
+        self._sites = defaultdict(_Site)
+        self._collected = None
+
+    def __enter__(self):
+        _active.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active.remove(self)
+
+    def _observe(self, name, value):
+        if self._collected is not None:
+            self._collected.append((name, value))
+        else:
+            self.record(name, value)
+
+    def record(self, name, value, shadow=None):
+        """Record a value directly, without a probe.
+
+        Args:
+            name: The name of the probe.
+
+            value: A real number, usually a FixedPoint.
+
+            shadow: An optional reference value, usually a float, to which value would
+                be equal if computed without rounding.
+        """
+        if not isinstance(value, Real):
+            raise TypeError("Cannot profile non-real value {!r}".format(value))
+        self._sites[name].record(value, shadow)
+
+    def _collect(self, func, args):
+        self._collected = []
+        try:
+            with self:
+                result = func(*args)
+            return result, self._collected
+        finally:
+            self._collected = None
+
+    def run(self, func, *args, shadow=False):
+        """Call a function, observing the probes it passes.
+
+        Args:
+            func: The function to call.
+
+            *args: The arguments, usually FixedPoints.
+
+            shadow: If True, or a sequence of arguments, func is called a second time,
+                as a shadow computation, with those arguments or else with each of args
+                converted to float. The value at each probe is compared with the value at
+                the same probe, in the same order, in the shadow computation.
+
+        Returns:
+            The result of calling func with args.
+
+        Raises:
+            ValueError: If the shadow computation does not pass the same probes.
+        """
+        result, observations = self._collect(func, args)
+        if not shadow:
+            for name, value in observations:
+                self.record(name, value)
+            return result
+
+        shadow_args = [float(arg) for arg in args] if shadow is True else list(shadow)
+        _, shadow_observations = self._collect(func, shadow_args)
+        if [name for name, _ in observations] != [name for name, _ in shadow_observations]:
+            raise ValueError("The shadow computation passed different probes")
+        for (name, value), (_, shadow_value) in zip(observations, shadow_observations):
+            self.record(name, value, shadow_value)
+        return result
+
+    def reset(self):
+        """Discard all observations."""
+        self._sites.clear()
+
+    def profiles(self):
+        """The observations at each probe.
+
+        Returns:
+            A dictionary mapping probe names to Profiles. The minimum and maximum are
+            Fractions, integer_bits and fraction_bits describe the narrowest QFormat
+            which holds every observed value exactly (fraction_bits is None if some
+            value has no finite binary representation, in which case integer_bits is
+            for zero fraction bits), and the errors are those relative to the shadow
+            computation, or None if there was none.
+        """
+        profiles = {}
+        for name, site in self._sites.items():
+            fraction_bits = site.fraction_bits
+            integer_bits = integer_bits_for_range(site.minimum, site.maximum, fraction_bits or 0)
+            rms_error = sqrt(site.sum_squared_error / site.errors) if site.errors else None
+            profiles[name] = Profile(name, site.count, site.minimum, site.maximum, integer_bits, fraction_bits,
+                                     site.max_abs_error, rms_error)
+        return profiles
+
+    def recommend(self, error_budget=None):
+        """Recommend the narrowest QFormat for each probe.
+
+        The recommended format has enough integer bits for the observed range. Without
+        an error budget, it has enough fraction bits to represent every observed value
+        exactly. With an error budget, it has the fewest fraction bits for which the
+        error of rounding into it, added to the error already observed against the
+        shadow computation, is within the budget; if the observed error alone exceeds
+        the budget, no further rounding is allowed and values are kept exact.
+
+        Args:
+            error_budget: An optional greatest acceptable absolute error.
+
+        Returns:
+            A dictionary mapping probe names to QFormats.
+
+        Raises:
+            ValueError: If there is no error budget and some value at a probe has no
+                finite binary representation.
+        """
+        recommendations = {}
+        for name, profile in self.profiles().items():
+            fraction_bits = profile.fraction_bits
+            remaining = None if error_budget is None else error_budget - (profile.max_abs_error or 0)
+            if remaining is not None and remaining > 0:
+                needed = fraction_bits_for_error(remaining)
+                fraction_bits = needed if fraction_bits is None else min(fraction_bits, needed)
+            if fraction_bits is None:
+                raise ValueError("Values at probe {!r} cannot be represented exactly; supply an error budget"
+                                 .format(name))
+            integer_bits = integer_bits_for_range(profile.minimum, profile.maximum, fraction_bits)
+            recommendations[name] = QFormat(integer_bits, fraction_bits)
+        return recommendations
+
+    def report(self, error_budget=None):
+        """A table of the profile and recommended QFormat of each probe, as a string."""
+        recommendations = self.recommend(error_budget)
+        lines = ["{:<32} {:>8} {:>14} {:>14} {:>10} {:>12} {:>10}".format(
+            'probe', 'count', 'minimum', 'maximum', 'observed', 'max error', 'recommend')]
+        for name, profile in sorted(self.profiles().items()):
+            observed = "Q{}.{}".format(profile.integer_bits, '?' if profile.fraction_bits is None
+                                       else profile.fraction_bits)
+            error = '-' if profile.max_abs_error is None else "{:.3g}".format(profile.max_abs_error)
+            lines.append("{:<32} {:>8} {:>14.6g} {:>14.6g} {:>10} {:>12} {:>10}".format(
+                name[-32:], profile.count, float(profile.minimum), float(profile.maximum), observed, error,
+                str(recommendations[name])))
+        return '\n'.join(lines)
@@ -4,34 +4,40 @@ from weakref import WeakValueDictionary
 
 
 class QFormat:
-    """The precision and position of the binary point in a signed fixed point number.
+    """The precision and position of the binary point in a fixed point number.
+
+    A signed QFormat Qm.n counts the sign bit among its m integer bits. An unsigned
+    QFormat UQm.n has no sign bit, so it holds values from 0 to 2**m - 2**-n in m + n
+    bits.
     """
 
     _instances = WeakValueDictionary()
 
     @classmethod
     def from_str(cls, s):
-        """Create a QFormat from a string of the format 'Qm.n' where m and n are integers.
+        """Create a QFormat from a string of the format 'Qm.n' or 'UQm.n' where m and n are integers.
 
         Args:
             s: A string of the form 'Qm.n' where m is an integer specifying the number of bits
                 of precision in the integer part and n is the number of bits of precision in
-                the fractional part.
+                the fractional part, optionally prefixed with 'U' for an unsigned QFormat.
 
         Returns:
             A QFormat.
         """
-        if not s.startswith("Q"):
-            raise ValueError("Q format {!r} does not conform to Qm.n".format(s))
-        s_integer, _, s_fraction = s[1:].partition('.')
+        signed = not s.startswith("U")
+        q = s if signed else s[1:]
+        if not q.startswith("Q"):
+            raise ValueError("Q format {!r} does not conform to Qm.n or UQm.n".format(s))
+        s_integer, _, s_fraction = q[1:].partition('.')
 
         try:
             integer_bits = int(s_integer)
             fraction_bits = int(s_fraction)
         except ValueError:
-            raise ValueError("Q format {!r} does not conform to Qm.n".format(s))
+            raise ValueError("Q format {!r} does not conform to Qm.n or UQm.n".format(s))
 
-        return cls(integer_bits, fraction_bits)
+        return cls(integer_bits, fraction_bits, signed)
 
     @classmethod
     def from_qformats(cls, *qformats):
@@ -41,26 +47,29 @@ class QFormat:
             *qformats: One or more QFormat objects.
 
         Returns:
-            A QFormat.
+            A QFormat, which is unsigned only if all of qformats are unsigned.
 
         Raises:
             TypeError: If at least one QFormat is not supplied.
         """
         if len(qformats) < 1:
             raise TypeError("At least one QFormat must be supplied.")
+        if not all(q.signed == qformats[0].signed for q in qformats):
+            qformats = [q.to_signed() for q in qformats]
         max_integer_bits = max(q.integer_bits for q in qformats)
         max_fraction_bits = max(q.fraction_bits for q in qformats)
-        return cls(max_integer_bits, max_fraction_bits)
+        return cls(max_integer_bits, max_fraction_bits, qformats[0].signed)
 
-    def __new__(cls, integer_bits, fraction_bits):
+    def __new__(cls, integer_bits, fraction_bits, signed=True):
         """Initialize a QFormat with specified integer and fractional precision."""
-        precision = (integer_bits, fraction_bits)
+        precision = (integer_bits, fraction_bits, signed)
         try:
             obj = cls._instances[precision]
         except KeyError:
             obj = super().__new__(cls)
             obj._integer_bits = integer_bits
             obj._fraction_bits = fraction_bits
+            obj._signed = signed
             cls._instances[precision] = obj
         return obj
 
@@ -74,17 +83,41 @@ class QFormat:
         """The number of bits of fractional precision."""
         return self._fraction_bits
 
+    @property
+    def signed(self):
+        """True if the QFormat has a sign bit, False if it can represent only non-negative values."""
+        return self._signed
+
     @property
     def denominator(self):
         """The divisor by which the numerator in a a fixed point value must be divided to give the number value."""
         return 2**self.fraction_bits
 
-    def _max_signed_numerator(self):
+    def to_signed(self):
+        """The narrowest signed QFormat which can represent every value of this QFormat.
+
+        Returns:
+            This QFormat if it is signed, otherwise the QFormat with one more integer bit
+            for the sign.
+        """
+        if self._signed:
+            return self
+        return QFormat(self._integer_bits + 1, self._fraction_bits)
+
+    def _max_numerator(self):
+        if not self._signed:
+            return 2 ** (self.integer_bits + self.fraction_bits) - 1
         return 2 ** (self.integer_bits + self.fraction_bits - 1) - 1
 
-    def _min_signed_numerator(self):
+    def _min_numerator(self):
+        if not self._signed:
+            return 0
         return -(2 ** (self.integer_bits + self.fraction_bits - 1))
 
+    def _max_magnitude(self):
+        # The largest absolute value of a numerator, for bounding products and sums
+        return max(-self._min_numerator(), self._max_numerator())
+
     def rescale_numerator(self, src_numerator, src_qformat):
         """Rescale a numerator to a different QFormat.
 
@@ -115,15 +148,118 @@ class QFormat:
             OverflowError: If numerator is out of bounds.
         """
         assert isinstance(numerator, Integral)
-        lower = self._min_signed_numerator()
-        upper = self._max_signed_numerator()
+        lower = self._min_numerator()
+        upper = self._max_numerator()
         if not lower <= numerator <= upper:
             raise OverflowError("Numerator {} is out of range {} <= numerator <= {} for {!r}"
                                 .format(numerator, lower, upper, self))
         return numerator
 
+    def __reduce__(self):
+        # Unpickle through __new__ so that the QFormat is interned
+        return (self.__class__, (self._integer_bits, self._fraction_bits, self._signed))
+
     def __repr__(self):
+        if not self._signed:
+            return "{}({!r}, {!r}, signed=False)".format(self.__class__.__name__, self._integer_bits,
+                                                          self._fraction_bits)
         return "{}({!r}, {!r})".format(self.__class__.__name__, self._integer_bits, self._fraction_bits)
 
     def __str__(self):
-        return "Q{}.{}".format(self._integer_bits, self._fraction_bits)
\ No newline at end of file
+        return "{}Q{}.{}".format('' if self._signed else 'U', self._integer_bits, self._fraction_bits)
+
+
+def sum_qformat(a, b):
+    """The QFormat of the sum of values in two QFormats, in which it cannot overflow.
+
+    Args:
+        a: The QFormat of one addend.
+        b: The QFormat of the other addend.
+
+    Returns:
+        The QFormat with one more integer bit than from_qformats(a, b), which is
+        unsigned only if both a and b are.
+    """
+    promoted_qformat = QFormat.from_qformats(a, b)
+    return QFormat(promoted_qformat.integer_bits + 1, promoted_qformat.fraction_bits, promoted_qformat.signed)
+
+
+def minimal_sum_qformat(qformat, count):
+    """The narrowest QFormat which can hold any sum of count values in a QFormat.
+
+    Args:
+        qformat: The QFormat of the values.
+
+        count: The number of values which are summed.
+
+    Returns:
+        A QFormat with the fraction bits of qformat and enough integer bits that no
+        sum of count values can overflow it.
+    """
+    # The most negative sum, count * -2**(n - 1), has the greatest magnitude, or for an unsigned
+    # QFormat the largest sum, count * (2**n - 1)
+    growth_bits = max(count - 1, 0).bit_length()
+    return QFormat(qformat.integer_bits + growth_bits, qformat.fraction_bits, qformat.signed)
+
+
+def product_qformat(a, b):
+    """The QFormat of the exact product of values in two QFormats.
+
+    Args:
+        a: The QFormat of the multiplicand.
+        b: The QFormat of the multiplier.
+
+    Returns:
+        A QFormat with the integer and fraction bits of a and b combined, which is
+        unsigned only if both a and b are. A signed product has an extra integer bit.
+    """
+    signed = a.signed or b.signed
+    sign_bits = 1 if signed else 0
+    return QFormat(a.integer_bits + b.integer_bits + sign_bits, a.fraction_bits + b.fraction_bits, signed)
+
+
+def quotient_qformat(dividend, divisor):
+    """The QFormat of the quotient of values in two QFormats.
+
+    Args:
+        dividend: The QFormat of the dividend.
+        divisor: The QFormat of the divisor.
+
+    Returns:
+        A QFormat with integer bits for the largest dividend over the smallest divisor,
+        which is unsigned only if both dividend and divisor are. A signed quotient has
+        an extra integer bit.
+    """
+    signed = dividend.signed or divisor.signed
+    sign_bits = 1 if signed else 0
+    return QFormat(dividend.integer_bits + divisor.fraction_bits + sign_bits,
+                   divisor.integer_bits + dividend.fraction_bits, signed)
+
+
+def negated_qformat(qformat):
+    """The signed QFormat of the negation of values in a QFormat.
+
+    Args:
+        qformat: The QFormat of the operand.
+
+    Returns:
+        A signed QFormat with one more integer bit than qformat, for the negation of its
+        most negative value, or for the sign if qformat is unsigned.
+    """
+    return QFormat(qformat.integer_bits + 1, qformat.fraction_bits)
+
+
+def power_qformat(qformat, exponent):
+    """The QFormat of values in a QFormat raised to a non-negative integer power.
+
+    Args:
+        qformat: The QFormat of the base.
+        exponent: The non-negative integer exponent.
+
+    Returns:
+        A QFormat with exponent times the fraction bits of qformat, which is unsigned
+        if qformat is.
+    """
+    if not qformat.signed:
+        return QFormat(qformat.integer_bits * exponent, qformat.fraction_bits * exponent, signed=False)
+    return QFormat(max(qformat.integer_bits - 1, 0) * exponent + 1, qformat.fraction_bits * exponent)
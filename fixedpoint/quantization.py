@@ -0,0 +1,470 @@
+"""Vectorized quantization of arrays of real numbers into fixed-point numerators.
+
+This module requires NumPy.
+"""
+
+from collections import namedtuple
+from math import log10, sqrt
+
+import numpy as np
+
+from fixedpoint.qformat import QFormat
+
+
+ROUND_HALF_EVEN = 'half_even'
+ROUND_HALF_UP = 'half_up'
+ROUND_HALF_AWAY = 'half_away'
+ROUND_FLOOR = 'floor'
+ROUND_CEILING = 'ceiling'
+ROUND_TOWARD_ZERO = 'toward_zero'
+
+ROUNDING_MODES = (ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_HALF_AWAY,
+                  ROUND_FLOOR, ROUND_CEILING, ROUND_TOWARD_ZERO)
+
+OVERFLOW_SATURATE = 'saturate'
+OVERFLOW_WRAP = 'wrap'
+OVERFLOW_ERROR = 'error'
+
+OVERFLOW_MODES = (OVERFLOW_SATURATE, OVERFLOW_WRAP, OVERFLOW_ERROR)
+
+MAX_ARRAY_BITS = 64
+
+Quantized = namedtuple('Quantized', ['numerators', 'overflow', 'statistics'])
+
+QuantizationStatistics = namedtuple('QuantizationStatistics', ['max_abs_error', 'rms_error', 'sqnr_db'])
+
+Requantized = namedtuple('Requantized', ['numerators', 'saturated'])
+
+
+def numerator_dtype(qformat):
+    """The narrowest native integer dtype which can hold numerators of a QFormat.
+
+    Args:
+        qformat: The QFormat of the numerators to be stored.
+
+    Returns:
+        One of numpy.int8, numpy.int16, numpy.int32 or numpy.int64, or if qformat is
+        unsigned one of numpy.uint8, numpy.uint16, numpy.uint32 or numpy.uint64.
+
+    Raises:
+        ValueError: If the numerators of qformat do not fit in 64 bits.
+    """
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    dtypes = (np.int8, np.int16, np.int32, np.int64) if qformat.signed else (np.uint8, np.uint16, np.uint32, np.uint64)
+    for dtype in dtypes:
+        if num_bits <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError("{!r} needs {} bits which exceeds the {} bits available in arrays"
+                     .format(qformat, num_bits, MAX_ARRAY_BITS))
+
+
+def check_rounding(rounding):
+    """Check that rounding is a supported rounding mode.
+
+    Raises:
+        ValueError: If rounding is not one of ROUNDING_MODES.
+    """
+    if rounding not in ROUNDING_MODES:
+        raise ValueError("Rounding mode {!r} is not one of {}".format(rounding, ', '.join(ROUNDING_MODES)))
+
+
+def check_overflow(overflow):
+    """Check that overflow is a supported overflow mode.
+
+    Raises:
+        ValueError: If overflow is not one of OVERFLOW_MODES.
+    """
+    if overflow not in OVERFLOW_MODES:
+        raise ValueError("Overflow mode {!r} is not one of {}".format(overflow, ', '.join(OVERFLOW_MODES)))
+
+
+def shift_round(numerators, shift, rounding=ROUND_HALF_EVEN):
+    """Multiply an array of integer numerators by 2**shift, rounding if shift is negative.
+
+    This is the integer-only equivalent of moving numerators between QFormats with
+    different numbers of fraction bits. Arrays of dtype object containing Python
+    integers are supported, for values too wide for native integers.
+
+    Args:
+        numerators: An array of integers.
+
+        shift: The signed number of bits by which to shift. Positive values shift
+            left exactly. Negative values shift right, rounding as specified.
+
+        rounding: One of the ROUNDING_MODES.
+
+    Returns:
+        An array of shifted integers with the same dtype as numerators.
+    """
+    check_rounding(rounding)
+    numerators = np.asarray(numerators)
+    if shift >= 0:
+        return numerators << shift if shift else numerators
+    shift = -shift
+    half = 1 << (shift - 1)
+    quotient = numerators >> shift
+    remainder = numerators - (quotient << shift)
+    if rounding == ROUND_FLOOR:
+        return quotient
+    if rounding == ROUND_CEILING:
+        return quotient + (remainder > 0)
+    if rounding == ROUND_TOWARD_ZERO:
+        return quotient + ((remainder > 0) & (numerators < 0))
+    if rounding == ROUND_HALF_UP:
+        return quotient + (remainder >= half)
+    if rounding == ROUND_HALF_AWAY:
+        return quotient + ((remainder > half) | ((remainder == half) & (numerators >= 0)))
+    return quotient + ((remainder > half) | ((remainder == half) & ((quotient & 1) == 1)))
+
+
+def shift_round_integer(numerator, shift, rounding=ROUND_HALF_EVEN):
+    """Multiply an integer by 2**shift, rounding if shift is negative.
+
+    The scalar equivalent of shift_round(), for use in sample-recursive kernels.
+    The rounding mode is not checked.
+
+    Args:
+        numerator: An integer.
+        shift: The signed number of bits by which to shift.
+        rounding: One of the ROUNDING_MODES.
+
+    Returns:
+        The shifted integer.
+    """
+    if shift >= 0:
+        return numerator << shift
+    shift = -shift
+    quotient = numerator >> shift
+    remainder = numerator - (quotient << shift)
+    if remainder == 0 or rounding == ROUND_FLOOR:
+        return quotient
+    if rounding == ROUND_CEILING:
+        return quotient + 1
+    if rounding == ROUND_TOWARD_ZERO:
+        return quotient + 1 if numerator < 0 else quotient
+    half = 1 << (shift - 1)
+    if remainder > half:
+        return quotient + 1
+    if remainder < half:
+        return quotient
+    if rounding == ROUND_HALF_UP:
+        return quotient + 1
+    if rounding == ROUND_HALF_AWAY:
+        return quotient + 1 if numerator >= 0 else quotient
+    return quotient + (quotient & 1)
+
+
+def constrain_integer(numerator, qformat, overflow=OVERFLOW_SATURATE):
+    """Bring an integer numerator within the range of a QFormat.
+
+    The scalar equivalent of constrain(). The overflow mode is not checked.
+
+    Args:
+        numerator: An integer.
+        qformat: The QFormat whose range the result must lie within.
+        overflow: One of the OVERFLOW_MODES.
+
+    Returns:
+        The constrained numerator.
+
+    Raises:
+        OverflowError: If overflow is OVERFLOW_ERROR and numerator is out of range.
+    """
+    lower = qformat._min_numerator()
+    upper = qformat._max_numerator()
+    if lower <= numerator <= upper:
+        return numerator
+    if overflow == OVERFLOW_SATURATE:
+        return upper if numerator > upper else lower
+    if overflow == OVERFLOW_WRAP:
+        return ((numerator - lower) & (upper - lower)) + lower
+    return qformat.check_numerator(numerator)
+
+
+def constrain(numerators, qformat, overflow=OVERFLOW_SATURATE):
+    """Bring integer numerators within the range of a QFormat.
+
+    Args:
+        numerators: An array of integers, possibly of dtype object.
+
+        qformat: The QFormat whose range the result must lie within.
+
+        overflow: One of the OVERFLOW_MODES.
+
+    Returns:
+        A 2-tuple of the constrained numerators, in the narrowest dtype for qformat
+        or dtype object if its numerators do not fit in 64 bits, and a boolean
+        array marking the elements which were out of range.
+
+    Raises:
+        OverflowError: If overflow is OVERFLOW_ERROR and any numerator is out of range.
+    """
+    check_overflow(overflow)
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    dtype = numerator_dtype(qformat) if num_bits <= MAX_ARRAY_BITS else object
+    numerators = np.asarray(numerators)
+    lower = qformat._min_numerator()
+    upper = qformat._max_numerator()
+    out_of_range = np.asarray((numerators < lower) | (numerators > upper), dtype=bool)
+    if not out_of_range.any():
+        return numerators.astype(dtype), out_of_range
+    if overflow == OVERFLOW_ERROR:
+        index = np.unravel_index(np.argmax(out_of_range), out_of_range.shape)
+        raise OverflowError("Numerator {} at index {} is out of range {} <= numerator <= {} for {!r}"
+                            .format(numerators[index], index if numerators.ndim != 1 else index[0],
+                                    lower, upper, qformat))
+    if overflow == OVERFLOW_SATURATE:
+        if numerators.dtype != object:
+            # The bounds of a QFormat of a different signedness may not be representable in the dtype of numerators
+            info = np.iinfo(numerators.dtype)
+            lower, upper = max(lower, info.min), min(upper, info.max)
+        return np.clip(numerators, lower, upper).astype(dtype), out_of_range
+    if numerators.dtype == object:
+        wrapped = ((numerators - lower) & ((1 << num_bits) - 1)) + lower
+    else:
+        # Conversion to 64 bits wraps modulo 2**64, after which the shifts sign-extend a signed QFormat and
+        # zero-extend an unsigned one
+        unused_bits = MAX_ARRAY_BITS - num_bits
+        wrapped = numerators.astype(np.int64 if qformat.signed else np.uint64)
+        wrapped = (wrapped << unused_bits) >> unused_bits
+    return wrapped.astype(dtype), out_of_range
+
+
+def _qformats_along_axis(qformats, length):
+    """A list of one QFormat for each index along an axis of the given length."""
+    if isinstance(qformats, QFormat):
+        return [qformats] * length
+    qformats = list(qformats)
+    if len(qformats) != length:
+        raise ValueError("{} QFormats were supplied for an axis of length {}".format(len(qformats), length))
+    return qformats
+
+
+def _requantize(numerators, source_qformat, target_qformat, rounding, overflow):
+    """Shift, round and constrain numerators from one QFormat to another."""
+    shift = target_qformat.fraction_bits - source_qformat.fraction_bits
+    signed_source_qformat = source_qformat.to_signed()
+    num_bits = signed_source_qformat.integer_bits + signed_source_qformat.fraction_bits + max(shift, 0)
+    numerators = numerators.astype(np.int64 if num_bits <= MAX_ARRAY_BITS else object, copy=False)
+    return constrain(shift_round(numerators, shift, rounding), target_qformat, overflow)
+
+
+def requantize(numerators, source_qformat, target_qformat, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_SATURATE,
+               axis=None):
+    """Convert an array of numerators from one QFormat to another by shifting and rounding.
+
+    Each channel along axis may have its own source and target QFormats. Channels
+    with the same pair of QFormats are converted together.
+
+    Example:
+
+        >>> r = requantize(np.array([100, -100, 5]), QFormat(4, 4), QFormat(2, 2))
+        >>> r.numerators
+        array([ 7, -8,  1], dtype=int8)
+        >>> r.saturated
+        2
+
+    Args:
+        numerators: An array of integer numerators, possibly of dtype object.
+
+        source_qformat: The QFormat of numerators or, if axis is given, a sequence of
+            QFormats with one for each index along axis.
+
+        target_qformat: The QFormat of the results or, if axis is given, a sequence of
+            QFormats with one for each index along axis.
+
+        rounding: One of the ROUNDING_MODES, used where a target QFormat has fewer
+            fraction bits than its source.
+
+        overflow: One of the OVERFLOW_MODES, used for results which are out of the
+            range of their target QFormat.
+
+        axis: The axis along which per-channel QFormats are given, or None if
+            source_qformat and target_qformat are single QFormats.
+
+    Returns:
+        A Requantized named tuple of (numerators, saturated). The numerators have the
+        shape of the input, in the narrowest dtype which holds every target QFormat,
+        unsigned only if they all are, or dtype object if one is wider than 64 bits. saturated is the number
+        of elements which were out of range and were saturated or wrapped: an integer,
+        or if axis is given an array with the count for each index along axis.
+
+    Raises:
+        ValueError: If rounding or overflow are not supported modes, or the number of
+            QFormats does not match the length of axis.
+        OverflowError: If overflow is OVERFLOW_ERROR and any result is out of range.
+    """
+    check_rounding(rounding)
+    check_overflow(overflow)
+    numerators = np.asarray(numerators)
+    if axis is None:
+        result, out_of_range = _requantize(numerators, source_qformat, target_qformat, rounding, overflow)
+        return Requantized(result, int(np.count_nonzero(out_of_range)))
+
+    axis = axis % numerators.ndim
+    length = numerators.shape[axis]
+    channels_by_qformats = {}
+    for channel, qformats in enumerate(zip(_qformats_along_axis(source_qformat, length),
+                                           _qformats_along_axis(target_qformat, length))):
+        channels_by_qformats.setdefault(qformats, []).append(channel)
+
+    targets = [target for _, target in channels_by_qformats] or [QFormat(1, 0)]
+    if any(target.signed for target in targets):
+        targets = [target.to_signed() for target in targets]
+    widest_bits = max(target.integer_bits + target.fraction_bits for target in targets)
+    dtype = numerator_dtype(QFormat(widest_bits, 0, targets[0].signed)) if widest_bits <= MAX_ARRAY_BITS else object
+    result = np.empty(numerators.shape, dtype=dtype)
+    saturated = np.zeros(length, dtype=np.int64)
+    other_axes = tuple(a for a in range(numerators.ndim) if a != axis)
+    for (source, target), channels in channels_by_qformats.items():
+        converted, out_of_range = _requantize(np.take(numerators, channels, axis=axis), source, target, rounding,
+                                              overflow)
+        index = [slice(None)] * numerators.ndim
+        index[axis] = channels
+        result[tuple(index)] = converted
+        saturated[channels] = np.sum(out_of_range, axis=other_axes)
+    return Requantized(result, saturated)
+
+
+def _round_float(scaled, rounding):
+    """Round an array of floats to integral values.
+
+    All of the operations used are exact in binary floating point, so the result
+    is the correctly rounded value of each element.
+    """
+    if rounding == ROUND_HALF_EVEN:
+        return np.rint(scaled)
+    floored = np.floor(scaled)
+    if rounding == ROUND_FLOOR:
+        return floored
+    remainder = scaled - floored
+    if rounding == ROUND_HALF_UP:
+        return floored + (remainder >= 0.5)
+    if rounding == ROUND_CEILING:
+        return floored + (remainder > 0)
+    if rounding == ROUND_TOWARD_ZERO:
+        return np.trunc(scaled)
+    if rounding == ROUND_HALF_AWAY:
+        magnitude = np.abs(scaled)
+        floored = np.floor(magnitude)
+        return np.copysign(floored + (magnitude - floored >= 0.5), scaled)
+    raise ValueError("Rounding mode {!r} is not one of {}".format(rounding, ', '.join(ROUNDING_MODES)))
+
+
+def _wrap_float(rounded, num_bits):
+    """Reduce integral floats into the two's complement range of num_bits.
+
+    fmod() is exact, and each subsequent correction is exact because the operands
+    are within a factor of two of each other.
+    """
+    modulus = 2.0 ** num_bits
+    half = 2.0 ** (num_bits - 1)
+    wrapped = np.fmod(rounded, modulus)
+    wrapped = np.where(wrapped >= half, wrapped - modulus, wrapped)
+    wrapped = np.where(wrapped < -half, wrapped + modulus, wrapped)
+    return wrapped
+
+
+def _saturate_float(rounded, lower, upper):
+    """Clamp integral floats to the closed range [lower, upper] without exceeding upper."""
+    float_upper = float(upper)
+    if float_upper > upper:
+        float_upper = np.nextafter(float_upper, 0.0)
+    return np.clip(rounded, float(lower), float_upper)
+
+
+def quantize(values, qformat, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_SATURATE, statistics=False):
+    """Quantize an array of real numbers into numerators of a QFormat.
+
+    Example:
+
+        >>> q = quantize(np.array([0.3, -1.7, 9.0]), QFormat(4, 4))
+        >>> q.numerators
+        array([  5, -27, 127], dtype=int8)
+        >>> q.overflow
+        array([False, False,  True])
+
+    Args:
+        values: An array-like of real numbers.
+
+        qformat: The QFormat of the result. Its numerators must fit in 64 bits.
+
+        rounding: One of the ROUNDING_MODES. The default, ROUND_HALF_EVEN, matches
+            the rounding used by FixedPoint(value, qformat).
+
+        overflow: How values outside the range of qformat are treated.
+            OVERFLOW_SATURATE clamps them to the nearest representable value,
+            OVERFLOW_WRAP discards the high-order bits as two's complement hardware
+            would, and OVERFLOW_ERROR raises OverflowError. NaNs are treated as
+            overflowing and become zero.
+
+        statistics: If True, also compute QuantizationStatistics describing the
+            error between the finite input values and their quantized
+            representations.
+
+    Returns:
+        A Quantized named tuple of (numerators, overflow, statistics), where
+        numerators is an array in the narrowest dtype for qformat, overflow
+        is a boolean array marking elements which were out of range, and statistics
+        is a QuantizationStatistics, or None if statistics were not requested.
+
+    Raises:
+        ValueError: If rounding or overflow are not supported modes, or if qformat
+            is too wide for array storage.
+        OverflowError: If overflow is OVERFLOW_ERROR and any value is out of range.
+    """
+    check_rounding(rounding)
+    check_overflow(overflow)
+    dtype = numerator_dtype(qformat)
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+
+    values = np.asarray(values, dtype=np.float64)
+    scaled = np.ldexp(values, qformat.fraction_bits)
+    rounded = _round_float(scaled, rounding)
+
+    lower = qformat._min_numerator()
+    upper = qformat._max_numerator()
+    nan = np.isnan(rounded)
+    out_of_range = (rounded < float(lower)) | (rounded >= float(upper + 1)) | nan
+
+    if overflow == OVERFLOW_ERROR and out_of_range.any():
+        index = np.unravel_index(np.argmax(out_of_range), out_of_range.shape)
+        raise OverflowError("Value {} at index {} is out of range for {!r}"
+                            .format(values[index], index if values.ndim != 1 else index[0], qformat))
+
+    rounded = np.where(nan, 0.0, rounded)
+    if overflow == OVERFLOW_WRAP:
+        rounded = np.where(np.isinf(rounded), 0.0, rounded)
+        numerators = _wrap_float(rounded, num_bits).astype(np.int64)
+        if not qformat.signed:
+            # The two's complement bits of the signed result are the unsigned result
+            numerators = numerators.astype(np.uint64) & np.uint64(upper)
+        numerators = numerators.astype(dtype)
+    else:
+        numerators = _saturate_float(rounded, lower, upper).astype(dtype)
+        # The upper bound of formats wider than a float mantissa is not exactly
+        # representable as a float, so saturated elements are patched afterwards.
+        numerators[rounded >= float(upper + 1)] = upper
+
+    stats = _statistics(values, numerators, qformat) if statistics else None
+    return Quantized(numerators, out_of_range, stats)
+
+
+def _statistics(values, numerators, qformat):
+    finite = np.isfinite(values)
+    reference = values[finite]
+    reconstructed = np.ldexp(numerators[finite].astype(np.float64), -qformat.fraction_bits)
+    error = reference - reconstructed
+    if error.size == 0:
+        return QuantizationStatistics(0.0, 0.0, float('inf'))
+    max_abs_error = float(np.max(np.abs(error)))
+    error_power = float(np.dot(error, error))
+    signal_power = float(np.dot(reference, reference))
+    rms_error = sqrt(error_power / error.size)
+    if error_power == 0.0:
+        sqnr_db = float('inf')
+    elif signal_power == 0.0:
+        sqnr_db = float('-inf')
+    else:
+        sqnr_db = 10 * log10(signal_power / error_power)
+    return QuantizationStatistics(max_abs_error, rms_error, sqnr_db)
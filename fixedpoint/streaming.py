@@ -0,0 +1,355 @@
+"""Asynchronous pipelines which process streams of fixed-point blocks.
+
+A pipeline is a sequence of Stages, each of which converts one block into another:
+typically arrays of samples are quantized into FixedPointArrays, processed by a
+kernel such as a dsp.FIRFilter, requantized to an output format, and encoded as
+bytes. Each stage runs as its own task, connected to the next by a bounded queue,
+so a slow stage applies backpressure to the stages, and ultimately the stream,
+before it. Blocks with many elements are processed in an executor so that the
+arithmetic does not stall the event loop. Each stage records the time it spends
+processing blocks.
+
+Example:
+
+    >>> fir = FIRFilter(taps, QFormat(1, 15), QFormat(8, 30), QFormat(1, 15))
+    >>> pipeline = Pipeline([quantize_stage(QFormat(1, 15)),
+    ...                      kernel_stage(fir.process, fir.output_qformat),
+    ...                      requantize_stage(QFormat(1, 7)),
+    ...                      encode_stage()])
+    >>> await write_blocks(writer, pipeline.run(read_blocks(reader, 256)))
+
+This module requires NumPy.
+"""
+
+import asyncio
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from fixedpoint.array import FixedPointArray
+from fixedpoint.quantization import (quantize, requantize, numerator_dtype, check_rounding, check_overflow,
+                                     ROUND_HALF_EVEN, OVERFLOW_SATURATE)
+
+DEFAULT_QUEUE_SIZE = 4
+
+DEFAULT_OFFLOAD_THRESHOLD = 1 << 14
+
+StageLatency = namedtuple('StageLatency', ['name', 'count', 'total', 'mean', 'maximum'])
+
+_END = object()
+
+
+class _Failure:
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def _num_elements(block):
+    shape = getattr(block, 'shape', None)
+    if shape is not None:
+        return int(np.prod(shape))
+    try:
+        return len(block)
+    except TypeError:
+        return 1
+
+
+class Stage:
+    """A named step of a pipeline, which converts each block with a function.
+
+    A Stage can be used alone, as an asynchronous generator over an asynchronous
+    iterable of blocks, or as part of a Pipeline.
+    """
+
+    def __init__(self, name, func, offload_threshold=DEFAULT_OFFLOAD_THRESHOLD):
+        """Initialize a Stage.
+
+        Args:
+            name: The name by which the latency of the stage is reported.
+
+            func: A callable which converts one block into another.
+
+            offload_threshold: Blocks with at least this many elements are processed
+                in an executor rather than on the event loop. None processes every
+                block on the event loop.
+        """
+        self._name = name
+        self._func = func
+        self._offload_threshold = offload_threshold
+        self.reset()
+
+    @property
+    def name(self):
+        """The name of the stage."""
+        return self._name
+
+    def reset(self):
+        """Discard the recorded latencies."""
+        self._count = 0
+        self._total = 0.0
+        self._maximum = 0.0
+
+    def latency(self):
+        """The time spent processing blocks so far, in seconds, as a StageLatency."""
+        mean = self._total / self._count if self._count else 0.0
+        return StageLatency(self._name, self._count, self._total, mean, self._maximum)
+
+    async def apply(self, block, executor=None):
+        """Convert one block, recording the time taken.
+
+        Args:
+            block: The block to convert.
+
+            executor: The concurrent.futures.Executor in which large blocks are
+                processed, or None for the default executor of the event loop.
+
+        Returns:
+            The converted block.
+        """
+        start = time.perf_counter()
+        if self._offload_threshold is not None and _num_elements(block) >= self._offload_threshold:
+            result = await asyncio.get_running_loop().run_in_executor(executor, self._func, block)
+        else:
+            result = self._func(block)
+        elapsed = time.perf_counter() - start
+        self._count += 1
+        self._total += elapsed
+        self._maximum = max(self._maximum, elapsed)
+        return result
+
+    async def __call__(self, source, executor=None):
+        async for block in source:
+            yield await self.apply(block, executor)
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self._name)
+
+
+class Pipeline:
+    """A sequence of Stages, run concurrently and connected by bounded queues."""
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE, executor=None):
+        """Initialize a Pipeline.
+
+        Args:
+            stages: A non-empty sequence of Stages, applied in order.
+
+            queue_size: The greatest number of blocks waiting between two stages.
+
+            executor: The concurrent.futures.Executor in which large blocks are
+                processed, or None for the default executor of the event loop.
+
+        Raises:
+            ValueError: If there are no stages or queue_size is not positive.
+        """
+        if len(stages) < 1:
+            raise ValueError("{} requires at least one stage".format(self.__class__.__name__))
+        if queue_size < 1:
+            raise ValueError("Queue size {} is not positive".format(queue_size))
+        self._stages = list(stages)
+        self._queue_size = queue_size
+        self._executor = executor
+
+    @property
+    def stages(self):
+        """The stages, in order."""
+        return list(self._stages)
+
+    def latencies(self):
+        """The latency of each stage so far, as a list of StageLatency in stage order."""
+        return [stage.latency() for stage in self._stages]
+
+    async def run(self, source):
+        """Process a stream of blocks.
+
+        The blocks are read from source only as fast as the stages, and the consumer
+        of the results, can accept them.
+
+        Args:
+            source: An asynchronous iterable of blocks, such as read_blocks().
+
+        Yields:
+            The blocks produced by the last stage, in order.
+
+        Raises:
+            Any exception raised by source or a stage, once the blocks before it have
+            been yielded.
+        """
+        queues = [asyncio.Queue(self._queue_size) for _ in range(len(self._stages) + 1)]
+        tasks = [asyncio.ensure_future(_feed(source, queues[0]))]
+        tasks.extend(asyncio.ensure_future(self._work(stage, inbox, outbox))
+                     for stage, inbox, outbox in zip(self._stages, queues, queues[1:]))
+        try:
+            while True:
+                item = await queues[-1].get()
+                if item is _END:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.exception
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _work(self, stage, inbox, outbox):
+        while True:
+            item = await inbox.get()
+            if item is not _END and not isinstance(item, _Failure):
+                try:
+                    item = await stage.apply(item, self._executor)
+                except Exception as error:
+                    item = _Failure(error)
+            await outbox.put(item)
+            if item is _END or isinstance(item, _Failure):
+                return
+
+
+async def _feed(source, queue):
+    try:
+        async for block in source:
+            await queue.put(block)
+    except Exception as error:
+        await queue.put(_Failure(error))
+    else:
+        await queue.put(_END)
+
+
+def quantize_stage(qformat, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_SATURATE,
+                   offload_threshold=DEFAULT_OFFLOAD_THRESHOLD):
+    """A Stage which quantizes arrays of real numbers into FixedPointArrays.
+
+    Args:
+        qformat: The QFormat of the results, as for quantization.quantize().
+
+        rounding: One of the quantization.ROUNDING_MODES.
+
+        overflow: One of the quantization.OVERFLOW_MODES.
+
+        offload_threshold: As for Stage.
+    """
+    check_rounding(rounding)
+    check_overflow(overflow)
+
+    def convert(values):
+        return FixedPointArray(quantize(values, qformat, rounding, overflow).numerators, qformat)
+
+    return Stage('quantize', convert, offload_threshold)
+
+
+def kernel_stage(func, output_qformat, name='kernel', offload_threshold=DEFAULT_OFFLOAD_THRESHOLD):
+    """A Stage which applies a function of numerators to FixedPointArrays.
+
+    Args:
+        func: A callable taking an array of numerators and returning an array of
+            numerators in output_qformat, such as dsp.FIRFilter.process. Blocks are
+            passed to it one at a time, in order, so it may keep state between them.
+
+        output_qformat: The QFormat of the numerators returned by func.
+
+        name: The name of the stage.
+
+        offload_threshold: As for Stage.
+    """
+    def apply(block):
+        return FixedPointArray(func(block.numerators), output_qformat)
+
+    return Stage(name, apply, offload_threshold)
+
+
+def requantize_stage(qformat, rounding=ROUND_HALF_EVEN, overflow=OVERFLOW_SATURATE,
+                     offload_threshold=DEFAULT_OFFLOAD_THRESHOLD):
+    """A Stage which converts FixedPointArrays to another QFormat.
+
+    Args:
+        qformat: The QFormat of the results.
+
+        rounding: One of the quantization.ROUNDING_MODES, used if qformat has fewer
+            fraction bits than a block.
+
+        overflow: One of the quantization.OVERFLOW_MODES, used if a value is out of
+            the range of qformat.
+
+        offload_threshold: As for Stage.
+    """
+    check_rounding(rounding)
+    check_overflow(overflow)
+
+    def convert(block):
+        return FixedPointArray(requantize(block.numerators, block.qformat, qformat, rounding, overflow).numerators,
+                               qformat)
+
+    return Stage('requantize', convert, offload_threshold)
+
+
+def encode_stage(byteorder='<', offload_threshold=DEFAULT_OFFLOAD_THRESHOLD):
+    """A Stage which encodes FixedPointArrays as bytes.
+
+    Each numerator is encoded as a two's complement integer in the narrowest of 1, 2,
+    4 or 8 bytes which holds the QFormat of the block.
+
+    Args:
+        byteorder: '<' for little-endian or '>' for big-endian.
+
+        offload_threshold: As for Stage.
+    """
+    if byteorder not in ('<', '>'):
+        raise ValueError("Byte order {!r} is not '<' or '>'".format(byteorder))
+
+    def encode(block):
+        dtype = np.dtype(numerator_dtype(block.qformat)).newbyteorder(byteorder)
+        return block.numerators.astype(dtype).tobytes()
+
+    return Stage('encode', encode, offload_threshold)
+
+
+async def read_blocks(reader, block_size, dtype='<f4'):
+    """Read blocks of samples from a stream.
+
+    Args:
+        reader: An asyncio.StreamReader.
+
+        block_size: The number of samples in each block. The last block may be shorter.
+
+        dtype: The NumPy dtype of the samples in the stream.
+
+    Yields:
+        One-dimensional NumPy arrays of samples.
+
+    Raises:
+        ValueError: If the stream ends part way through a sample.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    while True:
+        try:
+            data = await reader.readexactly(block_size * itemsize)
+        except asyncio.IncompleteReadError as error:
+            data = error.partial
+            if len(data) % itemsize:
+                raise ValueError("The stream ended part way through a sample") from error
+            if data:
+                yield np.frombuffer(data, dtype)
+            return
+        yield np.frombuffer(data, dtype)
+
+
+async def write_blocks(writer, source):
+    """Write blocks of bytes to a stream, waiting for it to drain after each.
+
+    Args:
+        writer: An asyncio.StreamWriter.
+
+        source: An asynchronous iterable of bytes, such as the output of a Pipeline
+            ending with encode_stage().
+
+    Returns:
+        The number of bytes written.
+    """
+    count = 0
+    async for data in source:
+        writer.write(data)
+        await writer.drain()
+        count += len(data)
+    return count
@@ -69,7 +69,7 @@ setup(
 
     # You can just specify the packages manually here if your project is
     # simple. Or you can use find_packages().
-    packages=find_packages(exclude=['docs', 'test*']),
+    packages=find_packages(exclude=['docs', 'test*', 'benchmarks*']),
 
     # List run-time dependencies here.  These will be installed by pip when your
     # project is installed. For an analysis of "install_requires" vs pip's
@@ -82,6 +82,9 @@ setup(
     # $ pip install -e .[dev,test]
     extras_require = {
         'doc': ['sphinx'],
+        'numpy': ['numpy'],
+        'pandas': ['numpy', 'pandas'],
+        'arrow': ['numpy', 'pyarrow'],
     },
 
     # If there are data files included in your packages that need to be
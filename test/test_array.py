@@ -0,0 +1,276 @@
+import unittest
+from fractions import Fraction
+
+from fixedpoint import FixedPoint, QFormat, ComplexFixedPoint
+from fixedpoint.complexfixedpoint import MULTIPLY_STANDARD, MULTIPLY_GAUSS
+
+try:
+    import numpy as np
+    from fixedpoint.array import FixedPointArray, ComplexFixedPointArray
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestFixedPointArray(unittest.TestCase):
+
+    def test_from_numerators(self):
+        a = FixedPointArray([16, -8], QFormat(4, 4))
+        self.assertEqual(a.numerators.tolist(), [16, -8])
+        self.assertEqual(a.dtype, np.int8)
+
+    def test_numerators_read_only(self):
+        a = FixedPointArray([16, -8], QFormat(4, 4))
+        with self.assertRaises(ValueError):
+            a.numerators[0] = 1
+
+    def test_numerator_out_of_range(self):
+        with self.assertRaises(OverflowError):
+            FixedPointArray([128], QFormat(4, 4))
+
+    def test_non_integer_numerators(self):
+        with self.assertRaises(TypeError):
+            FixedPointArray([1.5], QFormat(4, 4))
+
+    def test_from_floats(self):
+        a = FixedPointArray.from_values([1.0, -0.5, 0.3], QFormat(4, 4))
+        self.assertEqual(a.numerators.tolist(), [16, -8, 5])
+
+    def test_from_fixed_points(self):
+        a = FixedPointArray.from_values([FixedPoint(1.5), Fraction(-1, 4)], QFormat(4, 4))
+        self.assertEqual(a.numerators.tolist(), [24, -4])
+
+    def test_from_fixed_points_with_rounding_and_overflow(self):
+        values = [Fraction(3, 64), Fraction(-3, 64), Fraction(1, 3), FixedPoint(100), FixedPoint(-100)]
+        for rounding, expected in (('floor', [0, -1, 5, 127, -128]), ('ceiling', [1, 0, 6, 127, -128]),
+                                   ('half_even', [1, -1, 5, 127, -128]), ('toward_zero', [0, 0, 5, 127, -128])):
+            with self.subTest(rounding=rounding):
+                a = FixedPointArray.from_values(values, QFormat(4, 4), rounding, 'saturate')
+                self.assertEqual(a.numerators.tolist(), expected)
+        wrapped = FixedPointArray.from_values([FixedPoint(9)], QFormat(4, 4), overflow='wrap')
+        self.assertEqual(wrapped.numerators.tolist(), [-112])
+        with self.assertRaises(OverflowError):
+            FixedPointArray.from_values([FixedPoint(100)], QFormat(4, 4))
+
+    def test_from_values_with_ties(self):
+        values = [Fraction(1, 32), Fraction(3, 32), Fraction(-1, 32)]
+        for rounding, expected in (('half_even', [0, 2, 0]), ('half_up', [1, 2, 0]), ('half_away', [1, 2, -1])):
+            with self.subTest(rounding=rounding):
+                self.assertEqual(FixedPointArray.from_values(values, QFormat(4, 4), rounding).numerators.tolist(),
+                                 expected)
+
+    def test_wide_qformat(self):
+        a = FixedPointArray([2**70], QFormat(40, 40))
+        self.assertEqual(a.dtype, object)
+        self.assertEqual(a[0], 2**30)
+
+    def test_unsigned(self):
+        qformat = QFormat(0, 16, signed=False)
+        a = FixedPointArray([0, 65535], qformat)
+        self.assertEqual(a.dtype, np.uint16)
+        self.assertEqual(a[1], FixedPoint.from_raw(65535, qformat))
+        with self.assertRaises(OverflowError):
+            FixedPointArray([-1], qformat)
+        self.assertEqual(FixedPointArray.from_values([0.5, -0.5], qformat, overflow='saturate').numerators.tolist(),
+                         [32768, 0])
+
+    def test_unsigned_sixty_four_bits(self):
+        a = FixedPointArray(np.array([1, 2**64 - 1], dtype=np.uint64), QFormat(64, 0, signed=False))
+        self.assertEqual(a.dtype, np.uint64)
+        self.assertEqual(a.max(), 2**64 - 1)
+        self.assertEqual(a.searchsorted([2, 2**64]).tolist(), [1, 2])
+
+    def test_getitem_scalar(self):
+        a = FixedPointArray([[16, -8], [4, 2]], QFormat(4, 4))
+        self.assertEqual(a[0, 1], FixedPoint(-0.5))
+        self.assertEqual(a[0, 1].qformat, QFormat(4, 4))
+
+    def test_getitem_slice(self):
+        a = FixedPointArray([[16, -8], [4, 2]], QFormat(4, 4))
+        self.assertEqual(a[1], FixedPointArray([4, 2], QFormat(4, 4)))
+
+    def test_iteration(self):
+        a = FixedPointArray([16, -8], QFormat(4, 4))
+        self.assertEqual(list(a), [1, -0.5])
+
+    def test_to_float(self):
+        a = FixedPointArray([16, -8], QFormat(4, 4))
+        self.assertEqual(a.to_float().tolist(), [1.0, -0.5])
+
+    def test_tolist(self):
+        a = FixedPointArray([[16], [-8]], QFormat(4, 4))
+        self.assertEqual(a.tolist(), [[FixedPoint(1.0)], [FixedPoint(-0.5)]])
+
+    def test_equality_requires_same_qformat(self):
+        self.assertNotEqual(FixedPointArray([1], QFormat(4, 4)), FixedPointArray([1], QFormat(8, 4)))
+
+    def test_repr(self):
+        a = FixedPointArray([16, -8], QFormat(4, 4))
+        self.assertEqual(repr(a), "FixedPointArray([16, -8], QFormat(4, 4))")
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestOrdering(unittest.TestCase):
+
+    def setUp(self):
+        self.a = FixedPointArray([3, -128, 127, 0, -5, 0], QFormat(4, 4))
+
+    def test_sort(self):
+        self.assertEqual(self.a.sort().numerators.tolist(), [-128, -5, 0, 0, 3, 127])
+        self.assertEqual(self.a.sort().qformat, QFormat(4, 4))
+
+    def test_sort_axis(self):
+        a = FixedPointArray([[3, 1], [-2, 5]], QFormat(8, 0))
+        self.assertEqual(a.sort(axis=0).numerators.tolist(), [[-2, 1], [3, 5]])
+        self.assertEqual(a.sort(axis=None).numerators.tolist(), [-2, 1, 3, 5])
+
+    def test_argsort_is_stable(self):
+        self.assertEqual(self.a.argsort().tolist(), [1, 4, 3, 5, 0, 2])
+
+    def test_sort_wide(self):
+        a = FixedPointArray(np.array([2**90, -2**90, 1], dtype=object), QFormat(100, 0))
+        self.assertEqual(a.sort().numerators.tolist(), [-2**90, 1, 2**90])
+
+    def test_min_max(self):
+        self.assertEqual(self.a.min(), FixedPoint(-8))
+        self.assertEqual(self.a.max(), FixedPoint(7.9375))
+        self.assertEqual(self.a.max().qformat, QFormat(4, 4))
+        a = FixedPointArray([[3, 1], [-2, 5]], QFormat(8, 0))
+        self.assertEqual(a.min(axis=1), FixedPointArray([1, -2], QFormat(8, 0)))
+
+    def test_min_empty(self):
+        with self.assertRaises(ValueError):
+            FixedPointArray(np.zeros(0, dtype=np.int8), QFormat(4, 4)).min()
+
+    def test_unique(self):
+        self.assertEqual(self.a.unique(), FixedPointArray([-128, -5, 0, 3, 127], QFormat(4, 4)))
+        values, counts = self.a.unique(return_counts=True)
+        self.assertEqual(counts.tolist(), [1, 1, 2, 1, 1])
+
+    def test_searchsorted_matches_exact_values(self):
+        a = self.a.sort()
+        exact = [Fraction(value) for value in a]
+        probes = [-9, -8, Fraction(-5, 16), 0, 0.1, 7.9375, 8, FixedPoint(0.1875), FixedPoint(2**-20, QFormat(2, 20))]
+        for probe in probes:
+            for side in ('left', 'right'):
+                expected = sum(1 for x in exact if x < probe or (side == 'right' and x == probe))
+                self.assertEqual(a.searchsorted(probe, side), expected)
+
+    def test_searchsorted_array(self):
+        a = self.a.sort()
+        values = FixedPointArray([1, 0, -1, 2**20, -2**23], QFormat(4, 20))
+        self.assertEqual(a.searchsorted(values).tolist(), [4, 2, 2, 5, 0])
+        self.assertEqual(a.searchsorted(values, side='right').tolist(), [4, 4, 2, 5, 1])
+        self.assertEqual(a.searchsorted([0, 1.0]).tolist(), [2, 5])
+
+    def test_searchsorted_wide(self):
+        a = FixedPointArray(np.array([-2**90, 1, 2**90], dtype=object), QFormat(100, 0))
+        self.assertEqual(a.searchsorted(FixedPoint(2**91)), 3)
+        self.assertEqual(a.searchsorted(1, side='right'), 2)
+
+    def test_searchsorted_invalid(self):
+        with self.assertRaises(ValueError):
+            self.a.searchsorted(0, side='middle')
+        with self.assertRaises(ValueError):
+            FixedPointArray([[1]], QFormat(4, 4)).searchsorted(0)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestComplexFixedPointArray(unittest.TestCase):
+
+    def setUp(self):
+        self.a = ComplexFixedPointArray([6, -8, 3], [-1, 7, 0], QFormat(2, 2))
+        self.b = ComplexFixedPointArray([-32, 12, 5], [12, -32, 31], QFormat(3, 4))
+
+    def check_elementwise(self, result, op, a, b):
+        expected = [op(x, y) for x, y in zip(a, b)]
+        self.assertEqual(result.tolist(), expected)
+        self.assertEqual(result.qformat, expected[0].qformat)
+
+    def test_unsigned_qformat_rejected(self):
+        with self.assertRaises(ValueError):
+            ComplexFixedPointArray([1], [2], QFormat(0, 8, signed=False))
+
+    def test_unsigned_real_operands(self):
+        unsigned = QFormat(2, 2, signed=False)
+        u = FixedPointArray([15, 0, 7], unsigned)
+        scalar = FixedPoint.from_raw(15, unsigned)
+        for operand, values in ((u, list(u)), (scalar, [scalar] * 3)):
+            for op in (lambda x, y: x + y, lambda x, y: y + x, lambda x, y: x - y, lambda x, y: y - x,
+                       lambda x, y: x * y, lambda x, y: y * x):
+                with self.subTest(operand=operand, op=op):
+                    result = op(self.a, operand)
+                    expected = [op(x, y) for x, y in zip(self.a, values)]
+                    self.assertEqual(result.tolist(), expected)
+                    self.assertEqual(result.qformat, expected[0].qformat)
+
+    def test_rational_operands(self):
+        result = self.a * Fraction(1, 4)
+        self.assertIsInstance(result, ComplexFixedPointArray)
+        self.assertEqual(result.tolist(), [x * Fraction(1, 4) for x in self.a])
+        self.assertEqual((Fraction(-3, 2) + self.a).tolist(), [Fraction(-3, 2) + x for x in self.a])
+        with self.assertRaises(TypeError):
+            self.a * Fraction(1, 3)
+
+    def test_from_complex_values(self):
+        z = ComplexFixedPointArray.from_values([1.5 - 0.25j, 0.3j], QFormat(2, 2))
+        self.assertEqual(z.real.numerators.tolist(), [6, 0])
+        self.assertEqual(z.imag.numerators.tolist(), [-1, 1])
+
+    def test_from_complex_fixed_points(self):
+        z = ComplexFixedPointArray.from_values([ComplexFixedPoint(1.5, -0.25), FixedPoint(0.5)], QFormat(4, 4))
+        self.assertEqual(z.tolist(), [ComplexFixedPoint(1.5, -0.25), ComplexFixedPoint(0.5, 0)])
+
+    def test_from_complex_fixed_points_with_rounding_and_overflow(self):
+        z = ComplexFixedPointArray.from_values([ComplexFixedPoint(100, Fraction(3, 64))], QFormat(4, 4),
+                                               rounding='floor', overflow='saturate')
+        self.assertEqual(z.real.numerators.tolist(), [127])
+        self.assertEqual(z.imag.numerators.tolist(), [0])
+
+    def test_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            ComplexFixedPointArray([1, 2], [1], QFormat(4, 4))
+
+    def test_getitem(self):
+        self.assertEqual(self.a[1], ComplexFixedPoint.from_raw(-8, 7, QFormat(2, 2)))
+        self.assertEqual(self.a[1:], ComplexFixedPointArray([-8, 3], [7, 0], QFormat(2, 2)))
+
+    def test_to_complex(self):
+        self.assertEqual(self.a.to_complex().tolist(), [1.5 - 0.25j, -2 + 1.75j, 0.75 + 0j])
+
+    def test_add_and_subtract(self):
+        self.check_elementwise(self.a + self.b, lambda x, y: x + y, self.a, self.b)
+        self.check_elementwise(self.a - self.b, lambda x, y: x - y, self.a, self.b)
+
+    def test_multiply(self):
+        for method in (MULTIPLY_STANDARD, MULTIPLY_GAUSS):
+            self.check_elementwise(self.a.multiply(self.b, method), lambda x, y: x * y, self.a, self.b)
+        self.assertEqual(self.a * self.b, self.a.multiply(self.b))
+
+    def test_multiply_by_scalar(self):
+        scalar = ComplexFixedPoint(0.5, -1)
+        self.check_elementwise(self.a * scalar, lambda x, y: x * y, self.a, [scalar] * 3)
+        self.check_elementwise(2 * self.a, lambda x, y: y * x, self.a, [2] * 3)
+
+    def test_multiply_by_real_array(self):
+        real = FixedPointArray([1, -2, 3], QFormat(4, 0))
+        self.check_elementwise(self.a * real, lambda x, y: x * y, self.a, real)
+
+    def test_multiply_wide(self):
+        qformat = QFormat(30, 30)
+        a = ComplexFixedPointArray([-2**59, 2**59 - 1], [-2**59, 5], qformat)
+        for method in (MULTIPLY_STANDARD, MULTIPLY_GAUSS):
+            self.check_elementwise(a.multiply(a, method), lambda x, y: x * y, a, a)
+
+    def test_negate_and_conjugate(self):
+        self.assertEqual((-self.a).tolist(), [-z for z in self.a])
+        self.assertEqual(self.a.conjugate().tolist(), [z.conjugate() for z in self.a])
+
+    def test_magnitude_squared(self):
+        result = self.a.magnitude_squared()
+        self.assertEqual(result.tolist(), [z.magnitude_squared() for z in self.a])
+        self.assertEqual(result.qformat, QFormat(5, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
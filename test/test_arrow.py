@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    from fixedpoint.array import FixedPointArray
+    from fixedpoint.arrow import FixedPointType, to_arrow, from_arrow
+except ImportError:
+    pa = None
+
+try:
+    import pandas as pd
+    from fixedpoint.pandas_extension import FixedPointExtensionArray
+except ImportError:
+    pd = None
+
+
+def write_ipc(path, table):
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+@unittest.skipIf(pa is None, "pyarrow is not installed")
+class TestFixedPointType(unittest.TestCase):
+
+    def test_storage_type(self):
+        self.assertEqual(FixedPointType(QFormat(4, 4)).storage_type, pa.int8())
+        self.assertEqual(FixedPointType(QFormat(1, 15)).storage_type, pa.int16())
+        self.assertEqual(FixedPointType(QFormat(8, 24)).storage_type, pa.int32())
+        self.assertEqual(FixedPointType(QFormat(16, 48)).storage_type, pa.int64())
+        with self.assertRaises(ValueError):
+            FixedPointType(QFormat(32, 48))
+
+    def test_unsigned_storage_type(self):
+        self.assertEqual(FixedPointType(QFormat(0, 16, signed=False)).storage_type, pa.uint16())
+        self.assertEqual(FixedPointType(QFormat(64, 0, signed=False)).storage_type, pa.uint64())
+        array = to_arrow(FixedPointArray([1, 65535], QFormat(0, 16, signed=False)))
+        self.assertEqual(array.type.__arrow_ext_serialize__(), b'UQ0.16')
+        self.assertEqual(from_arrow(array), FixedPointArray([1, 65535], QFormat(0, 16, signed=False)))
+
+    def test_equality(self):
+        self.assertEqual(FixedPointType(QFormat(1, 15)), FixedPointType(QFormat(1, 15)))
+        self.assertNotEqual(FixedPointType(QFormat(1, 15)), FixedPointType(QFormat(2, 14)))
+        with self.assertRaises(pa.ArrowInvalid):
+            pa.concat_arrays([to_arrow(FixedPointArray([1], QFormat(1, 15))),
+                              to_arrow(FixedPointArray([1], QFormat(2, 14)))])
+
+    def test_scalar(self):
+        array = to_arrow(FixedPointArray([24, -4], QFormat(4, 4)))
+        self.assertEqual(array[0].as_py(), FixedPoint(1.5, QFormat(4, 4)))
+        self.assertEqual(array.to_pylist(), [1.5, -0.25])
+
+
+@unittest.skipIf(pa is None, "pyarrow is not installed")
+class TestConversion(unittest.TestCase):
+
+    def setUp(self):
+        self.values = FixedPointArray(np.arange(-500, 500, dtype=np.int16), QFormat(4, 12))
+
+    def test_to_arrow_shares_numerators(self):
+        array = to_arrow(self.values)
+        self.assertEqual(array.storage.buffers()[1].address, self.values.numerators.ctypes.data)
+        self.assertEqual(array.type.qformat, QFormat(4, 12))
+
+    def test_round_trip_shares_numerators(self):
+        array = to_arrow(self.values).slice(10, 20)
+        result = from_arrow(array)
+        self.assertEqual(result, self.values[10:30])
+        self.assertEqual(result.numerators.ctypes.data, self.values.numerators.ctypes.data + 10 * 2)
+        self.assertFalse(result.numerators.flags.writeable)
+
+    def test_chunked_array(self):
+        chunked = pa.chunked_array([to_arrow(self.values[:100]), to_arrow(self.values[100:])])
+        self.assertEqual(from_arrow(chunked), self.values)
+
+    def test_chunked_array_without_chunks(self):
+        for qformat in (QFormat(4, 12), QFormat(48, 8), QFormat(8, 0, signed=False)):
+            with self.subTest(qformat=qformat):
+                result = from_arrow(pa.chunked_array([], type=FixedPointType(qformat)))
+                self.assertEqual(result, FixedPointArray(np.empty(0, dtype=np.int64), qformat))
+                self.assertEqual(result.qformat, qformat)
+
+    def test_nulls_rejected(self):
+        storage = pa.array([1, None], type=pa.int16())
+        with self.assertRaises(ValueError):
+            from_arrow(pa.ExtensionArray.from_storage(FixedPointType(QFormat(4, 12)), storage))
+
+    def test_out_of_range_rejected(self):
+        storage = pa.array([100], type=pa.int8())
+        with self.assertRaises(OverflowError):
+            from_arrow(pa.ExtensionArray.from_storage(FixedPointType(QFormat(3, 3)), storage))
+
+    def test_wrong_type_rejected(self):
+        with self.assertRaises(TypeError):
+            from_arrow(pa.array([1, 2], type=pa.int16()))
+
+    def test_multidimensional_rejected(self):
+        with self.assertRaises(ValueError):
+            to_arrow(FixedPointArray([[1, 2]], QFormat(4, 4)))
+
+
+@unittest.skipIf(pa is None, "pyarrow is not installed")
+class TestIPC(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'values.arrow')
+        self.a = FixedPointArray([3, -7, 127, -128], QFormat(1, 7))
+        self.b = FixedPointArray(np.array([2**40, -1, 0, 5]), QFormat(48, 8))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_file_round_trip(self):
+        write_ipc(self.path, pa.table({'a': to_arrow(self.a), 'b': to_arrow(self.b)}))
+        with pa.memory_map(self.path) as source:
+            table = pa.ipc.open_file(source).read_all()
+            self.assertEqual(table.schema.field('b').type, FixedPointType(QFormat(48, 8)))
+            self.assertEqual(from_arrow(table['a']), self.a)
+            self.assertEqual(from_arrow(table['b']), self.b)
+
+    def test_memory_mapped_read_is_zero_copy(self):
+        write_ipc(self.path, pa.table({'a': to_arrow(self.a)}))
+        with pa.memory_map(self.path) as source:
+            table = pa.ipc.open_file(source).read_all()
+            allocated = pa.total_allocated_bytes()
+            result = from_arrow(table['a'])
+            self.assertEqual(pa.total_allocated_bytes(), allocated)
+            self.assertEqual(result.numerators.ctypes.data, table['a'].chunk(0).storage.buffers()[1].address)
+
+    def test_qformat_in_field_metadata(self):
+        write_ipc(self.path, pa.table({'a': to_arrow(self.a)}))
+        pa.unregister_extension_type('fixedpoint.fixedpoint')
+        try:
+            with pa.memory_map(self.path) as source:
+                field = pa.ipc.open_file(source).schema.field('a')
+        finally:
+            pa.register_extension_type(FixedPointType(QFormat(1, 0)))
+        self.assertEqual(field.type, pa.int8())
+        self.assertEqual(field.metadata[b'ARROW:extension:name'], b'fixedpoint.fixedpoint')
+        self.assertEqual(field.metadata[b'ARROW:extension:metadata'], b'Q1.7')
+
+    @unittest.skipIf(pd is None, "pandas is not installed")
+    def test_pandas_round_trip(self):
+        df = pd.DataFrame({'x': pd.array([1.5, None, -0.25], dtype='fixedpoint[Q4.4]')})
+        write_ipc(self.path, pa.Table.from_pandas(df))
+        with pa.memory_map(self.path) as source:
+            result = pa.ipc.open_file(source).read_all().to_pandas()
+        self.assertEqual(result['x'].dtype, df['x'].dtype)
+        self.assertEqual(result['x'].isna().tolist(), [False, True, False])
+        self.assertEqual(result['x'][0], 1.5)
+        self.assertIsInstance(result['x'].array, FixedPointExtensionArray)
+
+    @unittest.skipIf(pd is None, "pandas is not installed")
+    def test_empty_column_to_pandas(self):
+        table = pa.table({'x': pa.chunked_array([], type=FixedPointType(QFormat(4, 4)))})
+        self.assertEqual(table['x'].num_chunks, 0)
+        result = table.to_pandas()
+        self.assertEqual(len(result), 0)
+        self.assertEqual(str(result['x'].dtype), 'fixedpoint[Q4.4]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import unittest
+
+from fixedpoint import QFormat
+from benchmarks.imports import measure, forbidden_modules
+from benchmarks.suite import cases, run, retime, compare, load, save, qformat_for_width, Regression, WIDTHS
+
+
+class TestCases(unittest.TestCase):
+
+    def test_every_case_runs(self):
+        for name, func in cases((8, 256)):
+            with self.subTest(name=name):
+                func()
+
+    def test_widths(self):
+        self.assertEqual([qformat_for_width(w) for w in WIDTHS],
+                         [QFormat(4, 4), QFormat(8, 8), QFormat(16, 16), QFormat(32, 32), QFormat(64, 64),
+                          QFormat(128, 128)])
+
+    def test_names_are_unique(self):
+        names = [name for name, _ in cases()]
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_baseline_covers_cases(self):
+        baseline = load(os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'baseline.json'))
+        self.assertEqual(set(baseline['results']), {name for name, _ in cases()})
+
+
+class TestRun(unittest.TestCase):
+
+    def test_filtered_run(self):
+        results = run(widths=(8,), pattern='add', repeat=2, min_time=0.001)
+        self.assertEqual(list(results['results']), ['add[Q4.4]'])
+        self.assertGreater(results['results']['add[Q4.4]'], 0)
+        self.assertGreater(results['calibration'], 0)
+
+    def test_retime_keeps_fastest(self):
+        results = {'results': {'add[Q4.4]': 1.0, 'sub[Q4.4]': 1.0}}
+        retime(results, ['add[Q4.4]'], widths=(8,), repeat=2, min_time=0.001)
+        self.assertLess(results['results']['add[Q4.4]'], 1.0)
+        self.assertEqual(results['results']['sub[Q4.4]'], 1.0)
+        retime(results, ['sub[Q4.4]'], widths=(8,), repeat=2, min_time=0.001)
+        self.assertLess(results['results']['sub[Q4.4]'], 1.0)
+
+    def test_save_and_load(self):
+        results = {'python': '3', 'results': {'add[Q4.4]': 1e-6}}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            save(results, path)
+            self.assertEqual(load(path), results)
+            with open(path) as f:
+                self.assertEqual(json.load(f), results)
+
+
+class TestCompare(unittest.TestCase):
+
+    baseline = {'results': {'add': 1.0, 'mul': 2.0, 'str': 3.0}}
+
+    def test_no_regressions(self):
+        current = {'results': {'add': 1.2, 'mul': 1.0, 'str': 3.0}}
+        self.assertEqual(compare(current, self.baseline, 0.25), [])
+
+    def test_regressions_slowest_first(self):
+        current = {'results': {'add': 1.5, 'mul': 4.0, 'str': 3.0}}
+        regressions = compare(current, self.baseline, 0.25)
+        self.assertEqual([r.name for r in regressions], ['mul', 'add'])
+        self.assertEqual(regressions[0].ratio, 2.0)
+
+    def test_normalized_by_calibration(self):
+        baseline = dict(self.baseline, calibration=1.0)
+        slower_machine = {'calibration': 2.0, 'results': {'add': 2.4, 'mul': 4.0, 'str': 6.0}}
+        self.assertEqual(compare(slower_machine, baseline, 0.25), [])
+        slower_case = {'calibration': 2.0, 'results': {'add': 3.0, 'mul': 4.0, 'str': 6.0}}
+        regressions = compare(slower_case, baseline, 0.25)
+        self.assertEqual(regressions, [Regression('add', 2.0, 3.0, 1.5)])
+
+    def test_calibration_needs_both_results(self):
+        current = {'calibration': 2.0, 'results': {'add': 1.5}}
+        self.assertEqual([r.ratio for r in compare(current, self.baseline, 0.25)], [1.5])
+
+    def test_min_delta(self):
+        baseline = {'results': {'add': 1e-7, 'mul': 1e-6}}
+        current = {'results': {'add': 2e-7, 'mul': 3e-6}}
+        self.assertEqual([r.name for r in compare(current, baseline, 0.25, min_delta=2e-7)], ['mul'])
+        self.assertEqual([r.name for r in compare(current, baseline, 0.25, min_delta=0)], ['mul', 'add'])
+
+    def test_new_cases_ignored(self):
+        current = {'results': {'pow': 100.0}}
+        self.assertEqual(compare(current, self.baseline), [])
+
+
+class TestImports(unittest.TestCase):
+
+    def test_import_loads_no_array_modules(self):
+        seconds, modules = measure('import fixedpoint', repeat=1)
+        self.assertGreater(seconds, 0)
+        self.assertIn('fixedpoint', modules)
+        self.assertEqual(forbidden_modules(modules), [])
+
+    def test_forbidden_modules(self):
+        modules = ['fixedpoint', 'fixedpoint.qformat', 'fixedpoint.array', 'numpy.core', 'numpyish']
+        self.assertEqual(forbidden_modules(modules), ['fixedpoint.array', 'numpy.core'])
+
+
+if __name__ == '__main__':
+    unittest.main()
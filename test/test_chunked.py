@@ -0,0 +1,200 @@
+import os
+import random
+import tempfile
+import unittest
+from fractions import Fraction
+from math import sqrt
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.array import FixedPointArray
+    from fixedpoint.chunked import (NumeratorFile, write_numerators, block_length, iter_blocks, map_blocks,
+                                    reduce_blocks, histogram, peak, error_statistics)
+    from fixedpoint.dsp import FIRFilter
+    from fixedpoint.packed import PackedFixedPointArray
+except ImportError:
+    np = None
+
+
+def random_array(rng, count, qformat):
+    lower, upper = qformat._min_numerator(), qformat._max_numerator()
+    numerators = [rng.randint(lower, upper) for _ in range(count)]
+    return FixedPointArray(np.array(numerators, dtype=object), qformat)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestNumeratorFile(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'values.bin')
+        self.values = random_array(random.Random(50), 1000, QFormat(4, 12))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(write_numerators(self.path, [self.values[:300], self.values[300:]]), 1000)
+        self.assertEqual(os.path.getsize(self.path), 2000)
+        values = NumeratorFile(self.path, QFormat(4, 12))
+        self.assertEqual(len(values), 1000)
+        self.assertIsInstance(values.numerators, np.memmap)
+        self.assertEqual(values[10:20], self.values[10:20])
+        self.assertEqual(values[-1], self.values[-1])
+        self.assertEqual(list(values), list(self.values))
+
+    def test_offset_and_byte_order(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'header')
+            write_numerators(f, [self.values], byteorder='>')
+        values = NumeratorFile(self.path, QFormat(4, 12), length=100, offset=6, byteorder='>')
+        self.assertEqual(values[:], self.values[:100])
+        self.assertEqual(values[:].numerators.dtype, np.dtype(np.int16))
+
+    def test_out_of_range_numerators_are_found_when_read(self):
+        np.array([1, 2, 100], dtype=np.int8).tofile(self.path)
+        values = NumeratorFile(self.path, QFormat(3, 3))
+        self.assertEqual(values[:2], FixedPointArray([1, 2], QFormat(3, 3)))
+        with self.assertRaises(OverflowError):
+            values[1:]
+
+    def test_mixed_qformats_rejected(self):
+        with self.assertRaises(ValueError):
+            write_numerators(self.path, [self.values, FixedPointArray([1], QFormat(8, 8))])
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestBlocks(unittest.TestCase):
+
+    def setUp(self):
+        self.values = random_array(random.Random(51), 1000, QFormat(8, 24))
+
+    def test_block_length(self):
+        self.assertEqual(block_length([QFormat(8, 24)], 4000, read_ahead=False), 1000)
+        self.assertEqual(block_length([QFormat(8, 24)], 4000), 500)
+        self.assertEqual(block_length([QFormat(8, 24), QFormat(1, 7)], 4000), 400)
+        with self.assertRaises(ValueError):
+            block_length([QFormat(8, 24)], 7)
+        with self.assertRaises(ValueError):
+            block_length([QFormat(40, 40)], 1 << 20)
+
+    def test_blocks_cover_sources(self):
+        for read_ahead in (False, True):
+            blocks = list(iter_blocks(self.values, max_memory=1200, read_ahead=read_ahead))
+            step = block_length([QFormat(8, 24)], 1200, read_ahead)
+            self.assertEqual([start for start, _ in blocks], list(range(0, 1000, step)))
+            numerators = np.concatenate([block for _, (block,) in blocks])
+            self.assertTrue(np.array_equal(numerators, self.values.numerators))
+
+    def test_mismatched_sources(self):
+        with self.assertRaises(ValueError):
+            list(iter_blocks(self.values, self.values[1:]))
+        with self.assertRaises(ValueError):
+            list(iter_blocks(FixedPointArray([[1]], QFormat(4, 4))))
+        with self.assertRaises(TypeError):
+            list(iter_blocks())
+
+    def test_read_errors_are_raised(self):
+        packed = PackedFixedPointArray(np.zeros(4, dtype=np.uint8), QFormat(2, 2), 8)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'values.bin')
+            np.array([0] * 100 + [100], dtype=np.int8).tofile(path)
+            values = NumeratorFile(path, QFormat(3, 3))
+            with self.assertRaises(OverflowError):
+                reduce_blocks(lambda count, start, block: count + len(block), 0, values, max_memory=40)
+            del values
+        self.assertEqual(reduce_blocks(lambda count, start, block: count + len(block), 0, packed), 8)
+
+    def test_filter_state_carried_across_blocks(self):
+        rng = random.Random(52)
+        samples = random_array(rng, 2000, QFormat(1, 15))
+        taps = [rng.uniform(-0.05, 0.05) for _ in range(17)]
+
+        def make_filter():
+            return FIRFilter(taps, QFormat(1, 15), QFormat(8, 30), QFormat(1, 15))
+
+        expected = make_filter().process(samples.numerators)
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'samples.bin')
+            output = os.path.join(directory, 'filtered.bin')
+            write_numerators(source, [samples])
+            fir = make_filter()
+            count = write_numerators(output, map_blocks(fir.process, fir.output_qformat,
+                                                        NumeratorFile(source, QFormat(1, 15)), max_memory=1000))
+            self.assertEqual(count, 2000)
+            self.assertTrue(np.array_equal(NumeratorFile(output, QFormat(1, 15))[:].numerators, expected))
+
+    def test_map_blocks_of_several_sources(self):
+        a = FixedPointArray(np.arange(100), QFormat(8, 0))
+        b = PackedFixedPointArray.from_array(FixedPointArray(np.arange(100) % 7, QFormat(4, 0)))
+        blocks = list(map_blocks(lambda x, y: x.astype(np.int16) * y, QFormat(12, 0), a, b, max_memory=64))
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual([int(n) for block in blocks for n in block.numerators],
+                         [i * (i % 7) for i in range(100)])
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestReductions(unittest.TestCase):
+
+    def test_histogram_matches_exact_comparison(self):
+        rng = random.Random(53)
+        edges = [-8, -2.5, Fraction(-1, 3), 0, 0.0625, 3, FixedPoint(7.9375)]
+        for qformat in (QFormat(4, 4), QFormat(4, 28)):
+            values = random_array(rng, 3000, qformat)
+            values = FixedPointArray(np.concatenate((values.numerators, [FixedPoint(7.9375, qformat)._numerator])),
+                                     qformat)
+            expected = [sum(1 for v in values if lower <= v < upper) for lower, upper in zip(edges, edges[1:])]
+            expected[-1] += sum(1 for v in values if v == edges[-1])
+            for read_ahead in (False, True):
+                with self.subTest(qformat=qformat, read_ahead=read_ahead):
+                    counts = histogram(values, edges, max_memory=3000, read_ahead=read_ahead)
+                    self.assertEqual(counts.tolist(), expected)
+
+    def test_histogram_edges_beyond_range(self):
+        for qformat in (QFormat(8, 0, signed=False), QFormat(32, 0, signed=False)):
+            values = FixedPointArray([0, 1, 255], qformat)
+            self.assertEqual(histogram(values, [-1000, 0.5, 255]).tolist(), [1, 2])
+            self.assertEqual(histogram(values, [300, 400]).tolist(), [0])
+            self.assertEqual(histogram(values, [-2, -1, 0]).tolist(), [0, 1])
+        with self.assertRaises(ValueError):
+            histogram(values, [1])
+        with self.assertRaises(ValueError):
+            histogram(values, [1, 1])
+
+    def test_peak(self):
+        values = FixedPointArray([3, -128, 5, -128, 127, 0], QFormat(1, 7))
+        self.assertEqual(peak(values, max_memory=4), (1, FixedPoint(-1, QFormat(1, 7))))
+        self.assertEqual(peak(FixedPointArray([7, 0, -7], QFormat(4, 0))), (0, FixedPoint(7, QFormat(4, 0))))
+        self.assertIsNone(peak(FixedPointArray(np.zeros(0, dtype=np.int8), QFormat(4, 0))))
+
+    def test_error_statistics(self):
+        rng = random.Random(54)
+        for a_qformat, b_qformat in ((QFormat(2, 14), QFormat(1, 7)), (QFormat(32, 32), QFormat(40, 24)),
+                                     (QFormat(0, 8, signed=False), QFormat(1, 15))):
+            with self.subTest(a=a_qformat, b=b_qformat):
+                results = random_array(rng, 500, a_qformat)
+                golden = random_array(rng, 500, b_qformat)
+                errors = [Fraction(r) - Fraction(g) for r, g in zip(results, golden)]
+                statistics = error_statistics(results, golden, max_memory=2000)
+                self.assertEqual(statistics.count, 500)
+                self.assertEqual(statistics.mismatches, sum(1 for e in errors if e))
+                self.assertEqual(Fraction(statistics.max_error), max(abs(e) for e in errors))
+                self.assertEqual(statistics.mean_error, float(sum(errors) / 500))
+                self.assertAlmostEqual(statistics.rms_error, sqrt(sum(e * e for e in errors) / 500))
+
+    def test_error_statistics_of_golden_data(self):
+        golden = random_array(random.Random(55), 100, QFormat(4, 12))
+        statistics = error_statistics(golden, golden)
+        self.assertEqual(statistics, (100, 0, FixedPoint(0), 0.0, 0.0))
+
+    def test_error_statistics_of_nothing(self):
+        empty = FixedPointArray(np.zeros(0, dtype=np.int8), QFormat(4, 4))
+        statistics = error_statistics(empty, empty)
+        self.assertEqual(statistics.count, 0)
+        self.assertNotEqual(statistics.mean_error, statistics.mean_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
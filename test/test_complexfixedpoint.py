@@ -0,0 +1,222 @@
+import pickle
+import random
+import unittest
+from fractions import Fraction
+
+from fixedpoint import FixedPoint, QFormat, ComplexFixedPoint
+from fixedpoint.complexfixedpoint import multiply_numerators, MULTIPLY_STANDARD, MULTIPLY_GAUSS
+
+
+class TestConstruction(unittest.TestCase):
+
+    def test_automatic_qformat(self):
+        z = ComplexFixedPoint(1.5, -0.25)
+        self.assertEqual(z.qformat, QFormat(2, 2))
+        self.assertEqual(z.real, FixedPoint(1.5))
+        self.assertEqual(z.imag, FixedPoint(-0.25))
+
+    def test_specific_qformat(self):
+        z = ComplexFixedPoint(0.3, 0.6, QFormat(1, 4))
+        self.assertEqual((z.real.qformat, z.imag.qformat), (QFormat(1, 4), QFormat(1, 4)))
+        self.assertEqual(complex(z), complex(0.3125, 0.625))
+
+    def test_unsigned_qformat_rejected(self):
+        with self.assertRaises(ValueError):
+            ComplexFixedPoint(0.5, 0.25, QFormat(0, 8, signed=False))
+        with self.assertRaises(ValueError):
+            ComplexFixedPoint.from_raw(1, 2, QFormat(0, 8, signed=False))
+
+    def test_unsigned_parts_promoted_to_signed(self):
+        part = FixedPoint(0.5, QFormat(0, 8, signed=False))
+        self.assertEqual(ComplexFixedPoint(part, part).qformat, QFormat(1, 8))
+
+    def test_from_complex(self):
+        self.assertEqual(ComplexFixedPoint(1.5 - 2j), ComplexFixedPoint(1.5, -2))
+
+    def test_complex_real_part_with_imaginary_part(self):
+        with self.assertRaises(TypeError):
+            ComplexFixedPoint(1j, 1)
+
+    def test_overflow(self):
+        with self.assertRaises(OverflowError):
+            ComplexFixedPoint(0, 2, QFormat(2, 4))
+
+    def test_from_raw(self):
+        z = ComplexFixedPoint.from_raw(3, -5, QFormat(4, 2))
+        self.assertEqual(z, ComplexFixedPoint(0.75, -1.25))
+
+    def test_from_raw_non_integer(self):
+        with self.assertRaises(TypeError):
+            ComplexFixedPoint.from_raw(3, 0.5, QFormat(4, 2))
+
+    def test_repr_and_str(self):
+        z = ComplexFixedPoint(1.5, -0.25)
+        self.assertEqual(repr(z), 'ComplexFixedPoint(1.5, -0.25, QFormat(2, 2))')
+        self.assertEqual(str(z), '(1.5-0.25j)')
+        self.assertEqual(str(ComplexFixedPoint(0, 2)), '(0+2j)')
+
+    def test_pickle(self):
+        z = ComplexFixedPoint(1.5, -0.25, QFormat(8, 8))
+        w = pickle.loads(pickle.dumps(z))
+        self.assertEqual(w, z)
+        self.assertEqual(w.qformat, QFormat(8, 8))
+
+    def test_unhashable(self):
+        with self.assertRaises(TypeError):
+            hash(ComplexFixedPoint(1, 1))
+
+
+class TestEquality(unittest.TestCase):
+
+    def test_equal_across_qformats(self):
+        self.assertEqual(ComplexFixedPoint(1, 2, QFormat(4, 0)), ComplexFixedPoint(1, 2, QFormat(8, 8)))
+
+    def test_equal_to_numbers(self):
+        self.assertEqual(ComplexFixedPoint(1.5, 0), FixedPoint(1.5))
+        self.assertEqual(FixedPoint(1.5), ComplexFixedPoint(1.5, 0))
+        self.assertEqual(ComplexFixedPoint(1.5, 0.5), 1.5 + 0.5j)
+        self.assertEqual(ComplexFixedPoint(3, 0), 3)
+        self.assertNotEqual(ComplexFixedPoint(3, 1), 3)
+
+    def test_bool(self):
+        self.assertFalse(ComplexFixedPoint(0, 0))
+        self.assertTrue(ComplexFixedPoint(0, 0.5))
+
+
+class TestArithmetic(unittest.TestCase):
+
+    def setUp(self):
+        self.a = ComplexFixedPoint(1.5, -0.25)
+        self.b = ComplexFixedPoint(-2, 0.75, QFormat(3, 4))
+
+    def test_add(self):
+        result = self.a + self.b
+        self.assertEqual(result, ComplexFixedPoint(-0.5, 0.5))
+        self.assertEqual(result.qformat, QFormat(4, 4))
+
+    def test_add_real(self):
+        self.assertEqual(self.a + 1, ComplexFixedPoint(2.5, -0.25))
+        self.assertEqual(1 + self.a, ComplexFixedPoint(2.5, -0.25))
+        self.assertEqual(FixedPoint(0.5) + self.a, ComplexFixedPoint(2, -0.25))
+
+    def test_unsigned_real_operands(self):
+        u = FixedPoint(3, QFormat.from_str('UQ2.0'))
+        c = ComplexFixedPoint(1, 1)
+        self.assertEqual(c + u, ComplexFixedPoint(4, 1))
+        self.assertEqual(u + c, ComplexFixedPoint(4, 1))
+        self.assertEqual(c - u, ComplexFixedPoint(-2, 1))
+        self.assertEqual(u - c, ComplexFixedPoint(2, -1))
+        self.assertEqual(c * u, ComplexFixedPoint(3, 3))
+        self.assertEqual(u * c, ComplexFixedPoint(3, 3))
+        self.assertEqual((c * u).qformat, c.multiply(ComplexFixedPoint(u)).qformat)
+
+    def test_dyadic_rational_operands(self):
+        quarter = Fraction(1, 4)
+        for op, expected in ((lambda x, y: x * y, ComplexFixedPoint(0.375, -0.0625)),
+                             (lambda x, y: y * x, ComplexFixedPoint(0.375, -0.0625)),
+                             (lambda x, y: x + y, ComplexFixedPoint(1.75, -0.25)),
+                             (lambda x, y: y - x, ComplexFixedPoint(-1.25, 0.25)),
+                             (lambda x, y: x / y, ComplexFixedPoint(6, -1))):
+            with self.subTest(expected=expected):
+                result = op(self.a, quarter)
+                self.assertIsInstance(result, ComplexFixedPoint)
+                self.assertEqual(result, expected)
+                self.assertEqual(result.qformat, op(self.a, FixedPoint(quarter)).qformat)
+
+    def test_non_dyadic_rational_operands(self):
+        for op in (lambda x, y: x * y, lambda x, y: y * x, lambda x, y: x + y, lambda x, y: y - x,
+                   lambda x, y: x / y, lambda x, y: x.multiply(y)):
+            with self.assertRaises(TypeError):
+                op(self.a, Fraction(1, 3))
+
+    def test_subtract(self):
+        self.assertEqual(self.a - self.b, ComplexFixedPoint(3.5, -1))
+        self.assertEqual(self.a - 3, ComplexFixedPoint(-1.5, -0.25))
+        self.assertEqual(3 - self.a, ComplexFixedPoint(1.5, 0.25))
+
+    def test_multiply(self):
+        result = self.a * self.b
+        self.assertEqual(result, complex(self.a) * complex(self.b))
+        self.assertEqual(result.qformat, QFormat(6, 6))
+
+    def test_multiply_by_real(self):
+        self.assertEqual(FixedPoint(2) * self.a, ComplexFixedPoint(3, -0.5))
+        self.assertEqual(self.a * 2, ComplexFixedPoint(3, -0.5))
+
+    def test_multiply_most_negative(self):
+        # Both parts of the product of the most negative values need every integer bit
+        z = ComplexFixedPoint.from_raw(-8, -8, QFormat(4, 0))
+        result = z * z
+        self.assertEqual(result, ComplexFixedPoint(0, 128))
+        self.assertEqual(result.qformat, QFormat(9, 0))
+
+    def test_multiply_methods_agree(self):
+        rng = random.Random(42)
+        qformat = QFormat(40, 60)
+        for _ in range(100):
+            a = ComplexFixedPoint.from_raw(rng.randrange(-2**99, 2**99), rng.randrange(-2**99, 2**99), qformat)
+            b = ComplexFixedPoint.from_raw(rng.randrange(-2**99, 2**99), rng.randrange(-2**99, 2**99), qformat)
+            standard = a.multiply(b, MULTIPLY_STANDARD)
+            gauss = a.multiply(b, MULTIPLY_GAUSS)
+            self.assertEqual(standard, gauss)
+            self.assertEqual(standard.real, a.real * b.real - a.imag * b.imag)
+            self.assertEqual(standard.imag, a.real * b.imag + a.imag * b.real)
+
+    def test_invalid_multiply_method(self):
+        with self.assertRaises(ValueError):
+            self.a.multiply(self.b, 'karatsuba')
+
+    def test_multiply_inexact(self):
+        with self.assertRaises(TypeError):
+            self.a.multiply(0.5)
+
+    def test_builtin_complex_operand(self):
+        self.assertEqual(self.a * 1j, complex(self.a) * 1j)
+        self.assertIsInstance(self.a + 1j, complex)
+
+    def test_divide(self):
+        result = self.a / self.b
+        expected = complex(self.a) / complex(self.b)
+        self.assertAlmostEqual(complex(result), expected, places=3)
+
+    def test_divide_exact(self):
+        self.assertEqual(ComplexFixedPoint(3, 1) / ComplexFixedPoint(1, 1), ComplexFixedPoint(2, -1))
+
+    def test_divide_by_zero(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.a / ComplexFixedPoint(0, 0)
+
+    def test_power(self):
+        self.assertEqual(self.a ** 3, self.a * self.a * self.a)
+        self.assertEqual(self.a ** 0, 1)
+        self.assertAlmostEqual(complex(self.a ** -1), 1 / complex(self.a), places=2)
+
+    def test_negate(self):
+        z = ComplexFixedPoint.from_raw(-8, 7, QFormat(4, 0))
+        self.assertEqual(-z, ComplexFixedPoint(8, -7))
+        self.assertEqual((-z).qformat, QFormat(5, 0))
+
+    def test_conjugate(self):
+        z = ComplexFixedPoint.from_raw(3, -8, QFormat(4, 0))
+        self.assertEqual(z.conjugate(), ComplexFixedPoint(3, 8))
+        self.assertEqual(z.conjugate().qformat, QFormat(5, 0))
+
+    def test_magnitude_squared(self):
+        z = ComplexFixedPoint.from_raw(-8, -8, QFormat(4, 0))
+        self.assertEqual(z.magnitude_squared(), 128)
+        self.assertEqual(z.magnitude_squared().qformat, QFormat(9, 0))
+        self.assertEqual(self.a.magnitude_squared(), FixedPoint(2.3125))
+
+    def test_abs(self):
+        self.assertEqual(abs(ComplexFixedPoint(3, -4)), 5.0)
+
+
+class TestMultiplyNumerators(unittest.TestCase):
+
+    def test_methods_agree(self):
+        for method in (MULTIPLY_STANDARD, MULTIPLY_GAUSS):
+            self.assertEqual(multiply_numerators(1, 2, 3, 4, method), (-5, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+import random
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.dsp import (FIRFilter, BiquadCascade,
+                                DIRECT_FORM_1, DIRECT_FORM_2, DIRECT_FORM_2_TRANSPOSED)
+    from fixedpoint.quantization import ROUND_FLOOR, OVERFLOW_SATURATE, OVERFLOW_WRAP
+except ImportError:
+    np = None
+
+
+def reference_fir(taps, samples, input_qformat, accumulator_qformat, output_qformat):
+    """Filter samples with scalar FixedPoint arithmetic."""
+    history = [FixedPoint(0, input_qformat)] * (len(taps) - 1)
+    outputs = []
+    for numerator in samples:
+        history.append(FixedPoint.from_raw(int(numerator), input_qformat))
+        acc = FixedPoint(0, accumulator_qformat)
+        for tap, sample in zip(taps, reversed(history)):
+            acc = FixedPoint(acc + FixedPoint(tap * sample, accumulator_qformat), accumulator_qformat)
+        outputs.append(FixedPoint(acc, output_qformat)._numerator)
+        history.pop(0)
+    return outputs
+
+
+def reference_biquad_cascade(sections, samples, input_qformat, state_qformats, output_qformat, form):
+    """Filter samples through second-order sections with scalar FixedPoint arithmetic."""
+    signal = [FixedPoint.from_raw(int(numerator), input_qformat) for numerator in samples]
+    for (b0, b1, b2, a1, a2), state_qformat in zip(sections, state_qformats):
+        def q(value):
+            return FixedPoint(value, state_qformat)
+        zero_in, zero = FixedPoint(0, signal[0].qformat), FixedPoint(0, state_qformat)
+        x1 = x2 = zero_in
+        y1 = y2 = w1 = w2 = s1 = s2 = zero
+        output = []
+        for x in signal:
+            if form == DIRECT_FORM_1:
+                y = q(b0*x + b1*x1 + b2*x2 - a1*y1 - a2*y2)
+                x2, x1, y2, y1 = x1, x, y1, y
+            elif form == DIRECT_FORM_2:
+                w = q(x - a1*w1 - a2*w2)
+                y = q(b0*w + b1*w1 + b2*w2)
+                w2, w1 = w1, w
+            else:
+                y = q(b0*x + s1)
+                s1, s2 = q(b1*x - a1*y + s2), q(b2*x - a2*y)
+            output.append(y)
+        signal = output
+    return [FixedPoint(y, output_qformat)._numerator for y in signal]
+
+
+def random_numerators(rng, qformat, count):
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    return [rng.randrange(-2**(num_bits - 1), 2**(num_bits - 1)) for _ in range(count)]
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestFIRFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(1234)
+
+    def test_impulse_response(self):
+        taps = [FixedPoint(0.5, QFormat(1, 7)), FixedPoint(-0.25, QFormat(1, 7)), FixedPoint(0.125, QFormat(1, 7))]
+        fir = FIRFilter(taps, QFormat(1, 7), QFormat(4, 14), QFormat(1, 7))
+        impulse = [64, 0, 0, 0]  # 0.5
+        self.assertEqual(fir.process(impulse).tolist(), [32, -16, 8, 0])
+
+    def test_taps_from_floats(self):
+        fir = FIRFilter([0.5, 0.25], QFormat(4, 4), QFormat(8, 8), QFormat(4, 4))
+        self.assertEqual(fir.taps_qformat, QFormat(1, 2))
+
+    def test_bit_exact_with_full_precision_accumulator(self):
+        taps = [FixedPoint(self.rng.uniform(-1, 1) / 16, QFormat(1, 15)) for _ in range(16)]
+        samples = random_numerators(self.rng, QFormat(1, 15), 200)
+        args = (QFormat(1, 15), QFormat(6, 30), QFormat(1, 15))
+        fir = FIRFilter(taps, *args, overflow=OVERFLOW_SATURATE)
+        reference = reference_fir(taps, samples, *args)
+        self.assertEqual(fir.process(samples).tolist(), reference)
+
+    def test_bit_exact_with_rounded_products(self):
+        taps = [FixedPoint(self.rng.uniform(-1, 1), QFormat(1, 11)) for _ in range(9)]
+        samples = random_numerators(self.rng, QFormat(2, 10), 200)
+        args = (QFormat(2, 10), QFormat(8, 12), QFormat(4, 8))
+        fir = FIRFilter(taps, *args)
+        reference = reference_fir(taps, samples, *args)
+        self.assertEqual(fir.process(samples).tolist(), reference)
+
+    def test_bit_exact_with_wide_accumulator(self):
+        taps = [FixedPoint(self.rng.uniform(-1, 1), QFormat(2, 40)) for _ in range(5)]
+        samples = random_numerators(self.rng, QFormat(2, 40), 50)
+        args = (QFormat(2, 40), QFormat(8, 80), QFormat(4, 40))
+        fir = FIRFilter(taps, *args)
+        reference = reference_fir(taps, samples, *args)
+        self.assertEqual(fir.process(samples).tolist(), reference)
+
+    def test_streaming_matches_single_block(self):
+        taps = [FixedPoint(self.rng.uniform(-1, 1) / 8, QFormat(1, 15)) for _ in range(7)]
+        samples = random_numerators(self.rng, QFormat(1, 15), 100)
+        args = (QFormat(1, 15), QFormat(6, 30), QFormat(1, 15))
+        whole = FIRFilter(taps, *args, overflow=OVERFLOW_SATURATE).process(samples)
+        streaming = FIRFilter(taps, *args, overflow=OVERFLOW_SATURATE)
+        pieces = [streaming.process(samples[i:j]) for i, j in [(0, 3), (3, 3), (3, 50), (50, 51), (51, 100)]]
+        self.assertEqual(np.concatenate(pieces).tolist(), whole.tolist())
+
+    def test_state(self):
+        fir = FIRFilter([1, 1, 1], QFormat(8, 0), QFormat(16, 0), QFormat(16, 0))
+        fir.process([1, 2, 3, 4])
+        self.assertEqual(fir.state.tolist(), [3, 4])
+
+    def test_reset(self):
+        fir = FIRFilter([1, 1], QFormat(8, 0), QFormat(16, 0), QFormat(16, 0))
+        fir.process([5])
+        fir.reset()
+        self.assertEqual(fir.process([1]).tolist(), [1])
+
+    def test_output_rounding_mode(self):
+        fir = FIRFilter([0.5], QFormat(8, 0), QFormat(8, 1), QFormat(8, 0), rounding=ROUND_FLOOR)
+        self.assertEqual(fir.process([3, -3]).tolist(), [1, -2])
+
+    def test_output_overflow_raises(self):
+        fir = FIRFilter([1, 1], QFormat(8, 0), QFormat(16, 0), QFormat(8, 0))
+        with self.assertRaises(OverflowError):
+            fir.process([100, 100])
+
+    def test_output_overflow_saturates(self):
+        fir = FIRFilter([1, 1], QFormat(8, 0), QFormat(16, 0), QFormat(8, 0), overflow=OVERFLOW_SATURATE)
+        self.assertEqual(fir.process([100, 100, -100, -100]).tolist(), [100, 127, 0, -128])
+
+    def test_most_negative_product_is_not_native(self):
+        # The product of the most negative tap and sample is 2**63, which int64 cannot hold
+        tap = FixedPoint(-2**31, QFormat(32, 0))
+        fir = FIRFilter([tap], QFormat(33, 0), QFormat(64, 0), QFormat(64, 0), overflow=OVERFLOW_SATURATE)
+        self.assertEqual(fir.process(np.array([-2**32])).tolist(), [2**63 - 1])
+
+    def test_samples_out_of_range(self):
+        fir = FIRFilter([0.5], QFormat(1, 15), QFormat(2, 30), QFormat(1, 15))
+        with self.assertRaises(OverflowError):
+            fir.process(np.array([2**50]))
+        with self.assertRaises(OverflowError):
+            fir.process([0, -2**15 - 1])
+        self.assertEqual(fir.state.tolist(), [])
+        self.assertEqual(fir.process([-2**15, 2**15 - 1]).tolist(), [-2**14, 2**14])
+
+    def test_accumulator_overflow_wraps(self):
+        fir = FIRFilter([1, 1], QFormat(8, 0), QFormat(8, 0), QFormat(16, 0), overflow=OVERFLOW_WRAP)
+        self.assertEqual(fir.process([100, 100]).tolist(), [100, -56])
+
+    def test_no_taps(self):
+        with self.assertRaises(ValueError):
+            FIRFilter([], QFormat(8, 0), QFormat(16, 0), QFormat(8, 0))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestBiquadCascade(unittest.TestCase):
+
+    coefficient_qformat = QFormat(2, 14)
+
+    def setUp(self):
+        self.rng = random.Random(5678)
+        lowpass = (0.0675, 0.135, 0.0675, -1.143, 0.4128)
+        resonator = (0.25, 0.0, -0.25, -1.5, 0.81)
+        self.sections = [tuple(FixedPoint(c, self.coefficient_qformat) for c in section)
+                         for section in (lowpass, resonator)]
+        self.samples = [n // 4 for n in random_numerators(self.rng, QFormat(1, 15), 300)]
+        self.samples[10] = 2**14  # An impulse, to excite the resonance
+
+    def check_against_reference(self, form, state_qformats):
+        args = (QFormat(1, 15), state_qformats, QFormat(1, 15))
+        cascade = BiquadCascade(self.sections, *args, form=form)
+        reference = reference_biquad_cascade(self.sections, self.samples, *args, form=form)
+        self.assertEqual(cascade.process(self.samples).tolist(), reference)
+
+    def test_direct_form_1(self):
+        self.check_against_reference(DIRECT_FORM_1, [QFormat(4, 20), QFormat(4, 12)])
+
+    def test_direct_form_2(self):
+        self.check_against_reference(DIRECT_FORM_2, [QFormat(6, 20), QFormat(6, 12)])
+
+    def test_direct_form_2_transposed(self):
+        self.check_against_reference(DIRECT_FORM_2_TRANSPOSED, [QFormat(4, 20), QFormat(4, 12)])
+
+    def test_narrow_state_rounds(self):
+        self.check_against_reference(DIRECT_FORM_2_TRANSPOSED, [QFormat(4, 8), QFormat(4, 8)])
+
+    def test_streaming_matches_single_block(self):
+        for form in (DIRECT_FORM_1, DIRECT_FORM_2, DIRECT_FORM_2_TRANSPOSED):
+            with self.subTest(form=form):
+                args = (self.sections, QFormat(1, 15), QFormat(6, 20), QFormat(1, 15), form)
+                whole = BiquadCascade(*args).process(self.samples)
+                streaming = BiquadCascade(*args)
+                pieces = [streaming.process(self.samples[i:j]) for i, j in [(0, 7), (7, 7), (7, 150), (150, 300)]]
+                self.assertEqual(np.concatenate(pieces).tolist(), whole.tolist())
+
+    def test_scipy_style_sections(self):
+        cascade = BiquadCascade([(0.5, 0, 0, 1, -0.5, 0)], QFormat(8, 0), QFormat(8, 8), QFormat(8, 8))
+        self.assertEqual(cascade.process([2, 0, 0]).tolist(), [256, 128, 64])
+
+    def test_unnormalized_section(self):
+        with self.assertRaises(ValueError):
+            BiquadCascade([(0.5, 0, 0, 2, -0.5, 0)], QFormat(8, 0), QFormat(8, 8), QFormat(8, 8))
+
+    def test_state_qformat_count_mismatch(self):
+        with self.assertRaises(ValueError):
+            BiquadCascade(self.sections, QFormat(1, 15), [QFormat(4, 20)], QFormat(1, 15))
+
+    def test_unknown_form(self):
+        with self.assertRaises(ValueError):
+            BiquadCascade(self.sections, QFormat(1, 15), QFormat(4, 20), QFormat(1, 15), form='lattice')
+
+    def test_state_overflow_raises_and_keeps_state(self):
+        cascade = BiquadCascade([(1, 0, 0, -1, 0)], QFormat(8, 0), QFormat(8, 0), QFormat(8, 0))
+        cascade.process([100])
+        with self.assertRaises(OverflowError):
+            cascade.process([100])
+        self.assertEqual(cascade.state, [(100, 0)])
+
+    def test_samples_out_of_range(self):
+        cascade = BiquadCascade([(1, 0, 0, -0.5, 0)], QFormat(8, 0), QFormat(8, 8), QFormat(8, 8))
+        with self.assertRaises(OverflowError):
+            cascade.process([4, 128])
+        self.assertEqual(cascade.state, [(0, 0)])
+
+    def test_state_overflow_saturates(self):
+        cascade = BiquadCascade([(1, 0, 0, -1, 0)], QFormat(8, 0), QFormat(8, 0), QFormat(8, 0),
+                                overflow=OVERFLOW_SATURATE)
+        self.assertEqual(cascade.process([100, 100, 0]).tolist(), [100, 127, 127])
+
+    def test_reset(self):
+        cascade = BiquadCascade([(1, 0, 0, -0.5, 0)], QFormat(8, 0), QFormat(8, 8), QFormat(8, 8))
+        cascade.process([4])
+        cascade.reset()
+        self.assertEqual(cascade.process([0]).tolist(), [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
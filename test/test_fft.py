@@ -0,0 +1,204 @@
+import random
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.fft import (fft, ifft, twiddles, digit_reversed_indices,
+                                SCALE_NONE, SCALE_UNCONDITIONAL, SCALE_BLOCK_FLOATING_POINT)
+    from fixedpoint.quantization import ROUND_FLOOR, OVERFLOW_SATURATE
+except ImportError:
+    np = None
+
+
+def reversed_digits(index, radix, num_digits):
+    result = 0
+    for _ in range(num_digits):
+        index, digit = divmod(index, radix)
+        result = result * radix + digit
+    return result
+
+
+def reference_fft(real, imag, qformat, twiddle_qformat, scaling, radix, inverse=False):
+    """A scalar FixedPoint model of the butterflies computed by fft(), with half-even rounding."""
+    n = len(real)
+    num_digits = {2: n.bit_length() - 1, 4: (n.bit_length() - 1) // 2}[radix]
+    w_real, w_imag = twiddles(n, twiddle_qformat, inverse)
+    w = [(FixedPoint.from_raw(int(r), twiddle_qformat), FixedPoint.from_raw(int(i), twiddle_qformat))
+         for r, i in zip(w_real, w_imag)]
+    x = [None] * n
+    for index in range(n):
+        source = reversed_digits(index, radix, num_digits)
+        x[index] = (FixedPoint.from_raw(int(real[source]), qformat), FixedPoint.from_raw(int(imag[source]), qformat))
+
+    def mul(a, b):
+        return a[0] * b[0] - a[1] * b[1], a[0] * b[1] + a[1] * b[0]
+
+    exponent = 0
+    span = 1
+    while span < n:
+        length = radix * span
+        y = [None] * n
+        for start in range(0, n, length):
+            for k in range(span):
+                indices = [start + p * span + k for p in range(radix)]
+                t = [x[indices[0]]] + [mul(x[indices[p]], w[p * k * (n // length)]) for p in range(1, radix)]
+                rotation = {2: -1, 4: 1j if inverse else -1j}[radix]
+                for q in range(radix):
+                    total_real, total_imag = FixedPoint(0), FixedPoint(0)
+                    for p in range(radix):
+                        factor = rotation ** ((p * q) % radix)
+                        c_real, c_imag = int(round(factor.real)), int(round(factor.imag))
+                        total_real = total_real + c_real * t[p][0] - c_imag * t[p][1]
+                        total_imag = total_imag + c_real * t[p][1] + c_imag * t[p][0]
+                    y[start + q * span + k] = (total_real, total_imag)
+
+        def rounded(shift):
+            scale = FixedPoint(2 ** -shift)
+            return [(FixedPoint(r * scale, qformat), FixedPoint(i * scale, qformat)) for r, i in y]
+
+        if scaling == SCALE_NONE:
+            shift = 0
+        elif scaling == SCALE_UNCONDITIONAL:
+            shift = radix.bit_length() - 1
+        else:
+            shift = 0
+            while True:
+                try:
+                    rounded(shift)
+                    break
+                except OverflowError:
+                    shift += 1
+        x = rounded(shift)
+        exponent += shift
+        span = length
+    return [r._numerator for r, _ in x], [i._numerator for _, i in x], exponent
+
+
+def random_numerators(rng, qformat, count, scale=1):
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    limit = 2**(num_bits - 1) // scale
+    return [rng.randrange(-limit, limit) for _ in range(count)]
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestDigitReversal(unittest.TestCase):
+
+    def test_radix_2(self):
+        self.assertEqual(digit_reversed_indices(8, 2).tolist(), [0, 4, 2, 6, 1, 5, 3, 7])
+
+    def test_radix_4(self):
+        self.assertEqual(digit_reversed_indices(16, 4).tolist(),
+                         [0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15])
+
+    def test_not_a_power_of_radix(self):
+        with self.assertRaises(ValueError):
+            digit_reversed_indices(8, 4)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestFFTBitExact(unittest.TestCase):
+
+    qformat = QFormat(1, 15)
+    twiddle_qformat = QFormat(2, 14)
+
+    def setUp(self):
+        rng = random.Random(97)
+        self.real = random_numerators(rng, self.qformat, 64, scale=2)
+        self.imag = random_numerators(rng, self.qformat, 64, scale=2)
+
+    def check(self, scaling, radix, inverse=False, qformat=None):
+        qformat = qformat or self.qformat
+        transform = ifft if inverse else fft
+        result = transform(self.real, self.imag, qformat, self.twiddle_qformat, scaling=scaling, radix=radix)
+        expected_real, expected_imag, exponent = reference_fft(self.real, self.imag, qformat,
+                                                               self.twiddle_qformat, scaling, radix, inverse)
+        self.assertEqual(result.real.tolist(), expected_real)
+        self.assertEqual(result.imag.tolist(), expected_imag)
+        if inverse:
+            exponent -= 6
+        self.assertEqual(result.exponent, exponent)
+
+    def test_radix_2_unconditional(self):
+        self.check(SCALE_UNCONDITIONAL, 2)
+
+    def test_radix_2_block_floating_point(self):
+        self.check(SCALE_BLOCK_FLOATING_POINT, 2)
+
+    def test_radix_2_unscaled(self):
+        self.check(SCALE_NONE, 2, qformat=QFormat(8, 15))
+
+    def test_radix_4_unconditional(self):
+        self.check(SCALE_UNCONDITIONAL, 4)
+
+    def test_radix_4_block_floating_point(self):
+        self.check(SCALE_BLOCK_FLOATING_POINT, 4)
+
+    def test_radix_2_inverse(self):
+        self.check(SCALE_UNCONDITIONAL, 2, inverse=True)
+
+    def test_radix_4_inverse(self):
+        self.check(SCALE_BLOCK_FLOATING_POINT, 4, inverse=True)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestFFT(unittest.TestCase):
+
+    qformat = QFormat(1, 15)
+
+    def setUp(self):
+        rng = random.Random(31)
+        self.real = random_numerators(rng, self.qformat, 256, scale=4)
+        self.imag = random_numerators(rng, self.qformat, 256, scale=4)
+        self.expected = np.fft.fft((np.array(self.real) + 1j * np.array(self.imag)) / 2**15)
+
+    def values(self, result):
+        return (result.real + 1j * result.imag) * 2.0**(result.exponent - 15)
+
+    def test_close_to_floating_point(self):
+        for radix in (2, 4):
+            for scaling in (SCALE_UNCONDITIONAL, SCALE_BLOCK_FLOATING_POINT):
+                with self.subTest(radix=radix, scaling=scaling):
+                    result = fft(self.real, self.imag, self.qformat, QFormat(2, 22), scaling=scaling, radix=radix)
+                    error = np.abs(self.values(result) - self.expected).max()
+                    self.assertLess(error, 2.0**(result.exponent - 15) * 8)
+
+    def test_round_trip(self):
+        forward = fft(self.real, self.imag, QFormat(10, 15), QFormat(2, 22), scaling=SCALE_NONE)
+        inverse = ifft(forward.real, forward.imag, QFormat(10, 15), QFormat(2, 22), scaling=SCALE_UNCONDITIONAL)
+        self.assertEqual(inverse.exponent, 0)
+        self.assertTrue(np.all(np.abs(inverse.real - np.array(self.real)) <= 1))
+        self.assertTrue(np.all(np.abs(inverse.imag - np.array(self.imag)) <= 1))
+
+    def test_real_input(self):
+        result = fft([2**14, 0, 0, 0], None, self.qformat, scaling=SCALE_NONE)
+        self.assertEqual(result.real.tolist(), [2**14] * 4)
+        self.assertEqual(result.imag.tolist(), [0] * 4)
+
+    def test_rounding_mode(self):
+        result = fft([1, 0], [0, 0], self.qformat, rounding=ROUND_FLOOR)
+        self.assertEqual(result.real.tolist(), [0, 0])
+
+    def test_unscaled_overflow_raises(self):
+        with self.assertRaises(OverflowError):
+            fft([2**14] * 4, None, self.qformat, scaling=SCALE_NONE)
+
+    def test_unscaled_overflow_saturates(self):
+        result = fft([2**14] * 4, None, self.qformat, scaling=SCALE_NONE, overflow=OVERFLOW_SATURATE)
+        self.assertEqual(result.real.tolist(), [2**15 - 1, 0, 0, 0])
+
+    def test_length_not_power_of_radix(self):
+        with self.assertRaises(ValueError):
+            fft([0] * 8, None, self.qformat, radix=4)
+
+    def test_wide_formats(self):
+        qformat = QFormat(8, 40)
+        real = [n << 24 for n in self.real[:16]]
+        result = fft(real, None, qformat, QFormat(2, 30))
+        narrow = fft(self.real[:16], None, self.qformat, QFormat(2, 30))
+        self.assertTrue(np.all(np.abs((result.real >> 24) - narrow.real) <= 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
+from decimal import Decimal, localcontext
 from fractions import Fraction
+import pickle
 import unittest
 from math import trunc, floor, ceil
 
 from fixedpoint import FixedPoint, QFormat
+from fixedpoint.fixedpoint import (flyweight_info, flyweight_clear, FLYWEIGHT_QFORMATS,
+                                   decimal_to_numerator, decimals_to_numerators, numerators_to_decimals,
+                                   sorted_fixed_points)
 
 
 class TestNumerator(unittest.TestCase):
@@ -51,6 +56,271 @@ class TestDenominator(unittest.TestCase):
         self.assertEqual(f.denominator, 8)
 
 
+class TestFromRaw(unittest.TestCase):
+
+    def test_from_raw_positive(self):
+        f = FixedPoint.from_raw(0x58, QFormat(4, 4))
+        self.assertEqual(f, 5.5)
+        self.assertEqual(f.qformat, QFormat(4, 4))
+
+    def test_from_raw_negative(self):
+        f = FixedPoint.from_raw(-3, QFormat(4, 4))
+        self.assertEqual(f, Fraction(-3, 16))
+
+    def test_from_raw_most_negative(self):
+        f = FixedPoint.from_raw(-128, QFormat(4, 4))
+        self.assertEqual(f, -8)
+
+    def test_from_raw_overflow(self):
+        with self.assertRaises(OverflowError):
+            FixedPoint.from_raw(128, QFormat(4, 4))
+
+    def test_from_raw_non_integer(self):
+        with self.assertRaises(TypeError):
+            FixedPoint.from_raw(1.5, QFormat(4, 4))
+
+
+class TestConstructionWithQFormat(unittest.TestCase):
+
+    def test_integer(self):
+        f = FixedPoint(-5, QFormat(4, 4))
+        self.assertEqual(f, -5)
+        self.assertEqual(f.qformat, QFormat(4, 4))
+
+    def test_integer_overflow(self):
+        with self.assertRaises(OverflowError):
+            FixedPoint(8, QFormat(4, 4))
+
+    def test_float_exact(self):
+        f = FixedPoint(-1.125, QFormat(4, 4))
+        self.assertEqual(f, -1.125)
+
+    def test_float_rounded_half_to_even_down(self):
+        f = FixedPoint(2.5, QFormat(4, 0))
+        self.assertEqual(f, 2)
+
+    def test_float_rounded_half_to_even_up(self):
+        f = FixedPoint(-3.5, QFormat(4, 0))
+        self.assertEqual(f, -4)
+
+    def test_float_nan(self):
+        with self.assertRaises(ValueError):
+            FixedPoint(float('nan'), QFormat(4, 4))
+
+    def test_float_infinite(self):
+        with self.assertRaises(ValueError):
+            FixedPoint(float('inf'), QFormat(4, 4))
+
+    def test_fraction_with_binary_expansion(self):
+        f = FixedPoint(Fraction(-5, 4), QFormat(4, 4))
+        self.assertEqual(f, Fraction(-5, 4))
+
+    def test_fraction_without_binary_expansion(self):
+        f = FixedPoint(Fraction(1, 3), QFormat(4, 4))
+        self.assertEqual(f, Fraction(5, 16))
+
+    def test_fraction_rounded(self):
+        f = FixedPoint(Fraction(3, 32), QFormat(4, 4))
+        self.assertEqual(f, Fraction(2, 16))
+
+    def test_fixed_point_rescaled(self):
+        f = FixedPoint(FixedPoint(1.625), QFormat(4, 2))
+        self.assertEqual(f, 1.5)
+        self.assertEqual(f.qformat, QFormat(4, 2))
+
+    def test_same_qformat_returns_same_instance(self):
+        f = FixedPoint(1.625, QFormat(4, 4))
+        self.assertIs(FixedPoint(f, QFormat(4, 4)), f)
+
+    def test_complex_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            FixedPoint(1+1j, QFormat(4, 4))
+
+
+class TestConstructionFromFraction(unittest.TestCase):
+
+    def test_improper_fraction(self):
+        f = FixedPoint(Fraction(5, 4))
+        self.assertEqual(f, Fraction(5, 4))
+
+    def test_negative_fraction(self):
+        f = FixedPoint(Fraction(-3, 8))
+        self.assertEqual(f, Fraction(-3, 8))
+
+    def test_fraction_without_binary_expansion(self):
+        with self.assertRaises(ValueError):
+            FixedPoint(Fraction(1, 3))
+
+
+class TestStr(unittest.TestCase):
+
+    def test_negative_fraction(self):
+        self.assertEqual(str(FixedPoint(-0.25)), '-0.25')
+        self.assertEqual(repr(FixedPoint(-0.75, QFormat(2, 2))), 'FixedPoint(-0.75, QFormat(2, 2))')
+
+    def test_negative_mixed(self):
+        self.assertEqual(str(FixedPoint(-1.25)), '-1.25')
+
+    def test_negative_integer(self):
+        self.assertEqual(str(FixedPoint(-3, QFormat(4, 2))), '-3')
+
+
+class TestDecimal(unittest.TestCase):
+
+    def test_exact(self):
+        f = FixedPoint(Decimal('1.25'))
+        self.assertEqual(f, Fraction(5, 4))
+        self.assertEqual(f.qformat, QFormat(2, 2))
+
+    def test_exact_matches_float(self):
+        for text in ('-0.375', '12.5000', '-1', '1E+3', '0.00', '-2.5'):
+            f = FixedPoint(Decimal(text))
+            g = FixedPoint(float(text))
+            self.assertEqual(f, g)
+            self.assertEqual(f.qformat.integer_bits, g.qformat.integer_bits)
+
+    def test_inexact_without_qformat(self):
+        with self.assertRaises(ValueError):
+            FixedPoint(Decimal('0.1'))
+
+    def test_special_values(self):
+        for text in ('NaN', 'Infinity', '-Infinity'):
+            with self.assertRaises(ValueError):
+                FixedPoint(Decimal(text))
+            with self.assertRaises(ValueError):
+                FixedPoint(Decimal(text), QFormat(8, 8))
+
+    def test_rounded_into_qformat(self):
+        self.assertEqual(FixedPoint(Decimal('0.1'), QFormat(4, 8))._numerator, 26)
+        # Ties round to even, as for other values
+        self.assertEqual(FixedPoint(Decimal('0.375'), QFormat(4, 2))._numerator, 2)
+        self.assertEqual(FixedPoint(Decimal('-0.625'), QFormat(4, 2))._numerator, -2)
+
+    def test_overflow(self):
+        with self.assertRaises(OverflowError):
+            FixedPoint(Decimal('8'), QFormat(4, 4))
+
+    def test_to_decimal(self):
+        self.assertEqual(FixedPoint(-0.75, QFormat(4, 8)).to_decimal().as_tuple(), Decimal('-0.75').as_tuple())
+        self.assertEqual(FixedPoint(96, QFormat(8, 4)).to_decimal().as_tuple(), Decimal('96').as_tuple())
+        self.assertEqual(FixedPoint(0, QFormat(8, 4)).to_decimal(), 0)
+
+    def test_to_decimal_ignores_context(self):
+        f = FixedPoint.from_raw(3**200, QFormat(400, 100))
+        with localcontext() as context:
+            context.prec = 5
+            d = f.to_decimal()
+        self.assertEqual(d.as_integer_ratio(), (3**200, 2**100))
+
+    def test_round_trip(self):
+        for numerator in (-2**70 + 1, -12345, -1, 0, 7, 2**63):
+            f = FixedPoint.from_raw(numerator, QFormat(80, 40))
+            self.assertEqual(FixedPoint(f.to_decimal(), QFormat(80, 40))._numerator, numerator)
+
+    def test_batch(self):
+        values = [Decimal('1.25'), Decimal('-0.1'), Decimal('3')]
+        numerators = decimals_to_numerators(values, QFormat(4, 4))
+        self.assertEqual(numerators, [decimal_to_numerator(value, QFormat(4, 4)) for value in values])
+        self.assertEqual(numerators, [20, -2, 48])
+        self.assertEqual(numerators_to_decimals(numerators, QFormat(4, 4)),
+                         [Decimal('1.25'), Decimal('-0.125'), Decimal('3')])
+
+
+class TestSortKey(unittest.TestCase):
+
+    def test_keys_order_values(self):
+        values = [FixedPoint(1.5), FixedPoint(-0.25, QFormat(4, 8)), FixedPoint(3), FixedPoint(1.5, QFormat(2, 2))]
+        keys = [value.sort_key(8) for value in values]
+        self.assertEqual(keys, [384, -64, 768, 384])
+
+    def test_too_few_fraction_bits(self):
+        with self.assertRaises(ValueError):
+            FixedPoint(0.125).sort_key(2)
+
+    def test_sorted_fixed_points(self):
+        values = [FixedPoint(3), FixedPoint(-0.25, QFormat(4, 8)), FixedPoint(1.5, QFormat(2, 2)), FixedPoint(1.5)]
+        result = sorted_fixed_points(values)
+        self.assertEqual(result, sorted(values))
+        # The sort is stable
+        self.assertIs(result[1], values[2])
+        self.assertIs(result[2], values[3])
+        self.assertEqual(sorted_fixed_points(values, reverse=True), sorted(values, reverse=True))
+
+    def test_sorted_empty(self):
+        self.assertEqual(sorted_fixed_points([]), [])
+
+
+class TestPickle(unittest.TestCase):
+
+    def test_round_trip(self):
+        f = FixedPoint(-5.5, QFormat(8, 4))
+        g = pickle.loads(pickle.dumps(f))
+        self.assertEqual(g, f)
+        self.assertEqual(g.qformat, QFormat(8, 4))
+
+    def test_qformat_is_interned(self):
+        q = QFormat(13, 7)
+        self.assertIs(pickle.loads(pickle.dumps(q)), q)
+
+    def test_all_protocols(self):
+        f = FixedPoint(2**100 + 0.25)
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            self.assertEqual(pickle.loads(pickle.dumps(f, protocol)), f)
+
+
+class TestFlyweight(unittest.TestCase):
+
+    def setUp(self):
+        flyweight_clear()
+
+    def test_small_integers_shared(self):
+        self.assertIs(FixedPoint(7), FixedPoint(7))
+        self.assertIs(FixedPoint(-256), FixedPoint(-256))
+        info = flyweight_info()
+        self.assertEqual((info.hits, info.misses), (2, 2))
+
+    def test_large_integers_not_shared(self):
+        self.assertIsNot(FixedPoint(1000), FixedPoint(1000))
+        self.assertEqual(flyweight_info().currsize, 0)
+
+    def test_operators_share_integer_operands(self):
+        x = FixedPoint(1.5)
+        products = [x * 2, 2 * x]
+        self.assertEqual(flyweight_info()[:2], (1, 1))
+        self.assertEqual(products, [FixedPoint(3), FixedPoint(3)])
+
+    def test_zero_and_one_in_qformat_shared(self):
+        q = QFormat(8, 8)
+        self.assertIs(FixedPoint(0, q), FixedPoint(0, q))
+        self.assertIs(FixedPoint(1, q), FixedPoint(1, q))
+        self.assertEqual(FixedPoint(1, q).qformat, q)
+        self.assertEqual(FixedPoint(1, q)._numerator, 256)
+        self.assertIsNot(FixedPoint(0, q), FixedPoint(0, QFormat(8, 9)))
+
+    def test_one_out_of_range(self):
+        with self.assertRaises(OverflowError):
+            FixedPoint(1, QFormat(1, 15))
+        self.assertEqual(flyweight_info().currsize, 0)
+
+    def test_qformat_constants_bounded(self):
+        for fraction_bits in range(FLYWEIGHT_QFORMATS + 10):
+            FixedPoint(0, QFormat(4, fraction_bits))
+            FixedPoint(1, QFormat(4, fraction_bits))
+        self.assertEqual(flyweight_info().currsize, 2 * FLYWEIGHT_QFORMATS)
+        self.assertLessEqual(flyweight_info().currsize, flyweight_info().maxsize)
+
+    def test_subclasses_not_shared(self):
+        class Sub(FixedPoint):
+            pass
+        self.assertIsInstance(Sub(3), Sub)
+        self.assertIsNot(Sub(3), FixedPoint(3))
+
+    def test_clear(self):
+        FixedPoint(3)
+        flyweight_clear()
+        self.assertEqual(flyweight_info(), (0, 0, flyweight_info().maxsize, 0))
+
+
 class TestEquality(unittest.TestCase):
 
     def test_equal_fixed_point_expecting_true(self):
@@ -688,6 +958,90 @@ class TestFixedPointNegation(unittest.TestCase):
         self.assertIsInstance(b, FixedPoint)
         self.assertEqual(b, FixedPoint(0))
 
+
+class TestUnsignedQFormat(unittest.TestCase):
+
+    def test_from_str(self):
+        qformat = QFormat.from_str('UQ0.16')
+        self.assertIs(qformat, QFormat(0, 16, signed=False))
+        self.assertFalse(qformat.signed)
+        self.assertEqual(str(qformat), 'UQ0.16')
+        self.assertEqual(repr(qformat), 'QFormat(0, 16, signed=False)')
+        self.assertTrue(QFormat.from_str('Q1.15').signed)
+        with self.assertRaises(ValueError):
+            QFormat.from_str('UX1.15')
+
+    def test_distinct_from_signed(self):
+        self.assertIsNot(QFormat(4, 4, signed=False), QFormat(4, 4))
+        self.assertNotEqual(QFormat(4, 4, signed=False), QFormat(4, 4))
+
+    def test_range(self):
+        qformat = QFormat(4, 4, signed=False)
+        self.assertEqual(qformat.check_numerator(255), 255)
+        with self.assertRaises(OverflowError):
+            qformat.check_numerator(256)
+        with self.assertRaises(OverflowError):
+            qformat.check_numerator(-1)
+        self.assertEqual(FixedPoint.from_raw(255, qformat), 15.9375)
+        with self.assertRaises(OverflowError):
+            FixedPoint(-0.0625, qformat)
+
+    def test_pickle(self):
+        qformat = QFormat(3, 9, signed=False)
+        self.assertIs(pickle.loads(pickle.dumps(qformat)), qformat)
+
+    def test_to_signed(self):
+        self.assertIs(QFormat(0, 16, signed=False).to_signed(), QFormat(1, 16))
+        self.assertIs(QFormat(1, 15).to_signed(), QFormat(1, 15))
+
+    def test_from_qformats(self):
+        self.assertEqual(QFormat.from_qformats(QFormat(0, 16, signed=False), QFormat(4, 4, signed=False)),
+                         QFormat(4, 16, signed=False))
+        self.assertEqual(QFormat.from_qformats(QFormat(4, 4, signed=False), QFormat(2, 8)), QFormat(5, 8))
+
+
+class TestUnsignedArithmetic(unittest.TestCase):
+
+    def setUp(self):
+        self.a = FixedPoint.from_raw(0xFFFF, QFormat(0, 16, signed=False))
+        self.b = FixedPoint(12.5, QFormat(4, 4, signed=False))
+        self.c = FixedPoint(-1.5, QFormat(2, 4))
+
+    def check(self, result, expected, qformat):
+        self.assertEqual(result, expected)
+        self.assertEqual(result.qformat, qformat)
+
+    def test_add(self):
+        self.check(self.a + self.b, Fraction(self.a) + Fraction(self.b), QFormat(5, 16, signed=False))
+
+    def test_add_signed(self):
+        self.check(self.b + self.c, 11, QFormat(6, 4))
+
+    def test_subtract(self):
+        self.check(self.a - self.b, Fraction(self.a) - Fraction(self.b), QFormat(6, 16))
+
+    def test_multiply(self):
+        self.check(self.a * self.b, Fraction(self.a) * Fraction(self.b), QFormat(4, 20, signed=False))
+        self.check(self.b * self.b, 156.25, QFormat(8, 8, signed=False))
+
+    def test_multiply_signed(self):
+        self.check(self.b * self.c, -18.75, QFormat(7, 8))
+
+    def test_divide(self):
+        self.check(self.b / FixedPoint(0.0625, QFormat(4, 4, signed=False)), 200, QFormat(8, 8, signed=False))
+
+    def test_divide_signed(self):
+        self.check(self.b / self.c, FixedPoint(Fraction(-25, 3), QFormat(9, 6)), QFormat(9, 6))
+
+    def test_negate(self):
+        self.check(-self.b, -12.5, QFormat(5, 4))
+
+    def test_power(self):
+        self.check(self.b ** 2, 156.25, QFormat(8, 8, signed=False))
+
+    def test_abs(self):
+        self.check(abs(self.b), 12.5, QFormat(4, 4, signed=False))
+
 class TestFixedPointPos(unittest.TestCase):
 
     def test_pos_positive(self):
@@ -0,0 +1,130 @@
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+from fixedpoint import instrumentation
+from fixedpoint.instrumentation import instrumented, snapshot, enable, disable, reset, is_enabled
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def tearDown(self):
+        disable()
+        reset()
+
+    def test_disabled_by_default(self):
+        self.assertFalse(is_enabled())
+
+    def test_no_counts_while_disabled(self):
+        FixedPoint(1.5) * FixedPoint(3)
+        self.assertEqual(snapshot()['allocations'], 0)
+
+    def test_originals_restored(self):
+        add = FixedPoint.__dict__['__add__']
+        new = FixedPoint.__dict__['__new__']
+        rescale = QFormat.__dict__['rescale_numerator']
+        with instrumented():
+            self.assertIsNot(FixedPoint.__dict__['__add__'], add)
+        self.assertIs(FixedPoint.__dict__['__add__'], add)
+        self.assertIs(FixedPoint.__dict__['__new__'], new)
+        self.assertIs(QFormat.__dict__['rescale_numerator'], rescale)
+        self.assertNotIn('__sub__', FixedPoint.__dict__)
+
+    def test_allocations_and_rescales_by_operator(self):
+        a = FixedPoint(1.5)
+        b = FixedPoint(3)
+        previous = a * b  # Keeps the result QFormat interned
+        with instrumented():
+            self.assertEqual(a * b, previous)
+        counts = snapshot()
+        # Both operands are rescaled into the result format, then the result is allocated
+        self.assertEqual(counts['by_operator']['__mul__'], {'allocations': 3, 'rescales': 2})
+        self.assertEqual(counts['allocations'], 3)
+        self.assertEqual(counts['rescales'], 2)
+
+    def test_nested_operations_attributed_to_outermost(self):
+        a = FixedPoint(1.5)
+        with instrumented():
+            a - a
+        self.assertEqual(set(snapshot()['by_operator']), {'__sub__'})
+
+    def test_qformats_interned(self):
+        # Interned QFormats are only retained while referenced
+        existing = QFormat(1001, 3)
+        with instrumented():
+            formats = [QFormat(1001, 3), QFormat(1002, 3), QFormat(1002, 3)]
+        self.assertIs(formats[0], existing)
+        self.assertEqual(snapshot()['qformats_interned'], 1)
+
+    def test_overflows(self):
+        with instrumented():
+            with self.assertRaises(OverflowError):
+                FixedPoint(100, QFormat(2, 2))
+        counts = snapshot()
+        self.assertEqual(counts['overflows'], 1)
+        self.assertEqual(counts['overflows_swallowed'], 0)
+        self.assertEqual(counts['by_operator']['__new__']['overflows'], 1)
+
+    def test_swallowed_overflows(self):
+        def lenient(value):
+            try:
+                return FixedPoint(value, QFormat(2, 2))
+            except OverflowError:
+                return None
+
+        original = FixedPoint.__dict__['__round__']
+        # Route an internally handled overflow through an instrumented operator
+        FixedPoint.__round__ = lambda self, ndigits=None: lenient(100)
+        try:
+            with instrumented():
+                round(FixedPoint(1))
+        finally:
+            FixedPoint.__round__ = original
+        counts = snapshot()
+        self.assertEqual(counts['overflows'], 1)
+        self.assertEqual(counts['overflows_swallowed'], 1)
+
+    def test_call_sites(self):
+        with instrumented(call_sites=True):
+            FixedPoint(1) + FixedPoint(2)
+        sites = snapshot()['by_call_site']
+        self.assertEqual(len(sites), 1)
+        site, counts = sites.popitem()
+        self.assertTrue(site.startswith(__file__.rstrip('c')))
+        self.assertGreater(counts['allocations'], 0)
+
+    def test_no_call_sites_by_default(self):
+        with instrumented():
+            FixedPoint(1) + FixedPoint(2)
+        self.assertEqual(snapshot()['by_call_site'], {})
+
+    def test_reset(self):
+        with instrumented():
+            FixedPoint(1000)
+        reset()
+        self.assertEqual(snapshot()['allocations'], 0)
+
+    def test_counts_accumulate_without_reset(self):
+        with instrumented():
+            FixedPoint(1000)
+        with instrumented(reset_counts=False):
+            FixedPoint(1000)
+        self.assertEqual(snapshot()['allocations'], 2)
+
+    def test_nested_context_keeps_enabled(self):
+        enable()
+        with instrumented():
+            pass
+        self.assertTrue(is_enabled())
+
+    def test_results_unchanged(self):
+        expected = [FixedPoint(1.25) / FixedPoint(3), round(FixedPoint(2.5)), str(FixedPoint(-0.125))]
+        with instrumented(call_sites=True):
+            actual = [FixedPoint(1.25) / FixedPoint(3), round(FixedPoint(2.5)), str(FixedPoint(-0.125))]
+        self.assertEqual(actual, expected)
+
+    def test_events(self):
+        self.assertEqual(set(snapshot()) - {'by_operator', 'by_call_site'}, set(instrumentation.EVENTS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import random
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+from fixedpoint.kernel import trace, rescale, Traced
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def expressions(a, b):
+    return (a + b, a - b, a * b, a / b, -a, abs(b), a ** 2, b ** -1, 3 - a, a - 5, 2 * b,
+            FixedPoint(1.5) - b, (a + b) / (a - b + FixedPoint(0.125)), rescale(a * b, QFormat(3, 3)))
+
+
+def outcome(func, *args):
+    try:
+        return func(*args)
+    except (OverflowError, ZeroDivisionError) as e:
+        return type(e)
+
+
+class TestTraceBitExact(unittest.TestCase):
+
+    qformats = (QFormat(4, 4), QFormat(3, 6))
+
+    def setUp(self):
+        rng = random.Random(34)
+        self.pairs = [(rng.randrange(-128, 128), rng.randrange(-256, 256)) for _ in range(500)]
+        self.pairs += [(-128, -256), (127, 255), (0, 0), (5, 0)]
+
+    def test_every_operation(self):
+        for index in range(len(expressions(FixedPoint(1), FixedPoint(1)))):
+            def func(a, b):
+                return expressions(a, b)[index]
+            kernel = trace(func, *self.qformats)
+            with self.subTest(index=index):
+                for a, b in self.pairs:
+                    x = FixedPoint.from_raw(a, self.qformats[0])
+                    y = FixedPoint.from_raw(b, self.qformats[1])
+                    expected = outcome(func, x, y)
+                    result = outcome(kernel, x, y)
+                    self.assertEqual(result, expected)
+                    if isinstance(expected, FixedPoint):
+                        self.assertEqual(result.qformat, expected.qformat)
+                        self.assertEqual(kernel.evaluate(a, b), expected._numerator)
+
+    def test_output_qformats_match_fixed_point(self):
+        kernel = trace(expressions, *self.qformats)
+        expected = expressions(FixedPoint(1, self.qformats[0]), FixedPoint(1, self.qformats[1]))
+        self.assertEqual(kernel.output_qformats, tuple(e.qformat for e in expected))
+
+    def test_multiply_accumulate(self):
+        mac = trace(lambda acc, x, y: rescale(acc + x * y, QFormat(8, 24)),
+                    QFormat(8, 24), QFormat(1, 15), QFormat(1, 15))
+        self.assertEqual(mac(FixedPoint(0.5), FixedPoint(0.25), FixedPoint(0.5)), FixedPoint(0.625))
+        self.assertEqual(mac.evaluate(2**23, 2**13, 2**14), 10485760)
+
+
+class TestTrace(unittest.TestCase):
+
+    def test_plan(self):
+        kernel = trace(lambda a, b: a * b + 1, QFormat(1, 15), QFormat(2, 14))
+        self.assertEqual(kernel.plan, (('x0', 'input', QFormat(1, 15)),
+                                       ('x1', 'input', QFormat(2, 14)),
+                                       ('t0', 'mul', QFormat(4, 29)),
+                                       ('t1', 'constant', QFormat(2, 0)),
+                                       ('t2', 'add', QFormat(5, 29))))
+        self.assertIn("x0 * x1", kernel.source)
+
+    def test_arguments_converted_to_input_qformats(self):
+        kernel = trace(lambda a: a + a, QFormat(4, 4))
+        self.assertEqual(kernel(1.0625), FixedPoint(2.125, QFormat(5, 4)))
+
+    def test_rescale_overflow(self):
+        kernel = trace(lambda a: rescale(a * a, QFormat(4, 4)), QFormat(4, 4))
+        with self.assertRaises(OverflowError):
+            kernel(FixedPoint(4))
+
+    def test_rescale_outside_trace(self):
+        self.assertEqual(rescale(1.25, QFormat(2, 1)), FixedPoint(1, QFormat(2, 1)))
+
+    def test_comparison_cannot_be_traced(self):
+        with self.assertRaises(TypeError):
+            trace(lambda a: a if a > 0 else -a, QFormat(4, 4))
+
+    def test_float_cannot_be_traced(self):
+        with self.assertRaises(TypeError):
+            trace(lambda a: a * 0.5, QFormat(4, 4))
+
+    def test_must_return_traced_value(self):
+        with self.assertRaises(TypeError):
+            trace(lambda a: FixedPoint(1), QFormat(4, 4))
+
+    def test_wrong_number_of_arguments(self):
+        kernel = trace(lambda a, b: a + b, QFormat(4, 4), QFormat(4, 4))
+        with self.assertRaises(TypeError):
+            kernel(FixedPoint(1))
+        with self.assertRaises(TypeError):
+            kernel(1, 2, 3)
+
+    def test_traced_repr(self):
+        trace(lambda a: self.assertEqual(repr(a), "Traced('x0', QFormat(4, 4))") or a, QFormat(4, 4))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestEvaluateArray(unittest.TestCase):
+
+    def check(self, func, qformats, columns):
+        kernel = trace(func, *qformats)
+        results = kernel.evaluate_array(*columns)
+        for index in range(len(columns[0])):
+            args = [FixedPoint.from_raw(int(column[index]), q) for column, q in zip(columns, qformats)]
+            expected = func(*args)
+            self.assertEqual([int(r[index]) for r in results], [e._numerator for e in expected])
+        return results
+
+    def test_native(self):
+        rng = np.random.default_rng(34)
+        a = rng.integers(-2**15, 2**15, 200)
+        b = rng.integers(1, 2**15, 200)
+        results = self.check(lambda x, y: (x * y - x, x / y, rescale(x * y, QFormat(2, 10))),
+                             (QFormat(1, 15), QFormat(1, 15)), (a, b))
+        self.assertEqual(results[0].dtype, np.int64)
+
+    def test_wide(self):
+        rng = np.random.default_rng(35)
+        a = rng.integers(-2**31, 2**31, 50)
+        results = self.check(lambda x: (x * x * x, x / 3), (QFormat(16, 16),), (a,))
+        self.assertEqual(results[0].dtype, object)
+
+    def test_unsigned_overflow(self):
+        unsigned = QFormat(4, 4, signed=False)
+        with self.assertRaises(OverflowError):
+            trace(lambda a: rescale(a, QFormat(4, 4)), unsigned).evaluate_array([1, 255])
+        with self.assertRaises(OverflowError):
+            trace(lambda a: rescale(a, unsigned), QFormat(4, 4)).evaluate_array([1, -1])
+        self.check(lambda a: (rescale(a, QFormat(5, 4)),), (unsigned,), ([0, 255],))
+
+    def test_overflow(self):
+        kernel = trace(lambda a: rescale(a + a, QFormat(4, 4)), QFormat(4, 4))
+        with self.assertRaises(OverflowError):
+            kernel.evaluate_array([1, 100])
+
+    def test_division_by_zero(self):
+        kernel = trace(lambda a, b: a / b, QFormat(4, 4), QFormat(4, 4))
+        with self.assertRaises(ZeroDivisionError):
+            kernel.evaluate_array([1, 2], [1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
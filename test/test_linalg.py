@@ -0,0 +1,110 @@
+import random
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.array import FixedPointArray
+    from fixedpoint.linalg import matmul, minimal_accumulator_qformat, accumulator_cannot_overflow
+    from fixedpoint.quantization import OVERFLOW_SATURATE
+except ImportError:
+    np = None
+
+
+def reference_matmul(a, b, accumulator_qformat, out_qformat):
+    """Multiply nested lists of FixedPoint with scalar FixedPoint arithmetic."""
+    result = []
+    for row in a:
+        result_row = []
+        for column in zip(*b):
+            acc = FixedPoint(0, accumulator_qformat)
+            for x, y in zip(row, column):
+                acc = FixedPoint(acc + FixedPoint(x * y, accumulator_qformat), accumulator_qformat)
+            result_row.append(FixedPoint(acc, out_qformat)._numerator)
+        result.append(result_row)
+    return result
+
+
+def random_array(rng, shape, qformat):
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    count = int(np.prod(shape))
+    numerators = [rng.randrange(-2**(num_bits - 1), 2**(num_bits - 1)) for _ in range(count)]
+    return FixedPointArray(np.array(numerators, dtype=object).reshape(shape), qformat)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestAccumulatorBounds(unittest.TestCase):
+
+    def test_minimal_accumulator(self):
+        self.assertEqual(minimal_accumulator_qformat(QFormat(1, 7), QFormat(1, 7), 1), QFormat(2, 14))
+        self.assertEqual(minimal_accumulator_qformat(QFormat(1, 7), QFormat(1, 7), 4), QFormat(4, 14))
+
+    def test_minimal_accumulator_cannot_overflow(self):
+        for inner in (1, 2, 3, 100, 1000):
+            qformat = minimal_accumulator_qformat(QFormat(3, 5), QFormat(2, 9), inner)
+            self.assertTrue(accumulator_cannot_overflow(QFormat(3, 5), QFormat(2, 9), inner, qformat))
+
+    def test_narrow_accumulator_can_overflow(self):
+        self.assertFalse(accumulator_cannot_overflow(QFormat(1, 7), QFormat(1, 7), 4, QFormat(3, 14)))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestMatmul(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(2024)
+
+    def check(self, a_qformat, b_qformat, inner, accumulator_qformat, out_qformat, batch=()):
+        a = random_array(self.rng, batch + (3, inner), a_qformat)
+        b = random_array(self.rng, batch + (inner, 4), b_qformat)
+        result = matmul(a, b, accumulator_qformat, out_qformat, overflow=OVERFLOW_SATURATE)
+        self.assertEqual(result.qformat, out_qformat)
+        self.assertEqual(result.shape, batch + (3, 4))
+        if batch:
+            for index in np.ndindex(*batch):
+                expected = reference_matmul(a[index].tolist(), b[index].tolist(), accumulator_qformat, out_qformat)
+                self.assertEqual(result.numerators[index].tolist(), expected)
+        else:
+            expected = reference_matmul(a.tolist(), b.tolist(), accumulator_qformat, out_qformat)
+            self.assertEqual(result.numerators.tolist(), expected)
+
+    def test_exact_native_accumulator(self):
+        acc = minimal_accumulator_qformat(QFormat(1, 15), QFormat(1, 15), 8)
+        self.check(QFormat(1, 15), QFormat(1, 15), 8, acc, QFormat(4, 15))
+
+    def test_rounded_products(self):
+        self.check(QFormat(2, 14), QFormat(1, 15), 6, QFormat(8, 16), QFormat(8, 12))
+
+    def test_blocked_accumulation(self):
+        # Products of 31-bit numerators need 62 bits, so only two fit in a native accumulator
+        acc = minimal_accumulator_qformat(QFormat(1, 30), QFormat(1, 30), 7)
+        self.check(QFormat(1, 30), QFormat(1, 30), 7, acc, QFormat(4, 30))
+
+    def test_python_integer_accumulation(self):
+        acc = minimal_accumulator_qformat(QFormat(2, 40), QFormat(2, 40), 5)
+        self.check(QFormat(2, 40), QFormat(2, 40), 5, acc, QFormat(4, 40))
+
+    def test_stacked_matrices(self):
+        self.check(QFormat(1, 7), QFormat(1, 7), 4, QFormat(4, 14), QFormat(2, 7), batch=(5,))
+
+    def test_accumulator_overflow_raises(self):
+        a = FixedPointArray([[127, 127]], QFormat(8, 0))
+        b = FixedPointArray([[127], [127]], QFormat(8, 0))
+        with self.assertRaises(OverflowError):
+            matmul(a, b, QFormat(15, 0), QFormat(16, 0))
+
+    def test_accumulator_overflow_saturates(self):
+        a = FixedPointArray([[127, 127]], QFormat(8, 0))
+        b = FixedPointArray([[127], [127]], QFormat(8, 0))
+        result = matmul(a, b, QFormat(15, 0), QFormat(16, 0), overflow=OVERFLOW_SATURATE)
+        self.assertEqual(result.numerators.tolist(), [[16383]])
+
+    def test_incompatible_shapes(self):
+        a = FixedPointArray([[1, 2]], QFormat(8, 0))
+        with self.assertRaises(ValueError):
+            matmul(a, a, QFormat(16, 0), QFormat(16, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
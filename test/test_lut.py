@@ -0,0 +1,174 @@
+import math
+import random
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.array import FixedPointArray
+    from fixedpoint.lut import build, LookupTable, INTERPOLATIONS, INTERPOLATION_NONE, INTERPOLATION_LINEAR
+    from fixedpoint.quantization import ROUND_FLOOR
+except ImportError:
+    np = None
+
+
+def sigmoid(x):
+    return 1 / (1 + math.exp(-x))
+
+
+def reference_lookup(func, input_qformat, output_qformat, entries, interpolation, numerator):
+    """A scalar FixedPoint model of a table lookup, with half-even rounding."""
+    low = FixedPoint(-2**(input_qformat.integer_bits - 1) if input_qformat.signed else 0)
+    width = FixedPoint(2**input_qformat.integer_bits) / entries
+    x = FixedPoint.from_raw(numerator, input_qformat)
+    position = (x - low) / width
+    index = math.floor(position)
+    lower = FixedPoint.from_raw(output_qformat._min_numerator(), output_qformat)
+    upper = FixedPoint.from_raw(output_qformat._max_numerator(), output_qformat)
+
+    def sample(i):
+        try:
+            value = func(float(low + i * width))
+        except (ValueError, ZeroDivisionError):
+            return FixedPoint(0, output_qformat)
+        except OverflowError:
+            return upper
+        value = FixedPoint(value)
+        return FixedPoint(max(min(value, upper), lower), output_qformat)
+
+    start = sample(index)
+    if interpolation == INTERPOLATION_NONE:
+        return start._numerator
+    return FixedPoint(start + (sample(index + 1) - start) * (position - index), output_qformat)._numerator
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestLookupTableBitExact(unittest.TestCase):
+
+    input_qformat = QFormat(4, 8)
+    output_qformat = QFormat(1, 15)
+
+    def setUp(self):
+        rng = random.Random(33)
+        self.numerators = [rng.randrange(-2**11, 2**11) for _ in range(200)] + [-2**11, 2**11 - 1, 0]
+
+    def check(self, func, entries, interpolation, input_qformat=None, output_qformat=None):
+        input_qformat = input_qformat or self.input_qformat
+        output_qformat = output_qformat or self.output_qformat
+        numerators = [n + 2**11 + input_qformat._min_numerator() for n in self.numerators]
+        table = LookupTable(func, input_qformat, output_qformat, entries, interpolation)
+        expected = [reference_lookup(func, input_qformat, output_qformat, entries, interpolation, n)
+                    for n in numerators]
+        self.assertEqual([table.lookup_numerator(n) for n in numerators], expected)
+        self.assertEqual(table.lookup_numerators(np.array(numerators)).tolist(), expected)
+
+    def test_tanh_linear(self):
+        self.check(math.tanh, 64, INTERPOLATION_LINEAR)
+
+    def test_sigmoid_linear(self):
+        self.check(sigmoid, 32, INTERPOLATION_LINEAR)
+
+    def test_tanh_nearest(self):
+        self.check(math.tanh, 128, INTERPOLATION_NONE)
+
+    def test_saturating_function(self):
+        self.check(lambda x: x * x, 16, INTERPOLATION_LINEAR)
+
+    def test_exhaustive_table(self):
+        self.check(math.sin, 2**12, INTERPOLATION_LINEAR)
+
+    def test_functions_outside_their_domain(self):
+        for input_qformat in (QFormat(4, 8), QFormat(4, 8, signed=False)):
+            for func in (math.log, lambda x: 1 / x, math.exp):
+                for interpolation in INTERPOLATIONS:
+                    with self.subTest(input_qformat=input_qformat, func=func, interpolation=interpolation):
+                        self.check(func, 64, interpolation, input_qformat, QFormat(8, 8))
+
+    def test_64_bit_inputs(self):
+        rng = random.Random(64)
+        for input_qformat in (QFormat(32, 32), QFormat(32, 32, signed=False)):
+            low = input_qformat._min_numerator()
+            high = input_qformat._max_numerator()
+            numerators = [low, high, low + 1, high - 1, 0, 2**63 + 2**58 if low == 0 else -2**58]
+            numerators += [rng.randint(low, high) for _ in range(100)]
+            for interpolation in INTERPOLATIONS:
+                with self.subTest(input_qformat=input_qformat, interpolation=interpolation):
+                    table = LookupTable(math.atan, input_qformat, self.output_qformat, 16, interpolation)
+                    x = FixedPointArray(np.array(numerators, dtype=np.uint64 if low == 0 else np.int64), input_qformat)
+                    self.assertEqual(table.lookup_numerators(x.numerators).tolist(),
+                                     [table.lookup_numerator(n) for n in numerators])
+                    self.assertEqual(table(x).tolist(), [table(v) for v in x])
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestLookupTable(unittest.TestCase):
+
+    def setUp(self):
+        build.cache_clear()
+
+    def test_scalar(self):
+        table = build(math.tanh, QFormat(4, 12), QFormat(1, 15), 256)
+        result = table(FixedPoint(0.5))
+        self.assertEqual(result.qformat, QFormat(1, 15))
+        self.assertAlmostEqual(float(result), math.tanh(0.5), delta=2**-12)
+
+    def test_array(self):
+        table = build(sigmoid, QFormat(4, 12), QFormat(1, 15), 256)
+        x = FixedPointArray.from_values(np.linspace(-8, 7.9, 100), QFormat(4, 12))
+        result = table(x)
+        self.assertEqual(result.qformat, QFormat(1, 15))
+        self.assertEqual(result.tolist(), [table(v) for v in x])
+        expected = 1 / (1 + np.exp(-x.to_float()))
+        self.assertLess(np.abs(result.to_float() - expected).max(), 2**-12)
+
+    def test_array_in_other_qformat(self):
+        table = build(math.tanh, QFormat(4, 12), QFormat(1, 15), 256)
+        x = FixedPointArray.from_values([0.25, -1.5], QFormat(8, 8))
+        self.assertEqual(table(x).tolist(), [table(FixedPoint(0.25)), table(FixedPoint(-1.5))])
+
+    def test_log_domain(self):
+        table = build(lambda x: math.log(x) if x > 0 else -math.inf, QFormat(8, 8), QFormat(8, 8), 1024)
+        self.assertAlmostEqual(float(table(FixedPoint(10))), math.log(10), delta=2**-7)
+        self.assertEqual(table(FixedPoint(-1)), FixedPoint(-128))
+
+    def test_overflowing_function_saturates(self):
+        table = build(math.exp, QFormat(12, 0), QFormat(8, 8), 64)
+        self.assertEqual(table(FixedPoint(2000)), FixedPoint.from_raw(2**15 - 1, QFormat(8, 8)))
+        self.assertEqual(table(FixedPoint(-2000)), FixedPoint(0, QFormat(8, 8)))
+
+    def test_registry_reuses_tables(self):
+        first = build(math.tanh, QFormat(4, 12), QFormat(1, 15), 256)
+        second = build(math.tanh, QFormat(4, 12), QFormat(1, 15), 256)
+        self.assertIs(first, second)
+        self.assertEqual(build.cache_info().hits, 1)
+        self.assertIsNot(build(math.tanh, QFormat(4, 12), QFormat(1, 15), 128), first)
+
+    def test_rounding_mode(self):
+        table = LookupTable(lambda x: x / 4, QFormat(4, 0), QFormat(4, 0), 16, INTERPOLATION_NONE, ROUND_FLOOR)
+        self.assertEqual(table(FixedPoint(-1)), FixedPoint(-1))
+
+    def test_wide_output(self):
+        table = LookupTable(lambda x: x * 2**40, QFormat(4, 20), QFormat(50, 13), 16)
+        x = FixedPointArray.from_values([0.5, -3.25], QFormat(4, 20))
+        self.assertEqual(table(x).tolist(), [FixedPoint(2**39), FixedPoint(-3.25 * 2**40)])
+
+    def test_entries_not_power_of_two(self):
+        with self.assertRaises(ValueError):
+            LookupTable(math.tanh, QFormat(4, 12), QFormat(1, 15), 100)
+
+    def test_too_many_entries(self):
+        with self.assertRaises(ValueError):
+            LookupTable(math.tanh, QFormat(2, 2), QFormat(1, 15), 32)
+
+    def test_unknown_interpolation(self):
+        with self.assertRaises(ValueError):
+            LookupTable(math.tanh, QFormat(4, 12), QFormat(1, 15), 16, 'cubic')
+
+    def test_repr(self):
+        table = LookupTable(math.tanh, QFormat(4, 12), QFormat(1, 15), 16)
+        self.assertEqual(repr(table), "LookupTable(tanh, QFormat(4, 12), QFormat(1, 15), 16, interpolation='linear')")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import random
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.array import FixedPointArray
+    from fixedpoint.nn import dense, conv2d, ACTIVATION_RELU
+except ImportError:
+    np = None
+
+
+def reference_neuron(inputs, weights, weight_qformat, x_qformat, bias, out_qformat, relu=False, clamp=None):
+    """One output of a quantized layer, computed with scalar FixedPoint arithmetic."""
+    accumulator_qformat = QFormat(64, x_qformat.fraction_bits + weight_qformat.fraction_bits)
+    acc = FixedPoint(0, accumulator_qformat)
+    for x, w in zip(inputs, weights):
+        acc = acc + FixedPoint.from_raw(int(x), x_qformat) * FixedPoint.from_raw(int(w), weight_qformat)
+    if bias is not None:
+        acc = acc + FixedPoint(bias, accumulator_qformat)
+    y = FixedPoint(acc, QFormat(64, out_qformat.fraction_bits))
+    if relu:
+        y = max(y, FixedPoint(0))
+    if clamp is not None:
+        y = min(max(y, FixedPoint(clamp[0])), FixedPoint(clamp[1]))
+    lower = FixedPoint.from_raw(out_qformat._min_numerator(), out_qformat)
+    upper = FixedPoint.from_raw(out_qformat._max_numerator(), out_qformat)
+    return FixedPoint(min(max(y, lower), upper), out_qformat)._numerator
+
+
+def random_numerators(rng, shape, qformat):
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    count = int(np.prod(shape))
+    return np.array([rng.randrange(-2**(num_bits - 1), 2**(num_bits - 1)) for _ in range(count)]).reshape(shape)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestDense(unittest.TestCase):
+
+    x_qformat = QFormat(1, 7)
+    out_qformat = QFormat(4, 4)
+    weight_qformats = [QFormat(1, 7), QFormat(2, 6), QFormat(0, 8)]
+
+    def setUp(self):
+        rng = random.Random(8)
+        self.x = FixedPointArray(random_numerators(rng, (4, 10), self.x_qformat), self.x_qformat)
+        self.weights = np.stack([random_numerators(rng, (10,), q) for q in self.weight_qformats])
+        self.bias = FixedPointArray(random_numerators(rng, (3,), QFormat(4, 12)), QFormat(4, 12))
+
+    def expected(self, bias=None, relu=False, clamp=None, out_qformat=None):
+        return [[reference_neuron(row, self.weights[c], q, self.x_qformat,
+                                  bias[c] if bias is not None else None, out_qformat or self.out_qformat, relu, clamp)
+                 for c, q in enumerate(self.weight_qformats)]
+                for row in self.x.numerators]
+
+    def test_per_channel_qformats(self):
+        y = dense(self.x, self.weights, self.weight_qformats, self.out_qformat)
+        self.assertEqual(y.qformat, self.out_qformat)
+        self.assertEqual(y.numerators.tolist(), self.expected())
+
+    def test_bias(self):
+        y = dense(self.x, self.weights, self.weight_qformats, self.out_qformat, bias=self.bias)
+        self.assertEqual(y.numerators.tolist(), self.expected(bias=self.bias))
+
+    def test_relu(self):
+        y = dense(self.x, self.weights, self.weight_qformats, self.out_qformat, bias=self.bias,
+                  activation=ACTIVATION_RELU)
+        self.assertEqual(y.numerators.tolist(), self.expected(bias=self.bias, relu=True))
+        self.assertTrue((y.numerators >= 0).all())
+
+    def test_clamp(self):
+        y = dense(self.x, self.weights, self.weight_qformats, self.out_qformat, clamp=(-0.5, 0.75))
+        self.assertEqual(y.numerators.tolist(), self.expected(clamp=(-0.5, 0.75)))
+
+    def test_clamp_beyond_output_range(self):
+        for clamp in ((0, 6), (-100, 0.25), (-100, 100), (0.5, 100)):
+            with self.subTest(clamp=clamp):
+                y = dense(self.x, self.weights, self.weight_qformats, QFormat(1, 7), activation=ACTIVATION_RELU,
+                          clamp=clamp)
+                expected = self.expected(relu=True, clamp=clamp, out_qformat=QFormat(1, 7))
+                self.assertEqual(y.numerators.tolist(), expected)
+
+    def test_single_weight_qformat(self):
+        weights = random_numerators(random.Random(1), (2, 10), QFormat(1, 7))
+        y = dense(self.x, weights, QFormat(1, 7), QFormat(2, 6))
+        self.assertEqual(y.shape, (4, 2))
+
+    def test_saturates_by_default(self):
+        x = FixedPointArray([[127, 127]], QFormat(8, 0))
+        y = dense(x, [[127, 127]], QFormat(8, 0), QFormat(8, 0))
+        self.assertEqual(y.numerators.tolist(), [[127]])
+
+    def test_weight_out_of_range(self):
+        with self.assertRaises(OverflowError):
+            dense(self.x, [[300] * 10], QFormat(8, 0), self.out_qformat)
+
+    def test_qformat_count_mismatch(self):
+        with self.assertRaises(ValueError):
+            dense(self.x, self.weights, self.weight_qformats[:2], self.out_qformat)
+
+    def test_bias_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            dense(self.x, self.weights, self.weight_qformats, self.out_qformat, bias=self.bias[:2])
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestConv2d(unittest.TestCase):
+
+    x_qformat = QFormat(1, 7)
+    out_qformat = QFormat(4, 4)
+    weight_qformats = [QFormat(1, 7), QFormat(2, 6)]
+
+    def setUp(self):
+        rng = random.Random(16)
+        self.x = FixedPointArray(random_numerators(rng, (2, 3, 6, 5), self.x_qformat), self.x_qformat)
+        self.weights = np.stack([random_numerators(rng, (3, 3, 2), q) for q in self.weight_qformats])
+        self.bias = FixedPointArray([17, -40], QFormat(2, 10))
+
+    def expected(self, stride, padding):
+        x = np.pad(self.x.numerators, ((0, 0), (0, 0), (padding, padding), (padding, padding)))
+        out_h = (x.shape[2] - 3) // stride + 1
+        out_w = (x.shape[3] - 2) // stride + 1
+        result = np.zeros((2, 2, out_h, out_w), dtype=np.int64)
+        for n in range(2):
+            for c, q in enumerate(self.weight_qformats):
+                for i in range(out_h):
+                    for j in range(out_w):
+                        field = x[n, :, i * stride:i * stride + 3, j * stride:j * stride + 2]
+                        result[n, c, i, j] = reference_neuron(field.ravel(), self.weights[c].ravel(), q,
+                                                              self.x_qformat, self.bias[c], self.out_qformat,
+                                                              relu=True)
+        return result.tolist()
+
+    def test_unit_stride(self):
+        y = conv2d(self.x, self.weights, self.weight_qformats, self.out_qformat, bias=self.bias,
+                   activation=ACTIVATION_RELU)
+        self.assertEqual(y.shape, (2, 2, 4, 4))
+        self.assertEqual(y.numerators.tolist(), self.expected(1, 0))
+
+    def test_stride_and_padding(self):
+        y = conv2d(self.x, self.weights, self.weight_qformats, self.out_qformat, bias=self.bias,
+                   stride=2, padding=1, activation=ACTIVATION_RELU)
+        self.assertEqual(y.numerators.tolist(), self.expected(2, 1))
+
+    def test_channel_mismatch(self):
+        with self.assertRaises(ValueError):
+            conv2d(self.x, self.weights[:, :2], self.weight_qformats, self.out_qformat)
+
+
+if __name__ == '__main__':
+    unittest.main()
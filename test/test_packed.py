@@ -0,0 +1,144 @@
+import os
+import random
+import tempfile
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.array import FixedPointArray
+    from fixedpoint.packed import pack, unpack, packed_nbytes, PackedFixedPointArray
+except ImportError:
+    np = None
+
+
+def random_numerators(rng, count, qformat):
+    lower, upper = qformat._min_numerator(), qformat._max_numerator()
+    return [rng.randint(lower, upper) for _ in range(count)] + [lower, upper]
+
+
+def reference_bytes(numerators, width):
+    """The packed bytes, built one bit field at a time from Python integers."""
+    packed = 0
+    for index, numerator in enumerate(numerators):
+        packed |= (numerator & ((1 << width) - 1)) << (index * width)
+    return packed.to_bytes(-(-len(numerators) * width // 8), 'little')
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestPack(unittest.TestCase):
+
+    def test_nbytes(self):
+        self.assertEqual(packed_nbytes(QFormat(2, 10), 1000), 1500)
+        self.assertEqual(packed_nbytes(QFormat(8, 16), 1000), 3000)
+        self.assertEqual(packed_nbytes(QFormat(1, 0), 9), 2)
+        with self.assertRaises(ValueError):
+            packed_nbytes(QFormat(40, 40), 1)
+
+    def test_matches_reference_layout(self):
+        rng = random.Random(49)
+        for signed in (True, False):
+            for width in range(1, 65):
+                qformat = QFormat(width // 2, width - width // 2, signed)
+                numerators = random_numerators(rng, 50, qformat)
+                array = np.array(numerators, dtype=object)
+                with self.subTest(qformat=qformat):
+                    packed = pack(array, qformat, block_length=16)
+                    self.assertEqual(packed.tobytes(), reference_bytes(numerators, width))
+                    self.assertEqual(unpack(packed, qformat, len(numerators), block_length=16).tolist(), numerators)
+
+    def test_native_numerators(self):
+        qformat = QFormat(2, 10)
+        numerators = np.arange(-2048, 2048, dtype=np.int16)
+        packed = pack(numerators, qformat)
+        self.assertEqual(packed.nbytes, numerators.nbytes * 3 // 4)
+        result = unpack(packed, qformat, len(numerators))
+        self.assertEqual(result.dtype, np.int16)
+        self.assertTrue(np.array_equal(result, numerators))
+
+    def test_unpack_from_offset(self):
+        qformat = QFormat(4, 8, signed=False)
+        numerators = np.arange(100, dtype=np.uint16) * 41
+        self.assertEqual(unpack(pack(numerators, qformat).tobytes(), qformat, 10, start=37).tolist(),
+                         numerators[37:47].tolist())
+
+    def test_out_of_range(self):
+        with self.assertRaises(OverflowError):
+            pack([2048], QFormat(2, 10))
+        with self.assertRaises(OverflowError):
+            pack([-1], QFormat(2, 10, signed=False))
+
+    def test_short_buffer(self):
+        with self.assertRaises(ValueError):
+            unpack(bytes(14), QFormat(2, 10), 10)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestPackedFixedPointArray(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(490)
+        self.qformat = QFormat(8, 16)
+        self.numerators = random_numerators(rng, 997, self.qformat)
+        self.values = FixedPointArray(self.numerators, self.qformat)
+        self.packed = PackedFixedPointArray.from_array(self.values)
+
+    def test_storage(self):
+        self.assertEqual(len(self.packed), 999)
+        self.assertEqual(self.packed.nbytes, 999 * 3)
+        self.assertFalse(self.packed.buffer.flags.writeable)
+        self.assertEqual(self.packed.to_array(block_length=64), self.values)
+
+    def test_scalar_access(self):
+        for index in (0, 1, 500, 998, -1, -999):
+            self.assertEqual(self.packed[index], FixedPoint.from_raw(self.numerators[index], self.qformat))
+        with self.assertRaises(IndexError):
+            self.packed[999]
+
+    def test_slices(self):
+        self.assertEqual(self.packed[10:20], self.values[10:20])
+        self.assertEqual(self.packed[::-3], self.values[::-3])
+        self.assertEqual(len(self.packed[20:10]), 0)
+
+    def test_index_arrays(self):
+        indices = np.array([[998, 0], [-2, 513]])
+        self.assertEqual(self.packed[indices], self.values[indices])
+        mask = np.arange(999) % 7 == 0
+        self.assertEqual(self.packed[mask], self.values[mask])
+        with self.assertRaises(IndexError):
+            self.packed[np.array([999])]
+
+    def test_blocks(self):
+        blocks = list(self.packed.blocks(100))
+        self.assertEqual([len(block) for block in blocks], [104] * 9 + [63])
+        self.assertEqual(list(self.packed), list(self.values))
+
+    def test_equality_ignores_padding(self):
+        values = FixedPointArray([1, -1, 3], QFormat(2, 1))
+        buffer = pack(values.numerators, values.qformat)
+        buffer[-1] |= 0x80
+        self.assertEqual(PackedFixedPointArray(buffer, values.qformat, 3), PackedFixedPointArray.from_array(values))
+        self.assertNotEqual(PackedFixedPointArray(buffer, values.qformat, 2), PackedFixedPointArray.from_array(values))
+
+    def test_file_is_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'values.bin')
+            with open(path, 'wb') as f:
+                f.write(b'header')
+                self.packed.tofile(f)
+            packed = PackedFixedPointArray.fromfile(path, self.qformat, len(self.packed), offset=6)
+            self.assertIsInstance(packed.buffer.base, np.memmap)
+            self.assertEqual(packed[100:900], self.values[100:900])
+            self.assertEqual(packed[-1], self.values[-1])
+            del packed
+
+    def test_bytes_buffer(self):
+        packed = PackedFixedPointArray(self.packed.buffer.tobytes(), self.qformat, len(self.packed))
+        self.assertEqual(packed, self.packed)
+        with self.assertRaises(ValueError):
+            PackedFixedPointArray(bytes(10), self.qformat, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+import pickle
+import random
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    import pandas as pd
+    from fixedpoint.pandas_extension import FixedPointDtype, FixedPointExtensionArray
+except ImportError:
+    pd = None
+
+
+def random_values(rng, count, qformat):
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    return [FixedPoint.from_raw(rng.randrange(-2**(num_bits - 1), 2**(num_bits - 1)), qformat) for _ in range(count)]
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class TestFixedPointDtype(unittest.TestCase):
+
+    def test_name(self):
+        dtype = FixedPointDtype(QFormat(1, 15))
+        self.assertEqual(dtype.name, 'fixedpoint[Q1.15]')
+        self.assertEqual(dtype, 'fixedpoint[Q1.15]')
+        self.assertNotEqual(dtype, FixedPointDtype(QFormat(2, 15)))
+
+    def test_construct_from_string(self):
+        self.assertEqual(pd.api.types.pandas_dtype('fixedpoint[Q8.24]'), FixedPointDtype(QFormat(8, 24)))
+        with self.assertRaises(TypeError):
+            FixedPointDtype.construct_from_string('fixedpoint')
+
+    def test_unsigned(self):
+        dtype = pd.api.types.pandas_dtype('fixedpoint[UQ0.16]')
+        self.assertEqual(dtype.qformat, QFormat(0, 16, signed=False))
+        self.assertEqual(dtype.name, 'fixedpoint[UQ0.16]')
+        self.assertNotEqual(dtype, FixedPointDtype(QFormat(0, 16)))
+
+    def test_pickle(self):
+        dtype = FixedPointDtype(QFormat(4, 4))
+        self.assertEqual(pickle.loads(pickle.dumps(dtype)), dtype)
+
+    def test_common_dtype(self):
+        a = pd.Series([1], dtype='fixedpoint[Q8.2]')
+        b = pd.Series([0.5], dtype='fixedpoint[Q2.6]')
+        result = pd.concat([a, b], ignore_index=True)
+        self.assertEqual(result.dtype, FixedPointDtype(QFormat(8, 6)))
+        self.assertEqual(list(result), [1, 0.5])
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class TestFixedPointExtensionArray(unittest.TestCase):
+
+    def test_storage(self):
+        array = FixedPointExtensionArray.from_values([1.5, None, -0.25], QFormat(4, 4))
+        self.assertEqual(array.numerators.dtype, np.int8)
+        self.assertEqual(array.numerators.tolist(), [24, 0, -4])
+        self.assertEqual(array.isna().tolist(), [False, True, False])
+        self.assertEqual(array.nbytes, 6)
+
+    def test_wide_storage(self):
+        qformat = QFormat(40, 40)
+        array = FixedPointExtensionArray.from_values([FixedPoint(2**30), FixedPoint(-1)], qformat)
+        self.assertEqual(array.numerators.dtype, object)
+        self.assertEqual(list(array), [2**30, -1])
+
+    def test_from_raw_numerators(self):
+        array = FixedPointExtensionArray([1, 2, 3], QFormat(4, 4), mask=[False, True, False])
+        self.assertEqual(list(array.isna()), [False, True, False])
+        with self.assertRaises(OverflowError):
+            FixedPointExtensionArray([256], QFormat(4, 4))
+        with self.assertRaises(TypeError):
+            FixedPointExtensionArray([1.0], QFormat(4, 4))
+
+    def test_float_quantization(self):
+        array = FixedPointExtensionArray.from_values(np.array([0.03125, np.nan, -0.09375]), QFormat(4, 4))
+        self.assertEqual(array.numerators.tolist(), [0, 0, -2])
+        self.assertEqual(array.isna().tolist(), [False, True, False])
+
+    def test_series(self):
+        s = pd.Series([1.5, -0.25, None], dtype='fixedpoint[Q4.4]')
+        self.assertEqual(s[0], FixedPoint(1.5, QFormat(4, 4)))
+        self.assertIs(s[2], pd.NA)
+        self.assertEqual(s.astype(float).tolist()[:2], [1.5, -0.25])
+        self.assertEqual(s.fillna(FixedPoint(0)).tolist(), [1.5, -0.25, 0])
+        self.assertEqual(s.dropna().tolist(), [1.5, -0.25])
+
+    def test_setitem(self):
+        array = FixedPointExtensionArray.from_values([1, 2, 3], QFormat(4, 4))
+        array[0] = 0.5
+        array[1] = None
+        array[[False, False, True]] = [FixedPoint(-1)]
+        self.assertEqual(list(array.numerators), [8, 0, -16])
+        self.assertEqual(list(array.isna()), [False, True, False])
+
+    def test_take(self):
+        array = FixedPointExtensionArray.from_values([1, 2, 3], QFormat(4, 4))
+        self.assertEqual(list(array.take([2, -1], allow_fill=True).isna()), [False, True])
+        self.assertEqual(list(array.take([2, -1])), [3, 3])
+        self.assertEqual(list(array.take([-1, 0], allow_fill=True, fill_value=FixedPoint(5))), [5, 1])
+
+    def test_astype(self):
+        array = FixedPointExtensionArray.from_values([1.5, -0.25, None], QFormat(4, 4))
+        rounded = array.astype('fixedpoint[Q4.1]')
+        self.assertEqual(rounded.numerators.tolist(), [3, 0, 0])
+        self.assertTrue(rounded.isna()[2])
+        with self.assertRaises(OverflowError):
+            FixedPointExtensionArray.from_values([7], QFormat(4, 4)).astype('fixedpoint[Q2.4]')
+
+    def test_sort_and_factorize(self):
+        s = pd.Series([0.5, None, -1, 0.5, 2], dtype='fixedpoint[Q4.4]')
+        self.assertEqual(s.sort_values().tolist()[:4], [-1, 0.5, 0.5, 2])
+        codes, uniques = pd.factorize(s)
+        self.assertEqual(codes.tolist(), [0, -1, 1, 0, 2])
+        self.assertEqual(list(uniques), [0.5, -1, 2])
+        counts = s.value_counts()
+        self.assertEqual(list(counts.index), [0.5, -1, 2])
+        self.assertEqual(counts.tolist(), [2, 1, 1])
+
+    def test_value_counts(self):
+        s = pd.Series([0.5, None, -1, 0.5, 2, None, 0.5], dtype='fixedpoint[Q4.4]')
+        counts = s.array.value_counts()
+        self.assertEqual(counts.index.dtype, s.dtype)
+        self.assertEqual(list(counts.index), [0.5, -1, 2])
+        self.assertEqual(counts.tolist(), [3, 1, 1])
+        with_missing = s.value_counts(dropna=False)
+        self.assertEqual(with_missing.tolist(), [3, 2, 1, 1])
+        self.assertEqual(with_missing.index.isna().tolist(), [False, True, False, False])
+        self.assertEqual(s.value_counts(normalize=True).tolist(), [0.6, 0.2, 0.2])
+        self.assertEqual(len(pd.Series([], dtype='fixedpoint[Q4.4]').value_counts()), 0)
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class TestArithmetic(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(45)
+        self.a = random_values(rng, 200, QFormat(4, 6))
+        self.b = random_values(rng, 200, QFormat(3, 9))
+        self.a[7] = None
+        self.sa = pd.Series(self.a, dtype='fixedpoint[Q4.6]')
+        self.sb = pd.Series(self.b, dtype='fixedpoint[Q3.9]')
+
+    def check(self, result, expected):
+        qformats = {value.qformat for value in expected if value is not None}
+        self.assertEqual(len(qformats), 1)
+        self.assertEqual(result.dtype, FixedPointDtype(qformats.pop()))
+        self.assertEqual([None if value is pd.NA else value for value in result], expected)
+
+    def test_matches_fixed_point(self):
+        for op in (lambda x, y: x + y, lambda x, y: x - y, lambda x, y: x * y, lambda x, y: x / y):
+            with self.subTest(op=op):
+                expected = [None if x is None else op(x, y) for x, y in zip(self.a, self.b)]
+                self.check(op(self.sa, self.sb), expected)
+
+    def test_scalars(self):
+        for op in (lambda x, y: x + y, lambda x, y: y + x, lambda x, y: y - x, lambda x, y: x * y,
+                   lambda x, y: x / y):
+            for other in (FixedPoint(-1.375), 3):
+                with self.subTest(op=op, other=other):
+                    self.check(op(self.sa, other), [None if x is None else op(x, other) for x in self.a])
+
+    def test_integer_subtrahend(self):
+        self.check(self.sa - 3, [None if x is None else x - 3 for x in self.a])
+
+    def test_negation(self):
+        self.check(-self.sa, [None if x is None else -x for x in self.a])
+
+    def test_float_operand(self):
+        result = self.sa + 0.5
+        self.assertEqual(result.dtype, np.float64)
+        self.assertEqual(result[0], float(self.a[0]) + 0.5)
+        self.assertTrue(np.isnan(result[7]))
+
+    def test_division_by_zero(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.sa / FixedPoint(0)
+
+    def test_wide_product(self):
+        a = pd.Series([FixedPoint(2**40 + 0.5)], dtype='fixedpoint[Q48.8]')
+        result = a * a
+        self.assertEqual(result.dtype, FixedPointDtype(QFormat(97, 16)))
+        self.assertEqual(result[0], FixedPoint(2**40 + 0.5) * FixedPoint(2**40 + 0.5))
+
+    def test_unsigned(self):
+        a = pd.Series([0.5, 0.75, None], dtype='fixedpoint[UQ0.16]')
+        b = pd.Series([0.25, 0.125, 0.5], dtype='fixedpoint[UQ4.4]')
+        self.assertEqual(a.array.numerators.dtype, np.uint16)
+        for op in (lambda x, y: x + y, lambda x, y: x - y, lambda x, y: x * y, lambda x, y: x / y):
+            with self.subTest(op=op):
+                expected = [None if x is pd.NA else op(x, y) for x, y in zip(a, b)]
+                self.check(op(a, b), expected)
+        self.check(-a, [None if x is pd.NA else -x for x in a])
+
+    def test_unsigned_sixty_four_bits(self):
+        a = pd.Series(FixedPointExtensionArray(np.array([2**64 - 1, 1], dtype=np.uint64),
+                                               QFormat(64, 0, signed=False)))
+        self.assertEqual((a + a).tolist(), [2**65 - 2, 2])
+        self.assertEqual(a.sum(), 2**64)
+        self.assertEqual(a.max(), 2**64 - 1)
+
+    def test_comparisons(self):
+        result = self.sa < self.sb
+        self.assertEqual(result.dtype, 'boolean')
+        expected = [None if x is None else x < y for x, y in zip(self.a, self.b)]
+        self.assertEqual([None if value is pd.NA else value for value in result], expected)
+        self.assertEqual((self.sa == self.a[0]).sum(), sum(1 for x in self.a if x is not None and x == self.a[0]))
+        self.assertEqual((self.sa >= 0.25).tolist()[:3], [x >= 0.25 for x in self.a[:3]])
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class TestReductions(unittest.TestCase):
+
+    def setUp(self):
+        self.s = pd.Series([1.5, -0.25, None, 3], dtype='fixedpoint[Q4.4]')
+
+    def test_sum(self):
+        result = self.s.sum()
+        self.assertEqual(result, FixedPoint(4.25))
+        self.assertEqual(result.qformat, QFormat(6, 4))
+        self.assertIs(self.s.sum(skipna=False), pd.NA)
+        self.assertIs(self.s.sum(min_count=4), pd.NA)
+
+    def test_min_max_mean_prod(self):
+        self.assertEqual(self.s.min(), -0.25)
+        self.assertEqual(self.s.max(), 3)
+        self.assertEqual(self.s.mean(), FixedPoint(4.25, QFormat(6, 4)) / 3)
+        self.assertEqual(self.s.prod(), -1.125)
+
+    def test_unsupported(self):
+        with self.assertRaises(TypeError):
+            self.s.std()
+
+    def test_groupby(self):
+        df = pd.DataFrame({'key': ['a', 'b', 'a', 'b', 'c', 'a'],
+                           'value': pd.array([1.5, 2, -0.25, None, None, 3], dtype='fixedpoint[Q4.4]')})
+        grouped = df.groupby('key')['value']
+        sums = grouped.sum()
+        self.assertEqual(sums.dtype, FixedPointDtype(QFormat(6, 4)))
+        self.assertEqual(sums.tolist(), [4.25, 2, 0])
+        self.assertEqual(grouped.sum(min_count=1).isna().tolist(), [False, False, True])
+        self.assertEqual(grouped.min().tolist()[:2], [-0.25, 2])
+        self.assertEqual(grouped.max().tolist()[:2], [3, 2])
+        self.assertIs(grouped.max()['c'], pd.NA)
+        self.assertEqual(grouped.mean()['a'], FixedPoint(4.25, QFormat(6, 4)) / 3)
+        self.assertEqual(grouped.prod()['a'], -1.125)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import random
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.array import FixedPointArray
+    from fixedpoint.parallel import reduce_sum, reduce_dot, minimal_sum_qformat, _tree_combine
+except ImportError:
+    np = None
+
+
+def random_array(rng, count, qformat):
+    num_bits = qformat.integer_bits + qformat.fraction_bits
+    numerators = [rng.randrange(-2**(num_bits - 1), 2**(num_bits - 1)) for _ in range(count)]
+    return FixedPointArray(np.array(numerators, dtype=object), qformat)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestMinimalSumQFormat(unittest.TestCase):
+
+    def test_growth(self):
+        self.assertEqual(minimal_sum_qformat(QFormat(1, 15), 0), QFormat(1, 15))
+        self.assertEqual(minimal_sum_qformat(QFormat(1, 15), 1), QFormat(1, 15))
+        self.assertEqual(minimal_sum_qformat(QFormat(1, 15), 2), QFormat(2, 15))
+        self.assertEqual(minimal_sum_qformat(QFormat(1, 15), 5), QFormat(4, 15))
+
+    def test_most_negative_sum_fits(self):
+        for count in (1, 2, 3, 4, 7, 8, 9):
+            qformat = minimal_sum_qformat(QFormat(3, 2), count)
+            qformat.check_numerator(count * QFormat(3, 2)._min_numerator())
+
+    def test_tree_combine(self):
+        self.assertEqual(_tree_combine([]), 0)
+        self.assertEqual(_tree_combine([5]), 5)
+        self.assertEqual(_tree_combine(range(11)), 55)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestReduceSum(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(40)
+
+    def check(self, qformat, count):
+        values = random_array(self.rng, count, qformat)
+        expected = sum(values.numerators.tolist())
+        results = [reduce_sum(values, workers=workers, chunk_size=chunk_size)
+                   for workers in (1, 2, 3, 8) for chunk_size in (1, 7, 64, 1 << 20)]
+        for result in results:
+            self.assertEqual(result._numerator, expected)
+            self.assertEqual(result.qformat, minimal_sum_qformat(qformat, count))
+
+    def test_native(self):
+        self.check(QFormat(1, 15), 1000)
+
+    def test_blocked_native(self):
+        # Only three 62-bit numerators are proven to fit in a native accumulator
+        self.check(QFormat(2, 60), 100)
+
+    def test_python_integers(self):
+        self.check(QFormat(40, 60), 100)
+
+    def test_narrow_dtype(self):
+        values = FixedPointArray(np.full(1000, 127, dtype=np.int8), QFormat(8, 0))
+        self.assertEqual(reduce_sum(values, workers=4, chunk_size=100), FixedPoint(127000))
+
+    def test_multidimensional(self):
+        values = FixedPointArray([[1, 2], [3, -4]], QFormat(4, 4))
+        self.assertEqual(reduce_sum(values), FixedPoint(0.125))
+
+    def test_empty(self):
+        values = FixedPointArray(np.zeros(0, dtype=np.int16), QFormat(8, 8))
+        result = reduce_sum(values)
+        self.assertEqual(result, 0)
+        self.assertEqual(result.qformat, QFormat(8, 8))
+
+    def test_executor(self):
+        values = random_array(self.rng, 500, QFormat(4, 12))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = reduce_sum(values, chunk_size=32, executor=executor)
+        self.assertEqual(result._numerator, sum(values.numerators.tolist()))
+
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(ValueError):
+            reduce_sum(FixedPointArray([1], QFormat(8, 0)), chunk_size=0)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestReduceDot(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(41)
+
+    def check(self, a_qformat, b_qformat, count):
+        a = random_array(self.rng, count, a_qformat)
+        b = random_array(self.rng, count, b_qformat)
+        expected = sum(FixedPoint.from_raw(x, a_qformat) * FixedPoint.from_raw(y, b_qformat)
+                       for x, y in zip(a.numerators.tolist(), b.numerators.tolist()))
+        for workers in (1, 2, 5):
+            for chunk_size in (1, 10, 1 << 20):
+                result = reduce_dot(a, b, workers=workers, chunk_size=chunk_size)
+                self.assertEqual(result, expected)
+                result.qformat.check_numerator(result._numerator)
+
+    def test_native(self):
+        self.check(QFormat(1, 15), QFormat(1, 15), 300)
+
+    def test_blocked_native(self):
+        self.check(QFormat(1, 30), QFormat(1, 30), 50)
+
+    def test_python_integers(self):
+        self.check(QFormat(2, 40), QFormat(3, 30), 50)
+
+    def test_result_qformat(self):
+        a = FixedPointArray([64, 64], QFormat(1, 7))
+        result = reduce_dot(a, a)
+        self.assertEqual(result.qformat, QFormat(3, 14))
+        self.assertEqual(result, FixedPoint(0.5))
+
+    def test_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            reduce_dot(FixedPointArray([1, 2], QFormat(8, 0)), FixedPointArray([1], QFormat(8, 0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from fractions import Fraction
+
+from fixedpoint import FixedPoint, QFormat
+from fixedpoint.profiler import (Profiler, probe, fraction_bits_of, integer_bits_for_range,
+                                 fraction_bits_for_error)
+
+
+def mac(acc, x, y):
+    return probe(acc + probe(x * y, 'product'), 'sum')
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_fraction_bits_of(self):
+        self.assertEqual(fraction_bits_of(FixedPoint(0.75, QFormat(4, 12))), 2)
+        self.assertEqual(fraction_bits_of(3), 0)
+        self.assertEqual(fraction_bits_of(0.1), 55)
+        self.assertIsNone(fraction_bits_of(Fraction(1, 3)))
+
+    def test_integer_bits_for_range(self):
+        self.assertEqual(integer_bits_for_range(-8, 7, 0), 4)
+        self.assertEqual(integer_bits_for_range(-8, 8, 0), 5)
+        self.assertEqual(integer_bits_for_range(0, 0.75, 2), 1)
+        self.assertEqual(integer_bits_for_range(-1, 0.99, 4), 2)  # 0.99 rounds up to 1
+        self.assertEqual(integer_bits_for_range(-1, 0.99, 8), 1)
+
+    def test_fraction_bits_for_error(self):
+        self.assertEqual(fraction_bits_for_error(2**-8), 7)
+        self.assertEqual(fraction_bits_for_error(0.001), 9)
+        self.assertEqual(fraction_bits_for_error(10), 0)
+        with self.assertRaises(ValueError):
+            fraction_bits_for_error(0)
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_probe_without_profiler(self):
+        value = FixedPoint(1)
+        self.assertIs(probe(value, 'x'), value)
+
+    def test_range_and_bits(self):
+        profiler = Profiler()
+        with profiler:
+            for value in (FixedPoint(-2.5), FixedPoint(3.25), FixedPoint(0.125, QFormat(8, 8))):
+                probe(value, 'x')
+        profile = profiler.profiles()['x']
+        self.assertEqual(profile.count, 3)
+        self.assertEqual((profile.minimum, profile.maximum), (Fraction(-5, 2), Fraction(13, 4)))
+        self.assertEqual((profile.integer_bits, profile.fraction_bits), (3, 3))
+        self.assertIsNone(profile.max_abs_error)
+        self.assertEqual(profiler.recommend(), {'x': QFormat(3, 3)})
+
+    def test_call_site_names(self):
+        profiler = Profiler()
+        with profiler:
+            probe(FixedPoint(1))
+        name, = profiler.profiles()
+        self.assertTrue(name.startswith(__file__.rstrip('c') + ':'))
+
+    def test_shadow_computation(self):
+        profiler = Profiler()
+        x, y = FixedPoint(0.3, QFormat(1, 15)), FixedPoint(-0.7, QFormat(1, 15))
+        result = profiler.run(mac, FixedPoint(0.5), x, y, shadow=[0.5, 0.3, -0.7])
+        self.assertEqual(result, FixedPoint(0.5) + x * y)
+        profiles = profiler.profiles()
+        self.assertAlmostEqual(profiles['product'].max_abs_error, abs(float(x * y) - 0.3 * -0.7))
+        self.assertEqual(profiles['sum'].rms_error, profiles['sum'].max_abs_error)
+        self.assertEqual(profiler.recommend(error_budget=2**-12), {'product': QFormat(1, 12), 'sum': QFormat(1, 12)})
+
+    def test_shadow_of_float_arguments(self):
+        profiler = Profiler()
+        profiler.run(lambda x: probe(x * x, 'square'), FixedPoint(1.5), shadow=True)
+        self.assertEqual(profiler.profiles()['square'].max_abs_error, 0)
+
+    def test_error_budget_reduces_fraction_bits(self):
+        profiler = Profiler()
+        for n in range(100):
+            profiler.record('x', FixedPoint.from_raw(n * 37 - 1800, QFormat(12, 16)))
+        self.assertEqual(profiler.recommend(), {'x': QFormat(1, 16)})
+        self.assertEqual(profiler.recommend(error_budget=2**-6), {'x': QFormat(1, 5)})
+
+    def test_budget_exhausted_keeps_values_exact(self):
+        profiler = Profiler()
+        profiler.record('x', FixedPoint(0.5), shadow=0.25)
+        self.assertEqual(profiler.recommend(error_budget=0.125), {'x': QFormat(1, 1)})
+
+    def test_inexact_values_need_budget(self):
+        profiler = Profiler()
+        profiler.record('x', Fraction(1, 3))
+        self.assertIsNone(profiler.profiles()['x'].fraction_bits)
+        with self.assertRaises(ValueError):
+            profiler.recommend()
+        self.assertEqual(profiler.recommend(error_budget=2**-10), {'x': QFormat(1, 9)})
+
+    def test_shadow_must_pass_same_probes(self):
+        def divergent(x):
+            return probe(x, 'fixed') if isinstance(x, FixedPoint) else probe(x, 'float')
+        with self.assertRaises(ValueError):
+            Profiler().run(divergent, FixedPoint(1), shadow=True)
+
+    def test_non_real_rejected(self):
+        with self.assertRaises(TypeError):
+            Profiler().record('x', 1j)
+
+    def test_reset(self):
+        profiler = Profiler()
+        profiler.record('x', 1)
+        profiler.reset()
+        self.assertEqual(profiler.profiles(), {})
+
+    def test_report(self):
+        profiler = Profiler()
+        profiler.run(mac, FixedPoint(0.5), FixedPoint(0.25), FixedPoint(0.5), shadow=True)
+        lines = profiler.report().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('Q1.3', lines[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
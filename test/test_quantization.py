@@ -0,0 +1,353 @@
+import random
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.quantization import (quantize, requantize, numerator_dtype, shift_round, constrain,
+                                         shift_round_integer, constrain_integer,
+                                         ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_HALF_AWAY,
+                                         ROUND_FLOOR, ROUND_CEILING, ROUND_TOWARD_ZERO,
+                                         OVERFLOW_SATURATE, OVERFLOW_WRAP, OVERFLOW_ERROR)
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestNumeratorDtype(unittest.TestCase):
+
+    def test_eight_bits(self):
+        self.assertIs(numerator_dtype(QFormat(4, 4)), np.int8)
+
+    def test_nine_bits(self):
+        self.assertIs(numerator_dtype(QFormat(1, 8)), np.int16)
+
+    def test_thirty_two_bits(self):
+        self.assertIs(numerator_dtype(QFormat(16, 16)), np.int32)
+
+    def test_sixty_four_bits(self):
+        self.assertIs(numerator_dtype(QFormat(32, 32)), np.int64)
+
+    def test_too_wide(self):
+        with self.assertRaises(ValueError):
+            numerator_dtype(QFormat(33, 32))
+
+    def test_unsigned(self):
+        self.assertIs(numerator_dtype(QFormat(0, 8, signed=False)), np.uint8)
+        self.assertIs(numerator_dtype(QFormat(0, 16, signed=False)), np.uint16)
+        self.assertIs(numerator_dtype(QFormat(12, 20, signed=False)), np.uint32)
+        self.assertIs(numerator_dtype(QFormat(64, 0, signed=False)), np.uint64)
+        with self.assertRaises(ValueError):
+            numerator_dtype(QFormat(64, 1, signed=False))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestQuantizeRounding(unittest.TestCase):
+
+    values = [2.5, 3.5, -2.5, -3.5, 2.25, -2.75, 0.0]
+
+    def check(self, rounding, expected):
+        q = quantize(self.values, QFormat(8, 0), rounding=rounding)
+        self.assertEqual(q.numerators.tolist(), expected)
+
+    def test_half_even(self):
+        self.check(ROUND_HALF_EVEN, [2, 4, -2, -4, 2, -3, 0])
+
+    def test_half_up(self):
+        self.check(ROUND_HALF_UP, [3, 4, -2, -3, 2, -3, 0])
+
+    def test_half_away(self):
+        self.check(ROUND_HALF_AWAY, [3, 4, -3, -4, 2, -3, 0])
+
+    def test_floor(self):
+        self.check(ROUND_FLOOR, [2, 3, -3, -4, 2, -3, 0])
+
+    def test_ceiling(self):
+        self.check(ROUND_CEILING, [3, 4, -2, -3, 3, -2, 0])
+
+    def test_toward_zero(self):
+        self.check(ROUND_TOWARD_ZERO, [2, 3, -2, -3, 2, -2, 0])
+
+    def test_unknown_rounding(self):
+        with self.assertRaises(ValueError):
+            quantize([1.0], QFormat(8, 0), rounding='stochastic')
+
+    def test_matches_scalar_constructor(self):
+        rng = random.Random(42)
+        qformat = QFormat(6, 10)
+        values = [rng.uniform(-32, 32) for _ in range(1000)]
+        q = quantize(values, qformat)
+        expected = [FixedPoint(v, qformat)._numerator for v in values]
+        self.assertEqual(q.numerators.tolist(), expected)
+        self.assertFalse(q.overflow.any())
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestQuantizeOverflow(unittest.TestCase):
+
+    def test_saturate(self):
+        q = quantize([9.0, -9.0, 7.9375, -8.0], QFormat(4, 4), overflow=OVERFLOW_SATURATE)
+        self.assertEqual(q.numerators.tolist(), [127, -128, 127, -128])
+        self.assertEqual(q.overflow.tolist(), [True, True, False, False])
+
+    def test_saturate_after_rounding(self):
+        q = quantize([7.99], QFormat(4, 4))
+        self.assertEqual(q.numerators.tolist(), [127])
+        self.assertTrue(q.overflow[0])
+
+    def test_wrap(self):
+        q = quantize([8.0, -8.0625, 24.5], QFormat(4, 4), overflow=OVERFLOW_WRAP)
+        self.assertEqual(q.numerators.tolist(), [-128, 127, -120])
+        self.assertEqual(q.overflow.tolist(), [True, True, True])
+
+    def test_error(self):
+        with self.assertRaises(OverflowError):
+            quantize([1.0, 8.0], QFormat(4, 4), overflow=OVERFLOW_ERROR)
+
+    def test_error_in_range(self):
+        q = quantize([1.0, -8.0], QFormat(4, 4), overflow=OVERFLOW_ERROR)
+        self.assertEqual(q.numerators.tolist(), [16, -128])
+
+    def test_nan_is_overflow(self):
+        q = quantize([float('nan')], QFormat(4, 4))
+        self.assertEqual(q.numerators.tolist(), [0])
+        self.assertTrue(q.overflow[0])
+
+    def test_infinities_saturate(self):
+        q = quantize([float('inf'), float('-inf')], QFormat(4, 4))
+        self.assertEqual(q.numerators.tolist(), [127, -128])
+
+    def test_saturate_sixty_four_bits(self):
+        q = quantize([1e30, -1e30], QFormat(64, 0))
+        self.assertEqual(q.numerators.tolist(), [2**63 - 1, -2**63])
+
+    def test_wrap_sixty_four_bits(self):
+        q = quantize([2.0**63], QFormat(64, 0), overflow=OVERFLOW_WRAP)
+        self.assertEqual(q.numerators.tolist(), [-2**63])
+
+    def test_unsigned(self):
+        qformat = QFormat(0, 16, signed=False)
+        q = quantize([0.5, 0.99999, -0.25, 1.0], qformat)
+        self.assertEqual(q.numerators.dtype, np.uint16)
+        self.assertEqual(q.numerators.tolist(), [32768, 65535, 0, 65535])
+        self.assertEqual(q.overflow.tolist(), [False, False, True, True])
+        q = quantize([-0.25, 1.25], qformat, overflow=OVERFLOW_WRAP)
+        self.assertEqual(q.numerators.tolist(), [49152, 16384])
+
+    def test_unsigned_sixty_four_bits(self):
+        qformat = QFormat(64, 0, signed=False)
+        self.assertEqual(quantize([1e30, -1.0], qformat).numerators.tolist(), [2**64 - 1, 0])
+        self.assertEqual(quantize([-1.0, 2.0**64 + 4096], qformat, overflow=OVERFLOW_WRAP).numerators.tolist(),
+                         [2**64 - 1, 4096])
+
+    def test_unknown_overflow(self):
+        with self.assertRaises(ValueError):
+            quantize([1.0], QFormat(8, 0), overflow='ignore')
+
+    def test_preserves_shape(self):
+        q = quantize(np.zeros((3, 4)), QFormat(4, 4))
+        self.assertEqual(q.numerators.shape, (3, 4))
+        self.assertEqual(q.overflow.shape, (3, 4))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestQuantizeStatistics(unittest.TestCase):
+
+    def test_no_statistics_by_default(self):
+        q = quantize([1.0], QFormat(4, 4))
+        self.assertIsNone(q.statistics)
+
+    def test_exact_values(self):
+        stats = quantize([1.0, 0.5, -2.25], QFormat(4, 4), statistics=True).statistics
+        self.assertEqual(stats.max_abs_error, 0.0)
+        self.assertEqual(stats.rms_error, 0.0)
+        self.assertEqual(stats.sqnr_db, float('inf'))
+
+    def test_errors(self):
+        stats = quantize([1.0 + 1/64, -1.0], QFormat(4, 4), statistics=True).statistics
+        self.assertEqual(stats.max_abs_error, 1/64)
+        self.assertAlmostEqual(stats.rms_error, (1/64) / 2**0.5)
+
+    def test_full_scale_ramp_sqnr(self):
+        values = np.linspace(-1, 0.999, 10001)
+        stats = quantize(values, QFormat(1, 15), statistics=True).statistics
+        self.assertLessEqual(stats.max_abs_error, 2**-16)
+        self.assertGreater(stats.sqnr_db, 90)
+
+    def test_non_finite_values_excluded(self):
+        stats = quantize([float('nan'), 0.5], QFormat(4, 4), statistics=True).statistics
+        self.assertEqual(stats.max_abs_error, 0.0)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestShiftRound(unittest.TestCase):
+
+    numerators = list(range(-12, 13))
+
+    def test_matches_float_quantization(self):
+        values = [n / 4 for n in self.numerators]
+        for rounding in (ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_HALF_AWAY,
+                         ROUND_FLOOR, ROUND_CEILING, ROUND_TOWARD_ZERO):
+            with self.subTest(rounding=rounding):
+                shifted = shift_round(np.array(self.numerators), -2, rounding)
+                expected = quantize(values, QFormat(8, 0), rounding=rounding).numerators
+                self.assertEqual(shifted.tolist(), expected.tolist())
+
+    def test_python_integers(self):
+        numerators = np.array([2**100 + 2**39, -(2**100) - 3 * 2**39], dtype=object)
+        shifted = shift_round(numerators, -40)
+        self.assertEqual(shifted.tolist(), [2**60, -(2**60) - 2])
+
+    def test_left_shift(self):
+        self.assertEqual(shift_round(np.array([3, -3]), 2).tolist(), [12, -12])
+
+    def test_scalar_matches_array(self):
+        numerators = list(range(-40, 41))
+        for rounding in (ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_HALF_AWAY,
+                         ROUND_FLOOR, ROUND_CEILING, ROUND_TOWARD_ZERO):
+            with self.subTest(rounding=rounding):
+                expected = shift_round(np.array(numerators), -3, rounding).tolist()
+                self.assertEqual([shift_round_integer(n, -3, rounding) for n in numerators], expected)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestConstrain(unittest.TestCase):
+
+    def test_in_range(self):
+        numerators, overflow = constrain(np.array([127, -128]), QFormat(4, 4))
+        self.assertEqual(numerators.dtype, np.int8)
+        self.assertFalse(overflow.any())
+
+    def test_saturate(self):
+        numerators, overflow = constrain(np.array([200, -300, 5]), QFormat(4, 4), OVERFLOW_SATURATE)
+        self.assertEqual(numerators.tolist(), [127, -128, 5])
+        self.assertEqual(overflow.tolist(), [True, True, False])
+
+    def test_wrap(self):
+        numerators, _ = constrain(np.array([200, -300, 5]), QFormat(4, 4), OVERFLOW_WRAP)
+        self.assertEqual(numerators.tolist(), [-56, -44, 5])
+
+    def test_wrap_python_integers(self):
+        numerators, _ = constrain(np.array([2**70 + 200], dtype=object), QFormat(4, 4), OVERFLOW_WRAP)
+        self.assertEqual(numerators.tolist(), [-56])
+
+    def test_error(self):
+        with self.assertRaises(OverflowError):
+            constrain(np.array([5, 200]), QFormat(4, 4), OVERFLOW_ERROR)
+
+    def test_scalar(self):
+        self.assertEqual(constrain_integer(200, QFormat(4, 4), OVERFLOW_SATURATE), 127)
+        self.assertEqual(constrain_integer(200, QFormat(4, 4), OVERFLOW_WRAP), -56)
+        self.assertEqual(constrain_integer(-5, QFormat(4, 4), OVERFLOW_ERROR), -5)
+        with self.assertRaises(OverflowError):
+            constrain_integer(-300, QFormat(4, 4), OVERFLOW_ERROR)
+
+    def test_wide_qformat(self):
+        numerators, _ = constrain(np.array([2**70], dtype=object), QFormat(40, 40))
+        self.assertEqual(numerators.dtype, object)
+
+    def test_unsigned(self):
+        qformat = QFormat(4, 4, signed=False)
+        numerators, overflow = constrain(np.array([300, -5, 200]), qformat, OVERFLOW_SATURATE)
+        self.assertEqual(numerators.dtype, np.uint8)
+        self.assertEqual(numerators.tolist(), [255, 0, 200])
+        self.assertEqual(overflow.tolist(), [True, True, False])
+        numerators, _ = constrain(np.array([300, -5, 200]), qformat, OVERFLOW_WRAP)
+        self.assertEqual(numerators.tolist(), [44, 251, 200])
+        numerators, _ = constrain(np.array([2**70 - 5], dtype=object), qformat, OVERFLOW_WRAP)
+        self.assertEqual(numerators.tolist(), [251])
+        self.assertEqual(constrain_integer(-5, qformat, OVERFLOW_WRAP), 251)
+
+    def test_unsigned_sixty_four_bits(self):
+        numerators, _ = constrain(np.array([-1, 5]), QFormat(64, 0, signed=False), OVERFLOW_SATURATE)
+        self.assertEqual(numerators.dtype, np.uint64)
+        self.assertEqual(numerators.tolist(), [0, 5])
+        numerators, _ = constrain(np.array([-1, 5]), QFormat(64, 0, signed=False), OVERFLOW_WRAP)
+        self.assertEqual(numerators.tolist(), [2**64 - 1, 5])
+
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestRequantize(unittest.TestCase):
+
+    def test_matches_rescale_numerator(self):
+        rng = random.Random(47)
+        source = QFormat(6, 10)
+        numerators = [rng.randrange(-2**15, 2**15) for _ in range(500)]
+        for target in (QFormat(6, 4), QFormat(8, 12), QFormat(10, 0)):
+            with self.subTest(target=target):
+                result = requantize(np.array(numerators, dtype=np.int16), source, target)
+                expected = [target.rescale_numerator(n, source) for n in numerators]
+                self.assertEqual(result.numerators.tolist(), expected)
+                self.assertIs(result.numerators.dtype.type, numerator_dtype(target))
+                self.assertEqual(result.saturated, 0)
+
+    def test_counts_saturated(self):
+        result = requantize(np.array([100, -100, 5, 127]), QFormat(4, 4), QFormat(2, 2))
+        self.assertEqual(result.numerators.tolist(), [7, -8, 1, 7])
+        self.assertEqual(result.saturated, 3)
+
+    def test_wrap(self):
+        result = requantize(np.array([100, -100]), QFormat(4, 4), QFormat(2, 2), overflow=OVERFLOW_WRAP)
+        self.assertEqual(result.numerators.tolist(), [-7, 7])
+        self.assertEqual(result.saturated, 2)
+
+    def test_error(self):
+        with self.assertRaises(OverflowError):
+            requantize(np.array([100]), QFormat(4, 4), QFormat(2, 2), overflow=OVERFLOW_ERROR)
+
+    def test_rounding(self):
+        result = requantize(np.array([6, -6]), QFormat(4, 2), QFormat(4, 0), rounding=ROUND_TOWARD_ZERO)
+        self.assertEqual(result.numerators.tolist(), [1, -1])
+
+    def test_per_channel_targets(self):
+        numerators = np.arange(-40, 40).reshape(8, 10) * 13
+        targets = [QFormat(4, 2), QFormat(8, 8)] * 5
+        result = requantize(numerators, QFormat(12, 4), targets, axis=1)
+        self.assertEqual(result.numerators.dtype, np.int16)
+        for channel, target in enumerate(targets):
+            expected = requantize(numerators[:, channel], QFormat(12, 4), target)
+            self.assertEqual(result.numerators[:, channel].tolist(), expected.numerators.tolist())
+            self.assertEqual(result.saturated[channel], expected.saturated)
+
+    def test_per_channel_sources(self):
+        numerators = np.array([[16, 16], [-8, -8]])
+        result = requantize(numerators, [QFormat(4, 4), QFormat(4, 2)], QFormat(8, 1), axis=0)
+        self.assertEqual(result.numerators.tolist(), [[2, 2], [-4, -4]])
+        self.assertEqual(result.saturated.tolist(), [0, 0])
+
+    def test_unsigned(self):
+        source = QFormat(0, 16, signed=False)
+        result = requantize(np.array([65535, 32768, 127], dtype=np.uint16), source, QFormat(0, 8, signed=False))
+        self.assertEqual(result.numerators.dtype, np.uint8)
+        self.assertEqual(result.numerators.tolist(), [255, 128, 0])
+        self.assertEqual(result.saturated, 1)
+        result = requantize(np.array([65535], dtype=np.uint16), source, QFormat(1, 15))
+        self.assertEqual(result.numerators.tolist(), [32767])
+        self.assertEqual(result.saturated, 1)
+
+    def test_unsigned_sixty_four_bits(self):
+        result = requantize(np.array([2**64 - 1], dtype=np.uint64), QFormat(64, 0, signed=False),
+                            QFormat(63, 1, signed=False))
+        self.assertEqual(result.numerators.tolist(), [2**64 - 1])
+        self.assertEqual(result.saturated, 1)
+
+    def test_mixed_signedness_channels(self):
+        targets = [QFormat(0, 8, signed=False), QFormat(1, 7)]
+        result = requantize(np.array([[-64, -64]]), QFormat(1, 7), targets, axis=1)
+        self.assertEqual(result.numerators.dtype, np.int16)
+        self.assertEqual(result.numerators.tolist(), [[0, -64]])
+
+    def test_wide_channel(self):
+        result = requantize(np.array([1, 2]), QFormat(4, 0), [QFormat(4, 0), QFormat(40, 40)], axis=-1)
+        self.assertEqual(result.numerators.dtype, object)
+        self.assertEqual(result.numerators.tolist(), [1, 2 << 40])
+
+    def test_qformat_count_mismatch(self):
+        with self.assertRaises(ValueError):
+            requantize(np.zeros((2, 3), dtype=np.int16), QFormat(4, 4), [QFormat(4, 4)] * 2, axis=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import asyncio
+import socket
+import unittest
+
+from fixedpoint import FixedPoint, QFormat
+
+try:
+    import numpy as np
+    from fixedpoint.array import FixedPointArray
+    from fixedpoint.dsp import FIRFilter
+    from fixedpoint.quantization import quantize
+    from fixedpoint.streaming import (Stage, Pipeline, quantize_stage, kernel_stage, requantize_stage, encode_stage,
+                                      read_blocks, write_blocks)
+except ImportError:
+    np = None
+
+
+async def iterate(blocks):
+    for block in blocks:
+        yield block
+
+
+async def collect(source):
+    return [block async for block in source]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+TAPS = [0.25, 0.5, 0.25]
+
+
+def reference(samples, output_qformat):
+    """Quantize, filter and requantize a whole signal at once."""
+    fir = FIRFilter(TAPS, QFormat(1, 15), QFormat(4, 30), QFormat(2, 15))
+    filtered = fir.process(quantize(samples, QFormat(1, 15)).numerators)
+    return [FixedPoint(FixedPoint.from_raw(n, QFormat(2, 15)), output_qformat)._numerator for n in filtered.tolist()]
+
+
+def make_pipeline(output_qformat, offload_threshold=None, queue_size=2):
+    fir = FIRFilter(TAPS, QFormat(1, 15), QFormat(4, 30), QFormat(2, 15))
+    return Pipeline([quantize_stage(QFormat(1, 15), offload_threshold=offload_threshold),
+                     kernel_stage(fir.process, fir.output_qformat, name='fir', offload_threshold=offload_threshold),
+                     requantize_stage(output_qformat, offload_threshold=offload_threshold),
+                     encode_stage(offload_threshold=offload_threshold)], queue_size=queue_size)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestStage(unittest.TestCase):
+
+    def test_standalone(self):
+        stage = Stage('double', lambda block: block * 2)
+        self.assertEqual(run(collect(stage(iterate([1, 2, 3])))), [2, 4, 6])
+        latency = stage.latency()
+        self.assertEqual(latency.name, 'double')
+        self.assertEqual(latency.count, 3)
+        self.assertGreaterEqual(latency.maximum, latency.mean)
+
+    def test_offload(self):
+        stage = Stage('sum', lambda block: int(block.sum()), offload_threshold=10)
+        blocks = [np.arange(5), np.arange(100)]
+        self.assertEqual(run(collect(stage(iterate(blocks)))), [10, 4950])
+
+    def test_reset(self):
+        stage = Stage('identity', lambda block: block)
+        run(collect(stage(iterate([1]))))
+        stage.reset()
+        self.assertEqual(stage.latency().count, 0)
+
+    def test_requantize_saturates(self):
+        stage = requantize_stage(QFormat(2, 2))
+        block = FixedPointArray([100, -100, 5], QFormat(4, 4))
+        result = run(collect(stage(iterate([block]))))[0]
+        self.assertEqual(result.numerators.tolist(), [7, -8, 1])
+
+    def test_encode(self):
+        block = FixedPointArray([1, -2], QFormat(4, 12))
+        self.assertEqual(run(collect(encode_stage('>')(iterate([block])))), [b'\x00\x01\xff\xfe'])
+
+    def test_invalid_byteorder(self):
+        with self.assertRaises(ValueError):
+            encode_stage('=')
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.samples = np.sin(np.linspace(0, 20, 1000)) * 0.9
+
+    def test_blocks_match_whole_signal(self):
+        for offload_threshold in (None, 1):
+            pipeline = make_pipeline(QFormat(2, 7), offload_threshold)
+            blocks = [self.samples[i:i + 64] for i in range(0, len(self.samples), 64)]
+            encoded = b''.join(run(collect(pipeline.run(iterate(blocks)))))
+            self.assertEqual(np.frombuffer(encoded, np.int16).tolist(), reference(self.samples, QFormat(2, 7)))
+            self.assertEqual([latency.count for latency in pipeline.latencies()], [len(blocks)] * 4)
+            self.assertEqual([latency.name for latency in pipeline.latencies()],
+                             ['quantize', 'fir', 'requantize', 'encode'])
+
+    def test_backpressure(self):
+        consumed = []
+
+        async def source():
+            for i in range(20):
+                consumed.append(i)
+                yield i
+
+        async def main():
+            pipeline = Pipeline([Stage('identity', lambda block: block)], queue_size=1)
+            results = pipeline.run(source())
+            first = await results.__anext__()
+            for _ in range(10):
+                await asyncio.sleep(0)
+            read_ahead = len(consumed)
+            await results.aclose()
+            return first, read_ahead
+
+        first, read_ahead = run(main())
+        self.assertEqual(first, 0)
+        # At most one block waits in each of the two queues, one is being put and one is yielded
+        self.assertLessEqual(read_ahead, 5)
+
+    def test_stage_error_propagates(self):
+        def fail(block):
+            if block == 2:
+                raise ArithmeticError("bad block")
+            return block
+
+        async def main():
+            results = []
+            with self.assertRaises(ArithmeticError):
+                async for block in Pipeline([Stage('fail', fail)]).run(iterate([1, 2, 3])):
+                    results.append(block)
+            return results
+
+        self.assertEqual(run(main()), [1])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Pipeline([])
+        with self.assertRaises(ValueError):
+            Pipeline([Stage('identity', lambda block: block)], queue_size=0)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestSocketStreaming(unittest.TestCase):
+
+    def test_socket_pair(self):
+        samples = (np.cos(np.linspace(0, 30, 777)) * 0.95).astype('<f4')
+        client_socket, server_socket = socket.socketpair()
+
+        async def serve(pipeline):
+            reader, writer = await asyncio.open_connection(sock=server_socket)
+            count = await write_blocks(writer, pipeline.run(read_blocks(reader, 100)))
+            writer.close()
+            await writer.wait_closed()
+            return count
+
+        async def client():
+            reader, writer = await asyncio.open_connection(sock=client_socket)
+            for start in range(0, len(samples), 50):
+                writer.write(samples[start:start + 50].tobytes())
+                await writer.drain()
+            writer.write_eof()
+            data = await reader.read()
+            writer.close()
+            await writer.wait_closed()
+            return data
+
+        async def main():
+            pipeline = make_pipeline(QFormat(2, 5))
+            count, data = await asyncio.gather(serve(pipeline), client())
+            return pipeline, count, data
+
+        pipeline, count, data = run(main())
+        self.assertEqual(count, len(samples))
+        self.assertEqual(np.frombuffer(data, np.int8).tolist(), reference(samples.astype(np.float64), QFormat(2, 5)))
+        self.assertEqual(pipeline.latencies()[0].count, 8)
+
+    def test_partial_sample(self):
+        async def main():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b'\x00' * 6)
+            reader.feed_eof()
+            return await collect(read_blocks(reader, 4))
+
+        with self.assertRaises(ValueError):
+            run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()